@@ -0,0 +1,41 @@
+"""Фильтры списков API (django-filter)."""
+
+from django_filters import rest_framework as filters
+
+from crm.date_filters import created_range
+from crm.models import Order, Purchase
+
+
+class CreatedRangeFilterSet(filters.FilterSet):
+    """Статус и диапазон дат создания ?date_from=&date_to= (YYYY-MM-DD).
+
+    Даты включительно, в часовом поясе TIME_ZONE; фильтр сравнивает
+    столбец create с границами дней и использует его индекс.
+    """
+
+    date_from = filters.DateFilter(method='filter_created')
+    date_to = filters.DateFilter(method='filter_created')
+
+    def filter_created(self, queryset, name, value):  # noqa: PLR6301
+        """Ограничивает дату создания одной границей диапазона."""
+        return queryset.filter(created_range(**{name: value}))
+
+
+class OrderFilter(CreatedRangeFilterSet):
+    """Фильтры списка заказов."""
+
+    class Meta:
+        """Поля модели, фильтруемые точным совпадением."""
+
+        model = Order
+        fields = ('status',)
+
+
+class PurchaseFilter(CreatedRangeFilterSet):
+    """Фильтры списка покупок."""
+
+    class Meta:
+        """Поля модели, фильтруемые точным совпадением."""
+
+        model = Purchase
+        fields = ('status',)
@@ -0,0 +1,18 @@
+"""Права доступа API."""
+
+from rest_framework.permissions import BasePermission
+
+
+class IsEventConsumer(BasePermission):
+    """Служебный пользователь потребителя событий (право на курсоры).
+
+    Сдвиг курсора доставки (POST /api/events/ack/) — право
+    crm.change_eventcursor: выдаётся служебному пользователю бота в
+    админке, у суперпользователя есть всегда.
+    """
+
+    message = 'Подтверждать события может только служебный пользователь.'
+
+    def has_permission(self, request, view):  # noqa: PLR6301
+        """Есть ли у пользователя право сдвигать курсоры доставки."""
+        return request.user.has_perm('crm.change_eventcursor')
@@ -3,10 +3,12 @@
 Содержит тесты для проверки работы API клиентов, заказов и покупок.
 """
 
+from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 from http import HTTPStatus
 
 import pytest
+from django.utils import timezone
 from rest_framework.test import APIClient
 
 from conftest import (
@@ -16,7 +18,8 @@ from conftest import (
     setup_api_client_with_auth,
     teardown_api_client_auth,
 )
-from crm.models import Client
+from crm.archive import archive_closed_orders
+from crm.models import Client, Order
 
 
 class BaseAPITest:
@@ -240,6 +243,27 @@ class TestOrderAPI(BaseAPITest):
             order['status'] == 'completed' for order in data
         ), 'Все заказы в ответе должны иметь статус "completed"'
 
+    def test_order_filter_by_create_dates(self):
+        """Даты создания фильтруются включительно по обеим границам."""
+        created = {
+            self.data['order1'].pk: datetime(2026, 3, 1, 23, 59, tzinfo=UTC),
+            self.data['order2'].pk: datetime(2026, 3, 2, tzinfo=UTC),
+            self.data['order3'].pk: datetime(2026, 2, 27, tzinfo=UTC),
+        }
+        for pk, value in created.items():
+            Order.objects.filter(pk=pk).update(create=value)
+        resp = self.api.get(
+            '/api/orders/',
+            {'date_from': '2026-03-01', 'date_to': '2026-03-01'},
+        )
+        assert [order['id'] for order in get_results(resp.json())] == [
+            self.data['order1'].pk
+        ]
+        resp = self.api.get('/api/orders/', {'date_from': '2026-03-01'})
+        assert len(get_results(resp.json())) == len(['order1', 'order2'])
+        resp = self.api.get('/api/orders/', {'date_to': 'вчера'})
+        assert resp.status_code == HTTPStatus.BAD_REQUEST
+
     def test_order_post_not_allowed(self):
         """Проверяет, что создание заказа запрещено."""
         resp = self.api.post('/api/orders/', {})
@@ -253,6 +277,46 @@ class TestOrderAPI(BaseAPITest):
         resp = self.api.get('/api/orders/', {'search': 'MA2000'})
         assert resp.status_code == HTTPStatus.OK
 
+    def test_order_search_by_code_prefix(self):
+        """Код с префиксом ищется точно и по началу кода, не по цифрам."""
+        resp = self.api.get('/api/orders/', {'search': 'TN-0010'})
+        codes = sorted(order['code'] for order in get_results(resp.json()))
+        assert codes == [
+            'TN-00101',
+            'TN-00102',
+            'TN-00103',
+        ], 'TN-0010 должен найти все заказы с кодами TN-0010x'
+        resp = self.api.get('/api/orders/', {'search': 'TN-00101'})
+        assert [order['code'] for order in get_results(resp.json())] == [
+            'TN-00101'
+        ], 'Полный код должен найти ровно один заказ'
+
+    def test_order_list_with_archive(self):
+        """?archive=true добавляет архивные заказы с теми же фильтрами."""
+        archive_closed_orders(timezone.now() + timedelta(days=1), 10)
+        resp = self.api.get('/api/orders/')
+        assert self.order2.id not in {o['id'] for o in resp.json()}
+
+        resp = self.api.get('/api/orders/', {'archive': 'true'})
+        data = get_results(resp.json())
+        assert [o['id'] for o in data] == [
+            self.order3.id,
+            self.order2.id,
+            self.order1.id,
+        ], 'Рабочие и архивные заказы идут по убыванию id'
+        assert [o['id'] for o in data if o['archived']] == [self.order2.id]
+        assert data[1]['duty'] == '1800.00'
+
+        resp = self.api.get(
+            '/api/orders/',
+            {'archive': 'true', 'status': 'completed', 'ordering': 'id'},
+        )
+        assert [o['id'] for o in get_results(resp.json())] == [self.order2.id]
+
+        resp = self.api.get(f'/api/orders/{self.order2.id}/')
+        assert resp.status_code == HTTPStatus.OK
+        assert resp.json()['code'] == self.order2.code
+
 
 # --------- Покупки ---------
 @pytest.mark.django_db
@@ -369,6 +433,16 @@ class TestPurchaseAPI(BaseAPITest):
             p['status'] == 'received' for p in data
         ), 'Все покупки в ответе должны иметь статус "received"'
 
+    def test_purchase_list_with_archive(self):
+        """Покупки архивных заказов видны только с ?archive=true."""
+        archive_closed_orders(timezone.now() + timedelta(days=1), 10)
+        resp = self.api.get('/api/purchases/')
+        assert self.purchase3.id not in {p['id'] for p in resp.json()}
+        resp = self.api.get('/api/purchases/', {'archive': 'true'})
+        archived = [p for p in get_results(resp.json()) if p['archived']]
+        assert [p['id'] for p in archived] == [self.purchase3.id]
+        assert archived[0]['order_code'] == self.data['order2'].code
+
     def test_purchase_ordering(self):
         """Проверяет сортировку покупок по идентификатору."""
         resp = self.api.get('/api/purchases/', {'ordering': 'id'})
@@ -390,3 +464,104 @@ class TestPurchaseAPI(BaseAPITest):
             'Метод POST должен быть запрещён для эндпоинта /api/purchases/ '
             '(используется ReadOnlyModelViewSet)'
         )
+
+
+# --------- Поиск для бота ---------
+@pytest.mark.django_db
+class TestBotLookupAPI(BaseAPITest):
+    """Тестирование компактного поиска /api/bot/lookup/."""
+
+    def setup_method(self):
+        """Подготовка перед каждым тестом."""
+        self.setup_auth()
+        self.data = create_crm_orders_and_purchases()
+        self.client1 = self.data['client1']
+        self.order1 = self.data['order1']
+        self.order2 = self.data['order2']
+
+    def teardown_method(self):
+        """Очистка после каждого теста."""
+        self.teardown_auth()
+
+    def lookup(self, query):
+        """Выполняет поиск и возвращает JSON ответа."""
+        resp = self.api.get('/api/bot/lookup/', {'q': query})
+        assert (
+            resp.status_code == HTTPStatus.OK
+        ), 'Статус ответа поиска для бота должен быть 200 OK'
+        return resp.json()
+
+    def test_lookup_requires_query(self):
+        """Без ?q= поиск возвращает 400 Bad Request."""
+        resp = self.api.get('/api/bot/lookup/')
+        assert resp.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_lookup_by_phone(self, django_assert_num_queries):
+        """Телефон в любом формате находит клиента и его открытые заказы."""
+        with django_assert_num_queries(3):  # пользователь JWT + 2 запроса
+            data = self.lookup('8 (999) 000-00-01')
+        assert data['match'] == 'phone'
+        assert data['client']['id'] == self.client1.id
+        assert [o['code'] for o in data['orders']] == [self.order1.code], (
+            'В ответе должны быть только открытые заказы клиента, '
+            'выполненный заказ не показывается'
+        )
+
+    def test_lookup_by_order_code(self):
+        """Код закрытого заказа находит клиента, сам заказ идёт первым."""
+        for query in (self.order2.code, str(self.order2.number)):
+            data = self.lookup(query)
+            assert data['match'] == 'order'
+            assert data['client']['id'] == self.client1.id
+            assert [o['id'] for o in data['orders']] == [
+                self.order2.id,
+                self.order1.id,
+            ]
+
+    def test_lookup_by_phone_prefix(self, django_assert_num_queries):
+        """Цифры без заказа с таким номером ищутся как начало телефона."""
+        client = Client.objects.create(
+            client_name='Префикс',
+            mobile_phone='+79161234567',
+        )
+        with django_assert_num_queries(
+            len(['пользователь JWT', 'заказ', 'клиент', 'заказы клиента'])
+        ):
+            data = self.lookup('8916123')
+        assert data['match'] == 'phone'
+        assert data['client']['id'] == client.id
+        assert data['orders'] == []
+
+        data = self.lookup('8999000')
+        assert data == {'match': None, 'client': None, 'orders': []}, (
+            'Начало телефона, общее для нескольких клиентов, '
+            'не должно выбирать одного из них'
+        )
+
+    def test_lookup_order_number_before_phone_prefix(self):
+        """Существующий номер заказа важнее совпадения начала телефона."""
+        Client.objects.create(
+            client_name='Тёзка номера',
+            mobile_phone=f'+7{self.order2.number:0<10}',
+        )
+        data = self.lookup(str(self.order2.number))
+        assert data['match'] == 'order'
+        assert data['client']['id'] == self.client1.id
+
+    def test_lookup_by_equipment(self):
+        """Наименование оборудования находит клиента последнего заказа."""
+        data = self.lookup('lenovo')
+        assert data['match'] == 'equipment'
+        assert data['client']['id'] == self.client1.id
+        assert set(data['orders'][0]) == {
+            'id',
+            'code',
+            'create',
+            'accepted_equipment',
+            'status',
+        }, 'Заказы в ответе для бота должны быть в кратком формате'
+
+    def test_lookup_not_found(self):
+        """Если ничего не найдено, client=null и пустой список заказов."""
+        data = self.lookup('+79995550000')
+        assert data == {'match': None, 'client': None, 'orders': []}
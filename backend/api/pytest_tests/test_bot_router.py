@@ -0,0 +1,132 @@
+"""Тесты маршрутизации текстовых сообщений бота (telegram_bot.router).
+
+Проверяется:
+1. Порядок выбора обработчика: (этап, текст) -> этап -> текст
+2. Служебные кнопки не перехватываются обработчиком этапа
+3. Неизвестный текст на этапе без обработчиков не маршрутизируется
+4. Таблица переходов DialogState
+5. Каждый этап, в который ведут ENTRY_STAGES и TRANSITIONS, обслуживается
+   зарегистрированным обработчиком
+"""
+
+import importlib
+
+import pytest
+
+from telegram_bot import config
+from telegram_bot.constants import SERVICE_BUTTONS
+from telegram_bot.router import (
+    ENTRY_STAGES,
+    TRANSITIONS,
+    DialogState,
+    Router,
+    Stage,
+)
+
+CHAT_ID = 1
+# Токен в формате Telegram: TeleBot проверяет его при создании бота.
+FAKE_BOT_TOKEN = '123456:TEST-TOKEN'  # noqa: S105
+
+
+def handler_named(name):
+    """Обработчик-заглушка, различимый по имени."""
+
+    def handler(message):
+        """Ничего не делает: тесты проверяют только выбор обработчика."""
+
+    handler.__name__ = name
+    return handler
+
+
+@pytest.fixture
+def router():
+    """Маршрутизатор с обработчиками всех трёх видов для ORDERS_MENU."""
+    router = Router({CHAT_ID: DialogState(Stage.ORDERS_MENU)})
+    router.stage_text(Stage.ORDERS_MENU, 'Поиск')(handler_named('stage_text'))
+    router.stage(Stage.ORDERS_MENU)(handler_named('stage'))
+    router.text('Поиск', 'Заказы', 'Меню')(handler_named('text'))
+    return router
+
+
+def route_name(router, text, chat_id=CHAT_ID):
+    """Имя обработчика, выбранного для текста, или None."""
+    handler = router.resolve(chat_id, text)
+    return handler.__name__ if handler is not None else None
+
+
+def test_stage_text_beats_stage(router):
+    """Кнопка этапа важнее обработчика свободного ввода и общей кнопки."""
+    assert route_name(router, 'Поиск') == 'stage_text'
+
+
+def test_stage_beats_text(router):
+    """Свободный ввод на этапе важнее общей кнопки с тем же текстом."""
+    router.text('Иванов')(handler_named('text'))
+    assert route_name(router, 'Иванов') == 'stage'
+
+
+@pytest.mark.parametrize('text', sorted(SERVICE_BUTTONS & {'Заказы', 'Меню'}))
+def test_service_buttons_bypass_stage_routes(router, text):
+    """Служебные кнопки работают на любом этапе со свободным вводом."""
+    assert route_name(router, text) == 'text'
+
+
+def test_unknown_text_in_unknown_stage_falls_through(router):
+    """На этапе без обработчиков неизвестный текст остаётся без ответа."""
+    router.dialogs[CHAT_ID] = DialogState('unknown_stage')
+    assert route_name(router, 'Привет') is None
+    assert route_name(router, 'Заказы') == 'text'
+
+
+def test_chat_without_dialog_is_idle(router):
+    """Чат без состояния диалога маршрутизируется как IDLE."""
+    other_chat = CHAT_ID + 1
+    assert route_name(router, 'Заказы', chat_id=other_chat) == 'text'
+    assert route_name(router, 'Иванов', chat_id=other_chat) is None
+
+
+def test_dialog_state_transitions():
+    """Переходы вне TRANSITIONS и ENTRY_STAGES запрещены."""
+    state = DialogState(Stage.ORDERS_MENU)
+    state.advance(Stage.AWAIT_STATUS)
+    with pytest.raises(ValueError, match='Недопустимый переход'):
+        state.advance(Stage.AWAIT_PASSWORD)
+    state.advance(Stage.AWAIT_USERNAME)
+    state.advance(Stage.AWAIT_PASSWORD)
+    assert state.stage == Stage.AWAIT_PASSWORD
+
+
+@pytest.fixture(scope='module')
+def bot_router():
+    """Маршрутизатор бота с обработчиками из всех модулей хендлеров."""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(
+            config,
+            'TELEGRAM_BOT_TOKEN',
+            config.TELEGRAM_BOT_TOKEN or FAKE_BOT_TOKEN,
+        )
+        main = importlib.import_module('telegram_bot.main')
+        for module in main.HANDLER_MODULES:
+            importlib.import_module(module)
+    return main.router
+
+
+def reachable_stages():
+    """Этапы, в которые можно попасть, кроме IDLE (там — только кнопки)."""
+    stages = set(ENTRY_STAGES)
+    for targets in TRANSITIONS.values():
+        stages |= targets
+    return sorted(stages - {Stage.IDLE})
+
+
+@pytest.mark.parametrize('stage', reachable_stages())
+def test_reachable_stage_has_handler(bot_router, stage):
+    """На каждом достижимом этапе зарегистрирован хотя бы один обработчик."""
+    assert stage in bot_router.stage_routes or any(
+        route_stage == stage for route_stage, _ in bot_router.stage_text_routes
+    ), f'Этап {stage} недостижим для обработчиков'
+
+
+def test_service_buttons_have_handlers(bot_router):
+    """Каждая служебная кнопка обслуживается обработчиком любого этапа."""
+    assert bot_router.text_routes.keys() >= SERVICE_BUTTONS
@@ -0,0 +1,161 @@
+"""Тесты доставки апдейтов Telegram через webhook (telegram_bot.webhook).
+
+Проверяется:
+1. Апдейты одного чата обрабатываются одним потоком по порядку
+2. stop() дожидается обработки уже принятых апдейтов
+3. Переполненная очередь отвечает 503
+4. Запрос без секрета или с неверным секретом отклоняется
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.client import HTTPConnection
+
+import pytest
+from telebot import types
+
+from telegram_bot.webhook import (
+    SECRET_HEADER,
+    ChatOrderedWorkerPool,
+    build_server,
+)
+
+SECRET = 'webhook-secret'  # noqa: S105
+PATH = '/telegram/webhook'
+WORKERS = 2
+UPDATES_PER_CHAT = 5
+HANDLER_DELAY = 0.01
+
+
+def update_payload(update_id: int, chat_id: int) -> dict:
+    """Тело апдейта Telegram с текстовым сообщением чата chat_id."""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': str(update_id),
+        },
+    }
+
+
+def make_update(update_id: int, chat_id: int) -> types.Update:
+    """Апдейт Telegram с сообщением чата chat_id."""
+    return types.Update.de_json(update_payload(update_id, chat_id))
+
+
+class RecordingHandler:
+    """Обработчик пула: запоминает чат, апдейт и поток обработки."""
+
+    def __init__(self, delay=0.0):
+        """Запоминает время «обработки» одного апдейта (с)."""
+        self.delay = delay
+        self.handled = []
+        self.lock = threading.Lock()
+
+    def __call__(self, updates):
+        """Имитирует bot.process_new_updates."""
+        for update in updates:
+            time.sleep(self.delay)
+            with self.lock:
+                self.handled.append(
+                    (
+                        update.message.chat.id,
+                        update.update_id,
+                        threading.current_thread().name,
+                    )
+                )
+
+
+def test_pool_keeps_order_within_chat():
+    """Апдейты чата идут одним потоком по порядку, чаты — параллельно."""
+    handler = RecordingHandler(delay=HANDLER_DELAY)
+    pool = ChatOrderedWorkerPool(handler, WORKERS, queue_size=100)
+    pool.start()
+    chats = range(WORKERS * 2)
+    update_id = 0
+    for _ in range(UPDATES_PER_CHAT):
+        for chat_id in chats:
+            update_id += 1
+            assert pool.submit(make_update(update_id, chat_id))
+    pool.stop()
+
+    for chat_id in chats:
+        handled = [item for item in handler.handled if item[0] == chat_id]
+        ids = [update for _, update, _ in handled]
+        assert len(ids) == UPDATES_PER_CHAT
+        assert ids == sorted(ids), 'Апдейты чата не должны обгонять друг друга'
+        assert len({thread for _, _, thread in handled}) == 1
+    assert len({thread for _, _, thread in handler.handled}) == WORKERS
+
+
+def test_pool_stop_drains_accepted_updates():
+    """stop() дожидается обработки всех принятых апдейтов."""
+    handler = RecordingHandler(delay=HANDLER_DELAY)
+    pool = ChatOrderedWorkerPool(handler, WORKERS, queue_size=100)
+    pool.start()
+    total = WORKERS * UPDATES_PER_CHAT
+    for update_id in range(1, total + 1):
+        assert pool.submit(make_update(update_id, update_id))
+    pool.stop()
+    assert len(handler.handled) == total
+
+
+@contextmanager
+def webhook_server(pool):
+    """HTTP-сервер webhook на свободном порту в фоновом потоке."""
+    server = build_server(pool, '127.0.0.1', 0, PATH, SECRET)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def post_update(port, payload, secret=SECRET, path=PATH) -> int:
+    """POST апдейта на webhook; возвращает код ответа."""
+    connection = HTTPConnection('127.0.0.1', port, timeout=5)
+    headers = {'Content-Type': 'application/json'}
+    if secret is not None:
+        headers[SECRET_HEADER] = secret
+    try:
+        connection.request('POST', path, json.dumps(payload), headers)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_webhook_full_queue_returns_503():
+    """Если очередь чата заполнена, Telegram получает 503 и повторит."""
+    handler = RecordingHandler()
+    pool = ChatOrderedWorkerPool(handler, 1, queue_size=1)
+    # Пул не запущен: первый апдейт занимает очередь, второму нет места.
+    with webhook_server(pool) as port:
+        assert post_update(port, update_payload(1, 1)) == HTTPStatus.OK
+        assert (
+            post_update(port, update_payload(2, 1))
+            == HTTPStatus.SERVICE_UNAVAILABLE
+        )
+    pool.start()
+    pool.stop()
+    assert [update for _, update, _ in handler.handled] == [1]
+
+
+@pytest.mark.parametrize('secret', [None, '', 'wrong-secret'])
+def test_webhook_rejects_wrong_secret(secret):
+    """Запрос без секрета или с чужим секретом отклоняется с 403."""
+    handler = RecordingHandler()
+    pool = ChatOrderedWorkerPool(handler, 1, queue_size=10)
+    pool.start()
+    with webhook_server(pool) as port:
+        status = post_update(port, update_payload(1, 1), secret=secret)
+    pool.stop()
+    assert status == HTTPStatus.FORBIDDEN
+    assert not handler.handled
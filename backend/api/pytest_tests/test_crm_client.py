@@ -0,0 +1,162 @@
+"""Тесты упреждающего обновления access-токена клиента CRM для бота.
+
+Проверяется:
+1. Синхронное обновление истёкшего токена перед запросом
+2. Одно фоновое обновление на много запросов у границы срока жизни
+3. Журналирование неожиданных ошибок фонового обновления
+"""
+
+import threading
+import time
+from http import HTTPStatus
+
+import jwt
+import pytest
+
+from telegram_bot.constants import (
+    ACCESS_TOKEN_EXPIRY_SKEW,
+    ACCESS_TOKEN_REFRESH_MARGIN,
+)
+from telegram_bot.crm_client import CRMClient
+from telegram_bot.logger import logger
+
+REFRESH_TOKEN = 'refresh'  # noqa: S105
+CONCURRENT_REQUESTS = 5
+WAIT_TIMEOUT = 5
+
+
+def make_token(expires_in: float) -> str:
+    """JWT с claim exp через expires_in секунд (подпись не проверяется)."""
+    return jwt.encode({'exp': int(time.time() + expires_in)}, 'secret')
+
+
+class FakeResponse:
+    """Ответ API с кодом и JSON."""
+
+    def __init__(self, data=None, status_code=HTTPStatus.OK):
+        """Запоминает тело и код ответа."""
+        self.data = data or {}
+        self.status_code = status_code
+
+    def json(self):
+        """Тело ответа."""
+        return self.data
+
+    def raise_for_status(self):
+        """Ответы фейкового API всегда успешны."""
+
+
+class FakeSession:
+    """Фейковая requests.Session: считает обновления токена.
+
+    refresh_started — обновление начато, release — разрешает ему
+    завершиться, refresh_error — исключение вместо ответа.
+    """
+
+    def __init__(self, refresh_error=None):
+        """Готовит счётчики и события."""
+        self.refresh_error = refresh_error
+        self.refreshes = 0
+        self.tokens = []
+        self.refresh_started = threading.Event()
+        self.release = threading.Event()
+
+    def post(self, url, json, timeout):
+        """POST /api/auth/jwt/refresh/."""
+        self.refreshes += 1
+        self.refresh_started.set()
+        self.release.wait(WAIT_TIMEOUT)
+        if self.refresh_error is not None:
+            raise self.refresh_error
+        return FakeResponse({'access': make_token(3600)})
+
+    def request(self, method, url, headers, **kwargs):
+        """Запрос к API: запоминает токен из заголовка."""
+        self.tokens.append(headers['Authorization'].removeprefix('Bearer '))
+        return FakeResponse([])
+
+
+def make_client(expires_in: float, session: FakeSession) -> CRMClient:
+    """Клиент CRM с токеном, истекающим через expires_in секунд."""
+    client = CRMClient(make_token(expires_in), REFRESH_TOKEN)
+    client.session = session
+    return client
+
+
+def wait_background_refresh():
+    """Дожидается завершения фоновых потоков обновления токена."""
+    for thread in threading.enumerate():
+        if thread.name == 'crm-token-refresh':
+            thread.join(WAIT_TIMEOUT)
+
+
+def test_expired_token_refreshed_before_request():
+    """Почти истёкший токен обновляется до запроса, запрос — с новым."""
+    session = FakeSession()
+    session.release.set()
+    client = make_client(ACCESS_TOKEN_EXPIRY_SKEW / 2, session)
+    old_token = client.access_token
+
+    client.get_clients()
+
+    assert session.refreshes == 1
+    assert session.tokens == [client.access_token]
+    assert client.access_token != old_token
+
+
+def test_background_refresh_started_once():
+    """Запросы у границы срока жизни запускают одно фоновое обновление.
+
+    Пока оно идёт, запросы уходят со старым, ещё действующим токеном.
+    """
+    session = FakeSession()
+    client = make_client(ACCESS_TOKEN_REFRESH_MARGIN / 2, session)
+    old_token = client.access_token
+
+    threads = [
+        threading.Thread(target=client.get_clients)
+        for _ in range(CONCURRENT_REQUESTS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(WAIT_TIMEOUT)
+    assert session.refresh_started.wait(WAIT_TIMEOUT)
+    client.get_clients()
+    session.release.set()
+    wait_background_refresh()
+
+    assert session.refreshes == 1
+    assert session.tokens == [old_token] * (CONCURRENT_REQUESTS + 1)
+    assert client.access_token != old_token
+    assert client.access_expires_at > time.time() + ACCESS_TOKEN_REFRESH_MARGIN
+
+
+@pytest.fixture
+def bot_log(caplog):
+    """Записи журнала бота (у его логгера отключён propagate)."""
+    logger.addHandler(caplog.handler)
+    try:
+        yield caplog
+    finally:
+        logger.removeHandler(caplog.handler)
+
+
+def test_background_refresh_logs_unexpected_error(bot_log):
+    """Неожиданная ошибка фонового обновления пишется в журнал.
+
+    Следующий запрос может снова запустить обновление.
+    """
+    session = FakeSession(refresh_error=ValueError('битый ответ'))
+    session.release.set()
+    client = make_client(ACCESS_TOKEN_REFRESH_MARGIN / 2, session)
+
+    client.get_clients()
+    wait_background_refresh()
+
+    [record] = [r for r in bot_log.records if r.exc_info]
+    assert record.exc_info[0] is ValueError
+    session.refresh_error = None
+    client.get_clients()
+    wait_background_refresh()
+    assert session.refreshes == len(['с ошибкой', 'успешное'])
@@ -0,0 +1,118 @@
+"""Тесты метрик запросов (tech_support.metrics).
+
+Проверяется:
+1. Выдача метрик по view в формате Prometheus и заголовок Server-Timing
+2. Ошибка при превышении бюджета запросов view
+3. Подсчёт повторяющихся SQL и обращений к кешу
+4. Метрики соединений с БД и пула psycopg
+"""
+
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from api.views import PurchaseViewSet
+from tech_support.metrics import (
+    QueryBudgetExceeded,
+    registry,
+    render_pool_metrics,
+    track_queries,
+)
+
+METRICS_TOKEN = 'metrics-secret'  # noqa: S105
+
+
+@pytest.fixture
+def metrics_settings(settings):
+    """Включает Server-Timing и токен для /metrics, очищает registry."""
+    settings.METRICS_SERVER_TIMING = True
+    settings.METRICS_TOKEN = METRICS_TOKEN
+    registry.reset()
+    yield settings
+    registry.reset()
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_and_server_timing(
+    api_client_auth, crm_data, metrics_settings
+):
+    """Запрос к API учитывается по имени view и виден в /metrics."""
+    resp = api_client_auth.get('/api/purchases/')
+    assert resp.status_code == HTTPStatus.OK
+    assert resp['Server-Timing'].startswith('total;dur=')
+    assert 'queries' in resp['Server-Timing']
+
+    api_client_auth.credentials()
+    assert (
+        api_client_auth.get('/metrics').status_code == HTTPStatus.FORBIDDEN
+    ), 'Метрики без токена должны быть недоступны'
+    resp = api_client_auth.get(
+        '/metrics', HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}'
+    )
+    assert resp.status_code == HTTPStatus.OK
+    assert resp['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = resp.content.decode()
+    assert 'django_db_queries_total{view="purchase-list"} 2' in body
+    assert (
+        'django_http_request_duration_seconds_count{view="purchase-list"} 1'
+        in body
+    )
+
+
+@pytest.mark.django_db
+def test_query_budget_exceeded(api_client_auth, crm_data, monkeypatch):
+    """View, выполнившая больше запросов, чем query_budget, — ошибка."""
+    monkeypatch.setattr(PurchaseViewSet, 'query_budget', 1)
+    with pytest.raises(QueryBudgetExceeded, match='purchase-list'):
+        api_client_auth.get('/api/purchases/')
+
+
+@pytest.mark.django_db
+def test_track_queries_counts_duplicates_and_cache():
+    """Повторы одного SQL и попадания/промахи кеша попадают в статистику."""
+    users = [
+        User.objects.create(username=f'user{index}') for index in range(3)
+    ]
+    cache.set('metrics-test', 1)
+    with track_queries(detailed=True) as stats:
+        for user in users:
+            User.objects.get(pk=user.pk)
+        cache.get('metrics-test')
+        cache.get_many(['metrics-test', 'metrics-missing'])
+    assert stats.queries == len(users)
+    assert stats.duplicates == len(users) - 1
+    assert stats.top_duplicates()[0][1] == len(users)
+    assert (stats.cache_hits, stats.cache_misses) == (2, 1)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('metrics_settings')
+def test_connection_and_pool_metrics():
+    """Открытые соединения и статистика пула выдаются по алиасам БД."""
+    registry.connection_opened('default')
+    assert (
+        'django_db_connections_opened_total{alias="default"} 1'
+        in registry.render()
+    )
+    body = render_pool_metrics(
+        {
+            'default': {
+                'pool_max': 4,
+                'pool_size': 4,
+                'pool_available': 1,
+                'requests_num': 10,
+                'requests_queued': 2,
+                'requests_wait_ms': 1500,
+            }
+        }
+    )
+    assert 'django_db_pool_requests_queued_total{alias="default"} 2' in body
+    assert (
+        'django_db_pool_requests_wait_seconds_total{alias="default"} 1.500000'
+        in body
+    )
+    assert 'django_db_pool_requests_errors_total{alias="default"} 0' in body
+    assert 'django_db_pool_usage_ratio{alias="default"} 0.750000' in body
+    assert not render_pool_metrics({})
@@ -0,0 +1,337 @@
+"""Тесты outbox-событий о смене статусов и их доставки в Telegram-бот.
+
+Проверяется:
+1. Запись события в outbox при смене статуса заказа/покупки
+2. Выдача событий после курсора и подтверждение доставки (ack)
+3. Событие транзакции, закоммиченной позже соседней, в пределах
+   задержки видимости не теряется, а коммит позже задержки журналируется
+4. Доставка «хотя бы один раз» потребителем бота с фейковым Telegram
+"""
+
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from telebot.apihelper import ApiTelegramException
+
+from conftest import create_crm_orders_and_purchases, create_test_user
+from crm.models import (
+    EventCursor,
+    Order,
+    OrderEvent,
+    OrderEventKind,
+    OrderStatus,
+    Purchase,
+    PurchaseStatus,
+)
+from telegram_bot.crm_client import CRMClient
+from telegram_bot.notifications import EventConsumer, format_events
+
+CONSUMER = 'telegram_bot'
+
+
+@pytest.fixture(autouse=True)
+def events_visible_immediately(settings):
+    """События выдаются сразу после записи (без задержки видимости)."""
+    settings.EVENTS_VISIBILITY_DELAY = 0
+
+
+def grant_ack_permission(user):
+    """Делает пользователя служебным потребителем событий."""
+    user.user_permissions.add(
+        Permission.objects.get(
+            content_type__app_label='crm', codename='change_eventcursor'
+        )
+    )
+
+
+def telegram_error(code, **parameters):
+    """Создаёт исключение в формате ответа Telegram Bot API."""
+    return ApiTelegramException(
+        'sendMessage',
+        None,
+        {
+            'ok': False,
+            'error_code': code,
+            'description': 'fake',
+            'parameters': parameters,
+        },
+    )
+
+
+class FakeTelegram:
+    """Фейковый Telegram: запоминает сообщения, умеет падать по сценарию."""
+
+    def __init__(self, failures=None):
+        """Сценарий ошибок: {chat_id: [исключение, ...]} для первых вызовов."""
+        self.failures = failures or {}
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        """Имитирует sendMessage."""
+        pending = self.failures.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+        self.sent.append((chat_id, text))
+
+
+@pytest.mark.django_db
+def test_order_status_change_writes_event(crm_data):
+    """Смена статуса заказа пишет одно событие, сохранение без смены — нет."""
+    order = Order.objects.get(pk=crm_data['order1'].pk)
+    order.paid += 1
+    order.save()
+    assert (
+        not OrderEvent.objects.exists()
+    ), 'Сохранение заказа без смены статуса не должно создавать событие'
+    order.status = OrderStatus.READY_PICKUP
+    order.save()
+    event = OrderEvent.objects.get()
+    assert event.kind == OrderEventKind.ORDER_STATUS
+    assert event.order_id == order.pk
+    assert event.old_status == OrderStatus.IN_WORKING
+    assert event.new_status == OrderStatus.READY_PICKUP
+    assert event.order_code == order.code
+
+
+@pytest.mark.django_db
+def test_purchase_status_change_writes_event(crm_data):
+    """Смена статуса покупки пишет событие со снимком кода заказа."""
+    purchase = Purchase.objects.get(pk=crm_data['purchase1'].pk)
+    purchase.status = PurchaseStatus.RECEIVED
+    purchase.save()
+    event = OrderEvent.objects.get()
+    assert event.kind == OrderEventKind.PURCHASE_STATUS
+    assert event.purchase_id == purchase.pk
+    assert event.order_code == crm_data['order1'].code
+    assert event.title == purchase.detail
+
+
+@pytest.mark.django_db
+def test_events_api_cursor_and_ack(api_client_auth, api_user, crm_data):
+    """Без ack события выдаются повторно, ack сдвигает курсор вперёд."""
+    grant_ack_permission(api_user)
+    for key in ('order1', 'order2'):
+        order = Order.objects.get(pk=crm_data[key].pk)
+        order.status = OrderStatus.NOT_RELEVANT
+        order.save()
+    first, second = OrderEvent.objects.values_list('id', flat=True)
+
+    params = {'consumer': CONSUMER, 'limit': 1}
+    resp = api_client_auth.get('/api/events/', params)
+    assert resp.status_code == HTTPStatus.OK
+    assert [e['id'] for e in resp.json()] == [first]
+    resp = api_client_auth.get('/api/events/', params)
+    assert [e['id'] for e in resp.json()] == [
+        first
+    ], 'Неподтверждённое событие должно выдаваться повторно'
+
+    resp = api_client_auth.post(
+        '/api/events/ack/', {'consumer': CONSUMER, 'last_event_id': first}
+    )
+    assert resp.status_code == HTTPStatus.OK
+    resp = api_client_auth.get('/api/events/', params)
+    assert [e['id'] for e in resp.json()] == [second]
+
+    api_client_auth.post(
+        '/api/events/ack/', {'consumer': CONSUMER, 'last_event_id': 0}
+    )
+    cursor = EventCursor.objects.get(consumer=CONSUMER)
+    assert cursor.last_event_id == first, 'Курсор не должен сдвигаться назад'
+
+
+@pytest.mark.django_db
+def test_events_api_ack_requires_permission(api_client_auth, crm_data):
+    """Обычный пользователь API не может сдвинуть курсор доставки."""
+    resp = api_client_auth.post(
+        '/api/events/ack/', {'consumer': CONSUMER, 'last_event_id': 1}
+    )
+    assert resp.status_code == HTTPStatus.FORBIDDEN
+    assert not EventCursor.objects.exists()
+
+
+@pytest.mark.django_db
+def test_events_api_hides_recent_events(api_client_auth, crm_data, settings):
+    """Свежие события не выдаются, пока не истечёт задержка видимости.
+
+    Иначе событие транзакции, закоммиченной позже соседней с большим id,
+    оказалось бы за курсором и не было бы доставлено.
+    """
+    settings.EVENTS_VISIBILITY_DELAY = 60
+    order = Order.objects.get(pk=crm_data['order1'].pk)
+    order.status = OrderStatus.READY_PICKUP
+    order.save()
+    params = {'consumer': CONSUMER}
+    assert api_client_auth.get('/api/events/', params).json() == []
+
+    event = OrderEvent.objects.get()
+    OrderEvent.objects.filter(pk=event.pk).update(
+        create=timezone.now() - timedelta(seconds=61)
+    )
+    resp = api_client_auth.get('/api/events/', params)
+    assert [e['id'] for e in resp.json()] == [event.id]
+
+
+@pytest.mark.django_db
+def test_events_api_late_commit_within_delay(
+    api_client_auth, crm_data, settings
+):
+    """Событие с меньшим id, закоммиченное позже, выдаётся по порядку.
+
+    Транзакция A записала событие раньше B, но закоммитилась позже — в
+    пределах EVENTS_VISIBILITY_DELAY. Пока A не видна, B ещё скрыта
+    задержкой, поэтому курсор B не перепрыгивает.
+    """
+    settings.EVENTS_VISIBILITY_DELAY = 60
+    for key in ('order1', 'order2'):
+        order = Order.objects.get(pk=crm_data[key].pk)
+        order.status = OrderStatus.NOT_RELEVANT
+        order.save()
+    late, committed = OrderEvent.objects.all()
+    # Пока транзакция A не закоммичена, её события не видно.
+    OrderEvent.objects.filter(pk=late.pk).delete()
+    OrderEvent.objects.update(create=timezone.now() - timedelta(seconds=30))
+    params = {'consumer': CONSUMER}
+    assert api_client_auth.get('/api/events/', params).json() == []
+
+    # A коммитится; её событие записано раньше события B.
+    late.save(force_insert=True)
+    OrderEvent.objects.filter(pk=late.pk).update(
+        create=timezone.now() - timedelta(seconds=35)
+    )
+    OrderEvent.objects.update(create=F('create') - timedelta(seconds=40))
+    resp = api_client_auth.get('/api/events/', params)
+    assert [e['id'] for e in resp.json()] == [late.id, committed.id]
+
+
+@pytest.mark.django_db
+def test_late_commit_beyond_delay_logged(
+    crm_data, settings, monkeypatch, caplog, django_capture_on_commit_callbacks
+):
+    """Коммит позже EVENTS_VISIBILITY_DELAY пишется предупреждением."""
+    settings.EVENTS_VISIBILITY_DELAY = 5
+    now = timezone.now
+    order = Order.objects.get(pk=crm_data['order1'].pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        order.status = OrderStatus.READY_PICKUP
+        order.save()
+        assert not caplog.records
+        monkeypatch.setattr(
+            timezone, 'now', lambda: now() + timedelta(seconds=10)
+        )
+
+    [record] = [r for r in caplog.records if r.name == 'crm.events']
+    assert f'#{OrderEvent.objects.get().pk}' in record.getMessage()
+
+
+@pytest.mark.django_db
+def test_timely_commit_not_logged(
+    crm_data, settings, caplog, django_capture_on_commit_callbacks
+):
+    """Коммит в пределах задержки видимости не журналируется."""
+    settings.EVENTS_VISIBILITY_DELAY = 5
+    order = Order.objects.get(pk=crm_data['order1'].pk)
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        order.status = OrderStatus.READY_PICKUP
+        order.save()
+    assert callbacks
+    assert not [r for r in caplog.records if r.name == 'crm.events']
+
+
+def test_format_events_coalesces_per_object():
+    """Несколько смен статуса одного заказа схлопываются в одну строку."""
+    base = {
+        'kind': 'order_status',
+        'order_id': 1,
+        'purchase_id': None,
+        'order_code': 'TN-00001',
+        'title': 'Ноутбук',
+    }
+    events = [
+        {
+            **base,
+            'id': 1,
+            'old_status': 'in_working',
+            'new_status': 'in_service',
+        },
+        {
+            **base,
+            'id': 2,
+            'old_status': 'in_service',
+            'new_status': 'ready_pickup',
+        },
+    ]
+    text = format_events(events)
+    assert text.count('TN-00001') == 1
+    assert 'в работе → готово к выдаче' in text
+    assert not format_events(
+        [
+            *events,
+            {
+                **base,
+                'id': 3,
+                'old_status': 'ready_pickup',
+                'new_status': 'in_working',
+            },
+        ]
+    ), 'Вернувшийся к исходному статус не должен порождать уведомление'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_consumer_delivers_at_least_once(live_server):
+    """Потребитель бота доставляет пачку всем чатам и подтверждает её.
+
+    Чат 1 при первом прогоне недоступен — его сообщение откладывается, а
+    остальные чаты получают пачку, и она подтверждается; при следующем
+    прогоне сообщение доставляется чату 1. Чат 2 заблокировал бота (403)
+    и снимается с подписки, чат 3 получает ошибку 429 и доставляется
+    после повтора.
+    """
+    data_order = _create_order_with_status_change()
+    user = create_test_user()
+    grant_ack_permission(user)
+    refresh = RefreshToken.for_user(user)
+    crm = CRMClient(
+        str(refresh.access_token), str(refresh), base_url=live_server.url
+    )
+    telegram = FakeTelegram(
+        failures={
+            1: [telegram_error(500)] * EventConsumer.send_attempts,
+            2: [telegram_error(403)],
+            3: [telegram_error(429, retry_after=0)],
+        }
+    )
+    subscribers = {1, 2, 3}
+    consumer = EventConsumer(
+        crm, telegram.send_message, subscribers, sleep=lambda _: None
+    )
+
+    assert consumer.run_once() == 1
+    assert [chat for chat, _ in telegram.sent] == [
+        3
+    ], 'Недоступный чат не должен задерживать остальные'
+    assert subscribers == {1, 3}
+    cursor = EventCursor.objects.get(consumer=CONSUMER)
+    assert cursor.last_event_id == OrderEvent.objects.get().id
+    assert set(consumer.parked) == {1}
+
+    assert consumer.run_once() == 0
+    assert [chat for chat, _ in telegram.sent] == [3, 1]
+    assert data_order.code in telegram.sent[-1][1]
+    assert not consumer.parked
+    assert consumer.run_once() == 0
+    assert len(telegram.sent) == len([3, 1]), 'Сообщения не дублируются'
+
+
+def _create_order_with_status_change():
+    """Создаёт заказ и переводит его в статус «готово к выдаче»."""
+    order = Order.objects.get(
+        pk=create_crm_orders_and_purchases()['order1'].pk
+    )
+    order.status = OrderStatus.READY_PICKUP
+    order.save()
+    return order
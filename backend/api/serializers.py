@@ -2,12 +2,17 @@
 
 from rest_framework import serializers
 
-from crm.constants import MONEY_DECIMAL_PLACES, MONEY_MAX_DIGITS
+from crm.constants import (
+    MAX_LENGTH_EVENT_CONSUMER,
+    MONEY_DECIMAL_PLACES,
+    MONEY_MAX_DIGITS,
+)
 from crm.models import (
     Category,
     Client,
     EntityType,
     Order,
+    OrderEvent,
     OrderStatus,
     Purchase,
     PurchaseStatus,
@@ -61,6 +66,7 @@ class PurchaseSerializer(serializers.ModelSerializer):
     order_code = serializers.SerializerMethodField(read_only=True)
     client_name = serializers.SerializerMethodField(read_only=True)
     status = serializers.ChoiceField(choices=PurchaseStatus.choices)
+    archived = serializers.BooleanField(source='is_archived', read_only=True)
 
     class Meta:
         """Мета-класс для настройки сериализатора Purchase."""
@@ -75,6 +81,7 @@ class PurchaseSerializer(serializers.ModelSerializer):
             'detail',
             'cost',
             'status',
+            'archived',
         )
         read_only_fields = ('create',)
 
@@ -155,26 +162,31 @@ class OrderSerializer(serializers.ModelSerializer):
         source='client.mobile_phone', read_only=True
     )
     code = serializers.CharField(read_only=True)
+    archived = serializers.BooleanField(source='is_archived', read_only=True)
     services = ServiceInOrderSerializer(
         source='service_lines', many=True, read_only=True
     )
     purchases = PurchaseInOrderSerializer(many=True, read_only=True)
     services_total = serializers.DecimalField(
+        source='financials.services_total',
         max_digits=MONEY_MAX_DIGITS,
         decimal_places=MONEY_DECIMAL_PLACES,
         read_only=True,
     )
     purchases_total = serializers.DecimalField(
+        source='financials.purchases_total',
         max_digits=MONEY_MAX_DIGITS,
         decimal_places=MONEY_DECIMAL_PLACES,
         read_only=True,
     )
     total_amount = serializers.DecimalField(
+        source='financials.total_amount',
         max_digits=MONEY_MAX_DIGITS,
         decimal_places=MONEY_DECIMAL_PLACES,
         read_only=True,
     )
     duty = serializers.DecimalField(
+        source='financials.duty',
         max_digits=MONEY_MAX_DIGITS,
         decimal_places=MONEY_DECIMAL_PLACES,
         read_only=True,
@@ -209,6 +221,7 @@ class OrderSerializer(serializers.ModelSerializer):
             'paid',
             'duty',
             'status',
+            'archived',
         )
         read_only_fields = (
             'id',
@@ -221,3 +234,46 @@ class OrderSerializer(serializers.ModelSerializer):
             'total_amount',
             'duty',
         )
+
+
+class BotOrderSerializer(serializers.ModelSerializer):
+    """Краткое представление заказа для ответа /api/bot/lookup/."""
+
+    code = serializers.CharField(read_only=True)
+
+    class Meta:
+        """Мета-класс для настройки сериализатора BotOrder."""
+
+        model = Order
+        fields = ('id', 'code', 'create', 'accepted_equipment', 'status')
+        read_only_fields = fields
+
+
+class OrderEventSerializer(serializers.ModelSerializer):
+    """Сериализатор события outbox о смене статуса."""
+
+    order_code = serializers.CharField(read_only=True)
+
+    class Meta:
+        """Мета-класс для настройки сериализатора OrderEvent."""
+
+        model = OrderEvent
+        fields = (
+            'id',
+            'kind',
+            'order_id',
+            'purchase_id',
+            'order_code',
+            'title',
+            'old_status',
+            'new_status',
+            'create',
+        )
+        read_only_fields = fields
+
+
+class EventAckSerializer(serializers.Serializer):
+    """Подтверждение доставки событий потребителем."""
+
+    consumer = serializers.CharField(max_length=MAX_LENGTH_EVENT_CONSUMER)
+    last_event_id = serializers.IntegerField(min_value=0)
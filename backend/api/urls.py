@@ -3,12 +3,20 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import ClientViewSet, OrderViewSet, PurchaseViewSet
+from .views import (
+    BotLookupViewSet,
+    ClientViewSet,
+    OrderEventViewSet,
+    OrderViewSet,
+    PurchaseViewSet,
+)
 
 router = DefaultRouter()
 router.register('clients', ClientViewSet)
 router.register('orders', OrderViewSet)
 router.register('purchases', PurchaseViewSet)
+router.register('events', OrderEventViewSet)
+router.register('bot/lookup', BotLookupViewSet, basename='bot-lookup')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,17 +1,66 @@
 """Представления для CRM системы.
 
 Этот модуль содержит API endpoints для работы с основными сущностями CRM:
-клиентами, заказами и покупками.
+клиентами, заказами и покупками, outbox-событиями о смене статусов для
+push-уведомлений и компактным поиском для Telegram-бота.
 """
 
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from crm.models import Client, Order, Purchase
+from crm.archive import ArchiveUnion, include_archive
+from crm.constants import BOT_LOOKUP_ORDERS_LIMIT, EVENTS_BATCH_LIMIT
+from crm.models import (
+    CLOSED_ORDER_STATUSES,
+    ArchivedOrder,
+    ArchivedPurchase,
+    Client,
+    EventCursor,
+    Order,
+    OrderEvent,
+    Purchase,
+)
+
+from .filters import OrderFilter, PurchaseFilter
+from .permissions import IsEventConsumer
+from .serializers import (
+    BotOrderSerializer,
+    ClientSerializer,
+    EventAckSerializer,
+    OrderEventSerializer,
+    OrderSerializer,
+    PurchaseSerializer,
+)
+
+PHONE_SEPARATORS_RE = re.compile(r'[\s()\-]')
+PHONE_RE = re.compile(r'^(?:\+7|8|7)?(\d{10})$')
+CLIENT_LOOKUP_FIELDS = ClientSerializer.Meta.fields
+BOT_ORDER_FIELDS = (
+    'id',
+    'number',
+    'client_id',
+    'create',
+    'accepted_equipment',
+    'status',
+)
+
 
-from .serializers import ClientSerializer, OrderSerializer, PurchaseSerializer
+def normalize_phone(value: str) -> str | None:
+    """Приводит телефон (+7 999 ..., 8999..., 999...) к виду +79998887766."""
+    match = PHONE_RE.match(PHONE_SEPARATORS_RE.sub('', value))
+    return f'+7{match.group(1)}' if match else None
 
 
 class ClientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -28,6 +77,8 @@ class ClientViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ClientSerializer
     filter_backends = (filters.SearchFilter,)
     search_fields = ('mobile_phone',)
+    query_budget = 2  # пользователь JWT + клиенты
+    statement_timeout = 2000  # мс: поиск по телефону для бота
 
     def list(self, request, *args, **kwargs):
         """Запрещаем /api/clients/ без параметра ?search=."""
@@ -39,19 +90,85 @@ class ClientViewSet(viewsets.ReadOnlyModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class OrderViewSet(viewsets.ReadOnlyModelViewSet):
+class ArchiveReadMixin:
+    """Чтение рабочей таблицы и, по запросу, архива (crm.archive).
+
+    - список с ?archive=true объединяет рабочие и архивные объекты с теми
+      же фильтрами, поиском и сортировкой по id;
+    - объект, которого нет среди рабочих, ищется в архиве.
+    """
+
+    archive_queryset = None
+
+    def get_archive_queryset(self):
+        """Архивный queryset (переопределяется, как get_queryset)."""
+        return self.archive_queryset.all()
+
+    def filter_archive_queryset(self, queryset):
+        """Фильтры списка для архива.
+
+        DjangoFilterBackend сверяет модель FilterSet с моделью queryset,
+        поэтому FilterSet применяется напрямую (поля у моделей общие).
+        """
+        for backend in self.filter_backends:
+            if issubclass(backend, DjangoFilterBackend):
+                queryset = self.filterset_class(
+                    self.request.query_params,
+                    queryset=queryset,
+                    request=self.request,
+                ).qs
+            else:
+                queryset = backend().filter_queryset(
+                    self.request, queryset, self
+                )
+        return queryset
+
+    def filter_queryset(self, queryset):
+        """Для списка с ?archive=true — ArchiveUnion с архивом."""
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list' or not include_archive(
+            self.request.query_params
+        ):
+            return queryset
+        ordering = filters.OrderingFilter().get_ordering(
+            self.request, queryset, self
+        )
+        return ArchiveUnion(
+            queryset,
+            self.filter_archive_queryset(self.get_archive_queryset()),
+            ordering=ordering[0],
+        )
+
+    def get_object(self):
+        """Рабочий объект, а если его нет — архивный."""
+        try:
+            return super().get_object()
+        except Http404:
+            return get_object_or_404(
+                self.get_archive_queryset(),
+                pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field],
+            )
+
+
+class OrderViewSet(ArchiveReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для работы с заказами в режиме только для чтения."""
 
     queryset = Order.objects.select_related('client').prefetch_related(
         'service_lines__service__category',
         'purchases',
     )
+    archive_queryset = ArchivedOrder.objects.select_related(
+        'client'
+    ).prefetch_related('service_lines__service__category', 'purchases')
     serializer_class = OrderSerializer
+    # Пользователь JWT + заказы + 4 предзагрузки; с архивом ещё id
+    # страницы (UNION) и архивные заказы с 4 предзагрузками.
+    query_budget = 12
     filter_backends = (
         DjangoFilterBackend,
         filters.OrderingFilter,
     )
-    filterset_fields = ('status',)
+    filterset_class = OrderFilter
     ordering_fields = ('id',)
     ordering = ('-id',)
 
@@ -61,24 +178,35 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
         Поддерживаем:
         - поиск по accepted_equipment (icontains)
         - поиск по телефону клиента (icontains)
-        - поиск по номеру заказа (точное совпадение number=int(digits)),
-          если в строке поиска удаётся выделить цифры.
+        - поиск по номеру заказа (точное совпадение), если строка — число
+          или код заказа;
+        - код с префиксом (TN-00123, TN-001) — только по индексу number:
+          точный номер и заказы, чей код начинается с этой строки.
         """
-        qs = super().get_queryset()
+        return self.search(super().get_queryset())
+
+    def get_archive_queryset(self):
+        """Архивные заказы с тем же поиском по ?search=."""
+        return self.search(super().get_archive_queryset())
+
+    def search(self, qs):
+        """Поиск по ?search= (см. get_queryset)."""
         search = (self.request.query_params.get('search') or '').strip()
         if not search:
             return qs
+        code_q = Order.code_search(search)
+        if code_q is not None:
+            return qs.filter(code_q)
         q = Q(accepted_equipment__icontains=search) | Q(
             client__mobile_phone__icontains=search
         )
-        digits = ''.join(ch for ch in search if ch.isdigit())
-        if digits:
-            q |= Q(number=int(digits))
-
+        number = Order.parse_code(search)
+        if number is not None:
+            q |= Q(number=number)
         return qs.filter(q)
 
 
-class PurchaseViewSet(viewsets.ReadOnlyModelViewSet):
+class PurchaseViewSet(ArchiveReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для работы с покупками (закупками) в режиме только для чтения.
 
     Предоставляет следующие API endpoints:
@@ -87,19 +215,193 @@ class PurchaseViewSet(viewsets.ReadOnlyModelViewSet):
 
     Особенности:
     - каждая покупка связана с заказом через ForeignKey (select_related);
-    - поддерживается фильтрация по статусу покупки;
+    - поддерживается фильтрация по статусу покупки и датам создания
+      (?date_from=&date_to=);
     - поддерживается поиск по полю detail (без учёта регистра);
-    - сортировка по идентификатору покупки (id), по умолчанию — по убыванию.
+    - сортировка по идентификатору покупки (id), по умолчанию — по убыванию;
+    - ?archive=true — вместе с покупками архивных заказов.
     """
 
     queryset = Purchase.objects.select_related('order__client')
+    archive_queryset = ArchivedPurchase.objects.select_related('order__client')
     serializer_class = PurchaseSerializer
     filter_backends = (
         DjangoFilterBackend,
         filters.SearchFilter,
         filters.OrderingFilter,
     )
-    filterset_fields = ('status',)
+    filterset_class = PurchaseFilter
     search_fields = ('detail',)
     ordering_fields = ('id',)
     ordering = ('-id',)
+    # Пользователь JWT + покупки с заказами; с архивом ещё id страницы
+    # (UNION) и архивные покупки.
+    query_budget = 4
+
+
+class OrderEventViewSet(viewsets.GenericViewSet):
+    """Outbox-события о смене статусов заказов и покупок.
+
+    - GET /api/events/?consumer=telegram_bot&limit=50 — пачка событий после
+      курсора потребителя (по возрастанию id);
+    - GET /api/events/?after=<id> — пачка событий после явного id;
+    - POST /api/events/ack/ {"consumer": ..., "last_event_id": ...} —
+      подтверждение доставки, курсор только увеличивается; только для
+      служебного пользователя (IsEventConsumer).
+
+    Пока пачка не подтверждена, она выдаётся повторно: доставка
+    «хотя бы один раз». id события выдаётся при вставке, а видно оно
+    после коммита: транзакция с меньшим id может закоммититься позже
+    соседней, и курсор её бы перепрыгнул. Поэтому выдаются только события
+    старше EVENTS_VISIBILITY_DELAY секунд — к этому времени транзакции,
+    менявшие статусы раньше, уже завершены. Это граница, а не гарантия
+    порядка коммитов: транзакция дольше задержки может потерять событие,
+    такой коммит журналирует crm.models.check_event_commit_lag.
+    """
+
+    queryset = OrderEvent.objects.all()
+    serializer_class = OrderEventSerializer
+    filter_backends = ()
+    pagination_class = None
+    # ack: права пользователя и групп, курсор под блокировкой + savepoint.
+    query_budget = 10
+
+    def list(self, request):
+        """Возвращает события после курсора потребителя или ?after=."""
+        params = request.query_params
+        try:
+            limit = min(int(params.get('limit', EVENTS_BATCH_LIMIT)), 1000)
+            after = int(params.get('after', 0))
+        except ValueError:
+            return Response(
+                {'detail': 'Параметры limit и after должны быть числами.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        consumer = params.get('consumer')
+        if consumer:
+            cursor = EventCursor.objects.filter(consumer=consumer).first()
+            after = max(after, cursor.last_event_id if cursor else 0)
+        visible_before = timezone.now() - timedelta(
+            seconds=settings.EVENTS_VISIBILITY_DELAY
+        )
+        events = (
+            self.get_queryset()
+            .filter(id__gt=after, create__lte=visible_before)
+            .order_by('id')
+        )
+        serializer = self.get_serializer(events[: max(limit, 1)], many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=(IsAuthenticated, IsEventConsumer),
+    )
+    def ack(self, request):  # noqa: PLR6301
+        """Сдвигает курсор потребителя на подтверждённое событие."""
+        serializer = EventAckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        consumer = serializer.validated_data['consumer']
+        last_event_id = serializer.validated_data['last_event_id']
+        with transaction.atomic():
+            cursor, _ = EventCursor.objects.select_for_update().get_or_create(
+                consumer=consumer
+            )
+            if last_event_id > cursor.last_event_id:
+                cursor.last_event_id = last_event_id
+                cursor.save(update_fields=['last_event_id', 'updated'])
+        return Response(
+            {'consumer': consumer, 'last_event_id': cursor.last_event_id}
+        )
+
+
+class BotLookupViewSet(viewsets.ViewSet):
+    """Поиск клиента для Telegram-бота одной строкой.
+
+    GET /api/bot/lookup/?q=<строка> — строка распознаётся как:
+    1. телефон (+7999..., 8999...) — точное совпадение по уникальному
+       индексу mobile_phone;
+    2. номер/код заказа (101, TN-00101) — по уникальному индексу number;
+       если заказа с таким номером нет, цифры — начало телефона
+       (8916123): клиент, если такой телефон у него одного (по тому же
+       индексу mobile_phone);
+    3. иначе наименование оборудования — последний подходящий заказ
+       (подстрока без индекса, время ограничено statement_timeout).
+
+    Ответ: {"match": "phone" | "order" | "equipment" | null,
+    "client": {...} | null, "orders": [...]}, где orders — найденный
+    заказ (если искали по нему) и последние открытые заказы клиента,
+    не больше BOT_LOOKUP_ORDERS_LIMIT. Два запроса к БД, с поиском по
+    началу телефона — три.
+    """
+
+    query_budget = 4  # пользователь JWT + заказ + клиент по телефону + заказы
+    statement_timeout = 2000  # мс: бот ждёт ответа в чате
+
+    def list(self, request):  # noqa: PLR6301
+        """Находит клиента и его открытые заказы по строке ?q=."""
+        query = (request.query_params.get('q') or '').strip()
+        if not query:
+            return Response(
+                {'detail': 'Параметр ?q= обязателен.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        match, client, order = _lookup_client(query)
+        orders = [order] if order is not None else []
+        if client is not None:
+            open_orders = (
+                Order.objects.filter(client=client)
+                .exclude(status__in=CLOSED_ORDER_STATUSES)
+                .only(*BOT_ORDER_FIELDS)
+                .order_by('-id')
+            )
+            if order is not None:
+                open_orders = open_orders.exclude(pk=order.pk)
+            orders.extend(open_orders[: BOT_LOOKUP_ORDERS_LIMIT - len(orders)])
+        return Response(
+            {
+                'match': match if client is not None else None,
+                'client': ClientSerializer(client).data if client else None,
+                'orders': BotOrderSerializer(orders, many=True).data,
+            }
+        )
+
+
+def _lookup_client(query: str):
+    """Возвращает (вид совпадения, клиент, найденный заказ) для строки."""
+    phone = normalize_phone(query)
+    if phone is not None:
+        return 'phone', Client.objects.filter(mobile_phone=phone).first(), None
+    orders = Order.objects.select_related('client').only(
+        *BOT_ORDER_FIELDS, *(f'client__{f}' for f in CLIENT_LOOKUP_FIELDS)
+    )
+    number = Order.parse_code(query)
+    if number is not None:
+        order = orders.filter(number=number).first()
+        if order is None and query.isdigit():
+            return 'phone', _client_by_phone_prefix(query), None
+        match = 'order'
+    else:
+        order = (
+            orders.filter(accepted_equipment__icontains=query)
+            .order_by('-id')
+            .first()
+        )
+        match = 'equipment'
+    return match, order.client if order else None, order
+
+
+def _client_by_phone_prefix(digits: str):
+    """Клиент, чей телефон начинается с digits, если такой один.
+
+    Первая 7 или 8 считается кодом страны. Поиск по началу номера
+    использует уникальный индекс mobile_phone.
+    """
+    if digits[0] in '78':
+        digits = digits[1:]
+    clients = list(
+        Client.objects.filter(mobile_phone__startswith=f'+7{digits}')
+        .only(*CLIENT_LOOKUP_FIELDS)
+        .order_by('pk')[:2]
+    )
+    return clients[0] if len(clients) == 1 else None
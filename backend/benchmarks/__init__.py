@@ -0,0 +1 @@
+"""Бенчмарки HTML-страниц и API CRM на синтетических наборах данных."""
@@ -0,0 +1,126 @@
+"""Перечень замеряемых страниц и эндпоинтов API.
+
+Каждый сценарий — GET-запрос к именованному маршруту. Аргументы маршрута
+и строки запроса подставляются из контекста набора данных (см.
+runner.collect_context): самый активный клиент, последний заказ и т.д.
+"""
+
+from typing import NamedTuple
+
+HTML = 'html'
+API = 'api'
+
+
+class Case(NamedTuple):
+    """Сценарий бенчмарка."""
+
+    name: str
+    kind: str
+    url_name: str
+    args: tuple = ()
+    query: dict | None = None
+
+
+CASES = (
+    Case('home', HTML, 'home'),
+    Case('about', HTML, 'about'),
+    Case('client_list', HTML, 'client_list'),
+    Case(
+        'client_list_search',
+        HTML,
+        'client_list',
+        query={'search': '{client_name}'},
+    ),
+    Case('client_detail', HTML, 'client_detail', ('client',)),
+    Case('client_create', HTML, 'client_create'),
+    Case('client_edit', HTML, 'client_edit', ('client',)),
+    Case('client_delete', HTML, 'client_delete', ('client',)),
+    Case('service_list', HTML, 'service_list'),
+    Case('service_create', HTML, 'service_create'),
+    Case('service_edit', HTML, 'service_edit', ('service',)),
+    Case('service_delete', HTML, 'service_delete', ('service',)),
+    Case('order_list', HTML, 'order_list'),
+    Case(
+        'order_list_status',
+        HTML,
+        'order_list',
+        query={'status': 'in_working'},
+    ),
+    Case(
+        'order_list_dates',
+        HTML,
+        'order_list',
+        query={'date_from': '{date_from}', 'date_to': '{date_to}'},
+    ),
+    Case(
+        'order_list_search_code',
+        HTML,
+        'order_list',
+        query={'search': '{order_code}'},
+    ),
+    Case(
+        'order_list_search_text',
+        HTML,
+        'order_list',
+        query={'search': 'Ноутбук'},
+    ),
+    Case('order_detail', HTML, 'order_detail', ('order',)),
+    Case('order_create', HTML, 'order_create'),
+    Case('order_edit', HTML, 'order_edit', ('order',)),
+    Case('order_delete', HTML, 'order_delete', ('order',)),
+    Case('purchase_list', HTML, 'purchase_list'),
+    Case(
+        'purchase_list_search',
+        HTML,
+        'purchase_list',
+        query={'search': 'SSD'},
+    ),
+    Case(
+        'purchase_list_dates',
+        HTML,
+        'purchase_list',
+        query={'date_from': '{date_from}', 'date_to': '{date_to}'},
+    ),
+    Case('purchase_detail', HTML, 'purchase_detail', ('purchase',)),
+    Case('purchase_create', HTML, 'purchase_create'),
+    Case('purchase_edit', HTML, 'purchase_edit', ('purchase',)),
+    Case('purchase_delete', HTML, 'purchase_delete', ('purchase',)),
+    Case(
+        'clients_search',
+        API,
+        'client-list',
+        query={'search': '{client_phone}'},
+    ),
+    Case('client', API, 'client-detail', ('client',)),
+    Case('orders', API, 'order-list'),
+    Case('orders_status', API, 'order-list', query={'status': 'in_working'}),
+    Case(
+        'orders_dates',
+        API,
+        'order-list',
+        query={'date_from': '{date_from}', 'date_to': '{date_to}'},
+    ),
+    Case('order', API, 'order-detail', ('order',)),
+    Case('purchases', API, 'purchase-list'),
+    Case('purchases_search', API, 'purchase-list', query={'search': 'SSD'}),
+    Case('purchase', API, 'purchase-detail', ('purchase',)),
+    Case('events', API, 'orderevent-list', query={'consumer': 'benchmark'}),
+    Case(
+        'bot_lookup_phone',
+        API,
+        'bot-lookup-list',
+        query={'q': '{client_phone}'},
+    ),
+    Case(
+        'bot_lookup_code',
+        API,
+        'bot-lookup-list',
+        query={'q': '{order_code}'},
+    ),
+    Case(
+        'bot_lookup_equipment',
+        API,
+        'bot-lookup-list',
+        query={'q': 'Роутер'},
+    ),
+)
@@ -0,0 +1,132 @@
+"""Фейковый Telegram Bot API для нагрузочных прогонов бота.
+
+Лёгкий HTTP-сервер на стандартной библиотеке отвечает на методы Bot API
+(sendMessage и любые другие) корректным JSON, запоминая отправленные
+сообщения по чатам. fake_telegram() направляет на него TeleBot
+(apihelper.API_URL) и переводит бота в синхронный режим, как в webhook:
+хендлеры выполняются в потоке, вызвавшем process_new_updates.
+"""
+
+import importlib
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from telebot import apihelper
+
+FAKE_TOKEN = '100000:load-test'  # noqa: S105
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    """HTTP-сервер фейкового Bot API с журналом сообщений."""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        """Слушает свободный порт localhost; latency — задержка ответа, с."""
+        super().__init__(('127.0.0.1', 0), FakeTelegramHandler)
+        self.latency = latency
+        self.message_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.messages = defaultdict(list)
+        self.calls = 0
+
+    @property
+    def api_url(self) -> str:
+        """Шаблон URL для apihelper.API_URL."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/bot{{0}}/{{1}}'
+
+    def record(self, chat_id: int, text: str) -> dict:
+        """Запоминает сообщение и возвращает его в формате Bot API."""
+        with self.lock:
+            self.calls += 1
+            self.messages[chat_id].append(text)
+            message_id = next(self.message_ids)
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': text,
+        }
+
+    def pop_messages(self, chat_id: int) -> list[str]:
+        """Возвращает и очищает сообщения, отправленные в чат."""
+        with self.lock:
+            return self.messages.pop(chat_id, [])
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов TeleBot к фейковому Bot API."""
+
+    def do_POST(self):
+        """Отвечает на вызов метода Bot API."""
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            params.update(parse_qsl(self.rfile.read(length).decode()))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        result = True
+        if 'chat_id' in params:
+            result = self.server.record(
+                int(params['chat_id']), params.get('text', '')
+            )
+        body = json.dumps({'ok': True, 'result': result}).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST
+
+    def log_message(self, format, *args):
+        """Не пишет журнал запросов."""
+
+
+def load_bot():
+    """Импортирует telegram_bot.bot и регистрирует хендлеры один раз.
+
+    Без TELEGRAM_BOT_TOKEN в окружении бот создаётся с фейковым токеном:
+    TeleBot проверяет токен уже в конструкторе.
+    """
+    config = importlib.import_module('telegram_bot.config')
+    config.TELEGRAM_BOT_TOKEN = config.TELEGRAM_BOT_TOKEN or FAKE_TOKEN
+    bot_module = importlib.import_module('telegram_bot.bot')
+    main = importlib.import_module('telegram_bot.main')
+    for module in main.HANDLER_MODULES:
+        importlib.import_module(module)
+    router, bot = bot_module.router, bot_module.bot
+    if not any(
+        handler['function'] == router.dispatch
+        for handler in bot.message_handlers
+    ):
+        router.install(bot)
+    return bot_module
+
+
+@contextmanager
+def fake_telegram(bot, latency=0.0):
+    """Запускает фейковый Bot API и направляет на него bot."""
+    server = FakeTelegramServer(latency)
+    thread = threading.Thread(
+        target=server.serve_forever, name='fake-telegram', daemon=True
+    )
+    thread.start()
+    saved = apihelper.API_URL, bot.threaded
+    apihelper.API_URL = server.api_url
+    bot.threaded = False
+    try:
+        yield server
+    finally:
+        apihelper.API_URL, bot.threaded = saved
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,527 @@
+"""Нагрузочный прогон веб-интерфейса, API и Telegram-бота.
+
+Виртуальные пользователи (потоки) до истечения времени прогона выбирают
+сценарий по весам смеси и выполняют его против запущенного сервера:
+- order_list — список заказов с фильтром (статус, даты, поиск, страница);
+- order_detail — карточка заказа;
+- order_edit — открытие формы заказа и сохранение без изменений;
+- api_lookup — поиск клиента через /api/bot/lookup/;
+- bot_lookup — поиск клиента в боте: апдейты 'Клиенты' и строка поиска
+  проходят через хендлеры telegram_bot, бот ходит в API по HTTP и
+  отвечает в фейковый Telegram (benchmarks.fake_telegram).
+
+Сервер — встроенный многопоточный WSGI-сервер Django в этом же процессе
+(local_server), gunicorn с gunicorn.conf.py в одном из режимов (sync,
+gthread, asgi; gunicorn_server) или внешний по URL. По каждому сценарию
+считаются пропускная способность, доля ошибок, перцентили и гистограмма
+задержек; format_comparison сводит прогоны разных серверов в таблицу.
+"""
+
+import itertools
+import os
+import random
+import secrets
+import socket
+import statistics
+import subprocess  # noqa: S404
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+)
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from telebot import types
+
+from crm.models import CLOSED_ORDER_STATUSES, Client, Order, OrderStatus
+from tech_support.metrics import DURATION_BUCKETS
+from telegram_bot.crm_client import CRMClient
+
+from .runner import BENCHMARK_USERNAME
+
+DEFAULT_MIX = {
+    'order_list': 35,
+    'order_detail': 25,
+    'order_edit': 10,
+    'api_lookup': 10,
+    'bot_lookup': 20,
+}
+POOL_SIZE = 200
+EDIT_POOL_SIZE = 20
+BOT_CHAT_BASE = 900_000_000
+BOT_ERROR_PREFIXES = ('Ошибка', 'API временно', 'Сначала авторизуйтесь')
+REQUEST_TIMEOUT = 30
+GUNICORN_MODES = ('sync', 'gthread', 'asgi')
+# Сколько ждать запуска gunicorn и его остановки (с).
+SERVER_START_TIMEOUT = 60
+SERVER_STOP_TIMEOUT = 35
+ORDER_LIST_FILTERS = (
+    {},
+    {'status': OrderStatus.IN_WORKING},
+    {'status': OrderStatus.READY_PICKUP},
+    {'page': 2},
+    {'search': 'Ноутбук'},
+)
+
+
+class LoadStats:
+    """Потокобезопасный сбор задержек и ошибок по сценариям."""
+
+    def __init__(self):
+        """Создаёт пустую статистику."""
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def add(self, scenario: str, latency: float, error=None):
+        """Учитывает одно выполнение сценария (latency в секундах)."""
+        with self._lock:
+            self.latencies[scenario].append(latency)
+            if error is not None:
+                self.errors[scenario][error] += 1
+
+    def report(self, elapsed: float) -> dict:
+        """Сводка по сценариям: rps, ошибки, перцентили, гистограмма."""
+        report = {}
+        for scenario, latencies in sorted(self.latencies.items()):
+            errors = self.errors[scenario]
+            total = len(latencies)
+            cuts = (
+                statistics.quantiles(latencies, n=100, method='inclusive')
+                if total > 1
+                else latencies * 99
+            )
+            report[scenario] = {
+                'requests': total,
+                'rps': round(total / elapsed, 2),
+                'errors': dict(errors),
+                'error_rate': round(sum(errors.values()) / total, 4),
+                'p50_ms': round(cuts[49] * 1000, 1),
+                'p95_ms': round(cuts[94] * 1000, 1),
+                'p99_ms': round(cuts[98] * 1000, 1),
+                'max_ms': round(max(latencies) * 1000, 1),
+                'histogram': histogram(latencies),
+            }
+        return report
+
+
+def histogram(latencies: list[float]) -> dict:
+    """Число выполнений по корзинам DURATION_BUCKETS (секунды)."""
+    counts = dict.fromkeys([*map(str, DURATION_BUCKETS), '+Inf'], 0)
+    for latency in latencies:
+        bucket = next(
+            (str(bound) for bound in DURATION_BUCKETS if latency <= bound),
+            '+Inf',
+        )
+        counts[bucket] += 1
+    return counts
+
+
+def format_report(report: dict, elapsed: float, users: int) -> str:
+    """Текстовый отчёт по результатам прогона."""
+    total = sum(item['requests'] for item in report.values())
+    lines = [
+        f'Пользователей: {users}, длительность {elapsed:.1f} с, '
+        f'сценариев {total} ({total / elapsed:.1f}/с)'
+    ]
+    for scenario, item in report.items():
+        lines.append(
+            f'{scenario}: {item["requests"]} ({item["rps"]}/с), '
+            f'ошибок {item["error_rate"]:.1%}, p50 {item["p50_ms"]} мс, '
+            f'p95 {item["p95_ms"]} мс, p99 {item["p99_ms"]} мс, '
+            f'max {item["max_ms"]} мс'
+        )
+        peak = max(item['histogram'].values())
+        lines.extend(
+            f'  ≤{bound:>5} с {"#" * round(40 * count / peak):<40} {count}'
+            for bound, count in item['histogram'].items()
+            if count
+        )
+        if item['errors']:
+            lines.append(f'  ошибки: {item["errors"]}')
+    return '\n'.join(lines)
+
+
+def format_comparison(runs: dict) -> str:
+    """Таблица сравнения серверов: {сервер: (отчёт, длительность)}.
+
+    p95 и p99 — худшие по сценариям.
+    """
+    lines = [
+        f'{"Сервер":<10} {"сцен./с":>8} {"ошибок":>7} '
+        f'{"p95 мс":>8} {"p99 мс":>8}'
+    ]
+    for server, (report, elapsed) in runs.items():
+        total = sum(item['requests'] for item in report.values())
+        errors = sum(sum(item['errors'].values()) for item in report.values())
+        lines.append(
+            f'{server:<10} {total / elapsed:>8.1f} '
+            f'{errors / max(total, 1):>7.1%} '
+            f'{max(item["p95_ms"] for item in report.values()):>8} '
+            f'{max(item["p99_ms"] for item in report.values()):>8}'
+        )
+    return '\n'.join(lines)
+
+
+def parse_mix(value: str) -> dict:
+    """Разбирает смесь вида 'order_list=50,bot_lookup=50'."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX or not weight.strip().isdigit():
+            raise ValueError(f'Неверный элемент смеси: {part!r}')  # noqa
+        mix[name] = int(weight)
+    return mix
+
+
+def ensure_load_user() -> tuple[str, str]:
+    """Пользователь прогона с новым случайным паролем."""
+    user, _ = get_user_model().objects.get_or_create(
+        username=BENCHMARK_USERNAME, defaults={'is_staff': True}
+    )
+    password = secrets.token_urlsafe(16)
+    user.set_password(password)
+    user.save(update_fields=['password'])
+    return user.username, password
+
+
+def prepare_context() -> dict:
+    """Пулы объектов для сценариев и данные форм заказов.
+
+    Всё читается из БД до начала прогона, чтобы драйвер не конкурировал
+    с сервером за соединения.
+    """
+    order_ids = list(
+        Order.objects.order_by('-pk').values_list('pk', flat=True)[:POOL_SIZE]
+    )
+    codes = [Order.format_code(number) for number in Order.objects.filter(
+        pk__in=order_ids
+    ).values_list('number', flat=True)]  # fmt: skip
+    phones = list(
+        Client.objects.order_by('-pk').values_list('mobile_phone', flat=True)[
+            :POOL_SIZE
+        ]
+    )
+    edit_forms = {}
+    open_orders = (
+        Order.objects.exclude(status__in=CLOSED_ORDER_STATUSES)
+        .prefetch_related('service_lines')
+        .order_by('-pk')[:EDIT_POOL_SIZE]
+    )
+    for order in open_orders:
+        edit_forms[order.pk] = {
+            'client': order.client_id,
+            'accepted_equipment': order.accepted_equipment,
+            'detail': order.detail,
+            'services': [
+                line.service_id for line in order.service_lines.all()
+            ],
+            'services_total_override': order.services_total_override or '',
+            'advance': order.advance,
+            'paid': order.paid,
+            'status': order.status,
+        }
+    return {
+        'order_ids': order_ids,
+        'lookups': [*codes, *phones],
+        'edit_forms': edit_forms,
+    }
+
+
+_update_ids = itertools.count(1)
+
+
+def make_update(chat_id: int, text: str) -> types.Update:
+    """Текстовый апдейт Telegram от пользователя чата."""
+    update_id = next(_update_ids)
+    return types.Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Load'},
+            'text': text,
+        },
+    })  # fmt: skip
+
+
+def check_status(response, expected=requests.codes.ok):
+    """Код ошибки сценария по ответу или None."""
+    if response.status_code != expected:
+        return f'HTTP {response.status_code}'
+    return None
+
+
+class LoadRun:
+    """Параметры прогона, общие для всех виртуальных пользователей."""
+
+    def __init__(self, base_url, telegram, bot_module, think_time=0, seed=0):
+        """Запоминает сервер, фейковый Telegram и модуль telegram_bot.bot."""
+        self.base_url = base_url.rstrip('/')
+        self.telegram = telegram
+        self.bot = bot_module
+        self.think_time = think_time
+        self.seed = seed
+        self.stats = LoadStats()
+        self.context = {}
+
+    def start(self, users: int, duration: float, mix: dict):
+        """Запускает users виртуальных пользователей на duration секунд.
+
+        Возвращает фактическую длительность прогона в секундах.
+        """
+        username, password = ensure_load_user()
+        self.context = prepare_context()
+        if not self.context['edit_forms']:
+            mix = {
+                name: weight
+                for name, weight in mix.items()
+                if name != 'order_edit'
+            }
+        virtual_users = [VirtualUser(index, self) for index in range(users)]
+        for user in virtual_users:
+            user.login(username, password)
+        started = time.monotonic()
+        deadline = started + duration
+        try:
+            with ThreadPoolExecutor(max_workers=users) as executor:
+                for user in virtual_users:
+                    executor.submit(user.run, mix, deadline)
+        finally:
+            for user in virtual_users:
+                self.bot.sessions.pop(user.chat_id, None)
+        return time.monotonic() - started
+
+
+class VirtualUser:
+    """Техник, который работает в вебе, API и боте одновременно."""
+
+    def __init__(self, index: int, load_run: LoadRun):
+        """Создаёт пользователя со своими сессиями и чатом бота."""
+        self.load_run = load_run
+        self.context = load_run.context
+        self.rng = random.Random(f'{load_run.seed}:{index}')  # noqa: S311
+        self.web = requests.Session()
+        self.api = requests.Session()
+        self.chat_id = BOT_CHAT_BASE + index
+
+    def url(self, path: str) -> str:
+        """Абсолютный URL на тестируемом сервере."""
+        return f'{self.load_run.base_url}{path}'
+
+    def login(self, username: str, password: str):
+        """Входит в веб-интерфейс, получает JWT и открывает сессию бота."""
+        login_url = self.url('/auth/login/')
+        self.web.get(login_url, timeout=REQUEST_TIMEOUT).raise_for_status()
+        response = self.web.post(
+            login_url,
+            data={
+                'username': username,
+                'password': password,
+                'csrfmiddlewaretoken': self.web.cookies['csrftoken'],
+            },
+            allow_redirects=False,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code != requests.codes.found:
+            raise RuntimeError('Не удалось войти в веб-интерфейс')  # noqa
+        response = self.api.post(
+            self.url('/api/auth/jwt/create/'),
+            json={'username': username, 'password': password},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        tokens = response.json()
+        self.api.headers['Authorization'] = f'Bearer {tokens["access"]}'
+        self.load_run.bot.sessions[self.chat_id] = CRMClient(
+            tokens['access'],
+            tokens['refresh'],
+            base_url=self.load_run.base_url,
+        )
+
+    def order_list(self):
+        """Список заказов со случайным фильтром."""
+        params = self.rng.choice(ORDER_LIST_FILTERS)
+        return check_status(
+            self.web.get(
+                self.url('/orders/'), params=params, timeout=REQUEST_TIMEOUT
+            )
+        )
+
+    def order_detail(self):
+        """Карточка случайного заказа."""
+        pk = self.rng.choice(self.context['order_ids'])
+        return check_status(
+            self.web.get(self.url(f'/orders/{pk}/'), timeout=REQUEST_TIMEOUT)
+        )
+
+    def order_edit(self):
+        """Открывает форму заказа и сохраняет её без изменений."""
+        pk, form = self.rng.choice(tuple(self.context['edit_forms'].items()))
+        edit_url = self.url(f'/orders/{pk}/edit/')
+        error = check_status(self.web.get(edit_url, timeout=REQUEST_TIMEOUT))
+        if error:
+            return error
+        response = self.web.post(
+            edit_url,
+            data={
+                **form,
+                'csrfmiddlewaretoken': self.web.cookies['csrftoken'],
+            },
+            allow_redirects=False,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code == requests.codes.ok:
+            return 'form invalid'
+        return check_status(response, requests.codes.found)
+
+    def api_lookup(self):
+        """Поиск клиента через API бота."""
+        return check_status(
+            self.api.get(
+                self.url('/api/bot/lookup/'),
+                params={'q': self.rng.choice(self.context['lookups'])},
+                timeout=REQUEST_TIMEOUT,
+            )
+        )
+
+    def bot_lookup(self):
+        """Поиск клиента в боте через хендлеры и фейковый Telegram."""
+        query = self.rng.choice(self.context['lookups'])
+        bot = self.load_run.bot.bot
+        for text in ('Клиенты', query):
+            bot.process_new_updates([make_update(self.chat_id, text)])
+        messages = self.load_run.telegram.pop_messages(self.chat_id)
+        if not messages or any(
+            message.startswith(BOT_ERROR_PREFIXES) for message in messages
+        ):
+            return 'bot error'
+        return None
+
+    def run(self, mix: dict, deadline: float):
+        """Выполняет сценарии смеси до наступления deadline."""
+        names, weights = tuple(mix), tuple(mix.values())
+        think_time = self.load_run.think_time
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(names, weights=weights)[0]
+            started = time.perf_counter()
+            try:
+                error = getattr(self, scenario)()
+            except Exception as exc:  # noqa: BLE001
+                error = type(exc).__name__
+            self.load_run.stats.add(
+                scenario, time.perf_counter() - started, error
+            )
+            if think_time:
+                time.sleep(self.rng.expovariate(1 / think_time))
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Обработчик встроенного сервера без журнала запросов."""
+
+    def log_message(self, format, *args):
+        """Не пишет журнал запросов."""
+
+
+@contextmanager
+def local_server():
+    """Встроенный многопоточный WSGI-сервер Django на свободном порту."""
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(
+        target=server.serve_forever, name='load-server', daemon=True
+    )
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        yield f'http://{host}:{port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def free_port() -> int:
+    """Свободный TCP-порт на 127.0.0.1."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def database_env() -> dict:
+    """Переменные окружения, направляющие подпроцесс на текущую БД."""
+    connection = connections['default']
+    name = str(connection.settings_dict['NAME'])
+    if connection.vendor == 'sqlite':
+        return {'SQLITE_PATH': name}
+    return {'POSTGRES_DB': name}
+
+
+def wait_until_ready(base_url: str, process):
+    """Ждёт, пока сервер начнёт отвечать; падение процесса — ошибка."""
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(  # noqa: TRY003
+                f'gunicorn завершился с кодом {process.returncode}'
+            )
+        try:
+            requests.get(base_url, timeout=1, allow_redirects=False)
+        except requests.ConnectionError:
+            time.sleep(0.2)
+        else:
+            return
+    raise RuntimeError(  # noqa: TRY003
+        f'gunicorn не ответил за {SERVER_START_TIMEOUT} с'
+    )
+
+
+@contextmanager
+def gunicorn_server(
+    mode: str, workers: int | None = None, threads: int | None = None
+):
+    """Gunicorn (gunicorn.conf.py) в режиме mode на свободном порту.
+
+    Подпроцесс работает с той же БД, что и соединение default; журнал
+    медленных запросов в нём выключен, как и у встроенного сервера.
+    workers и threads переопределяют значения конфигурации.
+    """
+    port = free_port()
+    env = {
+        **os.environ,
+        **database_env(),
+        'GUNICORN_MODE': mode,
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_ACCESSLOG': '',
+        'GUNICORN_LOGLEVEL': 'warning',
+        'SLOW_QUERY_LOG_ENABLED': 'False',
+    }
+    if workers:
+        env['GUNICORN_WORKERS'] = str(workers)
+    if threads:
+        env['GUNICORN_THREADS'] = str(threads)
+    process = subprocess.Popen(  # noqa: S603
+        [sys.executable, '-m', 'gunicorn'], cwd=settings.BASE_DIR, env=env
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_until_ready(base_url, process)
+        yield base_url
+    finally:
+        # SIGTERM: gunicorn дорабатывает текущие запросы (graceful_timeout).
+        process.terminate()
+        try:
+            process.wait(timeout=SERVER_STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
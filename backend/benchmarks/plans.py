@@ -0,0 +1,78 @@
+"""Планы основных выборок списков: какой индекс выбирает СУБД.
+
+Для каждой выборки строится тот же QuerySet, что у страницы списка
+(первая страница, новые сначала), и снимается план через
+QuerySet.explain(). В плане ищутся имена индексов, рассчитанных на эту
+выборку: SQLite пишет «USING INDEX <имя>», PostgreSQL — «Index Scan
+using <имя>» или «Bitmap Index Scan on <имя>». На секционированных
+таблицах (crm.partitioning) план называет индексы секций — они
+сопоставляются индексам родительской таблицы, а прочитанные секции
+выводятся отдельно: выборка по датам должна читать только свои годы.
+"""
+
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.db import connection
+
+from crm.constants import QUANTITY_ON_PAGE
+from crm.date_filters import created_range
+from crm.models import Order, OrderStatus, Purchase
+from crm.partitioning import parent_indexes, scanned_partitions
+
+RECENT_DAYS = 7
+
+
+class Plan(NamedTuple):
+    """Выборка и индексы, которые должна использовать СУБД."""
+
+    name: str
+    build: object  # callable(context) -> QuerySet
+    indexes: tuple
+
+
+def recent_range(context):
+    """Условие «создано за последние RECENT_DAYS дней набора»."""
+    last = context['last_created']
+    return created_range(last - timedelta(days=RECENT_DAYS), last)
+
+
+PLANS = (
+    Plan(
+        'orders_by_status',
+        lambda context: Order.objects.filter(status=OrderStatus.IN_WORKING),
+        ('crm_order_status_id_idx',),
+    ),
+    Plan(
+        'orders_of_client',
+        lambda context: Order.objects.filter(client_id=context['client']),
+        ('crm_order_client_id_idx',),
+    ),
+    Plan(
+        'orders_recent',
+        lambda context: Order.objects.filter(recent_range(context)),
+        ('crm_order_create_idx', 'crm_order_create_brin'),
+    ),
+    Plan(
+        'purchases_recent',
+        lambda context: Purchase.objects.filter(recent_range(context)),
+        ('crm_purchase_create_idx',),
+    ),
+)
+
+
+def explain_plans(context, plans=PLANS) -> dict:
+    """План и найденный в нём индекс (или None) для каждой выборки."""
+    results = {}
+    for plan in plans:
+        queryset = plan.build(context).order_by('-id')[:QUANTITY_ON_PAGE]
+        text = queryset.explain()
+        names = f'{text} {" ".join(parent_indexes(connection, text))}'
+        results[plan.name] = {
+            'index': next(
+                (index for index in plan.indexes if index in names), None
+            ),
+            'partitions': scanned_partitions(text),
+            'plan': text,
+        }
+    return results
@@ -0,0 +1,305 @@
+"""Подготовка наборов данных, замеры сценариев и сравнение с базовой линией.
+
+Для каждого размера набора (число заказов) используется отдельная БД:
+файл benchmarks/data/orders_<N>.sqlite3 на SQLite или база
+<POSTGRES_DB>_bench_<N> на PostgreSQL. Набор создаётся командой
+generate_load_data один раз и переиспользуется последующими запусками.
+
+Сценарий замеряется Django-клиентом без сети: сначала прогрев, затем
+iterations запросов с замером времени, отдельно — число SQL-запросов
+(track_queries) и пиковая память (tracemalloc) одного запроса, чтобы
+трассировка памяти не искажала время. Сценарий, первый запрос которого
+дольше SLOW_REQUEST_LIMIT_S (например, список без пагинации на 1M строк),
+замеряется одним запросом.
+"""
+
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Count
+from django.test import Client as HttpClient
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from crm.catalog import bump_catalog_version
+from crm.models import Client, Order, Purchase, Service
+from tech_support.metrics import track_queries
+
+from .cases import API
+from .plans import explain_plans
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+BASELINE_FILE = Path(__file__).resolve().parent / 'baseline.json'
+DATASET_SIZES = (1_000, 100_000, 1_000_000)
+DATASET_SEED = 2024
+ORDERS_PER_CLIENT = 20
+MIN_CLIENTS = 50
+BENCHMARK_USERNAME = 'benchmark'
+# Порог абсолютного роста времени, ниже которого разница считается шумом.
+MIN_LATENCY_DELTA_MS = 2.0
+PERCENTILES = {'p50_ms': 50, 'p95_ms': 95, 'p99_ms': 99}
+SLOW_REQUEST_LIMIT_S = 10
+
+
+class BenchmarkError(Exception):
+    """Сценарий бенчмарка не удалось выполнить."""
+
+
+def dataset_name(size: int, connection) -> str:
+    """Имя БД набора данных заданного размера."""
+    if connection.vendor == 'sqlite':
+        return str(DATA_DIR / f'orders_{size}.sqlite3')
+    return f'{connection.settings_dict["NAME"]}_bench_{size}'
+
+
+def _create_postgres_database(connection, name):
+    """Создаёт базу PostgreSQL для набора, если её ещё нет."""
+    with connection._nodb_cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_database WHERE datname = %s', [name])
+        if cursor.fetchone() is None:
+            cursor.execute(
+                f'CREATE DATABASE {connection.ops.quote_name(name)}'
+            )
+
+
+@contextmanager
+def use_dataset(size: int, stdout=None):
+    """Переключает соединение default на БД набора и готовит данные.
+
+    Так же подменяет имя БД тестовый раннер Django (create_test_db).
+    """
+    connection = connections['default']
+    original_name = connection.settings_dict['NAME']
+    name = dataset_name(size, connection)
+    if connection.vendor == 'sqlite':
+        DATA_DIR.mkdir(exist_ok=True)
+    else:
+        _create_postgres_database(connection, name)
+    connection.close()
+    connection.settings_dict['NAME'] = name
+    try:
+        call_command('migrate', verbosity=0, interactive=False)
+        if Order.objects.count() != size:
+            if stdout is not None:
+                stdout.write(f'Генерация набора {size} заказов: {name}')
+            call_command('flush', verbosity=0, interactive=False)
+            call_command(
+                'generate_load_data',
+                orders=size,
+                clients=max(size // ORDERS_PER_CLIENT, MIN_CLIENTS),
+                seed=DATASET_SEED,
+                batch_size=5000,
+                verbosity=0,
+            )
+        # Каталог услуг в памяти процесса собран по другой БД.
+        bump_catalog_version()
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = original_name
+        bump_catalog_version()
+
+
+def collect_context(user) -> dict:
+    """Объекты набора, подставляемые в URL сценариев.
+
+    Клиент — самый активный (больше всего заказов): худший случай для
+    страниц клиента.
+    """
+    client = (
+        Client.objects.annotate(orders_count=Count('orders'))
+        .order_by('-orders_count', 'pk')
+        .first()
+    )
+    order = Order.objects.order_by('-number').first()
+    first_order = Order.objects.order_by('number').first()
+    return {
+        'user': user,
+        'client': client.pk,
+        'client_name': client.client_name.split()[0],
+        'client_phone': client.mobile_phone,
+        'order': order.pk,
+        'order_code': order.code,
+        'date_from': first_order.create.date().isoformat(),
+        'date_to': order.create.date().isoformat(),
+        'last_created': order.create.date(),
+        'purchase': Purchase.objects.order_by('-pk').first().pk,
+        'service': Service.objects.order_by('pk').first().pk,
+    }
+
+
+def build_url(case, context) -> str:
+    """URL сценария с подставленными аргументами и строкой запроса."""
+    url = reverse(case.url_name, args=[context[arg] for arg in case.args])
+    if case.query:
+        query = '&'.join(
+            f'{key}={value.format(**context)}'
+            for key, value in case.query.items()
+        )
+        url = f'{url}?{query}'
+    return url
+
+
+def make_clients(user) -> dict:
+    """HTTP-клиенты: с сессией для страниц и с JWT для API."""
+    html = HttpClient()
+    html.force_login(user)
+    token = RefreshToken.for_user(user).access_token
+    api = HttpClient(headers={'Authorization': f'Bearer {token}'})
+    return {'html': html, API: api}
+
+
+def percentile_summary(timings: list[float]) -> dict:
+    """Перцентили времени ответа в миллисекундах."""
+    if len(timings) == 1:
+        return dict.fromkeys(PERCENTILES, round(timings[0], 2))
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        key: round(cuts[percent - 1], 2)
+        for key, percent in PERCENTILES.items()
+    }
+
+
+def _get(http, url):
+    """GET-запрос сценария; не-200 ответ — ошибка бенчмарка."""
+    response = http.get(url)
+    if response.status_code != 200:  # noqa: PLR2004
+        raise BenchmarkError(  # noqa: TRY003
+            f'{url}: HTTP {response.status_code}'
+        )
+    return response
+
+
+def _timed_get(http, url) -> float:
+    """Время GET-запроса сценария в миллисекундах."""
+    started = time.perf_counter()
+    _get(http, url)
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(http, url, iterations, warmup) -> dict:
+    """Замеры одного сценария: перцентили, число запросов, пик памяти."""
+    with track_queries() as stats:
+        first = _timed_get(http, url)
+    result = {'queries': stats.queries}
+    if first > SLOW_REQUEST_LIMIT_S * 1000:
+        return {**percentile_summary([first]), **result, 'samples': 1}
+    for _ in range(warmup - 1):
+        _get(http, url)
+    timings = [_timed_get(http, url) for _ in range(iterations)]
+    tracemalloc.start()
+    try:
+        _get(http, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        **percentile_summary(timings),
+        **result,
+        'peak_kb': round(peak / 1024),
+        'samples': iterations,
+    }
+
+
+def run_size(size, cases, iterations, warmup, stdout=None) -> dict:
+    """Прогоняет сценарии на наборе заданного размера."""
+    results = {}
+    with (
+        use_dataset(size, stdout),
+        override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            SLOW_QUERY_LOG_ENABLED=False,
+        ),
+    ):
+        user, _ = get_user_model().objects.get_or_create(
+            username=BENCHMARK_USERNAME, defaults={'is_staff': True}
+        )
+        context = collect_context(user)
+        clients = make_clients(user)
+        for case in cases:
+            name = f'{case.kind}:{case.name}'
+            results[name] = measure(
+                clients[case.kind],
+                build_url(case, context),
+                iterations,
+                warmup,
+            )
+            if stdout is not None:
+                stdout.write(f'  {name}: {results[name]}')
+    return results
+
+
+def explain_size(size, stdout=None) -> dict:
+    """Планы основных выборок списков на наборе заданного размера."""
+    with use_dataset(size, stdout):
+        results = explain_plans(collect_context(user=None))
+    if stdout is not None:
+        for name, result in results.items():
+            index = result['index'] or 'БЕЗ ИНДЕКСА'
+            partitions = ', '.join(result['partitions'])
+            stdout.write(
+                f'  {name}: {index}'
+                + (f' (секции: {partitions})' if partitions else '')
+            )
+            stdout.write(
+                '\n'.join(
+                    f'    {line}' for line in result['plan'].splitlines()
+                )
+            )
+    return results
+
+
+def load_baseline(path=BASELINE_FILE) -> dict:
+    """Читает базовую линию; без файла — пустая."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_baseline(baseline: dict, path=BASELINE_FILE):
+    """Записывает базовую линию в стабильном порядке ключей."""
+    path.write_text(
+        json.dumps(baseline, indent=2, sort_keys=True, ensure_ascii=False)
+        + '\n',
+        encoding='utf-8',
+    )
+
+
+def compare(baseline: dict, results: dict, tolerance: float) -> list[str]:
+    """Регрессии результатов относительно базовой линии.
+
+    Время (p50, p95) и пиковая память — рост больше чем на tolerance
+    (и больше MIN_LATENCY_DELTA_MS для времени), число запросов — любой
+    рост.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {base["queries"]} → {current["queries"]}'
+            )
+        for key in ('p50_ms', 'p95_ms'):
+            limit = max(
+                base[key] * (1 + tolerance), base[key] + MIN_LATENCY_DELTA_MS
+            )
+            if current[key] > limit:
+                regressions.append(
+                    f'{name}: {key} {base[key]} → {current[key]}'
+                )
+        # Медленные сценарии замеряются одним запросом без памяти.
+        peak, base_peak = current.get('peak_kb'), base.get('peak_kb')
+        if peak and base_peak and peak > base_peak * (1 + tolerance):
+            regressions.append(f'{name}: память {base_peak} → {peak} КБ')
+    return regressions
@@ -11,6 +11,7 @@ from decimal import Decimal
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -53,6 +54,22 @@ def teardown_api_client_auth(api_client):
     api_client.credentials()
 
 
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(settings):
+    """Превышение query_budget любой view в тестах — ошибка."""
+    settings.METRICS_ENFORCE_BUDGETS = True
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Чистый кеш в каждом тесте: версия каталога услуг начинается заново.
+
+    Тест идёт в откатываемой транзакции, и on_commit-сброс каталога
+    (crm.catalog) в нём не срабатывает.
+    """
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     """Базовый DRF APIClient (без авторизации)."""
@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 
-from .models import Category
+from .models import Category, Store
 
 
 @admin.register(Category)
@@ -12,3 +12,13 @@ class CategoryAdmin(admin.ModelAdmin):
     model = Category
     list_display = ('title', 'slug')
     prepopulated_fields = {'slug': ('title',)}  # noqa: RUF012
+
+
+@admin.register(Store)
+class StoreAdmin(admin.ModelAdmin):
+    """Справочник магазинов: счётчик ведётся при записи покупок."""
+
+    model = Store
+    list_display = ('name', 'purchases_count')
+    readonly_fields = ('purchases_count',)
+    search_fields = ('name',)
@@ -8,3 +8,7 @@ class CrmConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crm'
+
+    def ready(self):  # noqa: PLR6301
+        """Подключает сброс кеша каталога и обработчики фоновых задач."""
+        from . import catalog, tasks  # noqa: F401, PLC0415
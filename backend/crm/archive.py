@@ -0,0 +1,228 @@
+"""Архив закрытых заказов: перенос в холодные таблицы и чтение из обеих.
+
+Закрытые заказы старше заданного возраста вместе со строками услуг и
+покупками переносятся командой archive_orders в ArchivedOrder,
+ArchivedServiceLine и ArchivedPurchase пачками, каждая в своей
+транзакции. Рабочие таблицы остаются маленькими: списки, счётчики и
+расчёт долга по умолчанию их и читают.
+
+С параметром «включая архив» списки строятся ArchiveUnion: id страницы
+выбираются одним UNION ALL по обеим таблицам, затем объекты страницы
+читаются из каждой таблицы по id. Архив не меняется, поэтому баланс его
+заказов хранится в Client.archived_duty и учитывается в
+Client.total_duty и total_duty() без чтения архива.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import BooleanField, Func, Subquery, Value
+from django.utils import timezone
+
+from .models import (
+    CLOSED_ORDER_STATUSES,
+    ZERO,
+    ArchivedOrder,
+    ArchivedPurchase,
+    ArchivedServiceLine,
+    Client,
+    Order,
+    Purchase,
+    ServiceInOrder,
+    Store,
+    money_total_field,
+)
+
+ARCHIVE_PARAM = 'archive'
+ARCHIVE_PARAM_VALUES = {'1', 'true', 'on', 'yes'}
+ORDER_FIELDS = (
+    'id',
+    'number',
+    'client_id',
+    'create',
+    'accepted_equipment',
+    'detail',
+    'services_total_override',
+    'advance',
+    'paid',
+    'status',
+)
+PURCHASE_FIELDS = (
+    'id',
+    'order_id',
+    'create',
+    'store',
+    'detail',
+    'cost',
+    'status',
+)
+
+
+def include_archive(params) -> bool:
+    """Признак «включая архив» в GET-параметрах (?archive=1)."""
+    value = params.get(ARCHIVE_PARAM) or ''
+    return value.strip().lower() in ARCHIVE_PARAM_VALUES
+
+
+def total_duty() -> Decimal:
+    """Общий баланс по всем заказам: рабочим и архивным, одним запросом.
+
+    Сумма Client.archived_duty считается подзапросом в агрегате заказов.
+    """
+    archived = Client.objects.order_by().values(
+        total=Func(
+            'archived_duty', function='SUM', output_field=money_total_field()
+        )
+    )
+    return Order.objects.total_duty(extra=Subquery(archived))
+
+
+class ArchiveUnion:
+    """Рабочая и архивная выборки как один список, упорядоченный по id.
+
+    Пагинатору и сериализаторам достаточно count() и срезов. Срез
+    выбирает id и признак таблицы одним UNION ALL (по первичным ключам),
+    затем объекты читаются только из тех выборок, где они есть, — с их
+    select_related/prefetch_related. Id архивных строк совпадают с
+    прежними id рабочих и не пересекаются с новыми.
+    """
+
+    def __init__(self, hot, archive, ordering='-id'):
+        """Выборки с одинаковыми фильтрами; ordering — 'id' или '-id'."""
+        self.hot = hot
+        self.archive = archive
+        self.ordering = ordering
+
+    def count(self) -> int:
+        """Число объектов в обеих выборках."""
+        return self.hot.count() + self.archive.count()
+
+    def __len__(self):
+        """Число объектов в обеих выборках."""
+        return self.count()
+
+    def __iter__(self):
+        """Все объекты по порядку."""
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        """Объект по индексу или список объектов среза."""
+        if not isinstance(key, slice):
+            return self[key : key + 1][0]
+        rows = list(
+            self.page_keys(self.hot, archived=False)
+            .union(self.page_keys(self.archive, archived=True), all=True)
+            .order_by(self.ordering)[key]
+        )
+        found = {}
+        for queryset, archived in ((self.hot, False), (self.archive, True)):
+            ids = [pk for pk, flag in rows if flag == archived]
+            if ids:
+                found.update(
+                    ((obj.pk, archived), obj)
+                    for obj in queryset.filter(pk__in=ids)
+                )
+        return [found[pk, archived] for pk, archived in rows]
+
+    @staticmethod
+    def page_keys(queryset, archived: bool):
+        """Id выборки с признаком архивной таблицы."""
+        return (
+            queryset.order_by()
+            .prefetch_related(None)
+            .annotate(in_archive=Value(archived, output_field=BooleanField()))
+            .values_list('id', 'in_archive')
+        )
+
+
+def archive_closed_orders(
+    cutoff, batch_size: int, limit: int | None = None, progress=None
+) -> int:
+    """Переносит закрытые заказы, созданные до cutoff, в архив.
+
+    Пачки по batch_size заказов идут в отдельных транзакциях; limit
+    ограничивает общее число перенесённых заказов. После каждой пачки
+    вызывается progress(перенесено), если он задан. Возвращает число
+    перенесённых заказов.
+    """
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        count = archive_batch(cutoff, size)
+        moved += count
+        if progress is not None:
+            progress(moved)
+        if count < size:
+            break
+    return moved
+
+
+def archivable_orders(cutoff):
+    """Закрытые заказы, созданные до cutoff, — кандидаты в архив."""
+    return Order.objects.filter(
+        status__in=CLOSED_ORDER_STATUSES, create__lt=cutoff
+    )
+
+
+def archive_cutoff(days: int):
+    """Граница возраста: заказы, созданные раньше, архивируются."""
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size: int) -> int:
+    """Переносит одну пачку заказов в архив в одной транзакции.
+
+    Заказы блокируются (select_for_update), копируются в архив
+    bulk_create вместе со строками и покупками и удаляются из рабочих
+    таблиц; долг пачки добавляется к Client.archived_duty, счётчики
+    магазинов уменьшаются одним UPDATE на магазин.
+    """
+    with transaction.atomic(), Store.objects.deferred_usage():
+        ids = list(
+            archivable_orders(cutoff)
+            .select_for_update()
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        orders = list(Order.objects.filter(pk__in=ids).with_financials())
+        ArchivedOrder.objects.bulk_create(
+            ArchivedOrder(
+                **{field: getattr(order, field) for field in ORDER_FIELDS}
+            )
+            for order in orders
+        )
+        ArchivedServiceLine.objects.bulk_create(
+            ArchivedServiceLine(**line)
+            for line in ServiceInOrder.objects.filter(order_id__in=ids).values(
+                'order_id', 'service_id', 'amount'
+            )
+        )
+        ArchivedPurchase.objects.bulk_create(
+            ArchivedPurchase(**purchase)
+            for purchase in Purchase.objects.filter(order_id__in=ids).values(
+                *PURCHASE_FIELDS
+            )
+        )
+        add_archived_duty(orders)
+        Purchase.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def add_archived_duty(orders):
+    """Добавляет долг заказов к балансу архива их клиентов."""
+    duty = defaultdict(lambda: ZERO)
+    for order in orders:
+        duty[order.client_id] += order.duty
+    clients = list(
+        Client.objects.select_for_update()
+        .filter(pk__in=duty)
+        .only('id', 'archived_duty')
+    )
+    for client in clients:
+        client.archived_duty += duty[client.pk]
+    Client.objects.bulk_update(clients, ['archived_duty'])
@@ -2,15 +2,17 @@
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.http import JsonResponse
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
     ListView,
     UpdateView,
+    View,
 )
 
-from .constants import QUANTITY_ON_PAGE
+from .constants import AUTOCOMPLETE_PAGE_SIZE, QUANTITY_ON_PAGE
 from .mixins import NameContextMixin
 
 
@@ -46,3 +48,46 @@ class BaseDeleteView(LoginRequiredMixin, DeleteView):
     """Базовый DeleteView для авторизованных пользователей."""
 
     pass
+
+
+class BaseAutocompleteView(LoginRequiredMixin, View):
+    """Базовый JSON-эндпоинт автодополнения для Select2.
+
+    GET ?term=<строка>&page=<номер> → {"results": [{"id", "text"}],
+    "pagination": {"more": bool}}. На странице AUTOCOMPLETE_PAGE_SIZE
+    объектов; следующая страница определяется выборкой на один объект
+    больше, без COUNT по таблице.
+    """
+
+    query_budget = 3  # сессия + пользователь + страница результатов
+    # мс: ответ нужен, пока пользователь печатает, устаревший не нужен
+    statement_timeout = 1000
+
+    def get_queryset(self, term: str):
+        """Упорядоченный QuerySet вариантов для строки поиска."""
+        raise NotImplementedError
+
+    def get_label(self, obj) -> str:  # noqa: PLR6301
+        """Подпись варианта (как в списке выбора формы)."""
+        return str(obj)
+
+    def get(self, request, *args, **kwargs):
+        """Возвращает страницу вариантов."""
+        term = (request.GET.get('term') or '').strip()
+        try:
+            page = max(int(request.GET.get('page') or 1), 1)
+        except ValueError:
+            page = 1
+        offset = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+        objects = list(
+            self.get_queryset(term)[
+                offset : offset + AUTOCOMPLETE_PAGE_SIZE + 1
+            ]
+        )
+        return JsonResponse({
+            'results': [
+                {'id': obj.pk, 'text': self.get_label(obj)}
+                for obj in objects[:AUTOCOMPLETE_PAGE_SIZE]
+            ],
+            'pagination': {'more': len(objects) > AUTOCOMPLETE_PAGE_SIZE},
+        })  # fmt: skip
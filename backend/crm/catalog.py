@@ -0,0 +1,186 @@
+"""Кеш каталога услуг.
+
+Категории и услуги меняются несколько раз в месяц, а читаются почти на
+каждой странице заказа. Каталог хранится в памяти процесса компактными
+кортежами и пересобирается (два запроса) только при смене версии.
+
+Версия — метка в кеше Django (CATALOG_VERSION_CACHE_KEY), общая для
+всех воркеров gunicorn и воркера задач: в продакшене кеш по умолчанию
+файловый (CACHE_LOCATION в настройках). Сохранение и удаление
+Service/Category после коммита транзакции записывает новую метку,
+поэтому откаченные изменения в каталог не попадают. Массовые операции
+(bulk_create, QuerySet.update) сигналов не шлют — после них нужно
+вызвать bump_catalog_version() явно.
+
+Каталог служит для выбора и проверки услуг; цена, которая сохраняется в
+строке заказа, читается из БД (Order.set_services).
+"""
+
+import threading
+import time
+from decimal import Decimal
+from itertools import starmap
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .constants import CATALOG_VERSION_CACHE_KEY
+from .models import Category, Service
+
+
+class CatalogCategory(NamedTuple):
+    """Категория услуг в каталоге."""
+
+    pk: int
+    title: str
+    slug: str
+
+
+class CatalogService(NamedTuple):
+    """Услуга в каталоге с текущей ценой."""
+
+    pk: int
+    service_name: str
+    amount: Decimal
+    category: CatalogCategory
+
+    def as_model(self) -> Service:
+        """Несохраняемый экземпляр Service с категорией, без запросов."""
+        category = Category(
+            pk=self.category.pk,
+            title=self.category.title,
+            slug=self.category.slug,
+        )
+        service = Service(
+            pk=self.pk,
+            category=category,
+            service_name=self.service_name,
+            amount=self.amount,
+        )
+        service._state.adding = False
+        return service
+
+
+class Catalog:
+    """Снимок каталога одной версии.
+
+    categories упорядочены по названию, services — по категории и
+    названию услуги (как в списке выбора формы заказа).
+    """
+
+    __slots__ = (
+        '_by_pk',
+        '_folded_names',
+        'categories',
+        'services',
+        'version',
+    )
+
+    def __init__(self, version, categories, services):
+        """Строит индексы по pk и по названию для поиска."""
+        self.version = version
+        self.categories = tuple(categories)
+        self.services = tuple(services)
+        self._by_pk = {service.pk: service for service in self.services}
+        self._folded_names = tuple(
+            service.service_name.casefold() for service in self.services
+        )
+
+    @classmethod
+    def load(cls, version) -> 'Catalog':
+        """Читает каталог из БД."""
+        categories = {
+            category.pk: category
+            for category in starmap(
+                CatalogCategory,
+                Category.objects.order_by('title').values_list(
+                    'pk', 'title', 'slug'
+                ),
+            )
+        }
+        services = (
+            CatalogService(pk, name, amount, categories[category_id])
+            for pk, name, amount, category_id in Service.objects.order_by(
+                'category__title', 'service_name'
+            ).values_list('pk', 'service_name', 'amount', 'category_id')
+        )
+        return cls(version, categories.values(), services)
+
+    def service(self, pk) -> CatalogService | None:
+        """Услуга по pk или None."""
+        return self._by_pk.get(pk)
+
+    def price(self, pk) -> Decimal | None:
+        """Текущая цена услуги или None, если её нет в каталоге."""
+        service = self._by_pk.get(pk)
+        return None if service is None else service.amount
+
+    def search(self, term='', category_slug='') -> list[CatalogService]:
+        """Услуги категории и/или с подстрокой в названии (без регистра)."""
+        folded = term.casefold()
+        return [
+            service
+            for service, name in zip(
+                self.services, self._folded_names, strict=True
+            )
+            if (not category_slug or service.category.slug == category_slug)
+            and folded in name
+        ]
+
+
+class CatalogCache:
+    """Каталог, собранный в этом процессе."""
+
+    def __init__(self):
+        """Пустой кеш: каталог соберётся при первом обращении."""
+        self.lock = threading.Lock()
+        self.catalog = None
+
+    def get(self) -> Catalog:
+        """Каталог текущей версии; пересобирается только при её смене."""
+        version = catalog_version()
+        catalog = self.catalog
+        if catalog is not None and catalog.version == version:
+            return catalog
+        with self.lock:
+            if self.catalog is None or self.catalog.version != version:
+                self.catalog = Catalog.load(version)
+            return self.catalog
+
+
+def catalog_version():
+    """Текущая версия каталога из общего кеша."""
+    version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        # Ключ вытеснен или кеш очищен: начинаем с метки времени, чтобы
+        # не совпасть с версией, уже собранной каким-либо воркером.
+        cache.add(CATALOG_VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    return version
+
+
+get_catalog = CatalogCache().get
+
+
+def bump_catalog_version():
+    """Делает собранные во всех воркерах каталоги устаревшими.
+
+    Новая метка, а не incr: у файлового кеша incr — чтение и запись, и
+    два одновременных увеличения дали бы одну и ту же версию.
+    """
+    version = time.time_ns()
+    if version == cache.get(CATALOG_VERSION_CACHE_KEY):
+        version += 1
+    cache.set(CATALOG_VERSION_CACHE_KEY, version, timeout=None)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_catalog(sender, using, **kwargs):
+    """Изменение каталога: новая версия после коммита транзакции."""
+    transaction.on_commit(bump_catalog_version, using=using)
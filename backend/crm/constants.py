@@ -1,11 +1,22 @@
 """Модуль с константами для приложений CRM-системы."""
 
+AUTOCOMPLETE_PAGE_SIZE = 20
+BOT_LOOKUP_ORDERS_LIMIT = 5
+CATALOG_VERSION_CACHE_KEY = 'crm:catalog:version'
 COUNT_SERVICES_IN_ORDER = 10
+EVENTS_BATCH_LIMIT = 100
 MAX_LENGTH_ADDRESS = 256
 MAX_LENGTH_COMPANY_NAME = 256
 MAX_LENGTH_COMPONENT_DETAIL = 512
 MAX_LENGTH_COMPONENT_FIELD = 256
 MAX_LENGTH_ENTITY_TYPE = 2
+MAX_LENGTH_EVENT_CONSUMER = 64
+MAX_LENGTH_EVENT_KIND = 32
+MAX_LENGTH_EVENT_TITLE = 256
+MAX_LENGTH_JOB_DEDUP_KEY = 128
+MAX_LENGTH_JOB_NAME = 64
+MAX_LENGTH_JOB_STATUS = 16
+MAX_LENGTH_JOB_WORKER = 128
 MAX_LENGTH_MOBILE_PHONE = 16
 MAX_LENGTH_NAME_CLIENT = 128
 MAX_LENGTH_NAME_SHOP = 256
@@ -17,10 +28,15 @@ MAX_LENGTH_ORDER_STATUS = 56
 MAX_LENGTH_PURCHASE_STATUS = 56
 MONEY_DECIMAL_PLACES = 2
 MONEY_MAX_DIGITS = 10
+MONEY_TOTAL_MAX_DIGITS = 20
+ORDER_CODE_MAX_DIGITS = 9
 ORDER_CODE_PAD = 5
 ORDER_CODE_PREFIX = 'TN'
+ORDER_NUMBER_SEQUENCE = 'crm_order_number_seq'
 ORDER_SEQUENCE_NAME = 'order'
 ORDERS_LIMIT_ON_HOMEPAGE = 15
 QUANTITY_ON_PAGE = 10
 SERVICES_LIMIT_ERROR = 'Можно выбрать не более %(limit)s услуг.'
 SERVICES_LIMIT_ON_PAGE = 15
+STORES_CACHE_KEY = 'crm:stores'
+STORES_CACHE_TIMEOUT = 300
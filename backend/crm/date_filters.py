@@ -0,0 +1,43 @@
+"""Фильтры по дате создания полуоткрытыми диапазонами времени.
+
+Условие create__date__gte приводит столбец к дате, и индекс по create не
+используется. Здесь день переводится в границы [начало дня, начало
+следующего дня) в текущем часовом поясе (TIME_ZONE), и сравнивается сам
+столбец — по индексу.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+def parse_day(value) -> date | None:
+    """Дата из date или строки YYYY-MM-DD; None — пусто или неверно."""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat((value or '').strip())
+    except ValueError:
+        return None
+
+
+def day_start(day: date) -> datetime:
+    """Начало дня в текущем часовом поясе."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def created_range(date_from=None, date_to=None, field='create') -> Q:
+    """Условие «создано с date_from по date_to включительно».
+
+    Границы — date или строки YYYY-MM-DD; пустая или неверная граница
+    не ограничивает диапазон.
+    """
+    q = Q()
+    start = parse_day(date_from)
+    if start is not None:
+        q &= Q(**{f'{field}__gte': day_start(start)})
+    end = parse_day(date_to)
+    if end is not None:
+        q &= Q(**{f'{field}__lt': day_start(end + timedelta(days=1))})
+    return q
@@ -0,0 +1,146 @@
+"""Удаление больших деревьев объектов пачками в коротких транзакциях.
+
+QuerySet.delete() собирает в память все каскадно удаляемые объекты
+(Collector) и удаляет их одной транзакцией: у крупного клиента это все
+заказы, строки услуг и покупки, а таблицы заблокированы на секунды.
+BatchDeleter обходит те же связи, что и Collector, но снизу вверх и
+ограниченными пачками:
+
+- CASCADE — дочерние строки удаляются раньше родителя, тем же способом,
+  пачками по batch_size;
+- SET_NULL — ссылки обнуляются множественным UPDATE по пачке id;
+- последней удаляется сама пачка родителей обычным QuerySet.delete():
+  в ней уже нет детей, поэтому Collector работает с малым объёмом, шлёт
+  сигналы и обрабатывает прочие правила on_delete как обычно.
+
+Каждая пачка — своя транзакция. PROTECT проверяется заранее по всему
+дереву (check_protected): при защищённой ссылке поднимается ProtectedError
+до удаления чего-либо — как у QuerySet.delete(), на который рассчитаны
+представления удаления. Связи ManyToMany без своей модели и прочие
+правила остаются Collector'у.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CASCADE, PROTECT, SET_NULL
+from django.db.models.deletion import (
+    ProtectedError,
+    get_candidate_relations_to_delete,
+)
+
+
+def relations(model, on_delete) -> list:
+    """Обратные связи на model с правилом удаления on_delete.
+
+    Ссылки модели на саму себя остаются Collector'у.
+    """
+    return [
+        rel
+        for rel in get_candidate_relations_to_delete(model._meta)
+        if rel.field.remote_field.on_delete is on_delete
+        and rel.related_model is not model
+    ]
+
+
+def related_rows(rel, parents):
+    """Строки модели связи rel, ссылающиеся на parents (QuerySet или id)."""
+    return rel.related_model._base_manager.filter(
+        **{f'{rel.field.name}__in': parents}
+    )
+
+
+def parent_ids(queryset):
+    """Подзапрос id строк queryset."""
+    return queryset.order_by().values('pk')
+
+
+class BatchDeleter:
+    """Удаляет строки QuerySet со всеми каскадными пачками.
+
+    progress(удалено, всего) вызывается после каждой пачки.
+    """
+
+    def __init__(self, batch_size: int | None = None, progress=None):
+        """Размер пачки (по умолчанию DELETE_BATCH_SIZE) и обратный вызов."""
+        self.batch_size = batch_size or settings.DELETE_BATCH_SIZE
+        self.progress = progress
+        self.deleted = 0
+        self.total = 0
+
+    def check_protected(self, queryset):
+        """Поднимает ProtectedError, если удаление упрётся в PROTECT.
+
+        Проверяются все модели каскадного дерева, по запросу EXISTS на
+        каждую защищённую связь.
+        """
+        for rel in relations(queryset.model, PROTECT):
+            protected = related_rows(rel, parent_ids(queryset))
+            if protected.exists():
+                raise ProtectedError(  # noqa: TRY003
+                    f'Удаление {queryset.model.__name__} запрещено '
+                    f'защищённой связью '
+                    f'{rel.related_model.__name__}.{rel.field.name}',
+                    set(protected[: self.batch_size]),
+                )
+        for rel in relations(queryset.model, CASCADE):
+            self.check_protected(related_rows(rel, parent_ids(queryset)))
+
+    def count(self, queryset) -> int:
+        """Число строк, которые будут удалены, по всему дереву CASCADE."""
+        return queryset.count() + sum(
+            self.count(related_rows(rel, parent_ids(queryset)))
+            for rel in relations(queryset.model, CASCADE)
+        )
+
+    def prepare(self, queryset) -> int:
+        """Проверяет PROTECT и возвращает число удаляемых строк."""
+        self.check_protected(queryset)
+        self.total = self.count(queryset)
+        return self.total
+
+    def delete(self, queryset) -> int:
+        """Удаляет строки queryset и их дерево; возвращает число строк."""
+        self.prepare(queryset)
+        self.delete_rows(queryset)
+        return self.deleted
+
+    def delete_rows(self, queryset):
+        """Удаляет строки queryset пачками, начиная с дочерних."""
+        model = queryset.model
+        while True:
+            ids = list(
+                queryset.order_by('pk').values_list('pk', flat=True)[
+                    : self.batch_size
+                ]
+            )
+            if not ids:
+                return
+            for rel in relations(model, CASCADE):
+                self.delete_rows(related_rows(rel, ids))
+            for rel in relations(model, SET_NULL):
+                self.set_null(rel, ids)
+            with transaction.atomic():
+                deleted, _ = model._base_manager.filter(pk__in=ids).delete()
+            self.advance(deleted)
+
+    def set_null(self, rel, parents):
+        """Обнуляет ссылки rel на parents пачками UPDATE."""
+        rows = related_rows(rel, parents)
+        while True:
+            ids = list(
+                rows.order_by('pk').values_list('pk', flat=True)[
+                    : self.batch_size
+                ]
+            )
+            if not ids:
+                return
+            with transaction.atomic():
+                rel.related_model._base_manager.filter(pk__in=ids).update(
+                    **{rel.field.name: None}
+                )
+
+    def advance(self, deleted: int):
+        """Учитывает удалённые строки и сообщает о ходе работы."""
+        self.deleted += deleted
+        if self.progress is not None:
+            self.progress(self.deleted, max(self.total, self.deleted))
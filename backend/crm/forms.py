@@ -5,6 +5,7 @@ from decimal import Decimal
 from django import forms
 from django.core.exceptions import ValidationError
 
+from .catalog import get_catalog
 from .constants import (
     COUNT_SERVICES_IN_ORDER,
     MONEY_DECIMAL_PLACES,
@@ -17,6 +18,48 @@ from .models import (
     Purchase,
     Service,
 )
+from .widgets import AutocompleteSelect, CatalogServicesSelect
+
+
+def service_label(service: Service) -> str:
+    """Подпись услуги в списке выбора: название и цена."""
+    return f'{service.service_name} - {service.amount} ₽'
+
+
+def order_label(order: Order) -> str:
+    """Подпись заказа в списке выбора: код и клиент."""
+    return f'{order.code} — {order.client.client_name}'
+
+
+class CatalogServicesField(forms.ModelMultipleChoiceField):
+    """Выбор услуг с проверкой id по кешу каталога (crm.catalog).
+
+    Принимает только id услуг, существующих в каталоге, и возвращает
+    список экземпляров Service без запроса к БД. Цену для строк заказа
+    Order.set_services() всё равно читает из БД.
+    """
+
+    def _check_values(self, value):
+        """Проверяет id по каталогу и возвращает услуги."""
+        catalog = get_catalog()
+        services = {}
+        for pk in value:
+            try:
+                service = catalog.service(int(pk))
+            except (TypeError, ValueError):
+                raise ValidationError(
+                    self.error_messages['invalid_pk_value'],
+                    code='invalid_pk_value',
+                    params={'pk': pk},
+                ) from None
+            if service is None:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': pk},
+                )
+            services[service.pk] = service.as_model()
+        return list(services.values())
 
 
 class ClientForm(forms.ModelForm):
@@ -74,13 +117,12 @@ class ClientForm(forms.ModelForm):
 class OrderForm(forms.ModelForm):
     """Форма для заказа."""
 
-    services = forms.ModelMultipleChoiceField(
-        queryset=Service.objects.select_related('category').order_by(
-            'category__title', 'service_name'
-        ),
+    services = CatalogServicesField(
+        queryset=Service.objects.all(),
         required=False,
-        widget=forms.SelectMultiple(
-            attrs={'class': 'form-select js-services-select'}
+        widget=CatalogServicesSelect(
+            'service_autocomplete',
+            attrs={'class': 'form-select js-services-select'},
         ),
         label='Услуги',
     )
@@ -128,8 +170,9 @@ class OrderForm(forms.ModelForm):
             'status',
         )
         widgets = {  # noqa: RUF012
-            'client': forms.Select(
-                attrs={'class': 'form-select js-client-select'}
+            'client': AutocompleteSelect(
+                'client_autocomplete',
+                attrs={'class': 'form-select js-client-select'},
             ),
             'accepted_equipment': forms.TextInput(
                 attrs={
@@ -170,24 +213,19 @@ class OrderForm(forms.ModelForm):
         """
         super().__init__(*args, **kwargs)
         self.order_fields(self.Meta.fields)
-        self.fields['services'].label_from_instance = (
-            lambda s: f'{s.service_name} - {s.amount} ₽'
-        )
+        self.fields['services'].label_from_instance = service_label
         self.fields['services'].help_text = SERVICES_LIMIT_ERROR % {
             'limit': COUNT_SERVICES_IN_ORDER
         }
-        if (
-            self.instance
-            and self.instance.pk
-            and self.instance.services_total_override is None
-        ):
-            self.initial['services_total_override'] = (
-                self.instance.services_total
-            )
         if self.instance and self.instance.pk:
-            self.initial['purchases_total'] = self.instance.purchases_total
-            self.initial['total_amount'] = self.instance.total_amount
-            self.initial['duty'] = self.instance.duty
+            financials = self.instance.financials
+            if financials.services_total_override is None:
+                self.initial['services_total_override'] = (
+                    financials.services_total
+                )
+            self.initial['purchases_total'] = financials.purchases_total
+            self.initial['total_amount'] = financials.total_amount
+            self.initial['duty'] = financials.duty
         else:
             self.initial['purchases_total'] = Decimal('0.00')
             self.initial['total_amount'] = Decimal('0.00')
@@ -200,7 +238,7 @@ class OrderForm(forms.ModelForm):
         Вызывается автоматически при валидации формы.
         """
         services = self.cleaned_data.get('services')
-        if services and services.count() > COUNT_SERVICES_IN_ORDER:
+        if services and len(services) > COUNT_SERVICES_IN_ORDER:
             raise ValidationError(
                 SERVICES_LIMIT_ERROR,
                 code='services_limit',
@@ -208,6 +246,14 @@ class OrderForm(forms.ModelForm):
             )
         return services
 
+    def _save_m2m(self):
+        """Сохраняет услуги заказа через Order.set_services().
+
+        Других M2M-полей у заказа нет; services.set() по умолчанию читает
+        связи дважды и фиксирует цену отдельными SELECT и UPDATE.
+        """
+        self.instance.set_services(self.cleaned_data.get('services') or ())
+
 
 class ServiceForm(forms.ModelForm):
     """Форма для услуги."""
@@ -250,8 +296,9 @@ class PurchaseForm(forms.ModelForm):
         model = Purchase
         fields = ('order', 'store', 'detail', 'cost', 'status')
         widgets = {  # noqa: RUF012
-            'order': forms.Select(
-                attrs={'class': 'form-select js-order-select'}
+            'order': AutocompleteSelect(
+                'order_autocomplete',
+                attrs={'class': 'form-select js-order-select'},
             ),
             'store': forms.TextInput(
                 attrs={
@@ -281,6 +328,4 @@ class PurchaseForm(forms.ModelForm):
         self.fields['order'].queryset = Order.objects.select_related(
             'client'
         ).order_by('-id')
-        self.fields['order'].label_from_instance = (
-            lambda o: f'{o.code} — {o.client.client_name}'
-        )
+        self.fields['order'].label_from_instance = order_label
@@ -0,0 +1,366 @@
+"""Очередь фоновых задач в БД: постановка, захват воркером, повторы.
+
+Тяжёлая работа (экспорт, пересчёты, архивация) не выполняется в
+запросе: представление ставит задачу enqueue() и сразу отвечает, а
+процесс manage.py run_worker выполняет её. Очередь — таблица Job в той
+же БД, без отдельного брокера:
+
+- захват: на PostgreSQL SELECT ... FOR UPDATE SKIP LOCKED — несколько
+  воркеров берут разные задачи, не ожидая друг друга; на SQLite (SKIP
+  LOCKED нет) — условный UPDATE по статусу: задачу получает тот, чей
+  UPDATE изменил строку. Воркер без задач опрашивает очередь раз в
+  JOB_POLL_INTERVAL секунд;
+- порядок: больший priority, затем run_after и id;
+- повторы: при исключении задача возвращается в очередь с задержкой
+  JOB_RETRY_DELAY * 2^(попытка - 1), пока не исчерпаны max_attempts;
+- дедупликация: пока задача с dedup_key в очереди или выполняется,
+  enqueue() с тем же ключом возвращает её (частичный уникальный индекс);
+- задача воркера, который не подаёт признаков жизни дольше
+  JOB_LOCK_TIMEOUT секунд, возвращается в очередь или, если попытки
+  исчерпаны, завершается ошибкой. Признак жизни — locked_at: его
+  обновляют set_progress и фоновый поток heartbeat() раз в
+  JOB_HEARTBEAT_INTERVAL секунд (на своём соединении, поэтому и во время
+  долгой транзакции обработчика);
+- воркер завершает задачу только пока она за ним (locked_by и статус
+  «выполняется»): если её уже вернули в очередь и взял другой, результат
+  прежнего воркера отбрасывается.
+
+Задача ставится в текущей транзакции и видна воркеру после коммита.
+Обработчики регистрируются декоратором job_handler (crm.tasks) и
+получают задачу (для set_progress) и параметры из payload; результат
+обработчика (JSON) сохраняется в Job.result. SQL-запросы обработчика
+ограничены statement_timeout (JOB_STATEMENT_TIMEOUT_MS или свой у
+обработчика).
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    IntegrityError,
+    close_old_connections,
+    connection,
+    connections,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from tech_support.slow_queries import slow_query_log
+from tech_support.statement_timeouts import statement_timeout
+
+from .models import ACTIVE_JOB_STATUSES, Job, JobStatus
+
+logger = logging.getLogger('crm.jobs')
+
+# Сколько первых задач очереди пробует захватить воркер без SKIP LOCKED.
+CLAIM_CANDIDATES = 5
+# Как часто (с) воркер ищет задачи упавших воркеров.
+STALE_CHECK_INTERVAL = 60
+
+
+class JobSpec(NamedTuple):
+    """Зарегистрированный обработчик задачи."""
+
+    handler: Callable
+    title: str
+    priority: int
+    max_attempts: int | None
+    statement_timeout: int | None = None
+
+
+handlers: dict[str, JobSpec] = {}
+
+
+def job_handler(
+    name: str,
+    title: str,
+    priority: int = 0,
+    max_attempts=None,
+    statement_timeout=None,
+):
+    """Регистрирует обработчик задачи name.
+
+    priority — приоритет по умолчанию, max_attempts — число попыток
+    (по умолчанию JOB_MAX_ATTEMPTS), statement_timeout — предел SQL-запроса
+    в мс (по умолчанию JOB_STATEMENT_TIMEOUT_MS, 0 — без предела).
+    """
+
+    def register(func):
+        handlers[name] = JobSpec(
+            func, title, priority, max_attempts, statement_timeout
+        )
+        return func
+
+    return register
+
+
+def job_title(name: str) -> str:
+    """Название задачи для интерфейса."""
+    spec = handlers.get(name)
+    return spec.title if spec else name
+
+
+def enqueue(
+    name: str,
+    payload: dict | None = None,
+    dedup_key: str = '',
+    priority: int | None = None,
+    delay: float = 0,
+) -> Job:
+    """Ставит задачу в очередь и возвращает её.
+
+    Если задача с тем же dedup_key уже в очереди или выполняется,
+    возвращается она, новая не создаётся.
+    """
+    spec = handlers.get(name)
+    if spec is None:
+        raise ValueError(f'Неизвестная задача: {name}')  # noqa: TRY003
+    if dedup_key:
+        active = active_job(dedup_key)
+        if active is not None:
+            return active
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=payload or {},
+                dedup_key=dedup_key,
+                priority=spec.priority if priority is None else priority,
+                max_attempts=spec.max_attempts or settings.JOB_MAX_ATTEMPTS,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        # Такую же задачу параллельно поставил другой запрос.
+        active = active_job(dedup_key) if dedup_key else None
+        if active is None:
+            raise
+        return active
+
+
+def active_job(dedup_key: str) -> Job | None:
+    """Задача с ключом dedup_key в очереди или в работе."""
+    return Job.objects.filter(
+        dedup_key=dedup_key, status__in=ACTIVE_JOB_STATUSES
+    ).first()
+
+
+def claim_job(worker: str) -> Job | None:
+    """Захватывает первую готовую задачу очереди для воркера worker."""
+    now = timezone.now()
+    queued = Job.objects.filter(
+        status=JobStatus.QUEUED, run_after__lte=now
+    ).order_by('-priority', 'run_after', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = (
+                queued.select_for_update(skip_locked=True)
+                .values_list('id', flat=True)
+                .first()
+            )
+            return None if pk is None else take_job(pk, worker, now)
+    for pk in queued.values_list('id', flat=True)[:CLAIM_CANDIDATES]:
+        job = take_job(pk, worker, now)
+        if job is not None:
+            return job
+    return None
+
+
+def take_job(pk: int, worker: str, now) -> Job | None:
+    """Переводит задачу из очереди в работу, если её не взял другой."""
+    taken = Job.objects.filter(pk=pk, status=JobStatus.QUEUED).update(
+        status=JobStatus.RUNNING,
+        locked_by=worker,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return Job.objects.get(pk=pk) if taken else None
+
+
+def run_job(job: Job) -> bool:
+    """Выполняет захваченную задачу; True — если она выполнена."""
+    spec = handlers.get(job.name)
+    try:
+        if spec is None:
+            raise LookupError(  # noqa: TRY003, TRY301
+                f'Обработчик задачи {job.name} не зарегистрирован'
+            )
+        timeout = (
+            settings.JOB_STATEMENT_TIMEOUT_MS
+            if spec.statement_timeout is None
+            else spec.statement_timeout
+        )
+        with slow_query_log(), statement_timeout(timeout), heartbeat(job):
+            result = spec.handler(job, **job.payload)
+    except Exception:
+        logger.exception('Задача %s #%s завершилась ошибкой', job.name, job.pk)
+        fail_job(job, traceback.format_exc(), retry=spec is not None)
+        return False
+    fields = {
+        'status': JobStatus.DONE,
+        'result': result,
+        'error': '',
+        'finished': timezone.now(),
+    }
+    if not save_owned(job, **fields):
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def owned(job: Job):
+    """Задача, пока она выполняется воркером, который её взял."""
+    return Job.objects.filter(
+        pk=job.pk, locked_by=job.locked_by, status=JobStatus.RUNNING
+    )
+
+
+def save_owned(job: Job, **fields) -> bool:
+    """Сохраняет поля задачи, если она всё ещё за этим воркером.
+
+    Иначе (задачу вернули в очередь как зависшую, и её, возможно, уже
+    взял другой воркер) ничего не меняет и возвращает False.
+    """
+    if owned(job).update(**fields):
+        return True
+    logger.warning(
+        'Задача %s #%s больше не за воркером %s, результат отброшен',
+        job.name,
+        job.pk,
+        job.locked_by,
+    )
+    return False
+
+
+@contextmanager
+def heartbeat(job: Job, interval: float | None = None):
+    """Обновляет locked_at задачи в фоновом потоке, пока идёт блок.
+
+    Поток пишет на своём соединении с БД, поэтому признак жизни виден
+    и тогда, когда обработчик держит одну долгую транзакцию.
+    """
+    if interval is None:
+        interval = settings.JOB_HEARTBEAT_INTERVAL
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=beat,
+        args=(job, interval, stop),
+        name=f'job-{job.pk}-heartbeat',
+        daemon=True,
+    )
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def beat(job: Job, interval: float, stop: threading.Event):
+    """Тело потока heartbeat(): обновление locked_at до остановки."""
+    try:
+        while not stop.wait(interval):
+            try:
+                alive = owned(job).update(locked_at=timezone.now())
+            except DatabaseError:
+                logger.warning(
+                    'Не удалось отметить задачу %s #%s живой',
+                    job.name,
+                    job.pk,
+                    exc_info=True,
+                )
+                continue
+            if not alive:
+                return
+    finally:
+        connections.close_all()
+
+
+def fail_job(job: Job, error: str, retry: bool = True):
+    """Возвращает задачу в очередь с задержкой или завершает ошибкой."""
+    now = timezone.now()
+    fields = {'error': error}
+    if retry and job.attempts < job.max_attempts:
+        delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        fields.update(
+            status=JobStatus.QUEUED,
+            run_after=now + timedelta(seconds=delay),
+            locked_by='',
+            locked_at=None,
+        )
+    else:
+        fields.update(status=JobStatus.FAILED, finished=now)
+    if save_owned(job, **fields):
+        for name, value in fields.items():
+            setattr(job, name, value)
+
+
+def requeue_stale() -> int:
+    """Возвращает в очередь задачи воркеров, переставших подавать знаки.
+
+    Задачи с исчерпанными попытками завершаются ошибкой. Возвращает
+    число обработанных задач.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=JobStatus.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=JobStatus.FAILED,
+        finished=now,
+        error='Воркер не завершил задачу за JOB_LOCK_TIMEOUT',
+    )
+    requeued = stale.update(
+        status=JobStatus.QUEUED, run_after=now, locked_by='', locked_at=None
+    )
+    return failed + requeued
+
+
+def worker_name() -> str:
+    """Имя воркера: хост и номер процесса."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(
+    worker: str | None = None,
+    burst: bool = False,
+    max_jobs: int | None = None,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> int:
+    """Цикл воркера: берёт и выполняет задачи по одной.
+
+    burst — выйти, когда очередь опустела; max_jobs — выйти после
+    стольких задач; should_stop() проверяется перед каждой задачей.
+    Возвращает число выполненных (в том числе неудачно) задач.
+    """
+    worker = worker or worker_name()
+    processed = 0
+    next_stale_check = 0.0
+    while not should_stop() and (max_jobs is None or processed < max_jobs):
+        if not connection.in_atomic_block:
+            # Как между HTTP-запросами: закрыть оборванные соединения.
+            close_old_connections()
+        if time.monotonic() >= next_stale_check:
+            requeue_stale()
+            next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+        job = claim_job(worker)
+        if job is None:
+            if burst:
+                break
+            time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1 @@
+"""Management-команды приложения CRM."""
@@ -0,0 +1 @@
+"""Команды manage.py приложения CRM."""
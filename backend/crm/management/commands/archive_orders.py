@@ -0,0 +1,57 @@
+"""Перенос закрытых заказов в архив (crm.archive)."""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.archive import archive_closed_orders, archive_cutoff
+
+
+class Command(BaseCommand):
+    """Переносит старые закрытые заказы в холодные таблицы."""
+
+    help = (
+        'Переносит закрытые заказы старше --days дней со строками услуг '
+        'и покупками в архивные таблицы пачками по --batch-size.'
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        """Описывает аргументы команды."""
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help='возраст заказа в днях (от даты создания)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ORDER_ARCHIVE_BATCH_SIZE,
+            help='заказов в одной транзакции',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='перенести не больше стольких заказов за запуск',
+        )
+
+    def handle(self, *args, **options):
+        """Переносит заказы и печатает итог."""
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError(  # noqa: TRY003
+                '--days должен быть >= 0, --batch-size — >= 1'
+            )
+        started = time.perf_counter()
+        moved = archive_closed_orders(
+            archive_cutoff(options['days']),
+            options['batch_size'],
+            limit=options['limit'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'В архив перенесено заказов: {moved} '
+                f'за {time.perf_counter() - started:.1f} с'
+            )
+        )
@@ -0,0 +1,410 @@
+"""Генерация синтетических данных CRM для нагрузочного тестирования.
+
+Создаёт каталог (категории и услуги), клиентов, заказы со строками услуг
+и покупки в заданном объёме — до миллионов строк. Распределения
+приближены к реальным: активность клиентов распределена по Парето
+(несколько клиентов с сотнями заказов, большинство — с единицами),
+старые заказы в основном закрыты, новые — в работе.
+
+Данные детерминированы зерном --seed: повторный запуск на пустой БД даёт
+те же строки (кроме номеров заказов, которые берутся из последовательности).
+Вставка идёт через bulk_create пачками по --batch-size в отдельных
+транзакциях, номера заказов резервируются одним блоком
+reserve_order_numbers.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from crm.catalog import bump_catalog_version
+from crm.models import (
+    CLOSED_ORDER_STATUSES,
+    Category,
+    Client,
+    EntityType,
+    Order,
+    OrderStatus,
+    Purchase,
+    PurchaseStatus,
+    Service,
+    ServiceInOrder,
+    Store,
+)
+from crm.order_numbers import reserve_order_numbers
+
+PHONE_PREFIX = '+7999'
+PHONE_DIGITS = 7
+SLUG_PREFIX = 'load'
+CLIENT_ACTIVITY_ALPHA = 1.5
+LEGAL_ENTITY_SHARE = 0.15
+OVERRIDE_SHARE = 0.1
+PURCHASE_SHARE = 0.35
+ORPHAN_PURCHASE_SHARE = 0.05
+ADDRESS_SHARE = 0.5
+RECENT_ORDER_DAYS = 30
+MAX_LINES_PER_ORDER = 4
+
+FIRST_NAMES = (
+    'Александр', 'Алексей', 'Анна', 'Дмитрий', 'Екатерина', 'Елена',
+    'Иван', 'Ирина', 'Максим', 'Мария', 'Наталья', 'Николай', 'Ольга',
+    'Павел', 'Сергей', 'Татьяна',
+)  # fmt: skip
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров',
+    'Соколов', 'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков',
+)  # fmt: skip
+COMPANIES = (
+    'ООО «Вектор»', 'ООО «Альфа Сервис»', 'АО «Техносфера»',
+    'ИП Григорьев', 'ООО «Северный ветер»', 'ООО «Базис»',
+)  # fmt: skip
+STREETS = ('Ленина', 'Мира', 'Гагарина', 'Советская', 'Садовая', 'Лесная')
+EQUIPMENT = (
+    'Ноутбук ASUS VivoBook 15', 'Ноутбук Lenovo IdeaPad 3',
+    'Ноутбук HP Pavilion 14', 'Системный блок', 'Моноблок Acer Aspire',
+    'МФУ Canon i-SENSYS', 'Принтер HP LaserJet', 'Блок питания DEEPCOOL',
+    'Видеокарта MSI GeForce', 'Монитор Samsung 24"', 'SSD Kingston 480 ГБ',
+    'Роутер Keenetic',
+)  # fmt: skip
+FAULTS = (
+    'Не включается', 'Не работает экран', 'Сильно греется и шумит',
+    'Не печатает', 'Медленно работает', 'Требуется переустановка ОС',
+    'Нет изображения', 'Залит жидкостью', 'Не заряжается',
+    'Периодически перезагружается',
+)  # fmt: skip
+CATALOG = (
+    'Диагностика', 'Замена', 'Ремонт', 'Установка', 'Работа с данными',
+    'Обслуживание периферийных устройств', 'Настройка', 'Чистка',
+)  # fmt: skip
+SERVICE_TARGETS = (
+    'аккумулятора', 'блока питания', 'матрицы', 'клавиатуры', 'разъёма',
+    'системы охлаждения', 'жёсткого диска', 'SSD', 'оперативной памяти',
+    'операционной системы', 'драйверов', 'картриджа',
+)  # fmt: skip
+STORES = ('DNS', 'aliexpress', 'Ситилинк', 'Ozon', 'Wildberries')
+PARTS = (
+    'Аккумулятор', 'Матрица 15.6" FHD', 'Клавиатура', 'SSD 512 ГБ',
+    'Модуль памяти 8 ГБ', 'Термопаста', 'Кулер', 'Разъём питания',
+    'Картридж', 'Лицензия Windows',
+)  # fmt: skip
+
+# Доли статусов для старых (закрытых в основном) и свежих заказов.
+OLD_ORDER_STATUSES = {
+    OrderStatus.COMPLETED: 85,
+    OrderStatus.NOT_RELEVANT: 10,
+    OrderStatus.READY_PICKUP: 3,
+    OrderStatus.IN_SERVICE: 2,
+}
+RECENT_ORDER_STATUSES = {
+    OrderStatus.IN_WORKING: 35,
+    OrderStatus.UNDER_APPROVAL: 10,
+    OrderStatus.WAITING_PART: 15,
+    OrderStatus.IN_SERVICE: 5,
+    OrderStatus.READY_PICKUP: 10,
+    OrderStatus.COMPLETED: 20,
+    OrderStatus.NOT_RELEVANT: 5,
+}
+
+
+def money(value: float) -> Decimal:
+    """Денежное значение, округлённое до десятков рублей."""
+    return Decimal(int(value) // 10 * 10).quantize(Decimal('0.01'))
+
+
+@contextmanager
+def explicit_create_dates(*models):
+    """Временно отключает auto_now_add у поля create моделей.
+
+    bulk_create проставляет auto_now_add текущим временем, а генератору
+    нужны даты, распределённые по всему периоду.
+    """
+    fields = [model._meta.get_field('create') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class LoadDataGenerator:
+    """Построитель синтетических объектов CRM на основе random.Random."""
+
+    def __init__(self, seed, days, batch_size, stdout=None):
+        """Создаёт генератор с зерном seed и периодом заказов в днях."""
+        self.rng = random.Random(seed)  # noqa: S311
+        # Отдельный поток для каталога: при повторном запуске каталог
+        # берётся из БД, и это не сдвигает случайные данные заказов.
+        self.catalog_rng = random.Random(f'{seed}:catalog')  # noqa: S311
+        self.days = days
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.now = timezone.now().replace(microsecond=0)
+
+    def log(self, message):
+        """Пишет сообщение о прогрессе, если задан поток вывода."""
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def create_catalog(self, categories, services_per_category):
+        """Создаёт категории и услуги (повторно использует созданные ранее)."""
+        existing = {
+            category.slug: category
+            for category in Category.objects.filter(
+                slug__startswith=f'{SLUG_PREFIX}-'
+            )
+        }
+        new_categories = [
+            Category(
+                title=f'{CATALOG[index % len(CATALOG)]} ({index + 1})',
+                slug=f'{SLUG_PREFIX}-{index + 1}',
+            )
+            for index in range(categories)
+            if f'{SLUG_PREFIX}-{index + 1}' not in existing
+        ]
+        Category.objects.bulk_create(new_categories)
+        services = [
+            Service(
+                category=category,
+                service_name=(
+                    f'{category.title.split(" (")[0]} '
+                    f'{self.catalog_rng.choice(SERVICE_TARGETS)} №{number}'
+                ),
+                amount=money(self.catalog_rng.lognormvariate(7.3, 0.7)),
+            )
+            for category in new_categories
+            for number in range(1, services_per_category + 1)
+        ]
+        Service.objects.bulk_create(services, batch_size=self.batch_size)
+        # bulk_create не шлёт сигналы, сбрасывающие кеш каталога.
+        transaction.on_commit(bump_catalog_version)
+        return list(
+            Service.objects.filter(
+                category__slug__startswith=f'{SLUG_PREFIX}-'
+            )
+            .order_by('pk')
+            .values_list('pk', 'amount')
+        )
+
+    def build_client(self, number):
+        """Клиент с уникальным телефоном по порядковому номеру."""
+        rng = self.rng
+        name = f'{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}'
+        is_legal = rng.random() < LEGAL_ENTITY_SHARE
+        return Client(
+            client_name=name,
+            mobile_phone=f'{PHONE_PREFIX}{number:0{PHONE_DIGITS}d}',
+            entity_type=EntityType.UL if is_legal else EntityType.FL,
+            company=rng.choice(COMPANIES) if is_legal else '',
+            address=(
+                f'ул. {rng.choice(STREETS)}, д. {rng.randint(1, 150)}'
+                if rng.random() < ADDRESS_SHARE
+                else ''
+            ),
+        )
+
+    def create_clients(self, count):
+        """Создаёт клиентов пачками; возвращает их pk."""
+        start = Client.objects.filter(
+            mobile_phone__startswith=PHONE_PREFIX
+        ).count()
+        if start + count > 10**PHONE_DIGITS:
+            raise CommandError(  # noqa: TRY003
+                'Исчерпан диапазон тестовых телефонов'
+            )
+        client_ids = []
+        for offset in range(0, count, self.batch_size):
+            batch = [
+                self.build_client(start + number)
+                for number in range(
+                    offset, min(offset + self.batch_size, count)
+                )
+            ]
+            with transaction.atomic():
+                Client.objects.bulk_create(batch)
+            client_ids.extend(client.pk for client in batch)
+            self.log(f'Клиенты: {len(client_ids)}/{count}')
+        return client_ids
+
+    def order_status(self, created):
+        """Статус заказа с учётом его возраста."""
+        is_recent = self.now - created < timedelta(days=RECENT_ORDER_DAYS)
+        statuses = RECENT_ORDER_STATUSES if is_recent else OLD_ORDER_STATUSES
+        return self.rng.choices(
+            tuple(statuses), weights=tuple(statuses.values())
+        )[0]
+
+    def build_order(self, number, client_id, created, services):
+        """Заказ со строками услуг (строки получат order после вставки)."""
+        rng = self.rng
+        status = self.order_status(created)
+        picked = rng.sample(
+            services, k=min(len(services), rng.randint(0, MAX_LINES_PER_ORDER))
+        )
+        lines = [
+            ServiceInOrder(service_id=pk, amount=amount)
+            for pk, amount in picked
+        ]
+        base_total = sum((amount for _, amount in picked), Decimal('0.00'))
+        override = None
+        if picked and rng.random() < OVERRIDE_SHARE:
+            override = money(float(base_total) * rng.uniform(0.7, 0.95))
+        total = base_total if override is None else override
+        advance = money(float(total) * rng.choice((0, 0, 0.2, 0.5)))
+        paid = Decimal('0.00')
+        if status == OrderStatus.COMPLETED:
+            paid = max(total - advance, Decimal('0.00'))
+        order = Order(
+            number=number,
+            client_id=client_id,
+            create=created,
+            accepted_equipment=rng.choice(EQUIPMENT),
+            detail=rng.choice(FAULTS),
+            services_total_override=override,
+            advance=advance,
+            paid=paid,
+            status=status,
+        )
+        return order, lines
+
+    def build_purchase(self, order):
+        """Покупка запчасти к заказу (или без заказа при order=None)."""
+        rng = self.rng
+        if order is None:
+            created = self.now - timedelta(
+                seconds=rng.randint(0, self.days * 86400)
+            )
+            status = rng.choice(PurchaseStatus.values)
+        else:
+            created = order.create + timedelta(hours=rng.randint(1, 72))
+            status = (
+                PurchaseStatus.INSTALLED
+                if order.status in CLOSED_ORDER_STATUSES
+                else rng.choice(PurchaseStatus.values)
+            )
+        return Purchase(
+            order=order,
+            create=created,
+            store=rng.choice(STORES),
+            detail=rng.choice(PARTS),
+            cost=money(rng.lognormvariate(8, 0.8)),
+            status=status,
+        )
+
+    def create_orders(self, count, client_ids, services):
+        """Создаёт заказы, строки услуг и покупки пачками.
+
+        Клиент каждого заказа выбирается по весам его активности
+        (распределение Парето с тяжёлым хвостом), даты заказов
+        равномерно растут вместе с номером.
+        """
+        rng = self.rng
+        numbers = reserve_order_numbers(count)
+        cum_weights = list(
+            accumulate(
+                rng.paretovariate(CLIENT_ACTIVITY_ALPHA) for _ in client_ids
+            )
+        )
+        period = self.days * 86400
+        totals = {'lines': 0, 'purchases': 0}
+        for offset in range(0, count, self.batch_size):
+            orders, order_lines, purchases = [], [], []
+            for index in range(offset, min(offset + self.batch_size, count)):
+                created = self.now - timedelta(
+                    seconds=period * (count - index) // count
+                    + rng.randint(0, 3600)
+                )
+                client_id = rng.choices(client_ids, cum_weights=cum_weights)[0]
+                order, lines = self.build_order(
+                    numbers[index], client_id, created, services
+                )
+                orders.append(order)
+                order_lines.append(lines)
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                lines = []
+                for order, order_line_list in zip(
+                    orders, order_lines, strict=True
+                ):
+                    for line in order_line_list:
+                        line.order = order
+                        lines.append(line)
+                    if rng.random() < PURCHASE_SHARE:
+                        purchases.append(self.build_purchase(order))
+                    if rng.random() < ORPHAN_PURCHASE_SHARE:
+                        purchases.append(self.build_purchase(None))
+                ServiceInOrder.objects.bulk_create(lines)
+                Purchase.objects.bulk_create(purchases)
+            totals['lines'] += len(lines)
+            totals['purchases'] += len(purchases)
+            self.log(f'Заказы: {offset + len(orders)}/{count}')
+        return totals
+
+
+class Command(BaseCommand):
+    """manage.py generate_load_data — синтетические данные для нагрузки."""
+
+    help = (
+        'Создаёт синтетических клиентов, услуги, заказы и покупки '
+        'для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        """Параметры объёма и воспроизводимости генерации."""
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=len(CATALOG))
+        parser.add_argument('--services-per-category', type=int, default=6)
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=730,
+            help='Период, по которому распределяются даты заказов.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        """Создаёт данные и выводит сводку."""
+        for option in ('clients', 'categories', 'days', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(  # noqa: TRY003
+                    f'--{option.replace("_", "-")} должен быть больше нуля'
+                )
+        if options['orders'] < 0:
+            raise CommandError(  # noqa: TRY003
+                '--orders не может быть отрицательным'
+            )
+        started = time.perf_counter()
+        generator = LoadDataGenerator(
+            options['seed'],
+            options['days'],
+            options['batch_size'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+        )
+        services = generator.create_catalog(
+            options['categories'], options['services_per_category']
+        )
+        client_ids = generator.create_clients(options['clients'])
+        totals = {'lines': 0, 'purchases': 0}
+        if options['orders']:
+            with explicit_create_dates(Order, Purchase):
+                totals = generator.create_orders(
+                    options['orders'], client_ids, services
+                )
+            # bulk_create покупок не обновляет счётчики магазинов.
+            Store.objects.rebuild()
+        self.stdout.write(
+            f'Создано: клиентов {len(client_ids)}, '
+            f'заказов {options["orders"]}, строк услуг {totals["lines"]}, '
+            f'покупок {totals["purchases"]} '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
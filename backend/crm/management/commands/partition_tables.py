@@ -0,0 +1,68 @@
+"""Секции заказов и покупок по году создания (crm.partitioning)."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from crm.partitioning import (
+    PARTITIONED_TABLES,
+    convert_table,
+    ensure_partitions,
+    partitioning_supported,
+)
+
+
+class Command(BaseCommand):
+    """Создаёт секции будущих лет и при необходимости секционирует."""
+
+    help = (
+        'Создаёт секции crm_order и crm_purchase на --years-ahead лет '
+        'вперёд; с --convert сначала преобразует несекционированные '
+        'таблицы пачками по --batch-size. Только PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        """Описывает аргументы команды."""
+        parser.add_argument(
+            '--years-ahead',
+            type=int,
+            default=1,
+            help='на сколько лет после текущего создать секции',
+        )
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='секционировать таблицы, которые ещё не секционированы',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.PARTITION_COPY_BATCH_SIZE,
+            help='строк в одной пачке копирования',
+        )
+
+    def handle(self, *args, **options):
+        """Преобразует таблицы (по запросу) и создаёт секции."""
+        if not partitioning_supported(connection):
+            self.stdout.write(
+                self.style.WARNING(
+                    'Секционирование поддерживается только на PostgreSQL, '
+                    f'текущая СУБД: {connection.vendor}'
+                )
+            )
+            return
+        if options['convert']:
+            for table in PARTITIONED_TABLES:
+                convert_table(
+                    connection,
+                    table,
+                    options['batch_size'],
+                    log=self.stdout.write,
+                )
+        created = ensure_partitions(connection, options['years_ahead'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Создано секций: {len(created)}'
+                + (f' ({", ".join(created)})' if created else '')
+            )
+        )
@@ -0,0 +1,128 @@
+"""Бенчмарки страниц и API с базовой линией в benchmarks/baseline.json."""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from benchmarks.cases import CASES
+from benchmarks.runner import (
+    BASELINE_FILE,
+    DATASET_SIZES,
+    compare,
+    explain_size,
+    load_baseline,
+    run_size,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    """manage.py run_benchmarks — замеры и поиск регрессий."""
+
+    help = (
+        'Замеряет время, число SQL-запросов и память HTML-страниц и API '
+        'на наборах из 1k/100k/1M заказов и сравнивает с базовой линией.'
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        """Параметры прогона."""
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=list(DATASET_SIZES),
+            help='Размеры наборов данных (число заказов).',
+        )
+        parser.add_argument(
+            '--cases',
+            nargs='+',
+            default=(),
+            help='Подстроки имён сценариев (по умолчанию все).',
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Допустимый относительный рост времени и памяти.',
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Показать планы выборок списков (EXPLAIN) без замеров.',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Записать результаты в базовую линию вместо сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        """Прогоняет сценарии и сравнивает с базовой линией."""
+        if options['iterations'] < 2:  # noqa: PLR2004
+            raise CommandError(  # noqa: TRY003
+                '--iterations должен быть не меньше 2'
+            )
+        cases = [
+            case
+            for case in CASES
+            if not options['cases']
+            or any(part in case.name for part in options['cases'])
+        ]
+        vendor = connections['default'].vendor
+        if options['explain']:
+            self.explain(options['sizes'], vendor)
+            return
+        baseline = load_baseline()
+        vendor_baseline = baseline.setdefault(vendor, {})
+        regressions = []
+        for size in options['sizes']:
+            self.stdout.write(f'Набор {size} заказов ({vendor})')
+            results = run_size(
+                size,
+                cases,
+                options['iterations'],
+                options['warmup'],
+                stdout=self.stdout,
+            )
+            if options['update_baseline']:
+                vendor_baseline.setdefault(str(size), {}).update(results)
+                continue
+            size_baseline = vendor_baseline.get(str(size), {})
+            missing = sorted(set(results) - set(size_baseline))
+            if missing:
+                self.stdout.write(f'Нет в базовой линии: {", ".join(missing)}')
+            regressions.extend(
+                f'[{size}] {line}'
+                for line in compare(
+                    size_baseline, results, options['tolerance']
+                )
+            )
+        if options['update_baseline']:
+            save_baseline(baseline)
+            self.stdout.write(f'Базовая линия обновлена: {BASELINE_FILE}')
+            return
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(  # noqa: TRY003
+                f'Регрессий производительности: {len(regressions)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено'))
+
+    def explain(self, sizes, vendor):
+        """Печатает планы выборок; выборка без индекса — ошибка."""
+        missing = []
+        for size in sizes:
+            self.stdout.write(f'Планы выборок: {size} заказов ({vendor})')
+            results = explain_size(size, stdout=self.stdout)
+            missing.extend(
+                f'[{size}] {name}'
+                for name, result in results.items()
+                if result['index'] is None
+            )
+        if missing:
+            raise CommandError(  # noqa: TRY003
+                f'Выборки без индекса: {", ".join(missing)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Все выборки используют индексы'))
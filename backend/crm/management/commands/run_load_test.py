@@ -0,0 +1,157 @@
+"""Нагрузочный прогон веб-интерфейса, API и бота (benchmarks.load)."""
+
+import json
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from benchmarks.fake_telegram import fake_telegram, load_bot
+from benchmarks.load import (
+    DEFAULT_MIX,
+    GUNICORN_MODES,
+    LoadRun,
+    format_comparison,
+    format_report,
+    gunicorn_server,
+    local_server,
+    parse_mix,
+)
+from benchmarks.runner import use_dataset
+
+
+class Command(BaseCommand):
+    """manage.py run_load_test — смесь трафика техников и чатов бота."""
+
+    help = (
+        'Нагружает сервер смесью сценариев (список и карточка заказа, '
+        'редактирование, поиск в API и в боте) и выводит пропускную '
+        'способность, задержки и долю ошибок.'
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        """Параметры прогона."""
+        parser.add_argument(
+            '--url',
+            help=(
+                'Адрес уже запущенного сервера (например, gunicorn). '
+                'Он должен работать с той же БД, что и команда.'
+            ),
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=1000,
+            help='Набор данных benchmarks для встроенного сервера.',
+        )
+        parser.add_argument(
+            '--server',
+            nargs='+',
+            choices=('local', *GUNICORN_MODES),
+            default=['local'],
+            help=(
+                'Серверы для прогона по очереди: local — встроенный, '
+                'sync/gthread/asgi — gunicorn с gunicorn.conf.py в этом '
+                'режиме. Несколько серверов сводятся в таблицу.'
+            ),
+        )
+        parser.add_argument(
+            '--workers', type=int, help='Воркеров gunicorn (GUNICORN_WORKERS).'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Потоков воркера gthread (GUNICORN_THREADS).',
+        )
+        parser.add_argument('--users', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+            help='Веса сценариев: order_list=35,bot_lookup=20,...',
+        )
+        parser.add_argument(
+            '--think-ms',
+            type=float,
+            default=0,
+            help='Средняя пауза пользователя между сценариями.',
+        )
+        parser.add_argument(
+            '--telegram-latency-ms',
+            type=float,
+            default=0,
+            help='Задержка ответа фейкового Telegram.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=Path, help='Отчёт в JSON.')
+
+    def handle(self, *args, **options):
+        """Готовит сервер и фейковый Telegram, запускает прогон."""
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(exc) from exc
+        if options['users'] < 1 or options['duration'] <= 0:
+            raise CommandError(  # noqa: TRY003
+                '--users и --duration должны быть больше нуля'
+            )
+        external_url = options['url']
+        servers = [external_url] if external_url else options['server']
+        dataset = (
+            nullcontext()
+            if external_url
+            else use_dataset(options['size'], self.stdout)
+        )
+        bot_module = load_bot()
+        runs = {}
+        with (
+            dataset,
+            override_settings(SLOW_QUERY_LOG_ENABLED=False),
+            fake_telegram(
+                bot_module.bot, options['telegram_latency_ms'] / 1000
+            ) as telegram,
+        ):
+            for server in servers:
+                with self.server(server, external_url, options) as base_url:
+                    database = settings.DATABASES['default']['NAME']
+                    self.stdout.write(
+                        f'Сервер {server}: {base_url}, БД {database}'
+                    )
+                    load_run = LoadRun(
+                        base_url,
+                        telegram,
+                        bot_module,
+                        think_time=options['think_ms'] / 1000,
+                        seed=options['seed'],
+                    )
+                    elapsed = load_run.start(
+                        options['users'], options['duration'], mix
+                    )
+                report = load_run.stats.report(elapsed)
+                runs[server] = (report, elapsed)
+                self.stdout.write(
+                    format_report(report, elapsed, options['users'])
+                )
+        if len(runs) > 1:
+            self.stdout.write(format_comparison(runs))
+        if options['output']:
+            output = (
+                report
+                if len(runs) == 1
+                else {server: report for server, (report, _) in runs.items()}
+            )
+            options['output'].write_text(
+                json.dumps(output, indent=2, ensure_ascii=False) + '\n',
+                encoding='utf-8',
+            )
+
+    @staticmethod
+    def server(server: str, external_url: str | None, options: dict):
+        """Контекст сервера прогона, дающий его адрес."""
+        if external_url:
+            return nullcontext(external_url)
+        if server == 'local':
+            return local_server()
+        return gunicorn_server(server, options['workers'], options['threads'])
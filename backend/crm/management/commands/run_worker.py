@@ -0,0 +1,57 @@
+"""Воркер очереди фоновых задач (crm.jobs)."""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from crm.jobs import work, worker_name
+
+
+class Command(BaseCommand):
+    """Выполняет задачи из очереди Job, пока его не остановят."""
+
+    help = (
+        'Берёт задачи из очереди в БД и выполняет их по одной. SIGTERM и '
+        'SIGINT завершают воркер после текущей задачи.'
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        """Описывает аргументы команды."""
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='выйти, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='выйти после стольких задач (перезапуск воркера)',
+        )
+
+    def handle(self, *args, **options):
+        """Запускает цикл воркера до сигнала остановки."""
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        previous = {
+            signum: signal.signal(signum, stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        name = worker_name()
+        self.stdout.write(f'Воркер {name} запущен')
+        try:
+            processed = work(
+                worker=name,
+                burst=options['burst'],
+                max_jobs=options['max_jobs'],
+                should_stop=lambda: bool(stopping),
+            )
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(
+            self.style.SUCCESS(f'Воркер {name} остановлен, задач: {processed}')
+        )
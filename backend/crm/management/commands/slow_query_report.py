@@ -0,0 +1,120 @@
+"""Сводка по журналу медленных SQL-запросов (tech_support.slow_queries)."""
+
+import json
+from collections import Counter
+from operator import itemgetter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = {
+    'total': itemgetter('total_ms'),
+    'max': itemgetter('max_ms'),
+    'count': itemgetter('count'),
+}
+SQL_PREVIEW_LENGTH = 300
+
+
+def read_entries(paths):
+    """Читает записи JSON Lines, пропуская повреждённые строки."""
+    for path in paths:
+        with path.open(encoding='utf-8') as log_file:
+            for line in log_file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries) -> list[dict]:
+    """Группирует записи по отпечатку SQL и считает агрегаты."""
+    groups = {}
+    for entry in entries:
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': Counter(),
+                'call_site': entry['call_site'],
+                'sql': entry['sql'],
+                'explain': None,
+            }
+        duration = entry['duration_ms']
+        group['count'] += 1
+        group['total_ms'] += duration
+        if duration >= group['max_ms']:
+            group['max_ms'] = duration
+            group['call_site'] = entry['call_site']
+        if entry.get('view'):
+            group['views'][entry['view']] += 1
+        if entry.get('explain'):
+            group['explain'] = entry['explain']
+    return list(groups.values())
+
+
+class Command(BaseCommand):
+    """Печатает самые затратные медленные запросы из журнала."""
+
+    help = (
+        'Сводка по журналу медленных SQL: группировка по отпечатку '
+        'запроса, суммарное и максимальное время, view и место вызова.'
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        """Описывает аргументы команды."""
+        parser.add_argument(
+            '--file',
+            type=Path,
+            default=settings.SLOW_QUERY_LOG_FILE,
+            help='журнал; ротированные копии (.1, .2, ...) читаются тоже',
+        )
+        parser.add_argument(
+            '--top', type=int, default=10, help='сколько запросов вывести'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=tuple(SORT_KEYS),
+            default='total',
+            help='сортировка: суммарное время, максимум или количество',
+        )
+        parser.add_argument(
+            '--explain', action='store_true', help='выводить планы запросов'
+        )
+
+    def handle(self, *args, **options):
+        """Читает журнал и выводит сводку."""
+        log_file = options['file']
+        paths = sorted(log_file.parent.glob(f'{log_file.name}*'))
+        if not paths:
+            raise CommandError(f'Журнал {log_file} не найден')  # noqa: TRY003
+        groups = summarize(read_entries(paths))
+        groups.sort(key=SORT_KEYS[options['sort']], reverse=True)
+        self.stdout.write(
+            f'Медленных запросов: {sum(g["count"] for g in groups)}, '
+            f'уникальных: {len(groups)}'
+        )
+        for rank, group in enumerate(groups[: options['top']], start=1):
+            self.write_group(rank, group, with_explain=options['explain'])
+
+    def write_group(self, rank, group, with_explain):
+        """Выводит одну группу запросов."""
+        average = group['total_ms'] / group['count']
+        views = ', '.join(
+            f'{view} ×{count}' for view, count in group['views'].most_common(3)
+        )
+        self.stdout.write(
+            f'\n#{rank} [{group["fingerprint"]}] {group["count"]} раз, '
+            f'всего {group["total_ms"]:.0f} мс, '
+            f'среднее {average:.0f} мс, максимум {group["max_ms"]:.0f} мс'
+        )
+        self.stdout.write(f'  view: {views or "-"}')
+        for frame in group['call_site'] or ['-']:
+            self.stdout.write(f'  at {frame}')
+        self.stdout.write(f'  {group["sql"][:SQL_PREVIEW_LENGTH]}')
+        if with_explain and group['explain']:
+            for line in group['explain'].splitlines():
+                self.stdout.write(f'    {line}')
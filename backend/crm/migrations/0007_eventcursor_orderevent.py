@@ -0,0 +1,136 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_alter_order_advance_alter_order_detail_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCursor',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'consumer',
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name='Потребитель'
+                    ),
+                ),
+                (
+                    'last_event_id',
+                    models.PositiveBigIntegerField(
+                        default=0,
+                        verbose_name='Последнее подтверждённое событие',
+                    ),
+                ),
+                (
+                    'updated',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='Обновлён'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Курсор доставки',
+                'verbose_name_plural': 'Курсоры доставки',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('order_status', 'статус заказа'),
+                            ('purchase_status', 'статус покупки'),
+                        ],
+                        max_length=32,
+                        verbose_name='Вид события',
+                    ),
+                ),
+                (
+                    'order_number',
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name='Номер заказа'
+                    ),
+                ),
+                (
+                    'title',
+                    models.CharField(
+                        blank=True,
+                        default='',
+                        max_length=256,
+                        verbose_name='Заголовок',
+                    ),
+                ),
+                (
+                    'old_status',
+                    models.CharField(
+                        max_length=56, verbose_name='Прежний статус'
+                    ),
+                ),
+                (
+                    'new_status',
+                    models.CharField(
+                        max_length=56, verbose_name='Новый статус'
+                    ),
+                ),
+                (
+                    'create',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'order',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='events',
+                        to='crm.order',
+                        verbose_name='Заказ',
+                    ),
+                ),
+                (
+                    'purchase',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='events',
+                        to='crm.purchase',
+                        verbose_name='Покупка',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'ordering': ('id',),
+            },
+        ),
+    ]
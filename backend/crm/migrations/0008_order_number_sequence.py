@@ -0,0 +1,80 @@
+"""Нативная последовательность номеров заказов для PostgreSQL.
+
+Последовательность начинается после максимального из уже выданных
+номеров: наибольшего Order.number и счётчика django-sequences 'order'
+(номера удалённых заказов повторно не выдаются). На других СУБД
+счётчик django-sequences подтягивается до наибольшего номера.
+"""
+
+from django.db import migrations
+from django.db.models import Max
+
+SEQUENCE_NAME = 'crm_order_number_seq'
+COUNTER_NAME = 'order'
+
+
+def last_issued_number(apps, using):
+    """Наибольший номер, уже выданный заказу или счётчиком."""
+    order_model = apps.get_model('crm', 'Order')
+    sequence_model = apps.get_model('sequences', 'Sequence')
+    last_order = order_model.objects.using(using).aggregate(
+        last=Max('number')
+    )['last']
+    counter = (
+        sequence_model.objects.using(using)
+        .filter(name=COUNTER_NAME)
+        .values_list('last', flat=True)
+        .first()
+    )
+    return max(last_order or 0, counter or 0)
+
+
+def create_sequence(apps, schema_editor):
+    """Создаёт и засевает последовательность (или счётчик не на PG)."""
+    connection = schema_editor.connection
+    last = last_issued_number(apps, connection.alias)
+    if connection.vendor != 'postgresql':
+        if last:
+            apps.get_model('sequences', 'Sequence').objects.using(
+                connection.alias
+            ).update_or_create(name=COUNTER_NAME, defaults={'last': last})
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE_NAME} AS bigint '
+            'MINVALUE 1 OWNED BY crm_order.number'
+        )
+        cursor.execute(
+            'SELECT setval(%s, %s, false)', [SEQUENCE_NAME, last + 1]
+        )
+
+
+def drop_sequence(apps, schema_editor):
+    """Возвращает выданные номера счётчику и удаляет последовательность."""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 '
+            f'END FROM {SEQUENCE_NAME}'
+        )
+        issued = cursor.fetchone()[0]
+        last = max(issued, last_issued_number(apps, connection.alias))
+        if last:
+            apps.get_model('sequences', 'Sequence').objects.using(
+                connection.alias
+            ).update_or_create(name=COUNTER_NAME, defaults={'last': last})
+        cursor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0007_eventcursor_orderevent'),
+        ('sequences', '0002_alter_sequence_last'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -0,0 +1,78 @@
+"""Справочник магазинов покупок и индекс Purchase.store.
+
+Справочник заполняется по существующим покупкам: магазин и число его
+покупок.
+"""
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_stores(apps, schema_editor):
+    """Создаёт магазины со счётчиками по существующим покупкам."""
+    using = schema_editor.connection.alias
+    purchase_model = apps.get_model('crm', 'Purchase')
+    store_model = apps.get_model('crm', 'Store')
+    counts = (
+        purchase_model.objects.using(using)
+        .order_by()
+        .values_list('store')
+        .annotate(total=Count('id'))
+    )
+    store_model.objects.using(using).bulk_create(
+        [store_model(name=name, purchases_count=total) for name, total in counts],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_order_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Store',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'name',
+                    models.CharField(
+                        max_length=256,
+                        unique=True,
+                        verbose_name='Наименование магазина',
+                    ),
+                ),
+                (
+                    'purchases_count',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Покупок'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Магазин',
+                'verbose_name_plural': 'Магазины',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.AlterField(
+            model_name='purchase',
+            name='store',
+            field=models.CharField(
+                db_index=True,
+                max_length=256,
+                verbose_name='Наименование магазина',
+            ),
+        ),
+        migrations.RunPython(fill_stores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+"""Индексы под выборки заказов и покупок.
+
+Составные индексы (status, -id) и (client, -id) заменяют одиночные
+индексы status и client_id и создаются раньше их удаления. На
+PostgreSQL для Order.create добавляется ещё BRIN-индекс.
+"""
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BRIN_INDEX = 'crm_order_create_brin'
+
+
+def create_brin_index(apps, schema_editor):
+    """BRIN по дате создания заказа (только PostgreSQL)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {BRIN_INDEX} '
+        'ON crm_order USING brin ("create")'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    """Удаляет BRIN-индекс."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {BRIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_store'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(
+                fields=['status', '-id'], name='crm_order_status_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(
+                fields=['client', '-id'], name='crm_order_client_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['create'], name='crm_order_create_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(
+                fields=['create'], name='crm_purchase_create_idx'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='client',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='orders',
+                to='crm.client',
+                verbose_name='Клиент',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('in_working', 'в работе'),
+                    ('under_approval', 'на согласовании'),
+                    ('waiting_part', 'ожидает запчасть'),
+                    ('in_service', 'находится в сервисном'),
+                    ('ready_pickup', 'готово к выдаче'),
+                    ('completed', 'выполнено'),
+                    ('not_relevant', 'не актуально'),
+                ],
+                default='in_working',
+                max_length=56,
+                verbose_name='Статус заказа',
+            ),
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
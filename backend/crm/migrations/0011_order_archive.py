@@ -0,0 +1,265 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:36
+
+import crm.models
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0010_order_purchase_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='archived_duty',
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal('0.00'),
+                editable=False,
+                help_text='Переносится командой archive_orders',
+                max_digits=20,
+                verbose_name='Баланс архивных заказов, ₽',
+            ),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                (
+                    'id',
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'number',
+                    models.PositiveIntegerField(
+                        unique=True, verbose_name='Номер заказа'
+                    ),
+                ),
+                ('create', models.DateTimeField(verbose_name='Дата создания')),
+                (
+                    'accepted_equipment',
+                    models.CharField(
+                        max_length=256, verbose_name='Принятое оборудование'
+                    ),
+                ),
+                (
+                    'detail',
+                    models.CharField(
+                        max_length=512, verbose_name='Описание неисправности'
+                    ),
+                ),
+                (
+                    'services_total_override',
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=10,
+                        null=True,
+                        verbose_name='Услуги, ₽',
+                    ),
+                ),
+                (
+                    'advance',
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal('0.00'),
+                        max_digits=10,
+                        verbose_name='Аванс, ₽',
+                    ),
+                ),
+                (
+                    'paid',
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal('0.00'),
+                        max_digits=10,
+                        verbose_name='Оплачено, ₽',
+                    ),
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('in_working', 'в работе'),
+                            ('under_approval', 'на согласовании'),
+                            ('waiting_part', 'ожидает запчасть'),
+                            ('in_service', 'находится в сервисном'),
+                            ('ready_pickup', 'готово к выдаче'),
+                            ('completed', 'выполнено'),
+                            ('not_relevant', 'не актуально'),
+                        ],
+                        max_length=56,
+                        verbose_name='Статус заказа',
+                    ),
+                ),
+                (
+                    'archived',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата архивации'
+                    ),
+                ),
+                (
+                    'client',
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='archived_orders',
+                        to='crm.client',
+                        verbose_name='Клиент',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архив заказов',
+                'ordering': ('-id',),
+            },
+            bases=(crm.models.OrderFinancialsMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='ArchivedServiceLine',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'amount',
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=10,
+                        null=True,
+                        verbose_name='Стоимость услуги в заказе',
+                    ),
+                ),
+                (
+                    'order',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='service_lines',
+                        to='crm.archivedorder',
+                        verbose_name='Заказ',
+                    ),
+                ),
+                (
+                    'service',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name='archived_order_lines',
+                        to='crm.service',
+                        verbose_name='Услуга',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Услуга в архивном заказе',
+                'verbose_name_plural': 'Услуги в архивных заказах',
+                'ordering': ('order', 'service'),
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='services',
+            field=models.ManyToManyField(
+                blank=True,
+                related_name='archived_orders',
+                through='crm.ArchivedServiceLine',
+                to='crm.service',
+                verbose_name='Услуги',
+            ),
+        ),
+        migrations.CreateModel(
+            name='ArchivedPurchase',
+            fields=[
+                (
+                    'id',
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('create', models.DateTimeField(verbose_name='Дата создания')),
+                (
+                    'store',
+                    models.CharField(
+                        max_length=256, verbose_name='Наименование магазина'
+                    ),
+                ),
+                (
+                    'detail',
+                    models.CharField(
+                        max_length=256, verbose_name='Детали покупки'
+                    ),
+                ),
+                (
+                    'cost',
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal('0.00'),
+                        max_digits=10,
+                        verbose_name='Стоимость покупки',
+                    ),
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('delivery_expected', 'ожидается поставка'),
+                            ('received', 'получено'),
+                            ('installed', 'установлено'),
+                        ],
+                        max_length=56,
+                        verbose_name='Статус покупки',
+                    ),
+                ),
+                (
+                    'order',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='purchases',
+                        to='crm.archivedorder',
+                        verbose_name='Номер заказа',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Архивная покупка',
+                'verbose_name_plural': 'Архив покупок',
+                'ordering': ('-id',),
+                'indexes': [
+                    models.Index(
+                        fields=['create'], name='crm_archpurchase_create_idx'
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivedserviceline',
+            constraint=models.UniqueConstraint(
+                fields=('order', 'service'),
+                name='uniq_service_per_archived_order',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(
+                fields=['client', '-id'], name='crm_archorder_client_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(
+                fields=['create'], name='crm_archorder_create_idx'
+            ),
+        ),
+    ]
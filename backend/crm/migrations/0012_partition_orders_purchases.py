@@ -0,0 +1,42 @@
+"""Секционирование заказов и покупок по году создания (PostgreSQL).
+
+Выполняется только на PostgreSQL при POSTGRES_PARTITIONING=True:
+таблицы преобразуются пачками (crm.partitioning.convert_table), каждая
+пачка в своей транзакции, поэтому миграция не атомарна. На SQLite и без
+настройки ничего не делает; включить секционирование позже можно
+командой partition_tables --convert. Обратное преобразование не
+выполняется.
+"""
+
+from django.conf import settings
+from django.db import migrations
+
+from crm.partitioning import (
+    PARTITIONED_TABLES,
+    convert_table,
+    partitioning_supported,
+)
+
+
+def partition_tables(apps, schema_editor):
+    """Секционирует crm_order и crm_purchase, если это включено."""
+    connection = schema_editor.connection
+    if not (
+        settings.POSTGRES_PARTITIONING and partitioning_supported(connection)
+    ):
+        return
+    for table in PARTITIONED_TABLES:
+        convert_table(connection, table, settings.PARTITION_COPY_BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('crm', '0011_order_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,161 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0012_partition_orders_purchases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'name',
+                    models.CharField(max_length=64, verbose_name='Задача'),
+                ),
+                (
+                    'payload',
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name='Параметры'
+                    ),
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('queued', 'в очереди'),
+                            ('running', 'выполняется'),
+                            ('done', 'выполнена'),
+                            ('failed', 'ошибка'),
+                        ],
+                        default='queued',
+                        max_length=16,
+                        verbose_name='Состояние',
+                    ),
+                ),
+                (
+                    'priority',
+                    models.SmallIntegerField(
+                        default=0, verbose_name='Приоритет'
+                    ),
+                ),
+                (
+                    'dedup_key',
+                    models.CharField(
+                        blank=True,
+                        default='',
+                        max_length=128,
+                        verbose_name='Ключ дедупликации',
+                    ),
+                ),
+                (
+                    'attempts',
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name='Попыток'
+                    ),
+                ),
+                (
+                    'max_attempts',
+                    models.PositiveSmallIntegerField(
+                        default=1, verbose_name='Попыток не больше'
+                    ),
+                ),
+                (
+                    'run_after',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name='Не раньше',
+                    ),
+                ),
+                (
+                    'locked_by',
+                    models.CharField(
+                        blank=True,
+                        default='',
+                        max_length=128,
+                        verbose_name='Воркер',
+                    ),
+                ),
+                (
+                    'locked_at',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='Взята воркером'
+                    ),
+                ),
+                (
+                    'progress_done',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Выполнено'
+                    ),
+                ),
+                (
+                    'progress_total',
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name='Всего'
+                    ),
+                ),
+                (
+                    'result',
+                    models.JSONField(
+                        blank=True, null=True, verbose_name='Результат'
+                    ),
+                ),
+                (
+                    'error',
+                    models.TextField(
+                        blank=True, default='', verbose_name='Ошибка'
+                    ),
+                ),
+                (
+                    'create',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'finished',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='Завершена'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ('-id',),
+                'indexes': [
+                    models.Index(
+                        models.OrderBy(models.F('priority'), descending=True),
+                        models.F('run_after'),
+                        models.F('id'),
+                        condition=models.Q(('status', 'queued')),
+                        name='crm_job_queue_idx',
+                    )
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        condition=models.Q(
+                            ('status__in', ('queued', 'running')),
+                            models.Q(('dedup_key', ''), _negated=True),
+                        ),
+                        fields=('dedup_key',),
+                        name='crm_job_active_dedup_key',
+                    )
+                ],
+            },
+        ),
+    ]
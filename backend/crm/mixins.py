@@ -1,6 +1,14 @@
 """Миксины для приложения CRM-системы."""
 
+from django.contrib import messages
+from django.db import transaction
+from django.db.models.deletion import ProtectedError
+from django.shortcuts import redirect
+
+from .deletion import BatchDeleter
+from .jobs import enqueue
 from .labels import GENITIVE_LABELS
+from .tasks import DELETE_OBJECTS, deletion_dedup_key
 
 
 class NameContextMixin:
@@ -19,3 +27,42 @@ class NameContextMixin:
             label = GENITIVE_LABELS.get(model, meta.verbose_name)
             context.setdefault('name', label)
         return context
+
+
+class BatchDeleteMixin:
+    """Удаление объекта DeleteView пачками (crm.deletion).
+
+    Дерево не больше одной пачки удаляется сразу, одной транзакцией: если
+    пачка упадёт на середине, не останется полуудалённого дерева. Большее
+    дерево удаляет задача воркера: ответ приходит сразу, ход удаления
+    виден на странице задачи.
+    Защищённые ссылки (PROTECT) проверяются до удаления: как при
+    ProtectedError у QuerySet.delete(), ничего не удаляется, выводится
+    protected_message и выполняется переход на success_url.
+    """
+
+    protected_message = 'Нельзя удалить: объект используется в других записях.'
+    background_message = 'Удаление выполняется в фоне.'
+
+    def form_valid(self, form):
+        """Удаляет объект сразу или ставит удаление в очередь."""
+        success_url = self.get_success_url()
+        deleter = BatchDeleter()
+        queryset = self.model._base_manager.filter(pk=self.object.pk)
+        try:
+            if deleter.prepare(queryset) > deleter.batch_size:
+                job = enqueue(
+                    DELETE_OBJECTS,
+                    {
+                        'model': self.model._meta.label_lower,
+                        'pk': self.object.pk,
+                    },
+                    dedup_key=deletion_dedup_key(self.object),
+                )
+                messages.info(self.request, self.background_message)
+                return redirect('job_detail', pk=job.pk)
+            with transaction.atomic():
+                deleter.delete_rows(queryset)
+        except ProtectedError:
+            messages.error(self.request, self.protected_message)
+        return redirect(success_url)
@@ -1,13 +1,33 @@
 """Модели для приложения CRM-системы."""
 
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
 from decimal import Decimal
+from functools import partial
+from typing import NamedTuple
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Q, Sum
-from django.db.models.signals import m2m_changed
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    DEFERRED,
+    Count,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed, post_delete
 from django.dispatch import receiver
-from sequences import get_next_value
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 from .constants import (
     MAX_LENGTH_ADDRESS,
@@ -15,6 +35,13 @@ from .constants import (
     MAX_LENGTH_COMPONENT_DETAIL,
     MAX_LENGTH_COMPONENT_FIELD,
     MAX_LENGTH_ENTITY_TYPE,
+    MAX_LENGTH_EVENT_CONSUMER,
+    MAX_LENGTH_EVENT_KIND,
+    MAX_LENGTH_EVENT_TITLE,
+    MAX_LENGTH_JOB_DEDUP_KEY,
+    MAX_LENGTH_JOB_NAME,
+    MAX_LENGTH_JOB_STATUS,
+    MAX_LENGTH_JOB_WORKER,
     MAX_LENGTH_MOBILE_PHONE,
     MAX_LENGTH_NAME_CLIENT,
     MAX_LENGTH_NAME_SHOP,
@@ -26,12 +53,22 @@ from .constants import (
     MAX_LENGTH_PURCHASE_STATUS,
     MONEY_DECIMAL_PLACES,
     MONEY_MAX_DIGITS,
+    MONEY_TOTAL_MAX_DIGITS,
+    ORDER_CODE_MAX_DIGITS,
     ORDER_CODE_PAD,
     ORDER_CODE_PREFIX,
-    ORDER_SEQUENCE_NAME,
+    STORES_CACHE_KEY,
+    STORES_CACHE_TIMEOUT,
 )
+from .order_numbers import next_order_number
 from .validators import phone_validator, validate_company_for_legal
 
+logger = logging.getLogger('crm.events')
+
+ZERO = Decimal('0.00')
+# Изменения счётчиков магазинов внутри StoreManager.deferred_usage().
+deferred_store_usage = ContextVar('deferred_store_usage', default=None)
+
 
 class EntityType(models.TextChoices):
     """Выбор вида клиента."""
@@ -71,6 +108,14 @@ class Client(models.Model):
         blank=True,
         default='',
     )
+    archived_duty = models.DecimalField(
+        verbose_name='Баланс архивных заказов, ₽',
+        max_digits=MONEY_TOTAL_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text='Переносится командой archive_orders',
+    )
 
     class Meta:
         """Мета-класс для работы с клиентами."""
@@ -108,33 +153,293 @@ class Client(models.Model):
         Сумма > 0 — клиент должен нам,
         Сумма < 0 — мы должны клиенту (переплата),
         Сумма = 0 — нет долга и переплаты.
+
+        Архивные заказы не меняются, их баланс хранится в archived_duty,
+        поэтому считаются только рабочие заказы.
         """
-        return self.orders.total_duty()
+        return self.orders.total_duty() + self.archived_duty
+
+
+class OrderEventKind(models.TextChoices):
+    """Вид события в outbox."""
+
+    ORDER_STATUS = 'order_status', 'статус заказа'
+    PURCHASE_STATUS = 'purchase_status', 'статус покупки'
+
+
+class StatusEventMixin:
+    """Пишет событие в outbox OrderEvent при смене поля status.
+
+    Статус, загруженный из БД, запоминается в from_db(); при сохранении
+    с другим статусом событие создаётся в той же транзакции, что и само
+    изменение (transactional outbox): либо сохраняются оба, либо ничего.
+    Создание объекта и массовый QuerySet.update() события не порождают.
+    """
+
+    event_kind = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает исходный статус загруженного объекта."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет объект и при смене статуса добавляет событие."""
+        with transaction.atomic(using=kwargs.get('using')):
+            result = super().save(*args, **kwargs)
+            previous = getattr(self, '_loaded_status', None)
+            if previous is not None and previous != self.status:
+                event = OrderEvent.objects.create(
+                    kind=self.event_kind,
+                    old_status=previous,
+                    new_status=self.status,
+                    **self.get_event_fields(),
+                )
+                transaction.on_commit(
+                    partial(check_event_commit_lag, event),
+                    using=kwargs.get('using'),
+                )
+            self._loaded_status = self.status
+        return result
+
+    def get_event_fields(self) -> dict:
+        """Денормализованные поля события (переопределяется в моделях)."""
+        raise NotImplementedError
+
+
+def check_event_commit_lag(event):
+    """Предупреждает, если событие закоммичено позже задержки видимости.
+
+    API событий выдаёт только события старше EVENTS_VISIBILITY_DELAY: если
+    транзакция держала событие дольше, потребитель мог уже подтвердить
+    события с большими id, и это событие останется за его курсором.
+    """
+    delay = settings.EVENTS_VISIBILITY_DELAY
+    lag = (timezone.now() - event.create).total_seconds()
+    if delay and lag > delay:
+        logger.warning(
+            'Событие #%s закоммичено через %.1f с после записи, '
+            'дольше EVENTS_VISIBILITY_DELAY=%s с: потребители могли '
+            'его пропустить',
+            event.pk,
+            lag,
+            delay,
+        )
+
+
+def money_total_field():
+    """Поле результата денежных сумм по многим строкам."""
+    return models.DecimalField(
+        max_digits=MONEY_TOTAL_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+    )
+
+
+def order_lines_sum(model, field: str):
+    """Подзапрос суммы field строк model заказа (0, если строк нет).
+
+    Подзапросы вместо JOIN не раздувают суммы при нескольких видах строк.
+    """
+    lines = (
+        model.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(total=Sum(field))
+        .values('total')
+    )
+    return Coalesce(
+        Subquery(lines), Value(ZERO), output_field=money_total_field()
+    )
+
+
+class OrderFinancials(NamedTuple):
+    """Финансовая сводка заказа.
+
+    Суммы строк услуг и покупок считаются один раз на экземпляр заказа
+    (Order.financials), производные значения — из них и полей заказа.
+    """
+
+    services_base_total: Decimal
+    purchases_total: Decimal
+    services_total_override: Decimal | None
+    advance: Decimal
+    paid: Decimal
+
+    @property
+    def services_total(self) -> Decimal:
+        """Стоимость услуг: ручная или по снимкам цен."""
+        if self.services_total_override is not None:
+            return self.services_total_override
+        return self.services_base_total
+
+    @property
+    def total_amount(self) -> Decimal:
+        """Итого для клиента: услуги + покупки."""
+        return self.services_total + self.purchases_total
+
+    @property
+    def duty(self) -> Decimal:
+        """Долг клиента (> 0) или переплата (< 0)."""
+        return self.total_amount - self.advance - self.paid
+
+
+class OrderLineMixin:
+    """Строка заказа (услуга, покупка): сбрасывает суммы своего заказа.
+
+    Если заказ загружен вместе со строкой (line.order или
+    order.purchases.create()), после save() и delete() строки его
+    Order.financials пересчитывается при следующем обращении.
+    """
+
+    def reset_order_financials(self):
+        """Сбрасывает кэш сумм заказа, уже загруженного в строку."""
+        order = self._state.fields_cache.get('order')
+        if order is not None:
+            order.reset_financials()
+
+    def save(self, *args, **kwargs):
+        """Сохраняет строку и сбрасывает суммы заказа."""
+        result = super().save(*args, **kwargs)
+        self.reset_order_financials()
+        return result
+
+    def delete(self, *args, **kwargs):
+        """Удаляет строку и сбрасывает суммы заказа."""
+        result = super().delete(*args, **kwargs)
+        self.reset_order_financials()
+        return result
 
 
 class OrderQuerySet(models.QuerySet):
     """Дополнительные агрегаты для заказов."""
 
-    def total_duty(self) -> Decimal:
-        """Общий баланс по заказам (услуги + покупки) без раздувания сумм."""
-        qs = self.prefetch_related('service_lines', 'purchases')
-        total = Decimal('0.00')
-        for order in qs:
-            services_sum = sum(
-                (line.amount or Decimal('0.00'))
-                for line in order.service_lines.all()
-            )
-            purchases_sum = sum(
-                (p.cost or Decimal('0.00')) for p in order.purchases.all()
-            )
-            if order.services_total_override is not None:
-                services_total = order.services_total_override
-            else:
-                services_total = services_sum
-            total += (
-                services_total + purchases_sum - order.advance - order.paid
+    def with_financials(self):
+        """Аннотирует суммы строк услуг и покупок для Order.financials."""
+        services, purchases = self.model.line_models()
+        return self.annotate(
+            services_sum=order_lines_sum(services, 'amount'),
+            purchases_sum=order_lines_sum(purchases, 'cost'),
+        )
+
+    def total_duty(self, extra=None) -> Decimal:
+        """Общий баланс по заказам (услуги + покупки) одним запросом.
+
+        extra — денежное выражение (например, подзапрос), прибавляемое к
+        сумме в том же запросе.
+        """
+        duty = (
+            Coalesce('services_total_override', 'services_sum')
+            + F('purchases_sum')
+            - F('advance')
+            - F('paid')
+        )
+        total = Sum(duty, output_field=money_total_field())
+        if extra is not None:
+            total = Coalesce(
+                total, Value(ZERO), output_field=money_total_field()
+            ) + Coalesce(extra, Value(ZERO), output_field=money_total_field())
+        total = self.with_financials().aggregate(total=total)['total']
+        return total or ZERO
+
+
+class OrderFinancialsMixin:
+    """Код и финансовая сводка заказа (рабочего и архивного).
+
+    Модель задаёт line_models() — модели строк услуг и покупок, по
+    которым OrderQuerySet.with_financials() считает суммы.
+    """
+
+    is_archived = False
+
+    @classmethod
+    def line_models(cls) -> tuple:
+        """Модели строк услуг (поле amount) и покупок (поле cost)."""
+        raise NotImplementedError
+
+    @staticmethod
+    def format_code(number: int) -> str:
+        """Форматирует номер заказа в код вида TN-00123."""
+        return f'{ORDER_CODE_PREFIX}-{number:0{ORDER_CODE_PAD}d}'
+
+    @property
+    def code(self) -> str:
+        """Генерирует красивый код заказа для отображения."""
+        return self.format_code(self.number)
+
+    @cached_property
+    def _line_totals(self) -> tuple[Decimal, Decimal]:
+        """Суммы строк услуг и покупок, один раз на экземпляр.
+
+        Берутся из аннотаций with_financials(), из предзагруженных
+        service_lines и purchases или одним запросом к БД.
+        """
+        if hasattr(self, 'services_sum') and hasattr(self, 'purchases_sum'):
+            return self.services_sum, self.purchases_sum
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'service_lines' in prefetched and 'purchases' in prefetched:
+            return (
+                sum(
+                    (line.amount or ZERO for line in self.service_lines.all()),
+                    ZERO,
+                ),
+                sum((p.cost or ZERO for p in self.purchases.all()), ZERO),
             )
-        return total
+        if self.pk is None:
+            return ZERO, ZERO
+        return (
+            type(self)
+            ._default_manager.with_financials()
+            .filter(pk=self.pk)
+            .values_list('services_sum', 'purchases_sum')
+            .get()
+        )
+
+    @property
+    def financials(self) -> OrderFinancials:
+        """Финансовая сводка заказа (суммы строк кэшируются)."""
+        return OrderFinancials(
+            *self._line_totals,
+            services_total_override=self.services_total_override,
+            advance=self.advance,
+            paid=self.paid,
+        )
+
+    def reset_financials(self):
+        """Сбрасывает кэш сумм после изменения строк услуг или покупок."""
+        for name in ('_line_totals', 'services_sum', 'purchases_sum'):
+            self.__dict__.pop(name, None)
+
+    def refresh_from_db(self, *args, **kwargs):
+        """Перечитывает заказ вместе с суммами строк."""
+        self.reset_financials()
+        return super().refresh_from_db(*args, **kwargs)
+
+    @property
+    def services_base_total(self) -> Decimal:
+        """Автоматическая сумма услуг по снимкам (история цен)."""
+        return self.financials.services_base_total
+
+    @property
+    def services_total(self) -> Decimal:
+        """Стоимость услуг для расчётов/показа: ручная или автоматическая."""
+        return self.financials.services_total
+
+    @property
+    def purchases_total(self) -> Decimal:
+        """Общая стоимость покупок."""
+        return self.financials.purchases_total
+
+    @property
+    def total_amount(self) -> Decimal:
+        """Итого для клиента: услуги (с учётом override) + покупки."""
+        return self.financials.total_amount
+
+    @property
+    def duty(self) -> Decimal:
+        """Высчитвает долг клиента, либо переплату."""
+        return self.financials.duty
 
 
 class OrderStatus(models.TextChoices):
@@ -149,9 +454,24 @@ class OrderStatus(models.TextChoices):
     NOT_RELEVANT = 'not_relevant', 'не актуально'
 
 
-class Order(models.Model):
+# Статусы, с которыми заказ считается закрытым.
+CLOSED_ORDER_STATUSES = (OrderStatus.COMPLETED, OrderStatus.NOT_RELEVANT)
+ORDER_CODE_RE = re.compile(
+    rf'^(?:{ORDER_CODE_PREFIX}\s*-?\s*)?(\d{{1,{ORDER_CODE_MAX_DIGITS}}})$',
+    re.IGNORECASE,
+)
+# Код с обязательным префиксом (TN-001): поиск по началу кода.
+ORDER_CODE_PREFIX_RE = re.compile(
+    rf'^{ORDER_CODE_PREFIX}\s*-?\s*(\d{{1,{ORDER_CODE_MAX_DIGITS}}})$',
+    re.IGNORECASE,
+)
+
+
+class Order(StatusEventMixin, OrderFinancialsMixin, models.Model):
     """Модель заказа."""
 
+    event_kind = OrderEventKind.ORDER_STATUS
+
     number = models.PositiveIntegerField(
         verbose_name='Номер заказа', unique=True, editable=False
     )
@@ -160,6 +480,7 @@ class Order(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Клиент',
         related_name='orders',
+        db_index=False,  # покрыт индексом (client, -id)
     )
     create = models.DateTimeField(
         verbose_name='Дата создания', auto_now_add=True
@@ -207,16 +528,30 @@ class Order(models.Model):
         choices=OrderStatus.choices,
         default=OrderStatus.IN_WORKING,
         max_length=MAX_LENGTH_ORDER_STATUS,
-        db_index=True,
     )
     objects = OrderQuerySet.as_manager()
 
     class Meta:
-        """Мета-класс для работы с заказами."""
+        """Мета-класс для работы с заказами.
+
+        Индексы повторяют основные выборки: списки по статусу и заказы
+        клиента (новые сначала), диапазоны дат создания. На PostgreSQL
+        для create есть ещё BRIN (миграция 0010): заказы создаются по
+        возрастанию даты, и он в сотни раз компактнее B-tree.
+        """
 
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ('-id',)
+        indexes = (
+            models.Index(
+                fields=('status', '-id'), name='crm_order_status_id_idx'
+            ),
+            models.Index(
+                fields=('client', '-id'), name='crm_order_client_id_idx'
+            ),
+            models.Index(fields=('create',), name='crm_order_create_idx'),
+        )
         constraints = (
             models.CheckConstraint(
                 name='order_accepted_equipment_not_empty',
@@ -235,45 +570,95 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         """Сохранение заказа с автоматической генерацией номера."""
         if self._state.adding and not self.number:
-            self.number = get_next_value(ORDER_SEQUENCE_NAME)
+            self.number = next_order_number(kwargs.get('using'))
         return super().save(*args, **kwargs)
 
-    @property
-    def code(self) -> str:
-        """Генерирует красивый код заказа для отображения."""
-        return f'{ORDER_CODE_PREFIX}-{self.number:0{ORDER_CODE_PAD}d}'
+    @classmethod
+    def line_models(cls) -> tuple:
+        """Строки услуг и покупки рабочих заказов."""
+        return ServiceInOrder, Purchase
 
-    @property
-    def services_base_total(self) -> Decimal:
-        """Автоматическая сумма услуг по снимкам (история цен)."""
-        return self.service_lines.aggregate(total=Sum('amount'))[
-            'total'
-        ] or Decimal('0.00')
+    def set_services(self, services):
+        """Заменяет услуги заказа, фиксируя цену новых строк.
 
-    @property
-    def services_total(self) -> Decimal:
-        """Стоимость услуг для расчётов/показа: ручная или автоматическая."""
-        return (
-            self.services_total_override
-            if self.services_total_override is not None
-            else self.services_base_total
+        Строки оставшихся услуг не меняются (цена на момент добавления
+        сохраняется), лишние удаляются одним DELETE, новые создаются
+        одним bulk_create — без bulk_update, как при services.set(). Цена
+        новых строк читается из БД одним запросом, а не берётся из
+        переданных объектов (они могут быть из кеша каталога). Услуги,
+        удалённые после проверки формы, пропускаются.
+        """
+        pks = {service.pk for service in services}
+        current = set(
+            self.service_lines.order_by().values_list('service_id', flat=True)
         )
-
-    @property
-    def purchases_total(self) -> Decimal:
-        """Общая стоимость покупок."""
-        agg = self.purchases.aggregate(total=Sum('cost'))
-        return agg['total'] or Decimal('0.00')
-
-    @property
-    def total_amount(self) -> Decimal:
-        """Итого для клиента: услуги (с учётом override) + покупки."""
-        return self.services_total + self.purchases_total
-
-    @property
-    def duty(self) -> Decimal:
-        """Высчитвает долг клиента, либо переплату."""
-        return self.total_amount - self.advance - self.paid
+        removed = current - pks
+        if removed:
+            self.service_lines.filter(service_id__in=removed).delete()
+        added = pks - current
+        prices = (
+            Service.objects.filter(pk__in=added).values_list('pk', 'amount')
+            if added
+            else ()
+        )
+        ServiceInOrder.objects.bulk_create(
+            ServiceInOrder(order=self, service_id=pk, amount=amount)
+            for pk, amount in prices
+        )
+        getattr(self, '_prefetched_objects_cache', {}).pop(
+            'service_lines', None
+        )
+        self.reset_financials()
+
+    @staticmethod
+    def parse_code(value: str) -> int | None:
+        """Номер заказа из кода (TN-00123, tn123) или числа; иначе None."""
+        match = ORDER_CODE_RE.match(value.strip())
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def code_number_ranges(digits: str) -> list[tuple[int, int]]:
+        """Диапазоны number, коды которых начинаются с TN-<digits>.
+
+        Код дополняется нулями до ORDER_CODE_PAD цифр, длиннее — без
+        нулей, поэтому на каждую длину кода приходится один сплошной
+        диапазон: 'TN-001' → 100..199, 'TN-12' → 12000..12999,
+        120000..129999 и т.д. Границы включительные.
+        """
+        prefix = int(digits)
+        ranges = []
+        for length in range(
+            max(len(digits), ORDER_CODE_PAD), ORDER_CODE_MAX_DIGITS + 1
+        ):
+            if length > ORDER_CODE_PAD and digits.startswith('0'):
+                break
+            scale = 10 ** (length - len(digits))
+            ranges.append((prefix * scale, (prefix + 1) * scale - 1))
+        return ranges
+
+    @classmethod
+    def code_search(cls, value: str, field: str = 'number') -> Q | None:
+        """Фильтр по коду заказа с префиксом (TN-00123, tn-001) или None.
+
+        Точный номер и диапазоны по началу кода — условия на уникальный
+        индекс number (field — путь к нему, например 'order__number').
+        """
+        match = ORDER_CODE_PREFIX_RE.match(value.strip())
+        if match is None:
+            return None
+        digits = match.group(1)
+        q = Q(**{field: int(digits)})
+        for low, high in cls.code_number_ranges(digits):
+            q |= Q(**{f'{field}__range': (low, high)})
+        return q
+
+    def get_event_fields(self) -> dict:
+        """Поля события о смене статуса заказа."""
+        return {
+            'order': self,
+            'order_number': self.number,
+            'title': self.accepted_equipment[:MAX_LENGTH_EVENT_TITLE],
+        }
 
 
 class Category(models.Model):
@@ -329,7 +714,7 @@ class Service(models.Model):
         return self.service_name
 
 
-class ServiceInOrder(models.Model):
+class ServiceInOrder(OrderLineMixin, models.Model):
     """Связующая модель 'Услуга в заказе`.
 
     Реализует связь "многие-ко-многим" между заказами и услугами с
@@ -392,20 +777,29 @@ class ServiceInOrder(models.Model):
 def snapshot_service_amount(
     sender, instance, action, pk_set, reverse, **kwargs
 ):
-    """После добавления услуг в заказ — зафиксировать цену в ServiceInOrder."""
+    """После добавления услуг в заказ — зафиксировать цену в ServiceInOrder.
+
+    Нужен для services.add()/set() (админка, shell); форма заказа создаёт
+    строки сразу с ценой через Order.set_services(). Цена копируется
+    одним UPDATE с подзапросом к услуге.
+    """
     if reverse:
         return
+    if action in {'post_add', 'post_remove', 'post_clear'}:
+        instance.reset_financials()
     if action != 'post_add' or not pk_set:
         return
-    lines = ServiceInOrder.objects.filter(
+    ServiceInOrder.objects.filter(
         order=instance,
         service_id__in=pk_set,
         amount__isnull=True,
-    ).select_related('service')
-    for line in lines:
-        line.amount = line.service.amount
-    if lines:
-        ServiceInOrder.objects.bulk_update(lines, ['amount'])
+    ).update(
+        amount=Subquery(
+            Service.objects.filter(pk=OuterRef('service_id')).values('amount')[
+                :1
+            ]
+        )
+    )
 
 
 class PurchaseStatus(models.TextChoices):
@@ -416,9 +810,166 @@ class PurchaseStatus(models.TextChoices):
     INSTALLED = 'installed', 'установлено'
 
 
-class Purchase(models.Model):
+class StoreManager(models.Manager):
+    """Счётчики использования магазинов и список для фильтра."""
+
+    def count_usage(self, name: str, delta: int):
+        """Меняет счётчик покупок магазина name на delta.
+
+        Магазин создаётся при первой покупке; счётчик не уходит ниже
+        нуля. Кеш списка для фильтра сбрасывается после коммита.
+        """
+        deferred = deferred_store_usage.get()
+        if deferred is not None:
+            deferred[name] += delta
+            return
+        updated = self.filter(name=name).update(
+            purchases_count=Greatest(F('purchases_count') + delta, 0)
+        )
+        if not updated and delta > 0:
+            try:
+                with transaction.atomic():
+                    self.create(name=name, purchases_count=delta)
+            except IntegrityError:
+                # Магазин параллельно создала другая покупка.
+                self.filter(name=name).update(
+                    purchases_count=F('purchases_count') + delta
+                )
+        transaction.on_commit(lambda: cache.delete(STORES_CACHE_KEY))
+
+    @contextmanager
+    def deferred_usage(self):
+        """Копит изменения счётчиков и применяет их при выходе из блока.
+
+        Для массовых операций с покупками: один UPDATE на магазин вместо
+        UPDATE на каждую покупку. При исключении изменения не применяются.
+        """
+        deltas = Counter()
+        token = deferred_store_usage.set(deltas)
+        try:
+            yield
+        finally:
+            deferred_store_usage.reset(token)
+        for name, delta in deltas.items():
+            if delta:
+                self.count_usage(name, delta)
+
+    def rebuild(self):
+        """Пересчитывает счётчики по покупкам (после массовых операций).
+
+        bulk_create и QuerySet.update() покупок счётчики не меняют.
+        """
+        counts = dict(
+            Purchase.objects.order_by()
+            .values_list('store')
+            .annotate(total=Count('id'))
+        )
+        self.exclude(name__in=counts).update(purchases_count=0)
+        self.bulk_create(
+            [
+                Store(name=name, purchases_count=total)
+                for name, total in counts.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['purchases_count'],
+        )
+        transaction.on_commit(lambda: cache.delete(STORES_CACHE_KEY))
+
+    def filter_names(self) -> list[str]:
+        """Магазины с покупками по алфавиту.
+
+        Кешируется до изменения: кеш сбрасывается после коммита записи
+        покупки. Сброс виден другим процессам только через общий кеш
+        (CACHE_LOCATION), поэтому запись ещё и живёт не дольше
+        STORES_CACHE_TIMEOUT секунд — с локальным кешем процесса список
+        устаревает не дольше этого срока.
+        """
+        names = cache.get(STORES_CACHE_KEY)
+        if names is None:
+            names = list(
+                self.filter(purchases_count__gt=0)
+                .order_by('name')
+                .values_list('name', flat=True)
+            )
+            cache.set(STORES_CACHE_KEY, names, timeout=STORES_CACHE_TIMEOUT)
+        return names
+
+
+class Store(models.Model):
+    """Справочник магазинов покупок со счётчиком использования.
+
+    Заполняется автоматически при записи покупок (Purchase.store
+    остаётся текстом) и служит источником списка для фильтра.
+    """
+
+    name = models.CharField(
+        'Наименование магазина', max_length=MAX_LENGTH_NAME_SHOP, unique=True
+    )
+    purchases_count = models.PositiveIntegerField('Покупок', default=0)
+
+    objects = StoreManager()
+
+    class Meta:
+        """Мета-класс справочника магазинов."""
+
+        ordering = ('name',)
+        verbose_name = 'Магазин'
+        verbose_name_plural = 'Магазины'
+
+    def __str__(self):
+        """Возвращает наименование магазина."""
+        return self.name
+
+
+class StoreUsageMixin:
+    """Поддерживает счётчик Store.purchases_count при записи покупки.
+
+    Магазин, загруженный из БД, запоминается в from_db(); сохранение
+    с другим магазином (или создание) переносит единицу счётчика.
+    Удаление обрабатывает сигнал post_delete (в т.ч. QuerySet.delete()).
+
+    Если магазин не загружался (only()/defer()), исходный магазин
+    неизвестен (DEFERRED): пока поле не тронуто, save() его не пишет и
+    счётчики не меняются; присвоенный магазин сверяется с сохранённым в
+    БД отдельным запросом.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает исходный магазин загруженного объекта."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_store = instance.__dict__.get('store', DEFERRED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет покупку и обновляет счётчики магазинов."""
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = getattr(self, '_loaded_store', None)
+            if previous is DEFERRED and 'store' in self.__dict__:
+                previous = (
+                    type(self)
+                    ._base_manager.filter(pk=self.pk)
+                    .values_list('store', flat=True)
+                    .first()
+                )
+            result = super().save(*args, **kwargs)
+            if previous is not DEFERRED and previous != self.store:
+                Store.objects.count_usage(self.store, 1)
+                if previous is not None:
+                    Store.objects.count_usage(previous, -1)
+            self._loaded_store = self.__dict__.get('store', DEFERRED)
+        return result
+
+
+class Purchase(
+    StoreUsageMixin, OrderLineMixin, StatusEventMixin, models.Model
+):
     """Модель покупки (запчасть/ПО)."""
 
+    event_kind = OrderEventKind.PURCHASE_STATUS
+    is_archived = False
+
     order = models.ForeignKey(
         Order,
         on_delete=models.SET_NULL,
@@ -431,7 +982,9 @@ class Purchase(models.Model):
         auto_now_add=True, verbose_name='Дата создания'
     )
     store = models.CharField(
-        verbose_name='Наименование магазина', max_length=MAX_LENGTH_NAME_SHOP
+        verbose_name='Наименование магазина',
+        max_length=MAX_LENGTH_NAME_SHOP,
+        db_index=True,
     )
     detail = models.CharField(
         'Детали покупки', max_length=MAX_LENGTH_OF_DETAIL_SHOP
@@ -457,8 +1010,443 @@ class Purchase(models.Model):
         ordering = ('-id',)
         verbose_name = 'Покупка'
         verbose_name_plural = 'Покупки'
+        indexes = (
+            models.Index(fields=('create',), name='crm_purchase_create_idx'),
+        )
 
     def __str__(self):
         """Возвращает строковое представление покупки."""
         order_code = self.order.code if self.order else 'без заказа'
         return f'Покупка для заказа {order_code}, {self.detail}, {self.store}'
+
+    def get_event_fields(self) -> dict:
+        """Поля события о смене статуса покупки."""
+        return {
+            'order_id': self.order_id,
+            'purchase': self,
+            'order_number': self.order.number if self.order_id else None,
+            'title': self.detail[:MAX_LENGTH_EVENT_TITLE],
+        }
+
+
+@receiver(post_delete, sender=Purchase)
+def release_store_usage(sender, instance, **kwargs):
+    """Удалённая покупка больше не учитывается в счётчике магазина."""
+    Store.objects.count_usage(instance.store, -1)
+
+
+class OrderEvent(models.Model):
+    """Событие outbox: смена статуса заказа или покупки.
+
+    Записывается в одной транзакции с изменением статуса и вычитывается
+    потребителями (Telegram-бот) по возрастанию id, начиная с курсора
+    EventCursor. Номер заказа и заголовок хранятся снимком, чтобы событие
+    оставалось читаемым и после удаления заказа/покупки.
+    """
+
+    kind = models.CharField(
+        verbose_name='Вид события',
+        choices=OrderEventKind.choices,
+        max_length=MAX_LENGTH_EVENT_KIND,
+    )
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        related_name='events',
+        verbose_name='Заказ',
+        null=True,
+        blank=True,
+    )
+    purchase = models.ForeignKey(
+        Purchase,
+        on_delete=models.SET_NULL,
+        related_name='events',
+        verbose_name='Покупка',
+        null=True,
+        blank=True,
+    )
+    order_number = models.PositiveIntegerField(
+        verbose_name='Номер заказа', null=True, blank=True
+    )
+    title = models.CharField(
+        verbose_name='Заголовок',
+        max_length=MAX_LENGTH_EVENT_TITLE,
+        blank=True,
+        default='',
+    )
+    old_status = models.CharField(
+        verbose_name='Прежний статус', max_length=MAX_LENGTH_ORDER_STATUS
+    )
+    new_status = models.CharField(
+        verbose_name='Новый статус', max_length=MAX_LENGTH_ORDER_STATUS
+    )
+    create = models.DateTimeField(
+        verbose_name='Дата создания', auto_now_add=True
+    )
+
+    class Meta:
+        """Мета-класс для работы с событиями."""
+
+        ordering = ('id',)
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+
+    def __str__(self):
+        """Возвращает строковое представление события."""
+        return (
+            f'{self.get_kind_display()}: {self.old_status} → {self.new_status}'
+        )
+
+    @property
+    def order_code(self) -> str | None:
+        """Код заказа на момент события."""
+        if self.order_number is None:
+            return None
+        return Order.format_code(self.order_number)
+
+
+class EventCursor(models.Model):
+    """Курсор доставки: последнее подтверждённое событие потребителя.
+
+    Курсор сдвигается только после успешной доставки (ack), поэтому при
+    сбое потребитель снова получит неподтверждённые события
+    (доставка «хотя бы один раз»).
+    """
+
+    consumer = models.CharField(
+        verbose_name='Потребитель',
+        max_length=MAX_LENGTH_EVENT_CONSUMER,
+        unique=True,
+    )
+    last_event_id = models.PositiveBigIntegerField(
+        verbose_name='Последнее подтверждённое событие', default=0
+    )
+    updated = models.DateTimeField(verbose_name='Обновлён', auto_now=True)
+
+    class Meta:
+        """Мета-класс для работы с курсорами доставки."""
+
+        verbose_name = 'Курсор доставки'
+        verbose_name_plural = 'Курсоры доставки'
+
+    def __str__(self):
+        """Возвращает строковое представление курсора."""
+        return f'{self.consumer}: {self.last_event_id}'
+
+
+class ArchivedOrder(OrderFinancialsMixin, models.Model):
+    """Закрытый заказ, перенесённый в архив командой archive_orders.
+
+    Холодная таблица с теми же полями, что у Order: id и номер
+    сохраняются, поэтому ссылки и коды заказов остаются прежними. Архив
+    только читается; баланс архивных заказов клиента переносится в
+    Client.archived_duty.
+    """
+
+    is_archived = True
+
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    number = models.PositiveIntegerField(
+        verbose_name='Номер заказа', unique=True
+    )
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        verbose_name='Клиент',
+        related_name='archived_orders',
+        db_index=False,  # покрыт индексом (client, -id)
+    )
+    create = models.DateTimeField(verbose_name='Дата создания')
+    accepted_equipment = models.CharField(
+        verbose_name='Принятое оборудование',
+        max_length=MAX_LENGTH_COMPONENT_FIELD,
+    )
+    detail = models.CharField(
+        verbose_name='Описание неисправности',
+        max_length=MAX_LENGTH_COMPONENT_DETAIL,
+    )
+    services = models.ManyToManyField(
+        Service,
+        through='ArchivedServiceLine',
+        verbose_name='Услуги',
+        related_name='archived_orders',
+        blank=True,
+    )
+    services_total_override = models.DecimalField(
+        verbose_name='Услуги, ₽',
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+        null=True,
+        blank=True,
+    )
+    advance = models.DecimalField(
+        verbose_name='Аванс, ₽',
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+        default=Decimal('0.00'),
+    )
+    paid = models.DecimalField(
+        verbose_name='Оплачено, ₽',
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+        default=Decimal('0.00'),
+    )
+    status = models.CharField(
+        verbose_name='Статус заказа',
+        choices=OrderStatus.choices,
+        max_length=MAX_LENGTH_ORDER_STATUS,
+    )
+    archived = models.DateTimeField(
+        verbose_name='Дата архивации', auto_now_add=True
+    )
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        """Мета-класс архива заказов."""
+
+        verbose_name = 'Архивный заказ'
+        verbose_name_plural = 'Архив заказов'
+        ordering = ('-id',)
+        indexes = (
+            models.Index(
+                fields=('client', '-id'),
+                name='crm_archorder_client_id_idx',
+            ),
+            models.Index(fields=('create',), name='crm_archorder_create_idx'),
+        )
+
+    def __str__(self):
+        """Строковое представление номера заказа."""
+        return f'Архивный заказ {self.code}'
+
+    @classmethod
+    def line_models(cls) -> tuple:
+        """Строки услуг и покупки архивных заказов."""
+        return ArchivedServiceLine, ArchivedPurchase
+
+
+class ArchivedServiceLine(models.Model):
+    """Услуга архивного заказа с ценой на момент оформления."""
+
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='service_lines',
+        verbose_name='Заказ',
+    )
+    service = models.ForeignKey(
+        Service,
+        on_delete=models.PROTECT,
+        related_name='archived_order_lines',
+        verbose_name='Услуга',
+    )
+    amount = models.DecimalField(
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+        verbose_name='Стоимость услуги в заказе',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        """Метаданные архивных строк услуг."""
+
+        verbose_name = 'Услуга в архивном заказе'
+        verbose_name_plural = 'Услуги в архивных заказах'
+        ordering = ('order', 'service')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('order', 'service'),
+                name='uniq_service_per_archived_order',
+            ),
+        )
+
+    def __str__(self) -> str:
+        """Строковое представление записи."""
+        return (
+            f'{self.order.code}: {self.service.service_name} = {self.amount}'
+        )
+
+
+class ArchivedPurchase(models.Model):
+    """Покупка архивного заказа (id сохраняется)."""
+
+    is_archived = True
+
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='purchases',
+        verbose_name='Номер заказа',
+    )
+    create = models.DateTimeField(verbose_name='Дата создания')
+    store = models.CharField(
+        verbose_name='Наименование магазина',
+        max_length=MAX_LENGTH_NAME_SHOP,
+    )
+    detail = models.CharField(
+        'Детали покупки', max_length=MAX_LENGTH_OF_DETAIL_SHOP
+    )
+    cost = models.DecimalField(
+        verbose_name='Стоимость покупки',
+        max_digits=MONEY_MAX_DIGITS,
+        decimal_places=MONEY_DECIMAL_PLACES,
+        default=Decimal('0.00'),
+    )
+    status = models.CharField(
+        choices=PurchaseStatus.choices,
+        verbose_name='Статус покупки',
+        max_length=MAX_LENGTH_PURCHASE_STATUS,
+    )
+
+    class Meta:
+        """Мета-класс архива покупок."""
+
+        ordering = ('-id',)
+        verbose_name = 'Архивная покупка'
+        verbose_name_plural = 'Архив покупок'
+        indexes = (
+            models.Index(
+                fields=('create',), name='crm_archpurchase_create_idx'
+            ),
+        )
+
+    def __str__(self):
+        """Возвращает строковое представление покупки."""
+        return (
+            f'Покупка для заказа {self.order.code}, {self.detail}, '
+            f'{self.store}'
+        )
+
+
+class JobStatus(models.TextChoices):
+    """Состояние фоновой задачи."""
+
+    QUEUED = 'queued', 'в очереди'
+    RUNNING = 'running', 'выполняется'
+    DONE = 'done', 'выполнена'
+    FAILED = 'failed', 'ошибка'
+
+
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class Job(models.Model):
+    """Фоновая задача очереди в БД (crm.jobs, команда run_worker).
+
+    Задачу берёт свободный воркер: первой — с большим priority, затем
+    по run_after и id. dedup_key не даёт поставить вторую такую же
+    задачу, пока первая в очереди или выполняется. Ход выполнения
+    (progress_done из progress_total) обновляется обработчиком и
+    показывается на странице задачи.
+    """
+
+    name = models.CharField(
+        verbose_name='Задача', max_length=MAX_LENGTH_JOB_NAME
+    )
+    payload = models.JSONField(
+        verbose_name='Параметры', default=dict, blank=True
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        choices=JobStatus.choices,
+        default=JobStatus.QUEUED,
+        max_length=MAX_LENGTH_JOB_STATUS,
+    )
+    priority = models.SmallIntegerField(verbose_name='Приоритет', default=0)
+    dedup_key = models.CharField(
+        verbose_name='Ключ дедупликации',
+        max_length=MAX_LENGTH_JOB_DEDUP_KEY,
+        blank=True,
+        default='',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток', default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток не больше', default=1
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Не раньше', default=timezone.now
+    )
+    locked_by = models.CharField(
+        verbose_name='Воркер',
+        max_length=MAX_LENGTH_JOB_WORKER,
+        blank=True,
+        default='',
+    )
+    locked_at = models.DateTimeField(
+        verbose_name='Взята воркером', null=True, blank=True
+    )
+    progress_done = models.PositiveIntegerField(
+        verbose_name='Выполнено', default=0
+    )
+    progress_total = models.PositiveIntegerField(
+        verbose_name='Всего', null=True, blank=True
+    )
+    result = models.JSONField(verbose_name='Результат', null=True, blank=True)
+    error = models.TextField(verbose_name='Ошибка', blank=True, default='')
+    create = models.DateTimeField(
+        verbose_name='Дата создания', auto_now_add=True
+    )
+    finished = models.DateTimeField(
+        verbose_name='Завершена', null=True, blank=True
+    )
+
+    class Meta:
+        """Мета-класс для работы с фоновыми задачами."""
+
+        ordering = ('-id',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                F('priority').desc(),
+                'run_after',
+                'id',
+                name='crm_job_queue_idx',
+                condition=Q(status=JobStatus.QUEUED),
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('dedup_key',),
+                name='crm_job_active_dedup_key',
+                condition=Q(status__in=ACTIVE_JOB_STATUSES) & ~Q(dedup_key=''),
+            ),
+        )
+
+    def __str__(self):
+        """Возвращает строковое представление задачи."""
+        return f'{self.name} #{self.pk} ({self.get_status_display()})'
+
+    @property
+    def is_active(self) -> bool:
+        """Задача ещё в очереди или выполняется."""
+        return self.status in ACTIVE_JOB_STATUSES
+
+    @property
+    def percent(self) -> int | None:
+        """Процент выполнения (None, пока объём работы неизвестен)."""
+        if self.status == JobStatus.DONE:
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, self.progress_done * 100 // self.progress_total)
+
+    def set_progress(self, done: int, total: int | None = None):
+        """Сохраняет ход выполнения одним UPDATE.
+
+        Обработчик вызывает его между своими транзакциями, чтобы
+        страница задачи видела ход работы сразу; заодно обновляется
+        locked_at — признак того, что воркер жив (crm.jobs).
+        """
+        self.progress_done = done
+        self.locked_at = timezone.now()
+        fields = {'progress_done': done, 'locked_at': self.locked_at}
+        if total is not None:
+            self.progress_total = fields['progress_total'] = total
+        Job.objects.filter(pk=self.pk, locked_by=self.locked_by).update(
+            **fields
+        )
@@ -0,0 +1,49 @@
+"""Фильтры списка заказов: общие для страницы списка и экспорта в CSV."""
+
+from django.db.models import Q
+
+from .archive import ARCHIVE_PARAM
+from .date_filters import created_range
+from .models import Order
+
+ORDER_FILTER_PARAMS = (
+    'status',
+    'entity_type',
+    'date_from',
+    'date_to',
+    'search',
+    ARCHIVE_PARAM,
+)
+
+
+def filter_orders(queryset, params):
+    """Применяет фильтры списка заказов к заказам или архиву.
+
+    params — GET-параметры страницы списка или их словарь (параметры
+    задачи экспорта): status, entity_type, date_from/date_to, search.
+    """
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+    entity_type = params.get('entity_type')
+    if entity_type:
+        queryset = queryset.filter(client__entity_type=entity_type)
+    queryset = queryset.filter(
+        created_range(params.get('date_from'), params.get('date_to'))
+    )
+    search = (params.get('search') or '').strip()
+    if not search:
+        return queryset
+    code_q = Order.code_search(search)
+    if code_q is not None:
+        return queryset.filter(code_q)
+    q = (
+        Q(client__client_name__icontains=search)
+        | Q(client__mobile_phone__icontains=search)
+        | Q(accepted_equipment__icontains=search)
+        | Q(detail__icontains=search)
+    )
+    number = Order.parse_code(search)
+    if number is not None:
+        q |= Q(number=number)
+    return queryset.filter(q)
@@ -0,0 +1,46 @@
+"""Выдача номеров заказов.
+
+На PostgreSQL номера берутся из нативной последовательности
+ORDER_NUMBER_SEQUENCE: nextval() не участвует в транзакции и не держит
+блокировок, поэтому параллельное создание заказов не ждёт друг друга.
+Номер отменённой транзакции не возвращается (пропуски допустимы, как и
+при удалении заказов).
+
+На остальных СУБД (SQLite в разработке и тестах) работает прежний
+счётчик django-sequences: SQLite всё равно сериализует запись, а
+строка счётчика в таблице sequences_sequence остаётся совместимой.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from sequences import get_next_values
+
+from .constants import ORDER_NUMBER_SEQUENCE, ORDER_SEQUENCE_NAME
+
+
+def uses_native_sequence(using: str | None = None) -> bool:
+    """Есть ли у базы нативная последовательность номеров заказов."""
+    return connections[using or DEFAULT_DB_ALIAS].vendor == 'postgresql'
+
+
+def reserve_order_numbers(count: int, using: str | None = None) -> list[int]:
+    """Резервирует count номеров заказов одним запросом.
+
+    Номера уникальны и возрастают, но на PostgreSQL при параллельных
+    резервированиях блок может быть не сплошным.
+    """
+    if count < 1:
+        return []
+    using = using or DEFAULT_DB_ALIAS
+    if not uses_native_sequence(using):
+        return list(get_next_values(count, ORDER_SEQUENCE_NAME, using=using))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(%s) FROM generate_series(1, %s)',
+            [ORDER_NUMBER_SEQUENCE, count],
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def next_order_number(using: str | None = None) -> int:
+    """Следующий номер заказа."""
+    return reserve_order_numbers(1, using=using)[0]
@@ -0,0 +1,339 @@
+"""Секционирование заказов и покупок по году создания (PostgreSQL).
+
+Включается переменной окружения POSTGRES_PARTITIONING=True; на SQLite и
+без неё таблицы остаются обычными. Таблицы crm_order и crm_purchase
+становятся секционированными по диапазону "create": секция на каждый
+год ({таблица}_y2026) и секция по умолчанию для дат вне созданных лет.
+Фильтр по дате создания полуоткрытым диапазоном (crm.date_filters)
+позволяет планировщику читать только нужные секции.
+
+Преобразование существующей таблицы идёт без долгой блокировки:
+1. создаётся секционированная таблица-двойник с теми же столбцами,
+   ограничениями CHECK, внешними ключами и индексами;
+2. триггер на исходной таблице повторяет в двойнике все изменения;
+3. строки копируются пачками по id, каждая пачка в своей транзакции
+   (строки пачки на время копирования блокируются FOR SHARE);
+4. в короткой транзакции под ACCESS EXCLUSIVE двойник занимает место
+   исходной таблицы, исходная удаляется.
+
+Ограничения секционированных таблиц PostgreSQL: первичный ключ
+становится (id, "create"), уникальность Order.number обеспечивает
+последовательность номеров crm_order_number_seq (индекс остаётся, но не
+уникальный; при подмене последовательность переходит к новой таблице,
+а не удаляется вместе со старой), внешние
+ключи на заказы и покупки из других таблиц снимаются — удаление
+заказов и покупок по-прежнему обрабатывает Django (on_delete).
+"""
+
+import re
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+PARTITIONED_TABLES = ('crm_order', 'crm_purchase')
+PARTITION_KEY = 'create'
+SHADOW_SUFFIX = '_partitioned'
+PARTITION_NAME_RE = re.compile(
+    rf'\b(?:{"|".join(PARTITIONED_TABLES)})_(?:y\d{{4}}|default)\b'
+)
+INDEX_DEF_RE = re.compile(
+    r'^CREATE (?:UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ (USING .*)$'
+)
+
+
+def partitioning_supported(connection) -> bool:
+    """Секционирование доступно только на PostgreSQL."""
+    return connection.vendor == 'postgresql'
+
+
+def partition_name(table: str, year: int) -> str:
+    """Имя секции года: crm_order_y2026."""
+    return f'{table}_y{year}'
+
+
+def default_partition_name(table: str) -> str:
+    """Имя секции по умолчанию (даты вне созданных лет)."""
+    return f'{table}_default'
+
+
+def year_start(year: int) -> datetime:
+    """Начало года в текущем часовом поясе (TIME_ZONE)."""
+    return timezone.make_aware(datetime(year, 1, 1))  # noqa: DTZ001
+
+
+def create_partition_sql(table: str, year: int) -> str:
+    """DDL секции года [1 января year, 1 января year + 1)."""
+    return (
+        f'CREATE TABLE IF NOT EXISTS {partition_name(table, year)} '
+        f'PARTITION OF {table} FOR VALUES '
+        f"FROM ('{year_start(year).isoformat()}') "
+        f"TO ('{year_start(year + 1).isoformat()}')"
+    )
+
+
+def create_default_partition_sql(table: str) -> str:
+    """DDL секции по умолчанию."""
+    return (
+        f'CREATE TABLE IF NOT EXISTS {default_partition_name(table)} '
+        f'PARTITION OF {table} DEFAULT'
+    )
+
+
+def shadow_index_sql(definition: str, name: str, shadow: str) -> str:
+    """Определение индекса исходной таблицы для двойника.
+
+    Уникальные индексы становятся обычными: уникальность на
+    секционированной таблице требует ключа секционирования в индексе.
+    """
+    match = INDEX_DEF_RE.match(definition)
+    if match is None:
+        raise ValueError(definition)
+    return f'CREATE INDEX {name} ON {shadow} {match.group(1)}'
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    """Таблица уже секционирована."""
+    cursor.execute(
+        'SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [table]
+    )
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def partition_years(cursor, table: str) -> set[int]:
+    """Годы, для которых у таблицы есть секции."""
+    cursor.execute(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE pg_inherits.inhparent = to_regclass(%s)',
+        [table],
+    )
+    prefix = f'{table}_y'
+    return {
+        int(name.removeprefix(prefix))
+        for (name,) in cursor.fetchall()
+        if name.startswith(prefix) and name.removeprefix(prefix).isdigit()
+    }
+
+
+def scanned_partitions(plan: str) -> list[str]:
+    """Секции заказов и покупок, упомянутые в плане запроса."""
+    return sorted(set(PARTITION_NAME_RE.findall(plan)))
+
+
+def parent_indexes(connection, plan: str) -> list[str]:
+    """Индексы секционированных таблиц, чьи индексы секций есть в плане.
+
+    Индексы секций PostgreSQL называет сам; план показывает их, а не
+    индекс родительской таблицы из Meta.indexes.
+    """
+    if not partitioning_supported(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname, parent.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            "WHERE child.relkind = 'i'"
+        )
+        return sorted(
+            {parent for child, parent in cursor.fetchall() if child in plan}
+        )
+
+
+def ensure_partitions(connection, years_ahead: int) -> list[str]:
+    """Создаёт секции с текущего года на years_ahead лет вперёд.
+
+    Секции нужно создавать заранее: если строки года уже попали в
+    секцию по умолчанию, PostgreSQL не даст создать секцию этого года.
+    Возвращает имена созданных секций.
+    """
+    current = timezone.localdate().year
+    created = []
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cursor, table):
+                continue
+            existing = partition_years(cursor, table)
+            for year in range(current, current + years_ahead + 1):
+                if year not in existing:
+                    cursor.execute(create_partition_sql(table, year))
+                    created.append(partition_name(table, year))
+    return created
+
+
+def convert_table(connection, table: str, batch_size: int, log=None):
+    """Преобразует таблицу в секционированную по году создания.
+
+    Таблица остаётся доступной для чтения и записи всё время, кроме
+    короткой финальной подмены. Повторный вызов для уже
+    секционированной таблицы ничего не делает.
+    """
+    log = log or (lambda message: None)
+    shadow = f'{table}{SHADOW_SUFFIX}'
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            log(f'{table}: уже секционирована')
+            return
+        with transaction.atomic(using=connection.alias):
+            indexes = create_shadow(cursor, table, shadow)
+        log(f'{table}: создана {shadow}, копирование пачками по {batch_size}')
+        copied = copy_rows(cursor, table, shadow, batch_size)
+        log(f'{table}: скопировано строк {copied}')
+        with transaction.atomic(using=connection.alias):
+            swap_tables(cursor, table, shadow, indexes)
+        log(f'{table}: секционирована')
+
+
+def create_shadow(cursor, table: str, shadow: str) -> dict:
+    """Создаёт двойника с секциями, индексами и триггером синхронизации.
+
+    Возвращает {временное имя индекса двойника: имя исходного индекса}.
+    """
+    cursor.execute(f'DROP TABLE IF EXISTS {shadow} CASCADE')
+    cursor.execute(
+        f'CREATE TABLE {shadow} (LIKE {table} INCLUDING DEFAULTS '
+        f'INCLUDING CONSTRAINTS) PARTITION BY RANGE ("{PARTITION_KEY}")'
+    )
+    cursor.execute(f'ALTER TABLE {shadow} ADD PRIMARY KEY (id, "create")')
+    cursor.execute(
+        f'SELECT extract(year FROM min("create") AT TIME ZONE %s)::int '  # noqa: S608
+        f'FROM {table}',
+        [timezone.get_current_timezone_name()],
+    )
+    first_year = cursor.fetchone()[0] or timezone.localdate().year
+    for year in range(first_year, timezone.localdate().year + 2):
+        cursor.execute(create_partition_sql(shadow, year))
+    cursor.execute(create_default_partition_sql(shadow))
+
+    # Внешние ключи — только на несекционированные таблицы.
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f' "
+        "AND (SELECT relkind FROM pg_class WHERE oid = confrelid) <> 'p'",
+        [table],
+    )
+    for name, definition in cursor.fetchall():
+        cursor.execute(
+            f'ALTER TABLE {shadow} ADD CONSTRAINT {name} {definition}'
+        )
+
+    cursor.execute(
+        'SELECT idx.relname, pg_get_indexdef(pg_index.indexrelid) '
+        'FROM pg_index JOIN pg_class idx ON idx.oid = pg_index.indexrelid '
+        'WHERE pg_index.indrelid = to_regclass(%s) '
+        'AND NOT pg_index.indisprimary ORDER BY idx.relname',
+        [table],
+    )
+    indexes = {}
+    for number, (name, definition) in enumerate(cursor.fetchall()):
+        temporary = f'{shadow}_idx{number}'
+        cursor.execute(shadow_index_sql(definition, temporary, shadow))
+        indexes[temporary] = name
+
+    cursor.execute(f'CREATE SEQUENCE {shadow}_id_seq')
+    cursor.execute(
+        f'CREATE OR REPLACE FUNCTION {table}_partition_sync() '  # noqa: S608
+        'RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN '
+        "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+        f'DELETE FROM {shadow} WHERE id = OLD.id; END IF; '
+        "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+        f'INSERT INTO {shadow} SELECT (NEW).* ON CONFLICT DO NOTHING; '
+        'END IF; RETURN NULL; END $$'
+    )
+    cursor.execute(
+        f'CREATE TRIGGER {table}_partition_sync '
+        f'AFTER INSERT OR UPDATE OR DELETE ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION {table}_partition_sync()'
+    )
+    return indexes
+
+
+def copy_rows(cursor, table: str, shadow: str, batch_size: int) -> int:
+    """Копирует строки в двойника пачками по диапазонам id.
+
+    Строки, изменённые во время копирования, переносит триггер;
+    FOR SHARE не даёт изменить строку, пока её пачка не записана.
+    """
+    cursor.execute(f'SELECT coalesce(max(id), 0) FROM {table}')  # noqa: S608
+    last_id = cursor.fetchone()[0]
+    copied = 0
+    start = 0
+    while start < last_id:
+        with transaction.atomic(using=cursor.db.alias):
+            cursor.execute(
+                f'INSERT INTO {shadow} SELECT * FROM {table} '  # noqa: S608
+                'WHERE id > %s AND id <= %s FOR SHARE '
+                'ON CONFLICT DO NOTHING',
+                [start, start + batch_size],
+            )
+            copied += cursor.rowcount
+        start += batch_size
+    return copied
+
+
+def owned_sequences(cursor, table: str) -> list[tuple[str, str]]:
+    """Последовательности, принадлежащие столбцам таблицы, кроме id.
+
+    Возвращает [(последовательность, столбец)]: например,
+    crm_order_number_seq (OWNED BY crm_order.number). PostgreSQL удаляет
+    такие последовательности вместе с таблицей.
+    """
+    cursor.execute(
+        'SELECT seq.relname, attr.attname FROM pg_depend dep '
+        "JOIN pg_class seq ON seq.oid = dep.objid AND seq.relkind = 'S' "
+        'JOIN pg_attribute attr ON attr.attrelid = dep.refobjid '
+        'AND attr.attnum = dep.refobjsubid '
+        "WHERE dep.classid = 'pg_class'::regclass "
+        'AND dep.refobjid = to_regclass(%s) '
+        "AND dep.deptype = 'a' AND attr.attname <> 'id' "
+        'ORDER BY seq.relname',
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def swap_tables(cursor, table: str, shadow: str, indexes: dict):
+    """Подменяет исходную таблицу двойником (внутри транзакции).
+
+    Последовательности столбцов исходной таблицы (номера заказов)
+    отвязываются перед её удалением и привязываются к двойнику.
+    """
+    cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+    years = partition_years(cursor, shadow)
+    sequences = owned_sequences(cursor, table)
+    for sequence, _ in sequences:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+    cursor.execute(f'DROP TRIGGER {table}_partition_sync ON {table}')
+    cursor.execute(f'DROP FUNCTION {table}_partition_sync()')
+    cursor.execute(
+        f"SELECT setval('{shadow}_id_seq', greatest("  # noqa: S608
+        f"pg_sequence_last_value(pg_get_serial_sequence('{table}', 'id')"
+        f'::regclass), (SELECT max(id) FROM {table}), 0) + 1, false)'
+    )
+    cursor.execute(
+        f'ALTER TABLE {shadow} ALTER COLUMN id '
+        f"SET DEFAULT nextval('{shadow}_id_seq')"
+    )
+    cursor.execute(f'DROP TABLE {table} CASCADE')
+    cursor.execute(f'ALTER TABLE {shadow} RENAME TO {table}')
+    cursor.execute(f'ALTER SEQUENCE {shadow}_id_seq RENAME TO {table}_id_seq')
+    cursor.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    for sequence, column in sequences:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.{column}')
+    cursor.execute(
+        f'ALTER TABLE {table} RENAME CONSTRAINT {shadow}_pkey '
+        f'TO {table}_pkey'
+    )
+    for temporary, name in indexes.items():
+        cursor.execute(f'ALTER INDEX {temporary} RENAME TO {name}')
+    for year in years:
+        cursor.execute(
+            f'ALTER TABLE {partition_name(shadow, year)} '
+            f'RENAME TO {partition_name(table, year)}'
+        )
+    cursor.execute(
+        f'ALTER TABLE {default_partition_name(shadow)} '
+        f'RENAME TO {default_partition_name(table)}'
+    )
@@ -0,0 +1,174 @@
+"""Тесты архива закрытых заказов (crm.archive, команда archive_orders)."""
+
+from datetime import timedelta
+from decimal import Decimal
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from crm.archive import ArchiveUnion, total_duty
+from crm.models import (
+    ArchivedOrder,
+    ArchivedPurchase,
+    Client,
+    Order,
+    OrderStatus,
+    Store,
+)
+
+User = get_user_model()
+ARCHIVE_AFTER_DAYS = 365
+
+
+def make_old(*orders):
+    """Переносит дату создания заказов за границу архивации."""
+    Order.objects.filter(pk__in=[order.pk for order in orders]).update(
+        create=timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS + 1)
+    )
+
+
+def archive_orders():
+    """Запускает команду архивации с маленькой пачкой."""
+    call_command(
+        'archive_orders',
+        days=ARCHIVE_AFTER_DAYS,
+        batch_size=1,
+        stdout=StringIO(),
+    )
+
+
+@pytest.mark.django_db
+def test_archive_moves_only_old_closed_orders(crm_data):
+    """Старые закрытые заказы переносятся со строками и покупками."""
+    order1, order2 = crm_data['order1'], crm_data['order2']
+    make_old(order1, order2)
+    client1 = Client.objects.get(pk=crm_data['client1'].pk)
+    duty_before = client1.total_duty
+    company_duty_before = total_duty()
+    dns_before = Store.objects.get(name='DNS').purchases_count
+
+    archive_orders()
+
+    assert Order.objects.filter(pk=order1.pk).exists()
+    assert not Order.objects.filter(pk=order2.pk).exists()
+    archived = ArchivedOrder.objects.get(pk=order2.pk)
+    assert archived.code == order2.code
+    assert archived.status == OrderStatus.COMPLETED
+    assert list(archived.service_lines.values_list('service', 'amount')) == [
+        (crm_data['service1'].pk, Decimal('1000.00'))
+    ]
+    assert list(archived.purchases.values_list('pk', flat=True)) == [
+        crm_data['purchase3'].pk
+    ]
+    assert archived.duty == Decimal('1800.00')
+
+    client1 = Client.objects.get(pk=client1.pk)
+    assert client1.archived_duty == archived.duty
+    assert client1.total_duty == duty_before
+    assert total_duty() == company_duty_before
+    assert Store.objects.get(name='DNS').purchases_count == dns_before - 1
+
+
+@pytest.mark.django_db
+def test_total_duty_includes_archive_in_one_query(
+    crm_data, django_assert_num_queries
+):
+    """Баланс архива суммируется в том же запросе, что и рабочих заказов."""
+    archived_duty = Decimal('500.00')
+    Client.objects.filter(pk=crm_data['client1'].pk).update(
+        archived_duty=archived_duty
+    )
+    hot_duty = Order.objects.total_duty()
+    with django_assert_num_queries(1):
+        assert total_duty() == hot_duty + archived_duty
+
+
+@pytest.mark.django_db
+def test_order_list_includes_archive_on_request(client, crm_data):
+    """Список заказов читает архив только с ?archive=1, по убыванию id."""
+    client.force_login(User.objects.create_user(username='archive'))
+    order2 = crm_data['order2']
+    make_old(order2)
+    archive_orders()
+    url = reverse('order_list')
+
+    response = client.get(url)
+    assert order2.pk not in [order.pk for order in response.context['orders']]
+
+    response = client.get(url, {'archive': '1'})
+    orders = response.context['orders']
+    assert [order.pk for order in orders] == sorted(
+        (order.pk for order in orders), reverse=True
+    )
+    assert [order.pk for order in orders if order.is_archived] == [order2.pk]
+    assert response.context['total_orders'] == len(orders)
+    assert (
+        response.context['status_stats'][OrderStatus.COMPLETED]
+        == Order.objects.filter(status=OrderStatus.COMPLETED).count() + 1
+    )
+
+    response = client.get(url, {'archive': '1', 'search': 'Монитор'})
+    assert [order.pk for order in response.context['orders']] == [order2.pk]
+
+
+@pytest.mark.django_db
+def test_archived_order_and_purchase_detail(client, crm_data):
+    """Карточки заказа и покупки открываются и после переноса в архив."""
+    client.force_login(User.objects.create_user(username='archive'))
+    order2, purchase3 = crm_data['order2'], crm_data['purchase3']
+    make_old(order2)
+    archive_orders()
+
+    response = client.get(reverse('order_detail', args=(order2.pk,)))
+    assert response.context['order'].is_archived
+    assert response.context['order'].duty == Decimal('1800.00')
+    response = client.get(reverse('order_edit', args=(order2.pk,)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    response = client.get(reverse('purchase_detail', args=(purchase3.pk,)))
+    assert isinstance(response.context['purchase'], ArchivedPurchase)
+
+
+@pytest.mark.django_db
+def test_archive_union_pages_across_tables(
+    crm_data, django_assert_num_queries
+):
+    """Срез объединения читает id одним запросом и объекты по таблицам."""
+    make_old(crm_data['order2'])
+    archive_orders()
+    union = ArchiveUnion(Order.objects.all(), ArchivedOrder.objects.all())
+    assert union.count() == len(['order1', 'order2', 'order3'])
+    with django_assert_num_queries(len(['id', 'рабочие', 'архивные'])):
+        page = union[1:3]
+    assert [order.pk for order in page] == [
+        crm_data['order2'].pk,
+        crm_data['order1'].pk,
+    ]
+    with django_assert_num_queries(len(['id', 'рабочие'])):
+        assert union[0].pk == crm_data['order3'].pk
+
+
+@pytest.mark.django_db
+def test_client_detail_with_archive(client, crm_data):
+    """История клиента с архивом; баланс одинаков в обоих режимах."""
+    client.force_login(User.objects.create_user(username='archive'))
+    client1, order2 = crm_data['client1'], crm_data['order2']
+    url = reverse('client_detail', args=(client1.pk,))
+    duty_before = client.get(url).context['total_duty']
+    make_old(order2)
+    archive_orders()
+
+    response = client.get(url)
+    assert response.context['orders_count'] == 1
+    assert response.context['total_duty'] == duty_before
+    response = client.get(url, {'archive': '1'})
+    assert response.context['orders_count'] == len(['order1', 'order2'])
+    assert [order.pk for order in response.context['orders']] == [
+        order2.pk,
+        crm_data['order1'].pk,
+    ]
+    assert response.context['total_duty'] == duty_before
@@ -0,0 +1,47 @@
+"""Тесты сравнения результатов бенчмарков с базовой линией."""
+
+import pytest
+
+from benchmarks.plans import explain_plans
+from benchmarks.runner import compare, percentile_summary
+
+BASE = {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 5, 'peak_kb': 100}
+
+
+def test_percentile_summary():
+    """Перцентили считаются по всем замерам, одиночный замер — как есть."""
+    summary = percentile_summary([float(value) for value in range(1, 101)])
+    assert summary == {'p50_ms': 50.5, 'p95_ms': 95.05, 'p99_ms': 99.01}
+    assert percentile_summary([7.0]) == dict.fromkeys(summary, 7.0)
+
+
+def test_compare_reports_regressions_beyond_tolerance():
+    """Рост в пределах допуска — не регрессия; рост запросов — всегда."""
+    baseline = {'html:home': BASE}
+    within = {**BASE, 'p50_ms': 12.0, 'peak_kb': 120}
+    assert not compare(baseline, {'html:home': within}, tolerance=0.25)
+    assert not compare(baseline, {'api:new': BASE}, tolerance=0.25)
+
+    worse = {**BASE, 'p95_ms': 30.0, 'queries': 6, 'peak_kb': 200}
+    regressions = compare(baseline, {'html:home': worse}, tolerance=0.25)
+    assert regressions == [
+        'html:home: запросов 5 → 6',
+        'html:home: p95_ms 20.0 → 30.0',
+        'html:home: память 100 → 200 КБ',
+    ]
+
+
+@pytest.mark.django_db
+def test_list_queries_use_indexes(crm_data):
+    """Выборки списков по статусу, клиенту и датам идут по индексам."""
+    order = crm_data['order1']
+    order.refresh_from_db()
+    results = explain_plans(
+        {'client': order.client_id, 'last_created': order.create.date()}
+    )
+    assert {name: result['index'] for name, result in results.items()} == {
+        'orders_by_status': 'crm_order_status_id_idx',
+        'orders_of_client': 'crm_order_client_id_idx',
+        'orders_recent': 'crm_order_create_idx',
+        'purchases_recent': 'crm_purchase_create_idx',
+    }
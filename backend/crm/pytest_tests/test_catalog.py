@@ -0,0 +1,174 @@
+"""Тесты кеша каталога услуг (crm.catalog)."""
+
+from contextlib import suppress
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from crm.catalog import catalog_version, get_catalog
+from crm.constants import CATALOG_VERSION_CACHE_KEY
+from crm.forms import OrderForm
+from crm.models import Category, Order, OrderStatus, Service
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_catalog_rebuilt_only_after_committed_change(
+    crm_data, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    """Каталог читается из БД один раз на версию."""
+    service = crm_data['service1']
+    with django_assert_num_queries(len(['категории', 'услуги'])):
+        catalog = get_catalog()
+    with django_assert_num_queries(0):
+        assert get_catalog() is catalog
+    assert catalog.price(service.pk) == service.amount
+
+    with django_capture_on_commit_callbacks(execute=True):
+        service.amount = Decimal('1234.00')
+        service.save()
+    assert catalog_version() != catalog.version
+    assert get_catalog().price(service.pk) == Decimal('1234.00')
+
+
+def create_category_and_roll_back():
+    """Создаёт категорию во вложенной транзакции и откатывает её."""
+    with suppress(RuntimeError), transaction.atomic():
+        Category.objects.create(title='Временная', slug='temp')
+        raise RuntimeError
+
+
+@pytest.mark.django_db
+def test_catalog_ignores_rolled_back_change(
+    crm_data, django_capture_on_commit_callbacks
+):
+    """Откаченное изменение не меняет версию каталога."""
+    version = catalog_version()
+    with django_capture_on_commit_callbacks() as callbacks:
+        create_category_and_roll_back()
+    assert callbacks == []
+    assert catalog_version() == version
+
+
+@pytest.mark.django_db
+def test_order_form_validates_services_by_catalog(crm_data):
+    """Форма заказа проверяет услуги по каталогу и берёт из него цену."""
+    service1, service2 = crm_data['service1'], crm_data['service2']
+    data = {
+        'client': crm_data['client1'].pk,
+        'accepted_equipment': 'Ноутбук',
+        'detail': 'Не включается',
+        'services': [service1.pk, service2.pk],
+        'advance': '0',
+        'paid': '0',
+        'status': OrderStatus.IN_WORKING,
+    }
+    get_catalog()
+    form = OrderForm(data=data)
+    with CaptureQueriesContext(connection) as queries:
+        assert form.is_valid(), form.errors
+    assert not [query for query in queries if 'crm_service' in query['sql']]
+    assert {
+        service.pk: service.amount for service in form.cleaned_data['services']
+    } == {service1.pk: service1.amount, service2.pk: service2.amount}
+
+    missing = Service.objects.order_by('-pk').first().pk + 1
+    form = OrderForm(data={**data, 'services': [service1.pk, missing]})
+    assert not form.is_valid()
+    assert 'services' in form.errors
+
+
+@pytest.mark.django_db
+def test_services_widget_skips_invalid_ids(crm_data):
+    """Нечисловые и удалённые id услуг не ломают рендер формы."""
+    service = crm_data['service1']
+    missing = Service.objects.order_by('-pk').first().pk + 1
+    form = OrderForm(
+        data={'services': ['abc', missing, service.pk]},
+        instance=crm_data['order1'],
+    )
+    assert not form.is_valid()
+    assert 'services' in form.errors
+    html = str(form['services'])
+    assert html.count('<option') == len([service])
+    assert f'value="{service.pk}"' in html
+
+
+@pytest.mark.django_db
+def test_service_list_filters_from_catalog(
+    client, crm_data, django_assert_num_queries
+):
+    """Список услуг фильтруется по каталогу без запросов к услугам."""
+    client.force_login(User.objects.create_user(username='catalog'))
+    url = reverse('service_list')
+    client.get(url)
+    with django_assert_num_queries(len(['сессия', 'пользователь'])):
+        response = client.get(
+            url,
+            {'category': crm_data['category'].slug, 'search': 'ЧИСТКА'},
+        )
+    assert [service.pk for service in response.context['services']] == [
+        crm_data['service2'].pk
+    ]
+    assert [category.slug for category in response.context['categories']] == [
+        crm_data['category'].slug
+    ]
+
+
+@pytest.mark.django_db
+def test_catalog_version_shared_through_file_cache(
+    crm_data, settings, tmp_path
+):
+    """Смена версии в другом процессе видна через общий файловый кеш."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'tech_support.metrics.InstrumentedFileBasedCache',
+            'LOCATION': str(tmp_path),
+        }
+    }
+    service = crm_data['service1']
+    catalog = get_catalog()
+    Service.objects.filter(pk=service.pk).update(amount=Decimal('777.00'))
+
+    # Другой воркер: свой экземпляр кеша на том же каталоге.
+    other_worker_cache = FileBasedCache(str(tmp_path), {})
+    other_worker_cache.set(
+        CATALOG_VERSION_CACHE_KEY, catalog.version + 1, timeout=None
+    )
+
+    assert get_catalog().price(service.pk) == Decimal('777.00')
+
+
+@pytest.mark.django_db
+def test_order_line_price_read_from_database(crm_data):
+    """Строка заказа получает цену из БД, даже если каталог устарел."""
+    service1, service2 = crm_data['service1'], crm_data['service2']
+    get_catalog()
+    Service.objects.filter(pk=service2.pk).update(amount=Decimal('555.00'))
+    order = crm_data['order3']
+    data = {
+        'client': order.client_id,
+        'accepted_equipment': order.accepted_equipment,
+        'detail': order.detail,
+        'services': [service1.pk, service2.pk],
+        'advance': '0',
+        'paid': '0',
+        'status': order.status,
+    }
+    form = OrderForm(data=data, instance=order)
+    assert form.is_valid(), form.errors
+    form.save()
+
+    lines = dict(
+        Order.objects.get(pk=order.pk).service_lines.values_list(
+            'service_id', 'amount'
+        )
+    )
+    assert lines[service2.pk] == Decimal('555.00')
+    assert lines[service1.pk] == service1.amount
@@ -0,0 +1,181 @@
+"""Тесты удаления пачками (crm.deletion, BatchDeleteMixin)."""
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models.deletion import ProtectedError
+from django.urls import reverse
+from django.utils import timezone
+
+from crm.deletion import BatchDeleter
+from crm.jobs import enqueue, work
+from crm.models import (
+    ArchivedOrder,
+    Client,
+    Job,
+    JobStatus,
+    Order,
+    OrderEvent,
+    OrderStatus,
+    Purchase,
+    Service,
+    ServiceInOrder,
+)
+from crm.tasks import DELETE_OBJECTS
+
+User = get_user_model()
+
+
+@pytest.fixture
+def user_client(client):
+    """Клиент с вошедшим пользователем."""
+    client.force_login(User.objects.create_user(username='deleter'))
+    return client
+
+
+def assert_client_deleted(crm_data):
+    """Клиент, его заказы и строки удалены, покупки отвязаны."""
+    client1 = crm_data['client1']
+    order_ids = [crm_data['order1'].pk, crm_data['order2'].pk]
+    assert not Client.objects.filter(pk=client1.pk).exists()
+    assert not Order.objects.filter(pk__in=order_ids).exists()
+    assert not ServiceInOrder.objects.filter(order_id__in=order_ids).exists()
+    assert not ArchivedOrder.objects.filter(client_id=client1.pk).exists()
+    purchase = Purchase.objects.get(pk=crm_data['purchase1'].pk)
+    assert purchase.order_id is None
+    assert Client.objects.filter(pk=crm_data['client2'].pk).exists()
+
+
+@pytest.mark.django_db
+def test_small_client_deleted_at_once(user_client, crm_data):
+    """Клиент с деревом не больше пачки удаляется сразу."""
+    order1 = crm_data['order1']
+    order1.status = OrderStatus.COMPLETED
+    order1.save()
+    url = reverse('client_delete', args=(crm_data['client1'].pk,))
+
+    response = user_client.post(url)
+
+    assert response.url == reverse('client_list')
+    assert_client_deleted(crm_data)
+    assert OrderEvent.objects.get().order_id is None
+
+
+@pytest.mark.django_db
+def test_large_client_deleted_in_background(user_client, crm_data, settings):
+    """Большое дерево удаляет воркер пачками, с ходом выполнения."""
+    settings.DELETE_BATCH_SIZE = 2
+    Order.objects.filter(pk=crm_data['order2'].pk).update(
+        create=timezone.now() - timedelta(days=400)
+    )
+    call_command('archive_orders', days=365, stdout=StringIO())
+    client1 = crm_data['client1']
+
+    url = reverse('client_delete', args=(client1.pk,))
+
+    response = user_client.post(url)
+
+    job = Job.objects.get()
+    assert response.url == reverse('job_detail', args=(job.pk,))
+    assert Client.objects.filter(pk=client1.pk).exists()
+    assert user_client.post(url).url == response.url
+
+    assert work(burst=True) == 1
+    job.refresh_from_db()
+    assert job.status == JobStatus.DONE
+    assert job.progress_done == job.progress_total == job.result['deleted']
+    assert_client_deleted(crm_data)
+
+
+@pytest.mark.django_db
+def test_batches_are_bounded(crm_data):
+    """Каждая пачка удаляет не больше batch_size строк одной модели."""
+    steps = []
+    deleter = BatchDeleter(
+        batch_size=1, progress=lambda done, total: steps.append(done)
+    )
+    queryset = Client.objects.filter(pk=crm_data['client1'].pk)
+
+    deleted = deleter.delete(queryset)
+
+    # 1 клиент + 2 заказа + 3 строки услуг, по одной строке за пачку.
+    assert (
+        deleted
+        == deleter.total
+        == len(['client', 'o1', 'o2', 'l1', 'l2', 'l3'])
+    )
+    assert steps == list(range(1, deleted + 1))
+
+
+@pytest.mark.django_db
+def test_protected_service_not_deleted(user_client, crm_data):
+    """Услуга из заказов не удаляется: сообщение и переход к списку."""
+    service1 = crm_data['service1']
+    with pytest.raises(ProtectedError):
+        BatchDeleter().prepare(Service.objects.filter(pk=service1.pk))
+
+    response = user_client.post(reverse('service_delete', args=(service1.pk,)))
+
+    assert response.url == reverse('service_list')
+    assert Service.objects.filter(pk=service1.pk).exists()
+    assert [
+        str(message) for message in get_messages(response.wsgi_request)
+    ] == ['Нельзя удалить услугу: она используется в заказах.']
+
+
+@pytest.mark.django_db
+def test_small_client_delete_is_atomic(user_client, crm_data, monkeypatch):
+    """Сбой посреди немедленного удаления не оставляет полудерева."""
+    advance = BatchDeleter.advance
+    calls = []
+
+    def failing_advance(self, deleted):
+        calls.append(deleted)
+        if len(calls) > 1:
+            raise DatabaseError('сбой посреди удаления')  # noqa: TRY003
+        advance(self, deleted)
+
+    monkeypatch.setattr(BatchDeleter, 'advance', failing_advance)
+    client1 = crm_data['client1']
+    lines = ServiceInOrder.objects.filter(order__client=client1).count()
+
+    with pytest.raises(DatabaseError):
+        user_client.post(reverse('client_delete', args=(client1.pk,)))
+
+    assert Client.objects.filter(pk=client1.pk).exists()
+    assert Order.objects.filter(client=client1).count() == len(
+        ['order1', 'order2']
+    )
+    assert ServiceInOrder.objects.filter(order__client=client1).count() == (
+        lines
+    ), 'Строки услуг, удалённые до сбоя, должны откатиться'
+
+
+@pytest.mark.django_db
+def test_background_delete_rechecks_protected(crm_data):
+    """Задача удаления повторяет проверку PROTECT перед первой пачкой.
+
+    На объект сослались, пока задача ждала в очереди: он не удаляется,
+    задача завершается с причиной в результате, без повторных попыток.
+    """
+    service = Service.objects.create(
+        category=crm_data['service1'].category,
+        service_name='Замена экрана',
+        amount=Decimal('3000.00'),
+    )
+    job = enqueue(DELETE_OBJECTS, {'model': 'crm.service', 'pk': service.pk})
+    crm_data['order3'].services.add(service)
+
+    assert work(burst=True) == 1
+
+    job.refresh_from_db()
+    assert job.status == JobStatus.DONE
+    assert job.result['deleted'] == 0
+    assert 'ServiceInOrder.service' in job.result['protected']
+    assert Service.objects.filter(pk=service.pk).exists()
@@ -0,0 +1,204 @@
+"""Тесты очереди фоновых задач (crm.jobs, crm.tasks, run_worker)."""
+
+import csv
+import time
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from crm.jobs import (
+    JobSpec,
+    claim_job,
+    enqueue,
+    handlers,
+    requeue_stale,
+    run_job,
+    work,
+)
+from crm.models import Job, JobStatus, OrderStatus
+from crm.tasks import EXPORT_ORDERS, REBUILD_STORE_USAGE
+
+User = get_user_model()
+
+HEARTBEAT_INTERVAL = 0.05
+
+
+@pytest.fixture
+def failing_handler(monkeypatch):
+    """Обработчик, который всегда падает (две попытки)."""
+
+    def fail(job):
+        raise RuntimeError('сбой')
+
+    monkeypatch.setitem(handlers, 'fail', JobSpec(fail, 'Сбой', 0, 2))
+
+
+@pytest.mark.django_db
+def test_enqueue_deduplicates_active_jobs():
+    """Пока задача с ключом активна, вторая не создаётся."""
+    first = enqueue(REBUILD_STORE_USAGE, dedup_key='stores')
+    assert enqueue(REBUILD_STORE_USAGE, dedup_key='stores') == first
+    assert work(burst=True) == 1
+    second = enqueue(REBUILD_STORE_USAGE, dedup_key='stores')
+    assert second != first
+    assert Job.objects.count() == len([first, second])
+
+
+@pytest.mark.django_db
+def test_claim_prefers_priority_then_age():
+    """Воркер берёт задачу с большим приоритетом, затем более раннюю."""
+    low = enqueue(REBUILD_STORE_USAGE)
+    high = enqueue(REBUILD_STORE_USAGE, priority=5)
+    later = enqueue(REBUILD_STORE_USAGE, delay=60)
+    assert claim_job('w1').pk == high.pk
+    assert claim_job('w2').pk == low.pk
+    assert claim_job('w3') is None
+    later.refresh_from_db()
+    assert later.status == JobStatus.QUEUED
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('failing_handler')
+def test_failed_job_retried_with_backoff_then_failed(settings):
+    """Упавшая задача повторяется с задержкой, пока есть попытки."""
+    settings.JOB_RETRY_DELAY = 10
+    job = enqueue('fail')
+    assert not run_job(claim_job('w1'))
+    job.refresh_from_db()
+    assert job.status == JobStatus.QUEUED
+    assert job.run_after > timezone.now() + timedelta(seconds=5)
+    assert 'RuntimeError: сбой' in job.error
+
+    Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+    assert not run_job(claim_job('w1'))
+    job.refresh_from_db()
+    assert job.status == JobStatus.FAILED
+    assert job.attempts == job.max_attempts
+    assert job.finished is not None
+
+
+@pytest.mark.django_db
+def test_stale_running_job_requeued(settings):
+    """Задача воркера без признаков жизни возвращается в очередь."""
+    settings.JOB_LOCK_TIMEOUT = 60
+    job = enqueue(REBUILD_STORE_USAGE)
+    claim_job('dead')
+    assert requeue_stale() == 0
+    Job.objects.filter(pk=job.pk).update(
+        locked_at=timezone.now() - timedelta(seconds=120)
+    )
+    assert requeue_stale() == 1
+    job.refresh_from_db()
+    assert job.status == JobStatus.QUEUED
+    assert not job.locked_by
+
+
+@pytest.mark.django_db
+def test_job_taken_over_not_finished_by_stale_worker(settings):
+    """Воркер, у которого задачу отобрали как зависшую, её не завершает."""
+    settings.JOB_LOCK_TIMEOUT = 60
+    job = enqueue(REBUILD_STORE_USAGE)
+    stale = claim_job('slow')
+    Job.objects.filter(pk=job.pk).update(
+        locked_at=timezone.now() - timedelta(seconds=120)
+    )
+    assert requeue_stale() == 1
+    current = claim_job('fresh')
+
+    assert not run_job(stale)
+    job.refresh_from_db()
+    assert job.status == JobStatus.RUNNING
+    assert job.locked_by == 'fresh'
+    assert job.result is None
+
+    assert run_job(current)
+    job.refresh_from_db()
+    assert job.status == JobStatus.DONE
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('failing_handler')
+def test_job_taken_over_not_failed_by_stale_worker(settings):
+    """Ошибка прежнего воркера не возвращает в очередь чужую задачу."""
+    settings.JOB_LOCK_TIMEOUT = 60
+    job = enqueue('fail')
+    stale = claim_job('slow')
+    Job.objects.filter(pk=job.pk).update(
+        locked_at=timezone.now() - timedelta(seconds=120)
+    )
+    requeue_stale()
+    claim_job('fresh')
+
+    assert not run_job(stale)
+    job.refresh_from_db()
+    assert job.status == JobStatus.RUNNING
+    assert job.locked_by == 'fresh'
+    assert not job.error
+
+
+@pytest.mark.django_db(transaction=True)
+def test_heartbeat_during_long_transaction(monkeypatch, settings):
+    """Пока обработчик держит транзакцию, воркер подаёт признаки жизни."""
+    settings.JOB_HEARTBEAT_INTERVAL = HEARTBEAT_INTERVAL
+
+    def slow(job):
+        with transaction.atomic():
+            time.sleep(HEARTBEAT_INTERVAL * 5)
+
+    monkeypatch.setitem(handlers, 'slow', JobSpec(slow, 'Долгая', 0, 1))
+    job = enqueue('slow')
+    claimed = claim_job('w1')
+    stale_mark = timezone.now() - timedelta(seconds=120)
+    Job.objects.filter(pk=job.pk).update(locked_at=stale_mark)
+
+    assert run_job(claimed)
+    job.refresh_from_db()
+    assert job.status == JobStatus.DONE
+    assert job.locked_at > stale_mark + timedelta(seconds=60)
+
+
+@pytest.mark.django_db
+def test_order_export_runs_in_background(client, crm_data, settings, tmp_path):
+    """Экспорт ставится в очередь, воркер пишет CSV по фильтрам списка."""
+    settings.JOB_EXPORT_DIR = tmp_path
+    client.force_login(User.objects.create_user(username='export'))
+    url = f'{reverse("order_export")}?status={OrderStatus.COMPLETED}&page=2'
+
+    response = client.post(url)
+    job = Job.objects.get(name=EXPORT_ORDERS)
+    assert response.url == reverse('job_detail', args=(job.pk,))
+    assert job.payload == {'filters': {'status': OrderStatus.COMPLETED}}
+    assert client.post(url).url == response.url
+    assert client.get(response.url).context['job'].is_active
+
+    call_command('run_worker', burst=True, stdout=StringIO())
+    job.refresh_from_db()
+    assert job.status == JobStatus.DONE
+    assert job.progress_done == job.progress_total == job.result['rows'] == 1
+
+    response = client.get(reverse('job_download', args=(job.pk,)))
+    content = b''.join(response.streaming_content).decode('utf-8-sig')
+    header, row = csv.reader(StringIO(content), delimiter=';')
+    assert header[0] == 'Номер'
+    assert row[0] == crm_data['order2'].code
+    assert row[11] == '1800.00'
+
+
+@pytest.mark.django_db
+def test_job_pages(client):
+    """Страница задач запускает обслуживание; чужие имена — 404."""
+    client.force_login(User.objects.create_user(username='jobs'))
+    response = client.post(reverse('job_start', args=(REBUILD_STORE_USAGE,)))
+    job = Job.objects.get()
+    assert response.url == reverse('job_detail', args=(job.pk,))
+    response = client.post(reverse('job_start', args=(EXPORT_ORDERS,)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    response = client.get(reverse('job_list'))
+    assert list(response.context['jobs']) == [job]
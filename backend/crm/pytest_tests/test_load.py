@@ -0,0 +1,104 @@
+"""Тесты статистики нагрузочного прогона, серверов и фейкового Telegram."""
+
+import runpy
+from types import SimpleNamespace
+
+import pytest
+import requests
+from django.conf import settings
+from telebot import apihelper
+
+from benchmarks.fake_telegram import fake_telegram
+from benchmarks.load import (
+    LoadStats,
+    format_comparison,
+    histogram,
+    parse_mix,
+)
+
+CHAT_ID = 42
+
+
+def test_parse_mix_validates_scenarios():
+    """Смесь принимает только известные сценарии с целыми весами."""
+    assert parse_mix('order_list=3, bot_lookup=1') == {
+        'order_list': 3,
+        'bot_lookup': 1,
+    }
+    for value in ('unknown=1', 'order_list', 'order_list=x'):
+        with pytest.raises(ValueError, match='Неверный элемент смеси'):
+            parse_mix(value)
+
+
+def test_load_stats_report():
+    """Отчёт содержит rps, долю ошибок, перцентили и гистограмму."""
+    stats = LoadStats()
+    for latency in (0.005, 0.02, 0.2, 7.0):
+        stats.add('order_list', latency)
+    stats.add('order_list', 0.03, error='HTTP 500')
+    report = stats.report(elapsed=2.5)['order_list']
+    assert {
+        key: report[key] for key in ('requests', 'rps', 'error_rate', 'max_ms')
+    } == {'requests': 5, 'rps': 2.0, 'error_rate': 0.2, 'max_ms': 7000.0}
+    assert report['errors'] == {'HTTP 500': 1}
+    assert report['histogram'] == histogram([0.005, 0.02, 0.2, 7.0, 0.03])
+    assert report['histogram']['0.01'] == 1
+    assert report['histogram']['+Inf'] == 1
+
+
+def test_format_comparison():
+    """Таблица сравнения: сценарии в секунду, ошибки, худшие p95/p99."""
+    fast, slow = LoadStats(), LoadStats()
+    for latency in (0.01, 0.02):
+        fast.add('order_list', latency)
+    slow.add('order_list', 0.5)
+    slow.add('order_detail', 2.0, error='HTTP 502')
+    table = format_comparison(
+        {
+            'gthread': (fast.report(1.0), 1.0),
+            'sync': (slow.report(2.0), 2.0),
+        }
+    ).splitlines()
+    assert table[1].split() == ['gthread', '2.0', '0.0%', '19.5', '19.9']
+    assert table[2].split() == ['sync', '1.0', '50.0%', '2000.0', '2000.0']
+
+
+def test_gunicorn_config_modes(monkeypatch):
+    """Режим gunicorn задаёт класс воркера и приложение WSGI или ASGI."""
+    path = settings.BASE_DIR / 'gunicorn.conf.py'
+    monkeypatch.setenv('GUNICORN_WORKERS', '3')
+    config = runpy.run_path(path)
+    assert config['worker_class'] == 'gthread'
+    assert config['workers'] == len(['w1', 'w2', 'w3'])
+    assert config['threads'] > 1
+    assert config['preload_app']
+    assert config['wsgi_app'] == 'tech_support.wsgi:application'
+
+    monkeypatch.setenv('GUNICORN_MODE', 'asgi')
+    config = runpy.run_path(path)
+    assert config['worker_class'] == 'uvicorn_worker.UvicornWorker'
+    assert config['wsgi_app'] == 'tech_support.asgi:application'
+    assert config['threads'] == 1
+
+    monkeypatch.setenv('GUNICORN_MODE', 'eventlet')
+    with pytest.raises(ValueError, match='GUNICORN_MODE'):
+        runpy.run_path(path)
+
+
+def test_fake_telegram_records_messages():
+    """Фейковый Bot API отвечает как Telegram и запоминает сообщения."""
+    bot = SimpleNamespace(threaded=True)
+    api_url = apihelper.API_URL
+    with fake_telegram(bot) as server:
+        assert server.api_url == apihelper.API_URL
+        assert not bot.threaded
+        response = requests.post(
+            server.api_url.format('token', 'sendMessage'),
+            params={'chat_id': CHAT_ID, 'text': 'привет'},
+            timeout=5,
+        )
+        assert response.json()['result']['text'] == 'привет'
+        assert server.pop_messages(CHAT_ID) == ['привет']
+        assert server.pop_messages(CHAT_ID) == []
+    assert api_url == apihelper.API_URL
+    assert bot.threaded
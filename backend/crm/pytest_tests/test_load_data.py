@@ -0,0 +1,66 @@
+"""Тесты генератора синтетических данных generate_load_data."""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+
+from crm.models import Client, Order, Purchase, ServiceInOrder
+
+CLIENTS = 30
+ORDERS = 300
+
+
+def generate(seed=7):
+    """Запускает генератор на небольшом объёме и возвращает снимок данных."""
+    call_command(
+        'generate_load_data',
+        clients=CLIENTS,
+        orders=ORDERS,
+        seed=seed,
+        batch_size=64,
+        stdout=StringIO(),
+    )
+    return list(
+        Order.objects.order_by('number').values_list(
+            'client__mobile_phone',
+            'accepted_equipment',
+            'status',
+            'services_total_override',
+            'paid',
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_generate_load_data_creates_consistent_rows():
+    """Заказы получают номера, даты из периода, строки услуг и покупки."""
+    generate()
+    assert Client.objects.count() == CLIENTS
+    assert Order.objects.count() == ORDERS
+    numbers = sorted(Order.objects.values_list('number', flat=True))
+    assert numbers == list(range(numbers[0], numbers[0] + ORDERS))
+    assert ServiceInOrder.objects.filter(amount__isnull=True).count() == 0
+    assert ServiceInOrder.objects.exists()
+    assert Purchase.objects.exists()
+    dates = Order.objects.order_by('number').values_list('create', flat=True)
+    assert dates[0] < dates[ORDERS - 1], 'Даты заказов должны расти с номером'
+    assert Order.create.field.auto_now_add, 'auto_now_add должен вернуться'
+
+
+@pytest.mark.django_db
+def test_generate_load_data_is_skewed_and_deterministic():
+    """Активность клиентов неравномерна, одно зерно даёт одни данные."""
+    first = generate()
+    counts = sorted(
+        Client.objects.annotate(n=Count('orders')).values_list('n', flat=True)
+    )
+    assert counts[-1] > 3 * counts[len(counts) // 2]
+
+    Purchase.objects.all().delete()
+    Client.objects.all().delete()
+    assert generate() == first
+    Purchase.objects.all().delete()
+    Client.objects.all().delete()
+    assert generate(seed=8) != first
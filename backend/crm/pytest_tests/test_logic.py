@@ -7,14 +7,40 @@
 4. Кастомных QuerySet методов (агрегация по клиентам/заказам)
 """
 
+import time
+from datetime import UTC, datetime
 from decimal import Decimal
 
 import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.filebased import FileBasedCache
 from django.core.exceptions import ValidationError
-
-from crm.models import Client, Order, OrderStatus
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from crm.constants import (
+    AUTOCOMPLETE_PAGE_SIZE,
+    COUNT_SERVICES_IN_ORDER,
+    QUANTITY_ON_PAGE,
+    STORES_CACHE_KEY,
+    STORES_CACHE_TIMEOUT,
+)
+from crm.date_filters import created_range
+from crm.forms import OrderForm, PurchaseForm
+from crm.models import (
+    Client,
+    Order,
+    OrderStatus,
+    Purchase,
+    PurchaseStatus,
+    Service,
+    Store,
+)
 from crm.validators import phone_validator, validate_company_for_legal
 
+User = get_user_model()
+
 
 @pytest.mark.django_db
 def test_phone_validator_valid():
@@ -272,3 +298,418 @@ def test_order_code_format():
     assert 'Заказ' in str(
         order
     ), '__str__ заказа должен содержать слово "Заказ" и код заказа'
+
+
+def test_order_code_number_ranges():
+    """Диапазоны номеров по началу кода учитывают дополнение нулями."""
+    assert Order.code_number_ranges('001') == [(100, 199)]
+    assert Order.code_number_ranges('00123') == [(123, 123)]
+    assert Order.code_number_ranges('12')[:2] == [
+        (12000, 12999),
+        (120000, 129999),
+    ]
+    assert Order.code_number_ranges('123456') == [
+        (123456, 123456),
+        (1234560, 1234569),
+        (12345600, 12345699),
+        (123456000, 123456999),
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ('search', 'numbers'),
+    [
+        ('TN-00102', [102]),
+        ('tn-0010', [101, 102, 103]),
+        ('TN 001', [101, 102, 103]),
+        ('TN-002', []),
+        ('103', [103]),
+        ('+7 101', []),
+    ],
+)
+def test_order_and_purchase_lists_search_by_code(
+    client, crm_data, search, numbers
+):
+    """Код заказа ищется по номеру, цифры из текста номером не считаются."""
+    client.force_login(User.objects.create_user(username='searcher'))
+    response = client.get(reverse('order_list'), {'search': search})
+    assert (
+        sorted(order.number for order in response.context['orders']) == numbers
+    )
+    response = client.get(reverse('purchase_list'), {'search': search})
+    assert sorted(
+        purchase.pk for purchase in response.context['purchases']
+    ) == sorted(
+        Purchase.objects.filter(order__number__in=numbers).values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def save_order_form(data, instance=None):
+    """Сохраняет OrderForm и возвращает заказ и SQL строк услуг."""
+    form = OrderForm(data=data, instance=instance)
+    assert form.is_valid(), form.errors
+    with CaptureQueriesContext(connection) as queries:
+        order = form.save()
+    line_queries = [
+        query['sql']
+        for query in queries.captured_queries
+        if 'crm_serviceinorder' in query['sql']
+    ]
+    return order, line_queries
+
+
+@pytest.mark.django_db
+def test_order_form_saves_service_lines_in_constant_queries(crm_data):
+    """Строки услуг: одно чтение и одна вставка/удаление с ценой."""
+    services = [
+        Service.objects.create(
+            category=crm_data['category'],
+            service_name=f'Услуга {index}',
+            amount=Decimal(index + 1),
+        )
+        for index in range(COUNT_SERVICES_IN_ORDER)
+    ]
+    data = {
+        'client': crm_data['client1'].pk,
+        'accepted_equipment': 'Ноутбук',
+        'detail': 'Не включается',
+        'services': [service.pk for service in services],
+        'advance': '0',
+        'paid': '0',
+        'status': OrderStatus.IN_WORKING,
+    }
+    order, line_queries = save_order_form(data)
+    assert [query.split()[0] for query in line_queries] == [
+        'SELECT',
+        'INSERT',
+    ]
+    assert {
+        line.service_id: line.amount for line in order.service_lines.all()
+    } == {service.pk: service.amount for service in services}
+
+    kept = services[-1]
+    Service.objects.filter(pk=kept.pk).update(amount=Decimal('999.00'))
+    data['services'] = [kept.pk, crm_data['service1'].pk]
+    order, line_queries = save_order_form(data, instance=order)
+    assert [query.split()[0] for query in line_queries] == [
+        'SELECT',
+        'DELETE',
+        'INSERT',
+    ]
+    assert {
+        line.service_id: line.amount for line in order.service_lines.all()
+    } == {
+        kept.pk: kept.amount,
+        crm_data['service1'].pk: crm_data['service1'].amount,
+    }
+
+
+@pytest.mark.django_db
+def test_services_add_snapshots_price(crm_data):
+    """services.add() вне формы тоже фиксирует текущую цену услуги."""
+    order = crm_data['order3']
+    service = crm_data['service2']
+    order.services.remove(service)
+    order.services.add(service)
+    assert order.service_lines.get(service=service).amount == service.amount
+
+
+@pytest.mark.django_db
+def test_order_financials_memoized(crm_data, django_assert_num_queries):
+    """Итоги заказа: один запрос, из аннотаций или предзагрузки — ноль."""
+    order = Order.objects.get(pk=crm_data['order1'].pk)
+    with django_assert_num_queries(1):
+        assert order.services_total == Decimal('1500.00')
+        assert order.purchases_total == Decimal('9000.00')
+        assert order.total_amount == Decimal('10500.00')
+        assert order.duty == Decimal('10200.00')
+    for queryset in (
+        Order.objects.with_financials(),
+        Order.objects.prefetch_related('service_lines', 'purchases'),
+    ):
+        order = queryset.get(pk=crm_data['order1'].pk)
+        with django_assert_num_queries(0):
+            assert order.financials == (
+                Decimal('1500.00'),
+                Decimal('9000.00'),
+                None,
+                Decimal('300.00'),
+                Decimal('0.00'),
+            )
+
+
+@pytest.mark.django_db
+def test_order_financials_reset_on_line_changes(crm_data):
+    """Изменение строк и покупок через модели сбрасывает кэш итогов."""
+    order = Order.objects.with_financials().get(pk=crm_data['order3'].pk)
+    assert order.total_amount == Decimal('0.00')
+    purchase = order.purchases.create(
+        store='DNS', detail='Ролик подачи', cost=Decimal('700.00')
+    )
+    assert order.purchases_total == Decimal('700.00')
+    order.services.add(crm_data['service2'])
+    assert order.services_total == Decimal('500.00')
+    order.service_lines.get().delete()
+    purchase.delete()
+    assert order.total_amount == Decimal('0.00')
+    order.services_total_override = Decimal('250.00')
+    assert order.duty == Decimal('50.00')
+
+
+@pytest.mark.django_db
+def test_client_detail_paginates_orders_in_constant_queries(client, crm_data):
+    """Карточка клиента: число запросов не зависит от числа заказов."""
+    client.force_login(User.objects.create_user(username='viewer'))
+    owner = crm_data['client1']
+    url = reverse('client_detail', args=[owner.pk])
+    with CaptureQueriesContext(connection) as few:
+        response = client.get(url)
+    assert response.context['orders_count'] == owner.orders.count()
+    assert response.context['total_duty'] == owner.total_duty
+
+    orders = Order.objects.bulk_create(
+        Order(
+            number=1000 + index,
+            client=owner,
+            accepted_equipment='Ноутбук',
+            detail='Не включается',
+        )
+        for index in range(QUANTITY_ON_PAGE * 3)
+    )
+    for order in orders:
+        order.services.add(crm_data['service1'])
+    with CaptureQueriesContext(connection) as many:
+        response = client.get(url, {'page': 2})
+    assert len(many) == len(few)
+    assert len(response.context['orders']) == QUANTITY_ON_PAGE
+    assert response.context['orders_count'] == owner.orders.count()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ('url_name', 'term', 'keys'),
+    [
+        ('client_autocomplete', '8 999 000-00-02', ['client2']),
+        ('client_autocomplete', 'Ромаш', ['client2']),
+        ('order_autocomplete', '102', ['order2']),
+        ('order_autocomplete', 'TN-0010', ['order3', 'order2', 'order1']),
+        ('order_autocomplete', 'samsung', ['order2']),
+        ('service_autocomplete', 'Чистка', ['service2']),
+    ],
+)
+def test_autocomplete_search(client, crm_data, url_name, term, keys):
+    """Эндпоинты автодополнения ищут по телефону, коду и названию."""
+    client.force_login(User.objects.create_user(username='picker'))
+    response = client.get(reverse(url_name), {'term': term})
+    data = response.json()
+    assert [item['id'] for item in data['results']] == [
+        crm_data[key].pk for key in keys
+    ]
+    assert not data['pagination']['more']
+
+
+@pytest.mark.django_db
+def test_autocomplete_paginates(client, crm_data):
+    """Страница ограничена, признак следующей страницы без COUNT."""
+    client.force_login(User.objects.create_user(username='picker'))
+    Client.objects.bulk_create(
+        Client(
+            client_name=f'Клиент {index}',
+            mobile_phone=f'+7988{index:07d}',
+            entity_type='FL',
+        )
+        for index in range(AUTOCOMPLETE_PAGE_SIZE)
+    )
+    url = reverse('client_autocomplete')
+    first = client.get(url).json()
+    last = client.get(url, {'page': 2}).json()
+    assert len(first['results']) == AUTOCOMPLETE_PAGE_SIZE
+    assert first['pagination']['more']
+    assert len(last['results']) == Client.objects.count() - len(
+        first['results']
+    )
+    assert not last['pagination']['more']
+
+
+@pytest.mark.django_db
+def test_autocomplete_widgets_render_only_selected(crm_data):
+    """В <select> попадают только выбранные варианты."""
+    form = PurchaseForm(instance=crm_data['purchase1'])
+    html = str(form['order'])
+    assert (
+        'data-autocomplete-url="{}"'.format(reverse('order_autocomplete'))
+        in html
+    )
+    assert html.count('<option') == len(['пустой', 'выбранный'])
+    assert crm_data['order1'].code in html
+    assert crm_data['order2'].code not in html
+
+    form = OrderForm(instance=crm_data['order1'])
+    html = str(form['services'])
+    assert html.count('<option') == crm_data['order1'].services.count()
+
+
+@pytest.mark.django_db
+def test_autocomplete_form_rejects_unknown_ids(crm_data):
+    """Валидация по-прежнему принимает только существующие id."""
+    missing = Order.objects.order_by('-pk').first().pk + 1
+    form = PurchaseForm(
+        data={
+            'order': missing,
+            'store': 'DNS',
+            'detail': 'Диск',
+            'status': 'delivery_expected',
+            'cost': '100',
+        }
+    )
+    assert not form.is_valid()
+    assert 'order' in form.errors
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ('form_class', 'field', 'instance'),
+    [(PurchaseForm, 'order', 'purchase1'), (OrderForm, 'client', 'order1')],
+)
+def test_autocomplete_form_renders_invalid_ids(
+    crm_data, form_class, field, instance
+):
+    """Нечисловой id в POST даёт ошибку формы, а не падение рендера."""
+    form = form_class(data={field: 'abc'}, instance=crm_data[instance])
+    assert not form.is_valid()
+    assert field in form.errors
+    html = str(form[field])
+    assert html.count('<option') == len(['пустой'])
+
+
+def store_counts():
+    """Счётчики магазинов из справочника."""
+    return dict(Store.objects.values_list('name', 'purchases_count'))
+
+
+@pytest.mark.django_db
+def test_store_counts_follow_purchase_writes(crm_data):
+    """Создание, смена магазина и удаление покупки меняют счётчики."""
+    assert store_counts() == {'DNS': 3, 'Citilink': 1}
+
+    purchase = Purchase.objects.get(pk=crm_data['purchase2'].pk)
+    purchase.store = 'Ozon'
+    purchase.save()
+    purchase.save()
+    assert store_counts() == {'DNS': 3, 'Citilink': 0, 'Ozon': 1}
+
+    crm_data['purchase1'].delete()
+    Purchase.objects.filter(store='Ozon').delete()
+    assert store_counts() == {'DNS': 2, 'Citilink': 0, 'Ozon': 0}
+    assert Store.objects.filter_names() == ['DNS']
+
+
+@pytest.mark.django_db
+def test_store_counts_with_deferred_store(crm_data):
+    """Покупка без загруженного магазина не сдвигает счётчики.
+
+    Присвоенный такой покупке магазин сверяется с сохранённым в БД.
+    """
+    pk = crm_data['purchase2'].pk
+    purchase = Purchase.objects.only('id', 'status').get(pk=pk)
+    purchase.status = PurchaseStatus.INSTALLED
+    purchase.save()
+    assert 'store' not in purchase.__dict__
+    assert store_counts() == {'DNS': 3, 'Citilink': 1}
+
+    purchase = Purchase.objects.defer('store').get(pk=pk)
+    purchase.store = 'Ozon'
+    purchase.save()
+    purchase.save()
+    assert store_counts() == {'DNS': 3, 'Citilink': 0, 'Ozon': 1}
+
+
+@pytest.mark.django_db
+def test_store_rebuild_after_bulk_writes(crm_data):
+    """rebuild() пересчитывает счётчики после массовых операций."""
+    Purchase.objects.filter(store='Citilink').update(store='Ozon')
+    Purchase.objects.bulk_create([Purchase(store='Ozon', detail='Кабель')])
+    Store.objects.rebuild()
+    assert store_counts() == {'DNS': 3, 'Citilink': 0, 'Ozon': 2}
+
+
+@pytest.mark.django_db
+def test_store_names_cache_shared_between_processes(
+    crm_data, settings, tmp_path, monkeypatch
+):
+    """Сброс кеша магазинов в другом процессе виден через общий кеш.
+
+    Запись кеша к тому же ограничена STORES_CACHE_TIMEOUT.
+    """
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'tech_support.metrics.InstrumentedFileBasedCache',
+            'LOCATION': str(tmp_path),
+        }
+    }
+    assert Store.objects.filter_names() == ['Citilink', 'DNS']
+    Store.objects.create(name='Ozon', purchases_count=1)
+    assert Store.objects.filter_names() == ['Citilink', 'DNS']
+
+    # Другой воркер записал покупку и сбросил кеш в своём экземпляре.
+    FileBasedCache(str(tmp_path), {}).delete(STORES_CACHE_KEY)
+    assert Store.objects.filter_names() == ['Citilink', 'DNS', 'Ozon']
+
+    Store.objects.filter(name='Ozon').delete()
+    expired = time.time() + STORES_CACHE_TIMEOUT + 1
+    monkeypatch.setattr(time, 'time', lambda: expired)
+    assert Store.objects.filter_names() == ['Citilink', 'DNS']
+
+
+@pytest.mark.django_db
+def test_purchase_list_stores_filter_cached(
+    client, crm_data, django_capture_on_commit_callbacks
+):
+    """Список магазинов для фильтра читается из кеша до изменения."""
+    client.force_login(User.objects.create_user(username='buyer'))
+    url = reverse('purchase_list')
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, {'store': 'DNS'})
+    assert list(response.context['stores']) == ['Citilink', 'DNS']
+    assert not [query for query in queries if 'crm_store' in query['sql']]
+    assert {purchase.store for purchase in response.context['purchases']} == {
+        'DNS'
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Purchase.objects.create(store='Ozon', detail='Кабель')
+    response = client.get(url)
+    assert list(response.context['stores']) == ['Citilink', 'DNS', 'Ozon']
+
+
+@pytest.mark.django_db
+def test_list_date_filters_use_local_day_bounds(client, crm_data, settings):
+    """Границы дней — в часовом поясе TIME_ZONE, по столбцу create."""
+    settings.TIME_ZONE = 'Europe/Moscow'
+    client.force_login(User.objects.create_user(username='dates'))
+    # 2026-03-01 23:30 по Москве — это ещё 1 марта, хотя в UTC 20:30.
+    late = datetime(2026, 3, 1, 20, 30, tzinfo=UTC)
+    # 2026-03-02 00:30 по Москве — уже 2 марта (в UTC ещё 1 марта).
+    early = datetime(2026, 3, 1, 21, 30, tzinfo=UTC)
+    Order.objects.filter(pk=crm_data['order1'].pk).update(create=late)
+    Order.objects.filter(pk=crm_data['order2'].pk).update(create=early)
+    Purchase.objects.filter(pk=crm_data['purchase1'].pk).update(create=late)
+    Purchase.objects.filter(pk=crm_data['purchase2'].pk).update(create=early)
+    day = {'date_from': '2026-03-01', 'date_to': '2026-03-01'}
+
+    response = client.get(reverse('order_list'), day)
+    assert [order.pk for order in response.context['orders']] == [
+        crm_data['order1'].pk
+    ]
+    response = client.get(reverse('purchase_list'), day)
+    assert [purchase.pk for purchase in response.context['purchases']] == [
+        crm_data['purchase1'].pk
+    ]
+    assert response.context['current_filters']['date_from'] == '2026-03-01'
+
+    sql = str(Order.objects.filter(created_range('2026-03-01')).query)
+    assert 'django_datetime_cast_date' not in sql
@@ -0,0 +1,106 @@
+"""Тесты выдачи номеров заказов (crm.order_numbers)."""
+
+import importlib
+import threading
+
+import pytest
+from django.apps import apps
+from django.db import connection, transaction
+from sequences.models import Sequence
+
+from crm.constants import ORDER_SEQUENCE_NAME
+from crm.models import Order
+from crm.order_numbers import (
+    next_order_number,
+    reserve_order_numbers,
+    uses_native_sequence,
+)
+
+BLOCK_SIZE = 5
+LOCK_TIMEOUT_MS = 2000
+
+order_sequence_migration = importlib.import_module(
+    'crm.migrations.0008_order_number_sequence'
+)
+
+
+def create_order(client):
+    """Создаёт заказ клиента с номером из последовательности."""
+    return Order.objects.create(
+        client=client, accepted_equipment='Ноутбук', detail='Не включается'
+    )
+
+
+def test_reserve_block_between_orders(crm_data):
+    """Блок номеров уникален, возрастает и не пересекается с заказами."""
+    first = create_order(crm_data['client1'])
+    block = reserve_order_numbers(BLOCK_SIZE)
+    assert len(set(block)) == BLOCK_SIZE
+    assert block == sorted(block)
+    assert block[0] > first.number
+    assert reserve_order_numbers(0) == []
+    second = create_order(crm_data['client1'])
+    assert second.number > block[-1]
+    assert next_order_number() > second.number
+
+
+def test_migration_seeds_after_last_issued_number(crm_data):
+    """Засев учитывает и заказы, и номера, выданные счётчиком ранее."""
+    last = max(Order.objects.values_list('number', flat=True))
+    assert order_sequence_migration.last_issued_number(apps, 'default') >= last
+    Sequence.objects.update_or_create(
+        name=ORDER_SEQUENCE_NAME, defaults={'last': last + BLOCK_SIZE}
+    )
+    assert (
+        order_sequence_migration.last_issued_number(apps, 'default')
+        == last + BLOCK_SIZE
+    )
+
+
+@pytest.mark.skipif(
+    not uses_native_sequence(), reason='нужна последовательность PostgreSQL'
+)
+@pytest.mark.django_db(transaction=True)
+def test_parallel_creates_do_not_block(crm_data):
+    """Второй заказ создаётся, пока транзакция первого ещё открыта.
+
+    Со счётчиком django-sequences второй поток ждал бы блокировку строки
+    счётчика до конца первой транзакции и упал бы по lock_timeout.
+    """
+    client = crm_data['client1']
+    first_created = threading.Event()
+    second_done = threading.Event()
+    numbers, errors = [], []
+
+    def first():
+        try:
+            with transaction.atomic():
+                numbers.append(create_order(client).number)
+                first_created.set()
+                second_done.wait(LOCK_TIMEOUT_MS / 1000 * 2)
+        finally:
+            first_created.set()
+            connection.close()
+
+    def second():
+        first_created.wait()
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT_MS}ms'"
+                    )
+                numbers.append(create_order(client).number)
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+        finally:
+            second_done.set()
+            connection.close()
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(set(numbers)) == len(threads)
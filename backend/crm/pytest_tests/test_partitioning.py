@@ -0,0 +1,116 @@
+"""Тесты секционирования заказов и покупок (crm.partitioning)."""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from crm.constants import ORDER_NUMBER_SEQUENCE
+from crm.models import Order
+from crm.partitioning import (
+    convert_table,
+    create_default_partition_sql,
+    create_partition_sql,
+    is_partitioned,
+    owned_sequences,
+    partitioning_supported,
+    scanned_partitions,
+    shadow_index_sql,
+)
+
+
+def test_partition_covers_calendar_year_in_time_zone(settings):
+    """Секция года — полуоткрытый диапазон по началу лет в TIME_ZONE."""
+    settings.TIME_ZONE = 'Europe/Moscow'
+    assert create_partition_sql('crm_order', 2026) == (
+        'CREATE TABLE IF NOT EXISTS crm_order_y2026 PARTITION OF crm_order '
+        "FOR VALUES FROM ('2026-01-01T00:00:00+03:00') "
+        "TO ('2027-01-01T00:00:00+03:00')"
+    )
+    assert create_default_partition_sql('crm_order') == (
+        'CREATE TABLE IF NOT EXISTS crm_order_default '
+        'PARTITION OF crm_order DEFAULT'
+    )
+
+
+@pytest.mark.parametrize(
+    ('definition', 'expected'),
+    [
+        (
+            'CREATE UNIQUE INDEX crm_order_number_key '
+            'ON public.crm_order USING btree (number)',
+            'CREATE INDEX tmp ON crm_order_partitioned USING btree (number)',
+        ),
+        (
+            'CREATE INDEX crm_order_create_brin '
+            'ON public.crm_order USING brin ("create")',
+            'CREATE INDEX tmp ON crm_order_partitioned USING brin ("create")',
+        ),
+        (
+            'CREATE INDEX crm_order_status_id_idx '
+            'ON ONLY public.crm_order USING btree (status, id DESC)',
+            'CREATE INDEX tmp ON crm_order_partitioned '
+            'USING btree (status, id DESC)',
+        ),
+    ],
+)
+def test_shadow_index_keeps_columns_and_method(definition, expected):
+    """Индекс двойника повторяет столбцы и метод, без уникальности."""
+    assert shadow_index_sql(definition, 'tmp', 'crm_order_partitioned') == (
+        expected
+    )
+
+
+def test_scanned_partitions_from_plan():
+    """Из плана берутся только секции заказов и покупок, без повторов."""
+    plan = (
+        'Append\n'
+        '  -> Index Scan using crm_order_y2026_create_idx on crm_order_y2026\n'
+        '  -> Seq Scan on crm_purchase_default\n'
+        '  -> Seq Scan on crm_order_y2026\n'
+        '  -> Seq Scan on crm_client'
+    )
+    assert scanned_partitions(plan) == [
+        'crm_order_y2026',
+        'crm_purchase_default',
+    ]
+
+
+@pytest.mark.django_db
+def test_command_is_noop_outside_postgresql():
+    """На SQLite команда только сообщает, что секционирование недоступно."""
+    stdout = StringIO()
+    call_command('partition_tables', '--convert', stdout=stdout)
+    assert 'только на PostgreSQL' in stdout.getvalue()
+
+
+@pytest.mark.skipif(
+    not partitioning_supported(connection), reason='нужен PostgreSQL'
+)
+@pytest.mark.django_db(transaction=True)
+def test_converted_order_table_keeps_number_sequence(crm_data):
+    """После секционирования crm_order новые заказы получают номера.
+
+    Последовательность номеров принадлежит crm_order.number и не должна
+    удаляться вместе с исходной таблицей.
+    """
+    last_number = max(
+        crm_data[name].number for name in ('order1', 'order2', 'order3')
+    )
+    convert_table(connection, 'crm_order', batch_size=1)
+    with connection.cursor() as cursor:
+        assert is_partitioned(cursor, 'crm_order')
+        assert owned_sequences(cursor, 'crm_order') == [
+            (ORDER_NUMBER_SEQUENCE, 'number')
+        ]
+
+    order = Order.objects.create(
+        client=crm_data['client1'],
+        accepted_equipment='Ноутбук',
+        detail='Не включается',
+    )
+
+    assert order.number > last_number
+    assert Order.objects.filter(number=order.number).count() == 1
+    assert Order.objects.count() == len(['order1', 'order2', 'order3', 'new'])
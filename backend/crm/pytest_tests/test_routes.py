@@ -22,6 +22,7 @@ from crm.views import (
     ClientListView,
     ClientUpdateView,
     HomeView,
+    JobListView,
     OrderCreateView,
     OrderDeleteView,
     OrderDetailView,
@@ -49,6 +50,7 @@ ROUTES_NO_PK = [
     ('order_create', OrderCreateView),
     ('purchase_list', PurchaseListView),
     ('purchase_create', PurchaseCreateView),
+    ('job_list', JobListView),
 ]
 
 # Маршруты, требующие pk.
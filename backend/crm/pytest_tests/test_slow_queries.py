@@ -0,0 +1,172 @@
+"""Тесты журнала медленных SQL-запросов и команды slow_query_report.
+
+Проверяется:
+1. Запись медленного запроса с view, местом вызова и планом EXPLAIN
+2. Сводка по журналу командой manage.py slow_query_report
+3. Создание каталога журнала при первой записи
+4. EXPLAIN без ANALYZE для SELECT с блокировками и nextval/setval
+"""
+
+import json
+import logging
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from conftest import create_test_user
+from tech_support.slow_queries import (
+    EXPLAIN_PREFIXES,
+    PLAN_ONLY_PREFIXES,
+    SlowQueryFileHandler,
+    explain_prefix,
+    slow_query_log,
+)
+from tech_support.slow_queries import logger as slow_query_logger
+
+
+class ListHandler(logging.Handler):
+    """Собирает записи журнала медленных запросов в список."""
+
+    def __init__(self):
+        """Создаёт пустой список записей."""
+        super().__init__()
+        self.entries = []
+
+    def emit(self, record):
+        """Сохраняет запись как словарь."""
+        self.entries.append(json.loads(record.getMessage()))
+
+
+@pytest.fixture
+def slow_entries(settings, monkeypatch):
+    """Считает медленным любой запрос и всегда снимает план.
+
+    Записи перехватываются вместо файла журнала.
+    """
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE = 1
+    handler = ListHandler()
+    monkeypatch.setattr(slow_query_logger, 'handlers', [handler])
+    return handler.entries
+
+
+@pytest.mark.django_db
+def test_slow_query_logged_with_call_site_and_plan(crm_data, slow_entries):
+    """Запрос из total_duty пишется с местом вызова и планом SQLite."""
+    with slow_query_log():
+        crm_data['client1'].orders.total_duty()
+    entry = slow_entries[0]
+    assert entry['sql'].lstrip().upper().startswith('SELECT')
+    assert entry['fingerprint']
+    assert entry['view'] is None
+    assert any(
+        'total_duty' in frame for frame in entry['call_site']
+    ), 'Место вызова должно указывать на код проекта, выполнивший запрос'
+    assert entry['explain'], 'Для SELECT должен сохраняться план EXPLAIN'
+
+
+@pytest.mark.django_db
+def test_slow_query_logged_with_view(client, crm_data, slow_entries):
+    """Медленный запрос веб-страницы записывается с именем view."""
+    client.force_login(create_test_user())
+    client.get('/orders/', {'q': 'Lenovo'})
+    assert 'order_list' in {entry['view'] for entry in slow_entries}
+
+
+def test_slow_query_report_summarizes_log(tmp_path):
+    """Команда группирует записи по отпечатку и сортирует по времени."""
+    log_file = tmp_path / 'slow_queries.log'
+    entries = [
+        {
+            'fingerprint': 'aaa',
+            'duration_ms': duration,
+            'view': 'order_list',
+            'call_site': ['crm/views.py:300 in get_queryset'],
+            'sql': 'SELECT * FROM crm_order',
+            'explain': None,
+        }
+        for duration in (300, 500)
+    ]
+    entries.append(
+        {
+            'fingerprint': 'bbb',
+            'duration_ms': 250,
+            'view': None,
+            'call_site': [],
+            'sql': 'SELECT 1',
+            'explain': 'SCAN crm_order',
+        }
+    )
+    log_file.write_text(
+        '\n'.join(json.dumps(entry) for entry in entries) + '\nbroken\n',
+        encoding='utf-8',
+    )
+    out = StringIO()
+    call_command('slow_query_report', file=log_file, explain=True, stdout=out)
+    report = out.getvalue()
+    assert 'Медленных запросов: 3, уникальных: 2' in report
+    assert report.index('[aaa] 2 раз, всего 800 мс') < report.index('[bbb]')
+    assert 'order_list ×2' in report
+    assert 'SCAN crm_order' in report
+
+
+def test_slow_query_log_dir_created_on_first_write(tmp_path):
+    """Каталог журнала создаётся при первой записи, а не заранее."""
+    log_file = tmp_path / 'logs' / 'slow_queries.log'
+    handler = SlowQueryFileHandler(log_file, delay=True, encoding='utf-8')
+    try:
+        assert not log_file.parent.exists()
+        handler.emit(
+            logging.LogRecord(
+                slow_query_logger.name,
+                logging.WARNING,
+                __file__,
+                0,
+                '{}',
+                None,
+                None,
+            )
+        )
+    finally:
+        handler.close()
+    assert log_file.read_text(encoding='utf-8') == '{}\n'
+
+
+@pytest.mark.parametrize(
+    'sql',
+    [
+        'SELECT nextval(%s) FROM generate_series(1, %s)',
+        "SELECT setval('crm_order_number_seq', %s)",
+        'SELECT * FROM crm_job WHERE id = %s FOR UPDATE SKIP LOCKED',
+        'SELECT * FROM crm_order WHERE id > %s FOR SHARE',
+        'SELECT * FROM crm_order WHERE id = %s for no key update',
+        'SELECT * FROM crm_order WHERE id = %s FOR KEY SHARE',
+    ],
+)
+def test_explain_without_analyze_for_side_effects(sql):
+    """SELECT с блокировками и nextval/setval не выполняется повторно."""
+    assert (
+        explain_prefix('postgresql', sql) == PLAN_ONLY_PREFIXES['postgresql']
+    )
+    assert 'ANALYZE' not in explain_prefix('postgresql', sql)
+
+
+@pytest.mark.parametrize(
+    ('sql', 'expected'),
+    [
+        (
+            'SELECT * FROM crm_order WHERE id = %s',
+            EXPLAIN_PREFIXES['postgresql'],
+        ),
+        (
+            "SELECT * FROM crm_order WHERE equipment = 'FOR SALE'",
+            EXPLAIN_PREFIXES['postgresql'],
+        ),
+        ('UPDATE crm_order SET status = %s', None),
+        ('DELETE FROM crm_order WHERE id = %s', None),
+    ],
+)
+def test_explain_prefix_for_plain_statements(sql, expected):
+    """Чистые SELECT получают EXPLAIN ANALYZE, изменения — без плана."""
+    assert explain_prefix('postgresql', sql) == expected
@@ -0,0 +1,138 @@
+"""Тесты ограничения времени SQL-запросов (tech_support.statement_timeouts).
+
+Проверяется:
+1. set_config() выполняется только при смене значения у соединения
+2. Значение, поставленное в транзакции, ставится снова после её отката
+3. Атрибут statement_timeout у view переопределяет значение по умолчанию
+"""
+
+from types import SimpleNamespace
+
+from django.test import RequestFactory
+from django.urls import resolve
+
+from api.views import BotLookupViewSet
+from tech_support.statement_timeouts import (
+    StatementTimeoutMiddleware,
+    StatementTimeoutWrapper,
+    TimeoutScope,
+    current_timeout,
+)
+
+
+class RawConnection:
+    """Физическое соединение: у каждого свой statement_timeout."""
+
+
+def run_query(wrapper, cursor):
+    """Выполняет пустой запрос через обёртку."""
+    wrapper(lambda *args: None, 'SELECT 1', None, False, {'cursor': cursor})
+
+
+def test_timeout_set_only_when_changed():
+    """Значение ставится один раз на соединение, пока оно не сменится."""
+    executed = []
+    cursor = SimpleNamespace(
+        cursor=SimpleNamespace(
+            execute=lambda sql, params: executed.append(params[0])
+        )
+    )
+    connection = SimpleNamespace(
+        connection=RawConnection(), in_atomic_block=False
+    )
+    scope = TimeoutScope(5000)
+    run_query(StatementTimeoutWrapper(connection, scope), cursor)
+    run_query(StatementTimeoutWrapper(connection, scope), cursor)
+    assert executed == ['5000']
+
+    scope.timeout = 0
+    run_query(StatementTimeoutWrapper(connection, scope), cursor)
+    connection.connection = RawConnection()
+    run_query(StatementTimeoutWrapper(connection, scope), cursor)
+    assert executed == ['5000', '0', '0']
+
+    # В транзакции значение не запоминается: откат его вернёт.
+    connection.in_atomic_block = True
+    scope.timeout = 1000
+    wrapper = StatementTimeoutWrapper(connection, scope)
+    run_query(wrapper, cursor)
+    run_query(wrapper, cursor)
+    connection.in_atomic_block = False
+    run_query(wrapper, cursor)
+    run_query(wrapper, cursor)
+    assert executed == ['5000', '0', '0', '1000', '1000', '1000']
+
+
+class FakeSession:
+    """Сессия PostgreSQL: statement_timeout с откатом транзакции."""
+
+    def __init__(self):
+        """Сессия без ограничения и вне транзакции."""
+        self.timeout = '0'
+        self.saved = None
+        self.connection = SimpleNamespace(
+            connection=RawConnection(), in_atomic_block=False
+        )
+        self.cursor = SimpleNamespace(
+            cursor=SimpleNamespace(execute=self.set_config)
+        )
+
+    def set_config(self, sql, params):
+        """Ставит statement_timeout сессии (запрос SET_TIMEOUT_SQL)."""
+        self.timeout = params[0]
+
+    def begin(self):
+        """Открывает транзакцию."""
+        self.saved = self.timeout
+        self.connection.in_atomic_block = True
+
+    def rollback(self):
+        """Откатывает транзакцию вместе с set_config()."""
+        self.timeout = self.saved
+        self.connection.in_atomic_block = False
+
+    def query(self, wrapper) -> str:
+        """Выполняет запрос; возвращает действовавший statement_timeout."""
+        return wrapper(
+            lambda *args: self.timeout,
+            'SELECT 1',
+            None,
+            False,
+            {'cursor': self.cursor},
+        )
+
+
+def test_timeout_restored_after_rollback():
+    """После отката транзакции ограничение ставится заново."""
+    session = FakeSession()
+    wrapper = StatementTimeoutWrapper(session.connection, TimeoutScope(5000))
+
+    session.begin()
+    assert session.query(wrapper) == '5000'
+    session.rollback()
+    assert session.query(wrapper) == '5000'
+
+    session.begin()
+    assert session.query(wrapper) == '5000'
+    session.rollback()
+    session.begin()
+    assert session.query(wrapper) == '5000'
+
+
+def test_view_statement_timeout(settings):
+    """Middleware берёт предел из атрибута view, иначе из настроек."""
+    settings.DB_STATEMENT_TIMEOUT_MS = 5000
+    request = RequestFactory().get('/api/bot/lookup/')
+    seen = []
+
+    def get_response(request):
+        seen.append(current_timeout())
+        middleware.process_view(request, None, (), {})
+        seen.append(current_timeout())
+
+    middleware = StatementTimeoutMiddleware(get_response)
+    request.resolver_match = resolve('/api/bot/lookup/')
+    middleware(request)
+    request.resolver_match = resolve('/about/')
+    middleware(request)
+    assert seen == [5000, BotLookupViewSet.statement_timeout, 5000, 5000]
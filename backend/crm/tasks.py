@@ -0,0 +1,187 @@
+"""Обработчики фоновых задач CRM (очередь crm.jobs, команда run_worker).
+
+Модуль импортируется в CrmConfig.ready(), поэтому обработчики
+зарегистрированы и в веб-процессе (enqueue проверяет имя), и в воркере.
+"""
+
+import csv
+import hashlib
+import os
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models.deletion import ProtectedError
+from django.utils import timezone
+
+from .archive import (
+    archivable_orders,
+    archive_closed_orders,
+    archive_cutoff,
+    include_archive,
+)
+from .deletion import BatchDeleter
+from .jobs import job_handler
+from .models import ArchivedOrder, Order, Store
+from .order_filters import ORDER_FILTER_PARAMS, filter_orders
+
+EXPORT_ORDERS = 'export_orders'
+REBUILD_STORE_USAGE = 'rebuild_store_usage'
+ARCHIVE_ORDERS = 'archive_orders'
+DELETE_OBJECTS = 'delete_objects'
+# Задачи обслуживания, которые можно запустить со страницы задач.
+MAINTENANCE_JOBS = (REBUILD_STORE_USAGE, ARCHIVE_ORDERS)
+EXPORT_PROGRESS_STEP = 500
+EXPORT_COLUMNS = (
+    'Номер',
+    'Дата',
+    'Клиент',
+    'Телефон',
+    'Оборудование',
+    'Описание неисправности',
+    'Услуги, ₽',
+    'Товар, ₽',
+    'Общая сумма, ₽',
+    'Аванс, ₽',
+    'Оплата, ₽',
+    'Долг, ₽',
+    'Статус',
+    'Архив',
+)
+
+
+def export_storage() -> FileSystemStorage:
+    """Хранилище файлов экспорта (JOB_EXPORT_DIR, не раздаётся как media)."""
+    return FileSystemStorage(location=settings.JOB_EXPORT_DIR)
+
+
+def export_filters(params) -> dict:
+    """Непустые фильтры списка заказов из GET-параметров."""
+    return {
+        name: params.get(name)
+        for name in ORDER_FILTER_PARAMS
+        if params.get(name)
+    }
+
+
+def export_dedup_key(filters: dict) -> str:
+    """Ключ дедупликации экспорта: одинаковые фильтры — одна задача."""
+    digest = hashlib.sha1(
+        urlencode(sorted(filters.items())).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'{EXPORT_ORDERS}:{digest}'
+
+
+def order_row(order) -> list:
+    """Строка CSV заказа (рабочего или архивного)."""
+    return [
+        order.code,
+        timezone.localtime(order.create).strftime('%d.%m.%Y %H:%M'),
+        order.client.client_name,
+        order.client.mobile_phone,
+        order.accepted_equipment,
+        order.detail,
+        order.services_total,
+        order.purchases_total,
+        order.total_amount,
+        order.advance,
+        order.paid,
+        order.duty,
+        order.get_status_display(),
+        'да' if order.is_archived else '',
+    ]
+
+
+@job_handler(
+    EXPORT_ORDERS,
+    'Экспорт заказов в CSV',
+    statement_timeout=settings.EXPORT_STATEMENT_TIMEOUT_MS,
+)
+def export_orders(job, filters: dict) -> dict:
+    """Выгружает заказы с фильтрами списка в CSV (новые сначала).
+
+    Файл пишется во временный и переименовывается в конце, поэтому
+    повтор после сбоя не оставляет обрезанного файла. Выборка по всей
+    таблице с поиском может идти дольше обычного предела SQL-запроса
+    задачи, поэтому у экспорта свой — EXPORT_STATEMENT_TIMEOUT_MS.
+    """
+    querysets = [Order.objects.all()]
+    if include_archive(filters):
+        querysets.append(ArchivedOrder.objects.all())
+    querysets = [
+        filter_orders(queryset, filters)
+        .select_related('client')
+        .with_financials()
+        .order_by('-id')
+        for queryset in querysets
+    ]
+    total = sum(queryset.count() for queryset in querysets)
+    job.set_progress(0, total)
+    name = f'orders-{job.pk}.csv'
+    path = export_storage().path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = 0
+    # utf-8-sig и «;» — чтобы файл сразу открывался в Excel.
+    with open(f'{path}.part', 'w', encoding='utf-8-sig', newline='') as out:
+        writer = csv.writer(out, delimiter=';')
+        writer.writerow(EXPORT_COLUMNS)
+        for queryset in querysets:
+            for order in queryset.iterator(chunk_size=EXPORT_PROGRESS_STEP):
+                writer.writerow(order_row(order))
+                rows += 1
+                if rows % EXPORT_PROGRESS_STEP == 0:
+                    job.set_progress(rows)
+    os.replace(f'{path}.part', path)
+    job.set_progress(rows)
+    return {'file': name, 'rows': rows}
+
+
+@job_handler(REBUILD_STORE_USAGE, 'Пересчёт счётчиков магазинов')
+def rebuild_store_usage(job) -> dict:
+    """Пересчитывает счётчики покупок магазинов по таблице покупок."""
+    with transaction.atomic():
+        Store.objects.rebuild()
+    job.set_progress(1, 1)
+    return {'stores': Store.objects.count()}
+
+
+@job_handler(ARCHIVE_ORDERS, 'Перенос закрытых заказов в архив', priority=-1)
+def archive_orders(job, days: int | None = None) -> dict:
+    """Переносит старые закрытые заказы в архив (как archive_orders)."""
+    cutoff = archive_cutoff(
+        settings.ORDER_ARCHIVE_AFTER_DAYS if days is None else days
+    )
+    total = archivable_orders(cutoff).count()
+    job.set_progress(0, total)
+    moved = archive_closed_orders(
+        cutoff,
+        settings.ORDER_ARCHIVE_BATCH_SIZE,
+        progress=lambda moved: job.set_progress(moved, max(total, moved)),
+    )
+    return {'moved': moved}
+
+
+def deletion_dedup_key(obj) -> str:
+    """Ключ дедупликации удаления: один объект — одна задача."""
+    return f'{DELETE_OBJECTS}:{obj._meta.label_lower}:{obj.pk}'
+
+
+@job_handler(DELETE_OBJECTS, 'Удаление пачками', priority=1)
+def delete_objects(job, model: str, pk: int) -> dict:
+    """Удаляет объект model (app_label.model) со всем деревом пачками.
+
+    Пока задача ждала в очереди, на дерево могли сослаться через PROTECT,
+    поэтому проверка повторяется до первой пачки. Защищённое дерево не
+    удаляется, задача завершается с причиной в результате: повтор
+    попытки ничего бы не изменил.
+    """
+    queryset = apps.get_model(model)._base_manager.filter(pk=pk)
+    deleter = BatchDeleter(progress=job.set_progress)
+    try:
+        deleter.prepare(queryset)
+    except ProtectedError as exc:
+        return {'deleted': 0, 'protected': exc.args[0]}
+    deleter.delete_rows(queryset)
+    return {'deleted': deleter.deleted}
@@ -0,0 +1,13 @@
+"""Фильтры шаблонов для фоновых задач (crm.jobs)."""
+
+from django import template
+
+from crm.jobs import job_title as get_job_title
+
+register = template.Library()
+
+
+@register.filter
+def job_title(name: str) -> str:
+    """Название задачи по имени обработчика."""
+    return get_job_title(name)
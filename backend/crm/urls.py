@@ -4,15 +4,22 @@ from django.urls import path
 
 from .views import (
     AboutView,
+    ClientAutocompleteView,
     ClientCreateView,
     ClientDeleteView,
     ClientDetailView,
     ClientListView,
     ClientUpdateView,
     HomeView,
+    JobDetailView,
+    JobDownloadView,
+    JobListView,
+    JobStartView,
+    OrderAutocompleteView,
     OrderCreateView,
     OrderDeleteView,
     OrderDetailView,
+    OrderExportView,
     OrderListView,
     OrderUpdateView,
     PurchaseCreateView,
@@ -20,6 +27,7 @@ from .views import (
     PurchaseDetailView,
     PurchaseListView,
     PurchaseUpdateView,
+    ServiceAutocompleteView,
     ServiceCreateView,
     ServiceDeleteView,
     ServiceListView,
@@ -59,6 +67,7 @@ urlpatterns = [
     ),
     path('orders/', OrderListView.as_view(), name='order_list'),
     path('orders/create/', OrderCreateView.as_view(), name='order_create'),
+    path('orders/export/', OrderExportView.as_view(), name='order_export'),
     path('orders/<int:pk>/', OrderDetailView.as_view(), name='order_detail'),
     path(
         'orders/<int:pk>/edit/', OrderUpdateView.as_view(), name='order_edit'
@@ -89,6 +98,29 @@ urlpatterns = [
         PurchaseDeleteView.as_view(),
         name='purchase_delete',
     ),
+    path('jobs/', JobListView.as_view(), name='job_list'),
+    path('jobs/<int:pk>/', JobDetailView.as_view(), name='job_detail'),
+    path(
+        'jobs/<int:pk>/download/',
+        JobDownloadView.as_view(),
+        name='job_download',
+    ),
+    path('jobs/start/<slug:name>/', JobStartView.as_view(), name='job_start'),
+    path(
+        'autocomplete/clients/',
+        ClientAutocompleteView.as_view(),
+        name='client_autocomplete',
+    ),
+    path(
+        'autocomplete/orders/',
+        OrderAutocompleteView.as_view(),
+        name='order_autocomplete',
+    ),
+    path(
+        'autocomplete/services/',
+        ServiceAutocompleteView.as_view(),
+        name='service_autocomplete',
+    ),
     path(
         'about/',
         AboutView.as_view(),
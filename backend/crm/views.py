@@ -1,40 +1,65 @@
 """Представления для CRM проекта."""
 
-from contextlib import suppress
+from operator import attrgetter
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import Paginator
 from django.db.models import Count, Prefetch, Q
-from django.db.models.deletion import ProtectedError
-from django.shortcuts import redirect
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
 
+from .archive import ArchiveUnion, include_archive, total_duty
 from .base_views import (
+    BaseAutocompleteView,
     BaseCreateView,
     BaseDeleteView,
     BaseDetailView,
     BaseListView,
     BaseUpdateView,
 )
+from .catalog import get_catalog
 from .constants import (
+    ORDER_CODE_PREFIX,
     ORDERS_LIMIT_ON_HOMEPAGE,
+    QUANTITY_ON_PAGE,
     SERVICES_LIMIT_ON_PAGE,
 )
+from .date_filters import created_range
 from .forms import (
     ClientForm,
     OrderForm,
     PurchaseForm,
     ServiceForm,
+    order_label,
+    service_label,
 )
+from .jobs import enqueue, job_title
+from .mixins import BatchDeleteMixin
 from .models import (
-    Category,
+    ArchivedOrder,
+    ArchivedPurchase,
+    ArchivedServiceLine,
     Client,
     EntityType,
+    Job,
+    JobStatus,
     Order,
     OrderStatus,
     Purchase,
     Service,
+    ServiceInOrder,
+    Store,
+)
+from .order_filters import filter_orders
+from .tasks import (
+    EXPORT_ORDERS,
+    MAINTENANCE_JOBS,
+    export_dedup_key,
+    export_filters,
+    export_storage,
 )
 
 
@@ -114,24 +139,51 @@ class ClientCreateView(BaseCreateView):
 
 
 class ClientDetailView(BaseDetailView):
-    """Класс просмотра клиента."""
+    """Класс просмотра клиента.
+
+    История заказов выводится постранично (параметр page): на странице
+    QUANTITY_ON_PAGE заказов со строками услуг и покупками, загруженными
+    двумя запросами на всю страницу. Баланс клиента считается в БД одним
+    агрегатом, число заказов берётся из пагинатора. С ?archive=1 в историю
+    входят и архивные заказы (crm.archive).
+    """
 
     model = Client
     template_name = 'crm/clients/detail.html'
     context_object_name = 'client'
 
-    def get_queryset(self):
-        """Оптимизирует запросы для страницы детального просмотра клиента."""
-        return (
-            super()
-            .get_queryset()
-            .prefetch_related(
-                Prefetch(
-                    'orders__purchases',
-                    queryset=Purchase.objects.order_by('-id'),
-                )
+    def get_context_data(self, **kwargs):
+        """Добавляет страницу заказов клиента и его баланс."""
+        context = super().get_context_data(**kwargs)
+        orders = Order.objects.filter(client=self.object).prefetch_related(
+            Prefetch(
+                'service_lines',
+                queryset=ServiceInOrder.objects.select_related('service'),
+            ),
+            Prefetch('purchases', queryset=Purchase.objects.order_by('-id')),
+        )
+        context['include_archive'] = include_archive(self.request.GET)
+        if context['include_archive']:
+            orders = ArchiveUnion(
+                orders,
+                self.object.archived_orders.prefetch_related(
+                    Prefetch(
+                        'service_lines',
+                        queryset=ArchivedServiceLine.objects.select_related(
+                            'service'
+                        ),
+                    ),
+                    'purchases',
+                ),
             )
+        page_obj = Paginator(orders, QUANTITY_ON_PAGE).get_page(
+            self.request.GET.get('page')
         )
+        context['page_obj'] = page_obj
+        context['orders'] = page_obj.object_list
+        context['orders_count'] = page_obj.paginator.count
+        context['total_duty'] = self.object.total_duty
+        return context
 
 
 class ClientUpdateView(BaseUpdateView):
@@ -146,26 +198,21 @@ class ClientUpdateView(BaseUpdateView):
         return reverse_lazy('client_detail', kwargs={'pk': self.object.pk})
 
 
-class ClientDeleteView(BaseDeleteView):
-    """Класс удаления клиента."""
+class ClientDeleteView(BatchDeleteMixin, BaseDeleteView):
+    """Класс удаления клиента.
+
+    Заказы крупного клиента удаляются в фоне пачками (BatchDeleteMixin).
+    """
 
     model = Client
     template_name = 'crm/clients/delete.html'
     context_object_name = 'client'
     success_url = reverse_lazy('client_list')
+    background_message = 'Клиент и его заказы удаляются в фоне.'
 
     def get_queryset(self):
-        """Оптимизирует запросы для страницы подтверждения удаления клиента."""
-        return (
-            super()
-            .get_queryset()
-            .prefetch_related(
-                Prefetch(
-                    'orders__purchases',
-                    queryset=Purchase.objects.order_by('-id'),
-                )
-            )
-        )
+        """Клиент с числом заказов для страницы подтверждения удаления."""
+        return super().get_queryset().annotate(orders_count=Count('orders'))
 
 
 class ServiceListView(BaseListView):
@@ -177,34 +224,29 @@ class ServiceListView(BaseListView):
     context_object_name = 'services'
 
     def get_queryset(self):
-        """Возвращает QuerySet услуг с фильтрацией по категории и поиску.
+        """Возвращает услуги из кеша каталога с фильтрами.
 
         Метод выполняет:
-        1. Базовый запрос с оптимизацией (select_related)
+        1. Выборку услуг из каталога (crm.catalog) без запросов к БД
         2. Фильтрацию по категории (если указана в параметрах GET)
-        3. Поиск по названию услуги (если указан поисковый запрос)
+        3. Поиск по названию услуги без учёта регистра
         """
-        qs = Service.objects.select_related('category').order_by(
-            'service_name'
+        self.catalog = get_catalog()
+        services = self.catalog.search(
+            term=(self.request.GET.get('search') or '').strip(),
+            category_slug=(self.request.GET.get('category') or '').strip(),
         )
-        category = (self.request.GET.get('category') or '').strip()
-        if category:
-            qs = qs.filter(category__slug=category)
-        search = (self.request.GET.get('search') or '').strip()
-        if search:
-            qs = qs.filter(Q(service_name__icontains=search))
-
-        return qs
+        return sorted(services, key=attrgetter('service_name'))
 
     def get_context_data(self, **kwargs):
         """Добавляет дополнительные данные в контекст шаблона.
 
         Метод расширяет базовый контекст:
-        1. Список всех категорий для фильтрации
+        1. Список всех категорий для фильтрации (из кеша каталога)
         2. Текущие значения фильтров для сохранения состояния формы
         """
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.order_by('title')
+        context['categories'] = self.catalog.categories
         context['current_filters'] = {
             'category': self.request.GET.get('category', ''),
             'search': self.request.GET.get('search', ''),
@@ -233,25 +275,14 @@ class ServiceUpdateView(BaseUpdateView):
         return reverse_lazy('service_list')
 
 
-class ServiceDeleteView(BaseDeleteView):
-    """Класс удаления услуги."""
+class ServiceDeleteView(BatchDeleteMixin, BaseDeleteView):
+    """Класс удаления услуги (нельзя, пока она есть в заказах)."""
 
     model = Service
     template_name = 'crm/services/delete.html'
     context_object_name = 'service'
     success_url = reverse_lazy('service_list')
-
-    def post(self, request, *args, **kwargs):
-        """Обрабатывает POST-запрос на удаление услуги."""
-        self.object = self.get_object()
-        try:
-            return super().post(request, *args, **kwargs)
-        except ProtectedError:
-            messages.error(
-                request,
-                'Нельзя удалить услугу: она используется в заказах.',
-            )
-            return redirect('service_list')
+    protected_message = 'Нельзя удалить услугу: она используется в заказах.'
 
 
 class OrderListView(BaseListView):
@@ -263,7 +294,9 @@ class OrderListView(BaseListView):
     - диапазону дат создания
     - текстовому поиску по различным полям
 
-    Также включает статистическую информацию по заказам.
+    Также включает статистическую информацию по заказам. По умолчанию
+    читаются только рабочие заказы; с ?archive=1 — и архивные
+    (crm.archive), теми же фильтрами.
     """
 
     model = Order
@@ -276,43 +309,33 @@ class OrderListView(BaseListView):
         Поддерживает фильтрацию по следующим параметрам:
         - status: статус заказа (из OrderStatus)
         - entity_type: тип клиента (FL/UL)
-        - date_from/date_to: диапазон дат создания заказа
+        - date_from/date_to: диапазон дат создания заказа (включительно,
+          по индексу create — см. crm.date_filters)
         - search: текстовый поиск по полям клиента, оборудования и деталям
+          или номеру заказа; код с префиксом (TN-00123, TN-001) ищется
+          только по индексу number — точно и по началу кода
+        - archive: включить архивные заказы
 
         Возвращает:
             QuerySet: Оптимизированный и отфильтрованный список заказов
-                     с предзагрузкой связанных данных о клиентах.
+                     с предзагрузкой связанных данных о клиентах
+                     (ArchiveUnion вместе с архивом).
         """
-        queryset = (
-            Order.objects.select_related('client')
-            .prefetch_related('service_lines__service')
-            .prefetch_related('purchases')
+        queryset = self.filter_orders(Order.objects.all())
+        if not include_archive(self.request.GET):
+            return queryset
+        return ArchiveUnion(
+            queryset, self.filter_orders(ArchivedOrder.objects.all())
+        )
+
+    def filter_orders(self, queryset):
+        """Применяет фильтры из GET-параметров к заказам или архиву."""
+        return filter_orders(
+            queryset.select_related('client').prefetch_related(
+                'service_lines__service', 'purchases'
+            ),
+            self.request.GET,
         )
-        status = self.request.GET.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-        entity_type = self.request.GET.get('entity_type')
-        if entity_type:
-            queryset = queryset.filter(client__entity_type=entity_type)
-        date_from = self.request.GET.get('date_from')
-        date_to = self.request.GET.get('date_to')
-        if date_from:
-            queryset = queryset.filter(create__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(create__date__lte=date_to)
-        search = (self.request.GET.get('search') or '').strip()
-        if search:
-            q = (
-                Q(client__client_name__icontains=search)
-                | Q(client__mobile_phone__icontains=search)
-                | Q(accepted_equipment__icontains=search)
-                | Q(detail__icontains=search)
-            )
-            digits = ''.join(ch for ch in search if ch.isdigit())
-            if digits:
-                q |= Q(number=int(digits))
-            queryset = queryset.filter(q)
-        return queryset
 
     def get_context_data(self, **kwargs):
         """Расширяет контекст шаблона статистикой и данными фильтров.
@@ -326,14 +349,16 @@ class OrderListView(BaseListView):
         - Статистику по статусам заказов
         """
         context = super().get_context_data(**kwargs)
-        context['total_orders'] = Order.objects.count()
-        context['physical_amount_order'] = Order.objects.filter(
-            client__entity_type='FL'
-        ).count()
-        context['legal_amount_order'] = Order.objects.filter(
-            client__entity_type='UL'
-        ).count()
-        context['total_duty'] = Order.objects.total_duty()
+        archive = include_archive(self.request.GET)
+        stats = self.get_stats(Order.objects.all())
+        if archive:
+            archived = self.get_stats(ArchivedOrder.objects.all())
+            stats = {key: stats[key] + archived[key] for key in stats}
+        context['total_orders'] = stats.pop('total_orders')
+        context['physical_amount_order'] = stats.pop('physical_amount_order')
+        context['legal_amount_order'] = stats.pop('legal_amount_order')
+        context['status_stats'] = stats
+        context['total_duty'] = total_duty()
         context['status_choices'] = OrderStatus.choices
         context['entity_type_choices'] = EntityType.choices
         context['current_filters'] = {
@@ -342,13 +367,27 @@ class OrderListView(BaseListView):
             'date_from': self.request.GET.get('date_from', ''),
             'date_to': self.request.GET.get('date_to', ''),
             'search': self.request.GET.get('search', ''),
-        }
-        context['status_stats'] = {
-            status[0]: Order.objects.filter(status=status[0]).count()
-            for status in OrderStatus.choices
+            'archive': archive,
         }
         return context
 
+    @staticmethod
+    def get_stats(queryset) -> dict:
+        """Число заказов всего, по типам клиентов и статусам одним запросом."""
+        return queryset.aggregate(
+            total_orders=Count('id'),
+            physical_amount_order=Count(
+                'id', filter=Q(client__entity_type=EntityType.FL)
+            ),
+            legal_amount_order=Count(
+                'id', filter=Q(client__entity_type=EntityType.UL)
+            ),
+            **{
+                status: Count('id', filter=Q(status=status))
+                for status in OrderStatus.values
+            },
+        )
+
 
 class OrderCreateView(BaseCreateView):
     """Класс создания заказа."""
@@ -360,7 +399,11 @@ class OrderCreateView(BaseCreateView):
 
 
 class OrderDetailView(BaseDetailView):
-    """Класс просмотра заказа."""
+    """Класс просмотра заказа.
+
+    Заказа нет среди рабочих — ищется в архиве (id сохраняются при
+    переносе, ссылки на заказ не устаревают).
+    """
 
     model = Order
     template_name = 'crm/orders/detail.html'
@@ -373,8 +416,21 @@ class OrderDetailView(BaseDetailView):
             .get_queryset()
             .select_related('client')
             .prefetch_related('service_lines__service')
+            .with_financials()
         )
 
+    def get_object(self, queryset=None):
+        """Рабочий заказ, а если его нет — архивный."""
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            return get_object_or_404(
+                ArchivedOrder.objects.select_related('client')
+                .prefetch_related('service_lines__service')
+                .with_financials(),
+                pk=self.kwargs['pk'],
+            )
+
 
 class OrderUpdateView(BaseUpdateView):
     """Класс редактирования заказа."""
@@ -383,22 +439,34 @@ class OrderUpdateView(BaseUpdateView):
     form_class = OrderForm
     success_message = 'Данные заказа успешно обновлены!'
 
+    def get_queryset(self):
+        """Заказ с суммами услуг и покупок для полей итогов формы."""
+        return super().get_queryset().with_financials()
+
     def get_success_url(self):
         """После сохранения возвращаемся на просмотр заказа."""
         return reverse_lazy('order_detail', kwargs={'pk': self.object.pk})
 
 
-class OrderDeleteView(BaseDeleteView):
+class OrderDeleteView(BatchDeleteMixin, BaseDeleteView):
     """Класс удаления заказа."""
 
     model = Order
     template_name = 'crm/orders/delete.html'
     context_object_name = 'order'
     success_url = reverse_lazy('order_list')
+    background_message = 'Заказ удаляется в фоне.'
+
+    def get_queryset(self):
+        """Заказ с суммами услуг и покупок для карточки подтверждения."""
+        return super().get_queryset().with_financials()
 
 
 class PurchaseListView(BaseListView):
-    """Класс списка покупок запчастей."""
+    """Класс списка покупок запчастей.
+
+    С ?archive=1 в список входят и покупки архивных заказов.
+    """
 
     model = Purchase
     template_name = 'crm/purchases/list.html'
@@ -406,18 +474,35 @@ class PurchaseListView(BaseListView):
 
     def get_queryset(self):
         """Возвращает фильтрованный и отсортированный QuerySet покупок."""
-        qs = Purchase.objects.select_related('order__client').order_by('-id')
+        qs = self.filter_purchases(Purchase.objects.all())
+        if not include_archive(self.request.GET):
+            return qs
+        return ArchiveUnion(
+            qs, self.filter_purchases(ArchivedPurchase.objects.all())
+        )
+
+    def filter_purchases(self, qs):
+        """Применяет фильтры из GET-параметров к покупкам или архиву."""
+        qs = qs.select_related('order__client').order_by('-id')
         store = (self.request.GET.get('store') or '').strip()
         if store:
             qs = qs.filter(store=store)
+        qs = qs.filter(
+            created_range(
+                self.request.GET.get('date_from'),
+                self.request.GET.get('date_to'),
+            )
+        )
         search = (self.request.GET.get('search') or '').strip()
         if not search:
             return qs
+        code_q = Order.code_search(search, field='order__number')
+        if code_q is not None:
+            return qs.filter(code_q)
         q = Q(detail__icontains=search)
-        digits = ''.join(ch for ch in search if ch.isdigit())
-        if digits:
-            with suppress(ValueError):
-                q |= Q(order__number=int(digits))
+        number = Order.parse_code(search)
+        if number is not None:
+            q |= Q(order__number=number)
         return qs.filter(q)
 
     def get_context_data(self, **kwargs):
@@ -427,27 +512,33 @@ class PurchaseListView(BaseListView):
         статистики и текущих параметров запроса.
         """
         context = super().get_context_data(**kwargs)
-        qs = self.get_queryset()
+        archive = include_archive(self.request.GET)
+        querysets = [self.filter_purchases(Purchase.objects.all())]
+        if archive:
+            querysets.append(
+                self.filter_purchases(ArchivedPurchase.objects.all())
+            )
 
-        context['stores'] = (
-            Purchase.objects.values_list('store', flat=True)
-            .distinct()
-            .order_by('store')
-        )
+        context['stores'] = Store.objects.filter_names()
         context['current_filters'] = {
             'store': self.request.GET.get('store', ''),
+            'date_from': self.request.GET.get('date_from', ''),
+            'date_to': self.request.GET.get('date_to', ''),
             'search': self.request.GET.get('search', ''),
+            'archive': archive,
         }
-        context['total_purchases'] = qs.count()
-        context['physical_amount_purchase'] = qs.filter(
-            order__client__entity_type='FL'
-        ).count()
-        context['legal_amount_purchase'] = qs.filter(
-            order__client__entity_type='UL'
-        ).count()
-        context['without_order_purchase'] = qs.filter(
-            order__isnull=True
-        ).count()
+        context['total_purchases'] = sum(qs.count() for qs in querysets)
+        context['physical_amount_purchase'] = sum(
+            qs.filter(order__client__entity_type='FL').count()
+            for qs in querysets
+        )
+        context['legal_amount_purchase'] = sum(
+            qs.filter(order__client__entity_type='UL').count()
+            for qs in querysets
+        )
+        context['without_order_purchase'] = (
+            querysets[0].filter(order__isnull=True).count()
+        )
         return context
 
 
@@ -461,12 +552,22 @@ class PurchaseCreateView(BaseCreateView):
 
 
 class PurchaseDetailView(BaseDetailView):
-    """Класс просмотра покупки запчасти."""
+    """Класс просмотра покупки запчасти (рабочей или архивной)."""
 
     model = Purchase
     template_name = 'crm/purchases/detail.html'
     context_object_name = 'purchase'
 
+    def get_object(self, queryset=None):
+        """Рабочая покупка, а если её нет — архивная."""
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            return get_object_or_404(
+                ArchivedPurchase.objects.select_related('order'),
+                pk=self.kwargs['pk'],
+            )
+
 
 class PurchaseUpdateView(BaseUpdateView):
     """Класс редактирования покупки запчасти."""
@@ -509,13 +610,151 @@ class HomeView(LoginRequiredMixin, TemplateView):
         context['active_orders_count'] = Order.objects.exclude(
             status__in=[OrderStatus.COMPLETED, OrderStatus.NOT_RELEVANT]
         ).count()
-        context['total_duty'] = Order.objects.total_duty()
-        context['recent_orders'] = Order.objects.select_related(
-            'client'
-        ).order_by('-create')[:ORDERS_LIMIT_ON_HOMEPAGE]
+        context['total_duty'] = total_duty()
+        context['recent_orders'] = (
+            Order.objects.select_related('client')
+            .with_financials()
+            .order_by('-create')[:ORDERS_LIMIT_ON_HOMEPAGE]
+        )
+        return context
+
+
+class ClientAutocompleteView(BaseAutocompleteView):
+    """Автодополнение клиента в форме заказа.
+
+    Телефон с кодом страны (+7..., 8..., 7...) ищется по началу номера
+    (уникальный индекс mobile_phone), иначе — по имени и компании.
+    """
+
+    def get_queryset(self, term):  # noqa: PLR6301
+        """Клиенты, новые сначала."""
+        queryset = Client.objects.order_by('-id')
+        if not term:
+            return queryset
+        digits = ''.join(ch for ch in term if ch.isdigit())
+        if digits and not term.strip('+0123456789 ()-'):
+            if term.startswith('+7') or digits[0] in '78':
+                return queryset.filter(
+                    mobile_phone__startswith=f'+7{digits[1:]}'
+                )
+            return queryset.filter(mobile_phone__contains=digits)
+        return queryset.filter(
+            Q(client_name__icontains=term) | Q(company__icontains=term)
+        )
+
+
+class OrderAutocompleteView(BaseAutocompleteView):
+    """Автодополнение заказа в форме покупки.
+
+    Номер или код (101, TN-001) ищется по индексу number точно и по
+    началу кода, иначе — по оборудованию и имени клиента.
+    """
+
+    def get_queryset(self, term):  # noqa: PLR6301
+        """Заказы с клиентами, новые сначала."""
+        queryset = Order.objects.select_related('client').order_by('-id')
+        if not term:
+            return queryset
+        code_filter = Order.code_search(
+            f'{ORDER_CODE_PREFIX}-{term}' if term.isdigit() else term
+        )
+        if code_filter is not None:
+            return queryset.filter(code_filter)
+        return queryset.filter(
+            Q(accepted_equipment__icontains=term)
+            | Q(client__client_name__icontains=term)
+        )
+
+    def get_label(self, obj):  # noqa: PLR6301
+        """Код заказа и клиент."""
+        return order_label(obj)
+
+
+class ServiceAutocompleteView(BaseAutocompleteView):
+    """Автодополнение услуг в форме заказа (поиск по названию)."""
+
+    # сессия + пользователь + сборка каталога при смене его версии
+    query_budget = 4
+
+    def get_queryset(self, term):  # noqa: PLR6301
+        """Услуги из кеша каталога по категориям и названию."""
+        return get_catalog().search(term)
+
+    def get_label(self, obj):  # noqa: PLR6301
+        """Название и цена услуги."""
+        return service_label(obj)
+
+
+class OrderExportView(LoginRequiredMixin, View):
+    """Ставит экспорт заказов в CSV в очередь и сразу отвечает.
+
+    Фильтры берутся из GET-параметров списка заказов; файл готовит
+    воркер (crm.tasks.export_orders), ход виден на странице задачи.
+    """
+
+    def post(self, request, *args, **kwargs):  # noqa: PLR6301
+        """Создаёт задачу экспорта (или находит такую же в работе)."""
+        filters = export_filters(request.GET)
+        job = enqueue(
+            EXPORT_ORDERS,
+            {'filters': filters},
+            dedup_key=export_dedup_key(filters),
+        )
+        messages.info(request, 'Экспорт поставлен в очередь.')
+        return redirect('job_detail', pk=job.pk)
+
+
+class JobListView(BaseListView):
+    """Список фоновых задач с ходом выполнения."""
+
+    model = Job
+    template_name = 'crm/jobs/list.html'
+    context_object_name = 'jobs'
+
+    def get_context_data(self, **kwargs):
+        """Добавляет задачи обслуживания, доступные для запуска."""
+        context = super().get_context_data(**kwargs)
+        context['maintenance_jobs'] = [
+            (name, job_title(name)) for name in MAINTENANCE_JOBS
+        ]
         return context
 
 
+class JobDetailView(BaseDetailView):
+    """Страница задачи: состояние, ход выполнения, результат."""
+
+    model = Job
+    template_name = 'crm/jobs/detail.html'
+    context_object_name = 'job'
+
+
+class JobStartView(LoginRequiredMixin, View):
+    """Запуск задачи обслуживания со страницы задач."""
+
+    def post(self, request, name, *args, **kwargs):  # noqa: PLR6301
+        """Ставит задачу в очередь, если такая ещё не выполняется."""
+        if name not in MAINTENANCE_JOBS:
+            raise Http404
+        job = enqueue(name, dedup_key=name)
+        messages.info(request, f'Задача «{job_title(name)}» в очереди.')
+        return redirect('job_detail', pk=job.pk)
+
+
+class JobDownloadView(LoginRequiredMixin, View):
+    """Скачивание файла, подготовленного задачей экспорта."""
+
+    def get(self, request, pk, *args, **kwargs):  # noqa: PLR6301
+        """Отдаёт файл выполненной задачи."""
+        job = get_object_or_404(Job, pk=pk, status=JobStatus.DONE)
+        name = (job.result or {}).get('file')
+        storage = export_storage()
+        if not name or not storage.exists(name):
+            raise Http404
+        return FileResponse(
+            storage.open(name, 'rb'), as_attachment=True, filename=name
+        )
+
+
 class AboutView(LoginRequiredMixin, TemplateView):
     """Класс страницы 'О сервисе'."""
 
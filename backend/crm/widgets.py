@@ -0,0 +1,86 @@
+"""Виджеты форм CRM.
+
+Виджеты автодополнения рендерят в <select> только выбранные варианты,
+остальные Select2 подгружает постранично из JSON-эндпоинта
+(crm.views.BaseAutocompleteView). Queryset поля при этом не
+перебирается целиком, а валидация ModelChoiceField по-прежнему
+принимает только существующие id из него.
+"""
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
+
+from .catalog import get_catalog
+
+
+class AutocompleteMixin:
+    """Общая часть виджетов автодополнения."""
+
+    def __init__(self, url_name: str, attrs=None):
+        """url_name — имя маршрута JSON-эндпоинта автодополнения."""
+        super().__init__(attrs)
+        self.url = reverse_lazy(url_name)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        """Добавляет адрес эндпоинта для Select2."""
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = str(self.url)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Варианты только для выбранных значений (один запрос)."""
+        selected = {str(item) for item in value if item not in {None, ''}}
+        options = []
+        if not self.allow_multiple_selected:
+            options.append(
+                self.create_option(name, '', '', not selected, 0, attrs=attrs)
+            )
+        if selected:
+            choices = self.choices
+            for obj in self.selected_objects(selected):
+                option_value, label = choices.choice(obj)
+                options.append(
+                    self.create_option(
+                        name,
+                        option_value,
+                        label,
+                        True,
+                        len(options),
+                        attrs=attrs,
+                    )
+                )
+        return [(None, options, 0)]
+
+    def selected_pks(self, selected):
+        """Строковые pk, приведённые к типу pk; некорректные пропускаются."""
+        pk_field = self.choices.queryset.model._meta.pk
+        pks = []
+        for value in selected:
+            try:
+                pks.append(pk_field.to_python(value))
+            except ValidationError:
+                continue
+        return pks
+
+    def selected_objects(self, selected):
+        """Выбранные объекты по строковым pk."""
+        return self.choices.queryset.filter(pk__in=self.selected_pks(selected))
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    """Выбор одного объекта с поиском на сервере."""
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    """Выбор нескольких объектов с поиском на сервере."""
+
+
+class CatalogServicesSelect(AutocompleteSelectMultiple):
+    """Выбор услуг: выбранные берутся из кеша каталога, без запроса."""
+
+    def selected_objects(self, selected):
+        """Выбранные услуги из каталога (crm.catalog)."""
+        catalog = get_catalog()
+        services = (catalog.service(pk) for pk in self.selected_pks(selected))
+        return [service.as_model() for service in services if service]
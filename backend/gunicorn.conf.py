@@ -0,0 +1,67 @@
+"""Конфигурация gunicorn (читается из рабочего каталога автоматически).
+
+Режим задаёт GUNICORN_MODE:
+- gthread (по умолчанию) — процессы-воркеры с пулом потоков: медленный
+  запрос (экспорт, тяжёлый поиск) занимает один поток, а не весь сайт;
+- sync — однопоточные воркеры (прежнее поведение, для сравнения);
+- asgi — tech_support.asgi под воркерами uvicorn (пакет uvicorn-worker):
+  для асинхронных представлений; синхронные Django выполняет в потоке.
+
+Число воркеров и потоков считается по числу CPU и переопределяется
+GUNICORN_WORKERS и GUNICORN_THREADS. Приложение загружается до fork
+(preload_app): воркеры стартуют быстро и делят память мастера
+(copy-on-write). Воркер перезапускается после max_requests запросов (с
+разбросом, чтобы не все сразу), зависший — через timeout; при остановке
+текущие запросы дорабатывают graceful_timeout секунд.
+
+Сравнение режимов под нагрузкой: manage.py run_load_test --server sync
+gthread asgi.
+"""
+
+import multiprocessing
+import os
+
+MODES = ('sync', 'gthread', 'asgi')
+mode = os.getenv('GUNICORN_MODE', 'gthread')
+if mode not in MODES:
+    raise ValueError(  # noqa: TRY003
+        f'GUNICORN_MODE: одно из {MODES}, получено {mode!r}'
+    )
+
+cpu_count = multiprocessing.cpu_count()
+
+wsgi_app = (
+    'tech_support.asgi:application'
+    if mode == 'asgi'
+    else 'tech_support.wsgi:application'
+)
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Потоки ждут БД и сеть, поэтому процессов меньше классических 2*CPU+1.
+workers = int(os.getenv('GUNICORN_WORKERS', str(cpu_count + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '4')) if mode == 'gthread' else 1
+worker_class = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'asgi': 'uvicorn_worker.UvicornWorker',
+}[mode]
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Отметки жизни воркеров в памяти, а не на диске контейнера.
+SHM_DIR = '/dev/shm'  # noqa: S108
+worker_tmp_dir = SHM_DIR if os.path.isdir(SHM_DIR) else None
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Воркер не наследует соединения с БД, открытые мастером при загрузке."""
+    from django.db import connections  # noqa: PLC0415
+
+    connections.close_all()
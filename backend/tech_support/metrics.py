@@ -0,0 +1,543 @@
+"""Метрики запросов: время, запросы к БД, N+1 и обращения к кешу.
+
+Содержит:
+- QueryMetricsMiddleware — для каждого запроса замеряет время ответа,
+  число и суммарное время SQL-запросов, обращения к кешу, а для части
+  запросов (METRICS_SAMPLE_RATE) — сигнатуры SQL, по которым считаются
+  повторяющиеся запросы (признак N+1). Итоги копятся по имени view
+  в registry и, если включено, отдаются заголовком Server-Timing;
+- metrics_view — выдача накопленных метрик в текстовом формате
+  Prometheus (GET /metrics);
+- track_queries — контекстный менеджер подсчёта запросов вне middleware;
+- InstrumentedLocMemCache — LocMemCache, учитывающий попадания и промахи;
+- бюджеты запросов: атрибут query_budget у view; при
+  METRICS_ENFORCE_BUDGETS (в тестах) превышение бюджета — ошибка
+  QueryBudgetExceeded;
+- соединения с БД: число открытых соединений по алиасам (сигнал
+  connection_created) и, при пуле psycopg, его заполненность и время
+  ожидания свободного соединения (pool_stats).
+
+Метрики хранятся в памяти процесса: при нескольких воркерах каждый
+отдаёт свои значения, Prometheus суммирует их по instance.
+"""
+
+import hmac
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+UNRESOLVED_VIEW = '<unresolved>'
+DUPLICATES_IN_ERROR = 5  # сколько повторяющихся SQL показать в ошибке
+
+_current_stats = ContextVar('request_stats', default=None)
+_MISSING = object()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """View выполнила больше SQL-запросов, чем заявлено в query_budget."""
+
+
+class RequestStats:
+    """Счётчики одного запроса; сам объект — execute_wrapper для БД."""
+
+    __slots__ = (
+        'cache_hits',
+        'cache_misses',
+        'db_time',
+        'queries',
+        'signatures',
+    )
+
+    def __init__(self, detailed=False):
+        """Создаёт счётчики; detailed — запоминать сигнатуры SQL."""
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.signatures = Counter() if detailed else None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполняет SQL-запрос, учитывая его время и сигнатуру."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            if self.signatures is not None:
+                # Параметры передаются отдельно, поэтому текст SQL с %s
+                # одинаков для повторов одного запроса с разными id.
+                self.signatures[sql] += 1
+
+    @property
+    def duplicates(self) -> int:
+        """Число повторных выполнений одинаковых SQL (0 без сэмпла)."""
+        if not self.signatures:
+            return 0
+        return sum(count - 1 for count in self.signatures.values())
+
+    def top_duplicates(self, limit=DUPLICATES_IN_ERROR):
+        """Самые частые повторяющиеся SQL: [(sql, количество), ...]."""
+        if not self.signatures:
+            return []
+        return [
+            (sql, count)
+            for sql, count in self.signatures.most_common(limit)
+            if count > 1
+        ]
+
+
+@contextmanager
+def track_queries(detailed=False):
+    """Считает SQL-запросы и обращения к кешу внутри блока.
+
+    Подключает RequestStats ко всем соединениям БД через
+    connection.execute_wrapper и делает его текущим для учёта кеша.
+    """
+    stats = RequestStats(detailed)
+    token = _current_stats.set(stats)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def record_cache_lookup(hits: int, misses: int):
+    """Учитывает обращения к кешу в текущем запросе (если он замеряется)."""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class InstrumentedCacheMixin:
+    """Учёт попаданий и промахов кеша в метриках запроса.
+
+    get_many у LocMemCache и FileBasedCache реализован через get, поэтому
+    учитывается тоже.
+    """
+
+    def get(self, key, default=None, version=None):
+        """Возвращает значение из кеша и учитывает попадание/промах."""
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            record_cache_lookup(0, 1)
+            return default
+        record_cache_lookup(1, 0)
+        return value
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    """LocMemCache (свой у каждого процесса) с учётом в метриках."""
+
+
+class InstrumentedFileBasedCache(InstrumentedCacheMixin, FileBasedCache):
+    """FileBasedCache (общий для воркеров на одном хосте) с метриками."""
+
+
+class ViewMetrics:
+    """Накопленные метрики одной view."""
+
+    __slots__ = (
+        'buckets',
+        'cache_hits',
+        'cache_misses',
+        'db_time',
+        'duplicates',
+        'queries',
+        'requests',
+        'sampled',
+        'wall_time',
+    )
+
+    def __init__(self):
+        """Создаёт нулевые счётчики."""
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.requests = 0
+        self.wall_time = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.sampled = 0
+        self.duplicates = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class MetricsRegistry:
+    """Потокобезопасное хранилище метрик по именам view."""
+
+    def __init__(self):
+        """Создаёт пустое хранилище."""
+        self._lock = threading.Lock()
+        self._views = {}
+        self._connections = Counter()
+
+    def connection_opened(self, alias: str):
+        """Учитывает новое соединение с БД (или выдачу из пула)."""
+        with self._lock:
+            self._connections[alias] += 1
+
+    def observe(self, view: str, wall_time: float, stats: RequestStats):
+        """Учитывает один обработанный запрос."""
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if wall_time <= bound:
+                    metrics.buckets[index] += 1
+            metrics.requests += 1
+            metrics.wall_time += wall_time
+            metrics.queries += stats.queries
+            metrics.db_time += stats.db_time
+            metrics.cache_hits += stats.cache_hits
+            metrics.cache_misses += stats.cache_misses
+            if stats.signatures is not None:
+                metrics.sampled += 1
+                metrics.duplicates += stats.duplicates
+
+    def reset(self):
+        """Очищает накопленные метрики."""
+        with self._lock:
+            self._views.clear()
+            self._connections.clear()
+
+    def render(self) -> str:
+        """Возвращает метрики в текстовом формате Prometheus."""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                '# HELP django_http_request_duration_seconds '
+                'Время обработки запроса.',
+                '# TYPE django_http_request_duration_seconds histogram',
+            ]
+            for view, metrics in views:
+                label = _label(view)
+                for bound, count in zip(
+                    DURATION_BUCKETS, metrics.buckets, strict=True
+                ):
+                    lines.append(
+                        'django_http_request_duration_seconds_bucket'
+                        f'{{view="{label}",le="{bound}"}} {count}'
+                    )
+                lines.extend(
+                    (
+                        'django_http_request_duration_seconds_bucket'
+                        f'{{view="{label}",le="+Inf"}} {metrics.requests}',
+                        'django_http_request_duration_seconds_sum'
+                        f'{{view="{label}"}} {metrics.wall_time:.6f}',
+                        'django_http_request_duration_seconds_count'
+                        f'{{view="{label}"}} {metrics.requests}',
+                    )
+                )
+            for name, kind, help_text, attr in COUNTERS:
+                lines.extend(
+                    (
+                        f'# HELP {name} {help_text}',
+                        f'# TYPE {name} {kind}',
+                    )
+                )
+                lines.extend(
+                    f'{name}{{view="{_label(view)}"}} '
+                    f'{_format_value(getattr(metrics, attr))}'
+                    for view, metrics in views
+                )
+            lines.extend(
+                (
+                    '# HELP django_db_connections_opened_total '
+                    'Открытые соединения с БД (при пуле — выдачи из пула).',
+                    '# TYPE django_db_connections_opened_total counter',
+                )
+            )
+            lines.extend(
+                f'django_db_connections_opened_total'
+                f'{{alias="{_label(alias)}"}} {count}'
+                for alias, count in sorted(self._connections.items())
+            )
+        return '\n'.join(lines) + '\n'
+
+
+COUNTERS = (
+    (
+        'django_db_queries_total',
+        'counter',
+        'Число SQL-запросов.',
+        'queries',
+    ),
+    (
+        'django_db_query_duration_seconds_total',
+        'counter',
+        'Суммарное время SQL-запросов.',
+        'db_time',
+    ),
+    (
+        'django_db_sampled_requests_total',
+        'counter',
+        'Запросы с детальным сбором сигнатур SQL.',
+        'sampled',
+    ),
+    (
+        'django_db_duplicate_queries_total',
+        'counter',
+        'Повторные одинаковые SQL (N+1) в сэмплированных запросах.',
+        'duplicates',
+    ),
+    (
+        'django_cache_hits_total',
+        'counter',
+        'Попадания в кеш.',
+        'cache_hits',
+    ),
+    (
+        'django_cache_misses_total',
+        'counter',
+        'Промахи кеша.',
+        'cache_misses',
+    ),
+)
+
+# Пул psycopg (ConnectionPool.get_stats()): метрика, тип, описание, ключ,
+# множитель. Счётчики пула копятся с его создания; отсутствующий ключ — 0.
+POOL_METRICS = (
+    ('django_db_pool_max', 'gauge', 'Предел соединений пула.', 'pool_max', 1),
+    (
+        'django_db_pool_size',
+        'gauge',
+        'Открытые соединения пула.',
+        'pool_size',
+        1,
+    ),
+    (
+        'django_db_pool_available',
+        'gauge',
+        'Свободные соединения пула.',
+        'pool_available',
+        1,
+    ),
+    (
+        'django_db_pool_requests_waiting',
+        'gauge',
+        'Потоки, ждущие свободного соединения сейчас.',
+        'requests_waiting',
+        1,
+    ),
+    (
+        'django_db_pool_requests_total',
+        'counter',
+        'Запросы соединения у пула.',
+        'requests_num',
+        1,
+    ),
+    (
+        'django_db_pool_requests_queued_total',
+        'counter',
+        'Запросы соединения, ждавшие в очереди пула.',
+        'requests_queued',
+        1,
+    ),
+    (
+        'django_db_pool_requests_wait_seconds_total',
+        'counter',
+        'Суммарное ожидание соединения в очереди пула.',
+        'requests_wait_ms',
+        0.001,
+    ),
+    (
+        'django_db_pool_requests_errors_total',
+        'counter',
+        'Запросы, не дождавшиеся соединения (тайм-аут пула).',
+        'requests_errors',
+        1,
+    ),
+    (
+        'django_db_pool_connections_lost_total',
+        'counter',
+        'Соединения, отбракованные проверкой при выдаче.',
+        'connections_lost',
+        1,
+    ),
+)
+
+registry = MetricsRegistry()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    """Учитывает соединение в метриках."""
+    registry.connection_opened(connection.alias)
+
+
+def pool_stats() -> dict[str, dict]:
+    """Статистика пулов psycopg по алиасам БД, у которых включён пул."""
+    return {
+        connection.alias: connection.pool.get_stats()
+        for connection in connections.all()
+        if connection.settings_dict['OPTIONS'].get('pool')
+    }
+
+
+def render_pool_metrics(stats: dict[str, dict]) -> str:
+    """Метрики пулов в текстовом формате Prometheus."""
+    if not stats:
+        return ''
+    lines = []
+    for name, kind, help_text, key, scale in POOL_METRICS:
+        lines.extend((f'# HELP {name} {help_text}', f'# TYPE {name} {kind}'))
+        lines.extend(
+            f'{name}{{alias="{_label(alias)}"}} '
+            f'{_format_value(values.get(key, 0) * scale)}'
+            for alias, values in sorted(stats.items())
+        )
+    # Заполненность: доля предела пула, занятая запросами.
+    lines.extend(
+        (
+            '# HELP django_db_pool_usage_ratio '
+            'Доля соединений пула, выданных потокам.',
+            '# TYPE django_db_pool_usage_ratio gauge',
+        )
+    )
+    lines.extend(
+        f'django_db_pool_usage_ratio{{alias="{_label(alias)}"}} '
+        f'{pool_usage(values):.6f}'
+        for alias, values in sorted(stats.items())
+    )
+    return '\n'.join(lines) + '\n'
+
+
+def pool_usage(values: dict) -> float:
+    """Доля предела пула, занятая выданными соединениями."""
+    in_use = values.get('pool_size', 0) - values.get('pool_available', 0)
+    return in_use / max(values.get('pool_max', 0), 1)
+
+
+def _label(value: str) -> str:
+    """Экранирует значение метки Prometheus."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value) -> str:
+    """Форматирует значение счётчика."""
+    return f'{value:.6f}' if isinstance(value, float) else str(value)
+
+
+def get_view_name(request) -> str:
+    """Имя view из resolver_match (или путь к функции), иначе заглушка."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    return match.view_name or match._func_path
+
+
+def get_view_attribute(request, name: str):
+    """Атрибут name у класса или функции view запроса (или None)."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    view = (
+        getattr(func, 'cls', None) or getattr(func, 'view_class', None) or func
+    )
+    return getattr(view, name, None)
+
+
+def get_query_budget(request) -> int | None:
+    """Бюджет запросов view: атрибут query_budget у класса или функции."""
+    return get_view_attribute(request, 'query_budget')
+
+
+def format_server_timing(wall_time: float, stats: RequestStats) -> str:
+    """Значение заголовка Server-Timing для ответа."""
+    parts = [
+        f'total;dur={wall_time * 1000:.1f}',
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+    ]
+    if stats.signatures is not None:
+        parts.append(f'dup;desc="{stats.duplicates} duplicate queries"')
+    if stats.cache_hits or stats.cache_misses:
+        parts.append(
+            f'cache;desc="{stats.cache_hits} hits, '
+            f'{stats.cache_misses} misses"'
+        )
+    return ', '.join(parts)
+
+
+def check_query_budget(request, view: str, stats: RequestStats):
+    """Бросает QueryBudgetExceeded, если view превысила свой бюджет."""
+    budget = get_query_budget(request)
+    if budget is None or stats.queries <= budget:
+        return
+    duplicates = '\n'.join(
+        f'  {count}x {sql}' for sql, count in stats.top_duplicates()
+    )
+    raise QueryBudgetExceeded(
+        f'{view}: {stats.queries} SQL-запросов при бюджете {budget}'
+        + (f'\nПовторяющиеся запросы:\n{duplicates}' if duplicates else '')
+    )
+
+
+class QueryMetricsMiddleware:
+    """Собирает метрики каждого запроса по имени view.
+
+    Подсчёт запросов и времени почти бесплатен и выполняется всегда,
+    сигнатуры SQL для поиска N+1 собираются только для доли запросов
+    METRICS_SAMPLE_RATE (и для всех — при проверке бюджетов в тестах).
+    """
+
+    def __init__(self, get_response):
+        """Сохраняет следующий обработчик цепочки."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Замеряет запрос и дополняет ответ заголовком Server-Timing."""
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        enforce = settings.METRICS_ENFORCE_BUDGETS
+        sample = random.random() < settings.METRICS_SAMPLE_RATE  # noqa: S311
+        detailed = enforce or sample
+        started = time.perf_counter()
+        with track_queries(detailed) as stats:
+            response = self.get_response(request)
+        wall_time = time.perf_counter() - started
+        view = get_view_name(request)
+        registry.observe(view, wall_time, stats)
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = format_server_timing(wall_time, stats)
+        if enforce:
+            check_query_budget(request, view, stats)
+        return response
+
+
+def metrics_view(request):
+    """Отдаёт метрики в формате Prometheus.
+
+    Доступ: по заголовку Authorization: Bearer <METRICS_TOKEN> или
+    сотруднику (is_staff) с активной сессией.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    if not (
+        (token and hmac.compare_digest(header, f'Bearer {token}'))
+        or request.user.is_staff
+    ):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render() + render_pool_metrics(pool_stats()),
+        content_type=PROMETHEUS_CONTENT_TYPE,
+    )
@@ -63,13 +63,18 @@ if DEBUG:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "db.sqlite3",
+            # SQLITE_PATH — другой файл БД (gunicorn в run_load_test).
+            "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
         }
     }
 else:
     # === ПРОДАКШН СЕРВЕР ===
     # Получаем SECRET_KEY из переменных окружения
     SECRET_KEY = env_required("SECRET_KEY")
+    # Соединения с PostgreSQL: постоянные (DB_CONN_MAX_AGE секунд, с
+    # проверкой перед первым запросом) или пул psycopg (DB_POOL=True,
+    # размер — на процесс gunicorn, не меньше GUNICORN_THREADS).
+    DB_POOL = os.getenv("DB_POOL", "False") == "True"
     # Используется PostgreSQL для надёжности и производительности
     DATABASES = {
         "default": {
@@ -79,6 +84,31 @@ else:
             "PASSWORD": env_required("POSTGRES_PASSWORD"),
             "HOST": os.getenv("POSTGRES_HOST", "db"),
             "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            # С пулом соединение возвращается в пул после каждого запроса.
+            "CONN_MAX_AGE": (
+                0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "60"))
+            ),
+            "CONN_HEALTH_CHECKS": (
+                os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True"
+            ),
+            "OPTIONS": (
+                {
+                    "pool": {
+                        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "4")),
+                        # Сколько секунд ждать свободного соединения.
+                        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                        "max_idle": float(
+                            os.getenv("DB_POOL_MAX_IDLE", "300")
+                        ),
+                        "max_lifetime": float(
+                            os.getenv("DB_POOL_MAX_LIFETIME", "1800")
+                        ),
+                    }
+                }
+                if DB_POOL
+                else {}
+            ),
         }
     }
 
@@ -113,6 +143,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tech_support.metrics.QueryMetricsMiddleware',
+    'tech_support.slow_queries.SlowQueryMiddleware',
+    'tech_support.statement_timeouts.StatementTimeoutMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -123,6 +156,125 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Каталог файлового кеша, общего для воркеров gunicorn и воркера задач
+# (версия каталога услуг crm.catalog, список магазинов и др.). В продакшене
+# по умолчанию backend/cache (в Docker — общий том); пустое значение —
+# LocMemCache, свой у каждого процесса: только для разработки и тестов.
+CACHE_LOCATION = os.getenv(
+    'CACHE_LOCATION', '' if DEBUG else str(BASE_DIR / 'cache')
+)
+CACHES = {
+    'default': (
+        {
+            'BACKEND': 'tech_support.metrics.InstrumentedFileBasedCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+        if CACHE_LOCATION
+        else {'BACKEND': 'tech_support.metrics.InstrumentedLocMemCache'}
+    ),
+}
+
+# Метрики запросов (tech_support.metrics): время, SQL, N+1, кеш.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+# Доля запросов с детальным сбором сигнатур SQL (поиск N+1).
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '0.05'))
+METRICS_SERVER_TIMING = (
+    os.getenv('METRICS_SERVER_TIMING', str(DEBUG)) == 'True'
+)
+# Токен для GET /metrics (Authorization: Bearer <токен>).
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Превышение query_budget у view — ошибка (включается в тестах).
+METRICS_ENFORCE_BUDGETS = (
+    os.getenv('METRICS_ENFORCE_BUDGETS', 'False') == 'True'
+)
+
+# Журнал медленных SQL (tech_support.slow_queries).
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'True') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+# Доля медленных SELECT, для которых сохраняется EXPLAIN.
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(
+    os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.2')
+)
+
+# Ограничение времени SQL-запроса (tech_support.statement_timeouts, только
+# PostgreSQL), мс, 0 — без ограничения: HTTP-запросы (атрибут
+# statement_timeout у view переопределяет), фоновые задачи и экспорт.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '5000'))
+JOB_STATEMENT_TIMEOUT_MS = int(os.getenv('JOB_STATEMENT_TIMEOUT_MS', '60000'))
+EXPORT_STATEMENT_TIMEOUT_MS = int(
+    os.getenv('EXPORT_STATEMENT_TIMEOUT_MS', '600000')
+)
+
+# Архив закрытых заказов (crm.archive, команда archive_orders): возраст
+# в днях, после которого заказ переносится, и размер пачки.
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', '365'))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv('ORDER_ARCHIVE_BATCH_SIZE', '500'))
+
+# Секционирование заказов и покупок по году создания (crm.partitioning,
+# только PostgreSQL): включается до миграции 0012 или позже командой
+# partition_tables --convert; размер пачки копирования строк.
+POSTGRES_PARTITIONING = os.getenv('POSTGRES_PARTITIONING', 'False') == 'True'
+PARTITION_COPY_BATCH_SIZE = int(
+    os.getenv('PARTITION_COPY_BATCH_SIZE', '10000')
+)
+
+# Очередь фоновых задач (crm.jobs, команда run_worker): пауза опроса
+# пустой очереди (с), базовая задержка повтора (с, удваивается с каждой
+# попыткой), число попыток, срок (с) без признаков жизни, после которого
+# задача упавшего воркера возвращается в очередь, интервал (с), с которым
+# воркер подаёт признак жизни во время задачи, и каталог файлов
+# экспорта — не media: файлы с данными клиентов отдаются только после
+# входа в систему.
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', '30'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', '900'))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '60'))
+JOB_EXPORT_DIR = Path(os.getenv('JOB_EXPORT_DIR', BASE_DIR / 'exports'))
+
+# Outbox-события (GET /api/events/) выдаются, только когда старше этой
+# задержки (с): транзакция, получившая меньший id, могла закоммититься
+# позже. Гарантия доставки держится, пока любая транзакция со сменой
+# статуса коммитится не позже чем через EVENTS_VISIBILITY_DELAY после
+# записи события; событие, закоммиченное позже, может остаться за курсором
+# потребителя — такие коммиты пишутся предупреждением в логгер crm.events.
+# 0 — без задержки и без проверки (только для тестов).
+EVENTS_VISIBILITY_DELAY = float(os.getenv('EVENTS_VISIBILITY_DELAY', '10'))
+
+# Удаление клиентов и заказов (crm.deletion): строк в одной транзакции;
+# дерево больше одной пачки удаляется в фоне воркером.
+DELETE_BATCH_SIZE = int(os.getenv('DELETE_BATCH_SIZE', '500'))
+
+# Каталог создаётся при первой записи (SlowQueryFileHandler).
+LOG_DIR = BASE_DIR / 'logs'
+SLOW_QUERY_LOG_FILE = LOG_DIR / 'slow_queries.log'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json_line': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'tech_support.slow_queries.SlowQueryFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 20_000_000,  # 20 MB
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json_line',
+        },
+    },
+    'loggers': {
+        'tech_support.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
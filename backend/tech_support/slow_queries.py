@@ -0,0 +1,214 @@
+"""Журнал медленных SQL-запросов с планом выполнения.
+
+SlowQueryMiddleware подключает к соединениям БД обёртку
+connection.execute_wrapper на время запроса; вне HTTP (команды, воркеры)
+то же делает контекстный менеджер slow_query_log(). Запросы дольше
+SLOW_QUERY_THRESHOLD_MS пишутся одной JSON-строкой в логгер
+tech_support.slow_queries (ротируемый файл logs/slow_queries.log):
+длительность, SQL и параметры, отпечаток запроса, view, место вызова в
+коде проекта. Для доли медленных SELECT (SLOW_QUERY_EXPLAIN_SAMPLE_RATE)
+дополнительно сохраняется план: EXPLAIN (ANALYZE, BUFFERS) на PostgreSQL
+и EXPLAIN QUERY PLAN на SQLite. EXPLAIN ANALYZE выполняет запрос ещё раз,
+поэтому для SELECT с блокировкой строк (FOR UPDATE/SHARE/...) и с
+изменяющими данные функциями (nextval, setval) снимается только оценочный
+план без выполнения.
+
+Сводку по журналу строит команда manage.py slow_query_report. Каталог
+журнала создаёт SlowQueryFileHandler при первой записи, а не загрузка
+настроек.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from .metrics import get_view_name
+
+logger = logging.getLogger('tech_support.slow_queries')
+
+MAX_PARAM_LENGTH = 200
+MAX_CALL_SITE_DEPTH = 3
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+# Планы без выполнения запроса — для SELECT с побочными эффектами.
+PLAN_ONLY_PREFIXES = {
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+LOCKING_CLAUSE_RE = re.compile(
+    r'\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b', re.IGNORECASE
+)
+VOLATILE_CALL_RE = re.compile(r'\b(?:nextval|setval)\s*\(', re.IGNORECASE)
+PLACEHOLDER_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+WHITESPACE_RE = re.compile(r'\s+')
+THIS_FILE = Path(__file__).resolve()
+
+_current_request = ContextVar('slow_query_request', default=None)
+_explaining = ContextVar('slow_query_explaining', default=False)
+
+
+class SlowQueryFileHandler(RotatingFileHandler):
+    """Ротируемый файл журнала; каталог создаётся при первой записи."""
+
+    def _open(self):
+        """Создаёт каталог журнала, если его нет, и открывает файл."""
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+def fingerprint(sql: str) -> str:
+    """Короткий отпечаток SQL: списки IN (%s, ...) и пробелы схлопнуты."""
+    normalized = WHITESPACE_RE.sub(' ', PLACEHOLDER_LIST_RE.sub('(...)', sql))
+    return hashlib.sha1(
+        normalized.strip().encode(), usedforsecurity=False
+    ).hexdigest()[:12]
+
+
+def find_call_site() -> list[str]:
+    """Ближайшие к запросу кадры стека из кода проекта (не Django)."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        path = Path(frame.filename).resolve()
+        if path == THIS_FILE or base_dir not in path.parents:
+            continue
+        if 'site-packages' in path.parts:
+            continue
+        frames.append(
+            f'{path.relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+        )
+        if len(frames) == MAX_CALL_SITE_DEPTH:
+            break
+    return frames
+
+
+def explain_prefix(vendor: str, sql: str) -> str | None:
+    """Префикс EXPLAIN для запроса; None — план не снимается.
+
+    План снимается только для SELECT. Если повторное выполнение запроса
+    заберёт блокировки или сдвинет последовательность, EXPLAIN ANALYZE
+    заменяется оценочным планом.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    if LOCKING_CLAUSE_RE.search(sql) or VOLATILE_CALL_RE.search(sql):
+        return PLAN_ONLY_PREFIXES.get(vendor)
+    return EXPLAIN_PREFIXES.get(vendor)
+
+
+def explain(connection, sql, params) -> str | None:
+    """Возвращает план запроса или текст ошибки; None — план не снимается."""
+    prefix = explain_prefix(connection.vendor, sql)
+    if prefix is None:
+        return None
+    token = _explaining.set(True)
+    try:
+        # Savepoint: ошибка EXPLAIN не ломает транзакцию исходного запроса.
+        with (
+            transaction.atomic(using=connection.alias),
+            connection.cursor() as cursor,
+        ):
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+    finally:
+        _explaining.reset(token)
+    return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+
+
+def _format_params(params):
+    """Параметры запроса для журнала (длинные значения обрезаются)."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        params = params.values()
+    return [repr(value)[:MAX_PARAM_LENGTH] for value in params]
+
+
+class SlowQueryWrapper:
+    """execute_wrapper, записывающий медленные запросы соединения."""
+
+    def __init__(self, connection):
+        """Запоминает соединение для EXPLAIN."""
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполняет запрос и записывает его, если он медленный."""
+        if _explaining.get():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            self.record(sql, params, many, duration_ms)
+        return result
+
+    def record(self, sql, params, many, duration_ms):
+        """Пишет запись о медленном запросе в журнал."""
+        request = _current_request.get()
+        plan = None
+        if (
+            not many
+            and random.random()  # noqa: S311
+            < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+        ):
+            plan = explain(self.connection, sql, params)
+        entry = {
+            'time': datetime.now(UTC).isoformat(timespec='seconds'),
+            'duration_ms': round(duration_ms, 2),
+            'alias': self.connection.alias,
+            'vendor': self.connection.vendor,
+            'view': get_view_name(request) if request else None,
+            'path': request.path if request else None,
+            'call_site': find_call_site(),
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'params': None if many else _format_params(params),
+            'explain': plan,
+        }
+        logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def slow_query_log(request=None):
+    """Записывает медленные запросы всех соединений внутри блока."""
+    token = _current_request.set(request)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(SlowQueryWrapper(connection))
+                )
+            yield
+    finally:
+        _current_request.reset(token)
+
+
+class SlowQueryMiddleware:
+    """Включает журнал медленных запросов на время обработки запроса."""
+
+    def __init__(self, get_response):
+        """Сохраняет следующий обработчик цепочки."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Обрабатывает запрос с подключённым журналом медленных SQL."""
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            return self.get_response(request)
+        with slow_query_log(request):
+            return self.get_response(request)
@@ -0,0 +1,142 @@
+"""Ограничение времени SQL-запросов (statement_timeout PostgreSQL).
+
+Запрос дольше statement_timeout PostgreSQL отменяет (OperationalError с
+кодом 57014): тяжёлый поиск не держит поток воркера и соединение сколь
+угодно долго. Значение в миллисекундах, 0 — без ограничения:
+- HTTP-запросы — StatementTimeoutMiddleware: атрибут statement_timeout
+  у view (как query_budget), иначе DB_STATEMENT_TIMEOUT_MS;
+- фоновые задачи — crm.jobs.run_job: параметр statement_timeout
+  обработчика (экспорт — EXPORT_STATEMENT_TIMEOUT_MS), иначе
+  JOB_STATEMENT_TIMEOUT_MS;
+- прочий код — контекстный менеджер statement_timeout().
+Команды manage.py (миграции, архивация) работают без ограничения.
+
+Значение ставится set_config() перед первым запросом блока и только
+если у физического соединения оно другое: при постоянных соединениях и
+пуле лишний запрос бывает лишь при смене значения. Внутри транзакции
+значение не запоминается ни для соединения, ни обёрткой — её откат
+вернёт прежнее, поэтому set_config() повторяется перед каждым запросом
+транзакции, пока значение не будет поставлено вне её. На других СУБД
+ничего не делается.
+"""
+
+import logging
+import weakref
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+from .metrics import get_view_attribute, get_view_name
+
+logger = logging.getLogger('tech_support.statement_timeouts')
+
+SET_TIMEOUT_SQL = "SELECT set_config('statement_timeout', %s, false)"
+QUERY_CANCELED = '57014'
+
+# Значение statement_timeout, поставленное физическому соединению.
+_session_timeouts = weakref.WeakKeyDictionary()
+_current_scope = ContextVar('statement_timeout_scope', default=None)
+
+
+class TimeoutScope:
+    """Текущее ограничение блока; view может сменить его до запросов."""
+
+    __slots__ = ('timeout',)
+
+    def __init__(self, timeout: int):
+        """Запоминает ограничение в миллисекундах."""
+        self.timeout = timeout
+
+
+class StatementTimeoutWrapper:
+    """execute_wrapper, ставящий statement_timeout соединению."""
+
+    def __init__(self, connection, scope: TimeoutScope):
+        """Запоминает соединение и ограничение блока."""
+        self.connection = connection
+        self.scope = scope
+        self.applied = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Ставит ограничение, если нужно, и выполняет запрос."""
+        timeout = self.scope.timeout
+        raw = self.connection.connection
+        if self.applied != (raw, timeout):
+            if _session_timeouts.get(raw) != timeout:
+                # Сырой курсор: запрос не проходит через прочие обёртки.
+                context['cursor'].cursor.execute(
+                    SET_TIMEOUT_SQL, [str(timeout)]
+                )
+                if self.connection.in_atomic_block:
+                    # Откат транзакции или savepoint вернёт прежнее
+                    # значение: ничего не запоминаем, следующий запрос
+                    # поставит ограничение снова.
+                    _session_timeouts.pop(raw, None)
+                    return execute(sql, params, many, context)
+                _session_timeouts[raw] = timeout
+            self.applied = (raw, timeout)
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def statement_timeout(timeout: int):
+    """Ограничивает время SQL-запросов внутри блока (мс, 0 — без него)."""
+    scope = TimeoutScope(timeout)
+    token = _current_scope.set(scope)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                if connection.vendor == 'postgresql':
+                    stack.enter_context(
+                        connection.execute_wrapper(
+                            StatementTimeoutWrapper(connection, scope)
+                        )
+                    )
+            yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def current_timeout() -> int | None:
+    """Предел SQL-запроса текущего блока (мс) или None вне блока."""
+    scope = _current_scope.get()
+    return None if scope is None else scope.timeout
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    """Ошибка — запрос, отменённый по statement_timeout."""
+    cause = exc.__cause__
+    code = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+    return isinstance(exc, OperationalError) and code == QUERY_CANCELED
+
+
+class StatementTimeoutMiddleware:
+    """Ограничивает время SQL-запросов на время обработки запроса."""
+
+    def __init__(self, get_response):
+        """Сохраняет следующий обработчик цепочки."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Обрабатывает запрос с ограничением DB_STATEMENT_TIMEOUT_MS."""
+        with statement_timeout(settings.DB_STATEMENT_TIMEOUT_MS):
+            return self.get_response(request)
+
+    def process_view(self, request, *view):  # noqa: PLR6301
+        """Применяет атрибут statement_timeout view, если он задан."""
+        timeout = get_view_attribute(request, 'statement_timeout')
+        scope = _current_scope.get()
+        if timeout is not None and scope is not None:
+            scope.timeout = timeout
+
+    def process_exception(self, request, exception):  # noqa: PLR6301
+        """Пишет в журнал запросы, отменённые по statement_timeout."""
+        if is_statement_timeout(exception):
+            logger.warning(
+                '%s %s: SQL-запрос отменён по statement_timeout %s мс',
+                get_view_name(request),
+                request.path,
+                current_timeout(),
+            )
@@ -2,8 +2,8 @@
 
 Содержит:
 - инициализацию объекта bot;
-- глобальные состояния (sessions, login_state, clients_state,
-  orders_state);
+- глобальные состояния (sessions, dialogs, subscriptions) и маршрутизатор
+  текстовых сообщений router (telegram_bot.router);
 - общие вспомогательные функции для хендлеров:
   форматирование дат и заказов, проверку доступа по chat_id,
   обращение к CRMClient и вывод основных меню.
@@ -14,7 +14,12 @@ from datetime import datetime
 import requests
 from telebot import TeleBot
 
-from .config import TELEGRAM_ALLOWED_CHAT_IDS, TELEGRAM_BOT_TOKEN
+from .config import (
+    DELIVERY_MODE_WEBHOOK,
+    TELEGRAM_ALLOWED_CHAT_IDS,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_DELIVERY_MODE,
+)
 from .constants import (
     MAX_ORDERS_SHOWN,
     MAX_PURCHASES_SHOWN,
@@ -23,14 +28,22 @@ from .constants import (
 )
 from .keyboards import main_menu_keyboard
 from .logger import logger
-
-bot = TeleBot(token=TELEGRAM_BOT_TOKEN)
+from .router import DialogState, Router
+
+# В режиме webhook апдейты раскладывает собственный пул с сохранением
+# порядка внутри чата (telegram_bot.webhook), поэтому встроенный пул
+# потоков TeleBot не нужен: хендлеры выполняются в потоке-обработчике.
+bot = TeleBot(
+    token=TELEGRAM_BOT_TOKEN,
+    threaded=TELEGRAM_DELIVERY_MODE != DELIVERY_MODE_WEBHOOK,
+)
 
 # Словари для хранения состояния пользователей
 sessions = {}  # Активные сессии пользователей (chat_id -> CRMClient)
-login_state = {}  # Состояние процесса авторизации
-clients_state = {}  # Состояние поиска клиентов
-orders_state = {}  # Состояние поиска заказов
+dialogs = {}  # Этапы диалогов (chat_id -> DialogState), без записи — IDLE
+subscriptions = set()  # chat_id, получающие push-уведомления о статусах
+
+router = Router(dialogs)
 
 
 def format_iso_date(date_str: str):
@@ -145,9 +158,17 @@ def send_purchases(chat_id: int, status=None):
 
 
 def clear_dialog_states(chat_id: int):
-    """Сбрасывает состояния диалогов Клиентов и Заказов для чата."""
-    clients_state.pop(chat_id, None)
-    orders_state.pop(chat_id, None)
+    """Сбрасывает состояние диалога чата (этап IDLE)."""
+    dialogs.pop(chat_id, None)
+
+
+def set_stage(chat_id: int, stage: str) -> DialogState:
+    """Переводит диалог чата на этап stage и возвращает его состояние."""
+    state = dialogs.get(chat_id)
+    if state is None:
+        state = dialogs[chat_id] = DialogState()
+    state.advance(stage)
+    return state
 
 
 def send_orders_list(chat_id: int, orders: list[dict]):
@@ -1,10 +1,16 @@
 """Конфигурация Telegram-бота CRM, читаемая из окружения (.env).
 
 Содержит:
-- базовый URL API (API_BASE_URL);
+- базовый URL API (API_BASE_URL) и таймауты обращения к нему
+  (API_CONNECT_TIMEOUT, API_READ_TIMEOUT);
 - токен Telegram-бота (TELEGRAM_BOT_TOKEN);
 - список разрешённых chat_id (TELEGRAM_ALLOWED_CHAT_IDS),
-  используемый для ограничения доступа.
+  используемый для ограничения доступа;
+- режим доставки апдейтов (TELEGRAM_DELIVERY_MODE: polling / webhook)
+  и параметры webhook-сервера (адрес, секрет, размер пула обработчиков);
+- учётные данные и интервал опроса outbox-событий для push-уведомлений
+  (TELEGRAM_EVENTS_USERNAME, TELEGRAM_EVENTS_PASSWORD,
+  TELEGRAM_EVENTS_POLL_INTERVAL).
 
 Файл описывает только параметры окружения и не содержит бизнес-логики
 или прикладных констант бота.
@@ -19,6 +25,9 @@ load_dotenv()
 API_BASE_URL = os.getenv(
     'API_BASE_URL',
 )
+# Таймауты (секунды) на установку соединения и чтение ответа API.
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', '3.05'))
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', '10'))
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 
 allowed_ids_raw = os.getenv('TELEGRAM_ALLOWED_CHAT_IDS', '')
@@ -30,3 +39,34 @@ if allowed_ids_raw:
     }
 else:
     TELEGRAM_ALLOWED_CHAT_IDS = set()
+
+DELIVERY_MODE_POLLING = 'polling'
+DELIVERY_MODE_WEBHOOK = 'webhook'
+
+TELEGRAM_DELIVERY_MODE = os.getenv(
+    'TELEGRAM_DELIVERY_MODE', DELIVERY_MODE_POLLING
+).lower()
+
+# Публичный URL, который регистрируется в Telegram через setWebhook.
+TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL', '')
+# Секрет из заголовка X-Telegram-Bot-Api-Secret-Token.
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+# Адрес и порт локального HTTP-сервера (за nginx).
+TELEGRAM_WEBHOOK_LISTEN = os.getenv(
+    'TELEGRAM_WEBHOOK_LISTEN', '0.0.0.0'  # noqa: S104
+)
+TELEGRAM_WEBHOOK_PORT = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8443'))
+# Количество потоков-обработчиков и ёмкость очереди каждого из них.
+TELEGRAM_WEBHOOK_WORKERS = int(os.getenv('TELEGRAM_WEBHOOK_WORKERS', '4'))
+TELEGRAM_WEBHOOK_QUEUE_SIZE = int(
+    os.getenv('TELEGRAM_WEBHOOK_QUEUE_SIZE', '100')
+)
+
+# Служебный пользователь CRM, от имени которого бот читает outbox-события.
+# Если не задан, push-уведомления отключены.
+TELEGRAM_EVENTS_USERNAME = os.getenv('TELEGRAM_EVENTS_USERNAME', '')
+TELEGRAM_EVENTS_PASSWORD = os.getenv('TELEGRAM_EVENTS_PASSWORD', '')
+# Пауза (секунды) между опросами, когда новых событий нет.
+TELEGRAM_EVENTS_POLL_INTERVAL = float(
+    os.getenv('TELEGRAM_EVENTS_POLL_INTERVAL', '5')
+)
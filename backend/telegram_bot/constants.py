@@ -4,13 +4,19 @@
 соответствий для перевода системных статусов в читаемые пользователю тексты.
 
 Основные разделы:
+0. ACCESS_TOKEN_REFRESH_MARGIN, ACCESS_TOKEN_EXPIRY_SKEW - когда обновлять
+   access-токен заранее (в фоне) и когда считать его уже истёкшим
 1. ENTITY_LABELS - словарь типов клиентов (юридический/физический)
 2. HELP_TEXT - справочное сообщение для пользователей
 3. MAX_ORDERS_SHOWN, MAX_PURCHASES_SHOWN - Сколько объектов показываем максимум
 4. ORDER_STATUS_LABELS - словарь статусов заказов (системный → читаемый)
 5. PURCHASE_STATUS_LABELS - словарь статусов покупок
+6. EVENTS_* - параметры доставки push-уведомлений о смене статусов
 """
 
+ACCESS_TOKEN_REFRESH_MARGIN = 300  # фоновое обновление за 5 минут до exp
+ACCESS_TOKEN_EXPIRY_SKEW = 10  # запас на рассинхрон часов и задержку сети
+
 ENTITY_LABELS = {
     'FL': 'физ',
     'UL': 'юр',
@@ -20,7 +26,9 @@ HELP_TEXT = (
     'Справка по боту CRM:\n\n'
     '/start — запустить бот. Если вы не авторизованы, бот предложит '
     'авторизацию.\n'
-    '/help — показать это сообщение.\n\n'
+    '/help — показать это сообщение.\n'
+    '/subscribe, /unsubscribe — включить или отключить уведомления о '
+    'смене статусов заказов и покупок (после авторизации включены).\n\n'
     'Кнопки:\n'
     'Авторизация — введите логин и пароль от CRM, чтобы работать с '
     'данными.\n'
@@ -64,3 +72,9 @@ PURCHASE_STATUS_LABELS = {
 }
 
 SERVICE_BUTTONS = {'Меню', 'Авторизация', 'Клиенты', 'Заказы', 'Покупки'}
+
+EVENTS_BATCH_SIZE = 30
+EVENTS_CONSUMER = 'telegram_bot'
+EVENTS_MAX_BACKOFF = 300
+EVENTS_SEND_ATTEMPTS = 3
+EVENTS_PARKED_LIMIT = 50
@@ -3,17 +3,26 @@
 Содержит:
 - функцию get_tokens для получения JWT-токенов по логину и паролю;
 - класс CRMClient с методами для чтения клиентов, заказов и покупок;
-- обёртку над requests.Session с автоматическим обновлением access-токена
-  по refresh-токену и обработкой ошибок.
+- обёртку над requests.Session с таймаутами на каждый запрос и
+  упреждающим обновлением access-токена по refresh-токену: срок жизни
+  берётся из claim exp, обновление запускается в фоне заранее, а
+  одновременные запросы из разных потоков ждут одно общее обновление.
 """
 
+import threading
+import time
+from concurrent.futures import Future
 from http import HTTPStatus
 
+import jwt
 import requests
 
-from .config import API_BASE_URL
+from .config import API_BASE_URL, API_CONNECT_TIMEOUT, API_READ_TIMEOUT
+from .constants import ACCESS_TOKEN_EXPIRY_SKEW, ACCESS_TOKEN_REFRESH_MARGIN
 from .logger import logger
 
+REQUEST_TIMEOUT = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+
 
 class CRMClientError(RuntimeError):
     """Базовый класс для всех ошибок клиента CRM-системы."""
@@ -53,7 +62,7 @@ def get_tokens(username, password):
     """
     token_url = f'{API_BASE_URL}/api/auth/jwt/create/'
     payload = {'username': username, 'password': password}
-    response = requests.post(token_url, json=payload, timeout=5)
+    response = requests.post(token_url, json=payload, timeout=REQUEST_TIMEOUT)
     response.raise_for_status()
     data = response.json()
     return {
@@ -62,23 +71,49 @@ def get_tokens(username, password):
     }
 
 
+def token_expires_at(token: str) -> float | None:
+    """Возвращает время истечения JWT (claim exp) или None.
+
+    Подпись не проверяется: токен проверяет сервер, клиенту нужен только
+    срок жизни, чтобы обновить токен до получения 401.
+    """
+    try:
+        claims = jwt.decode(token, options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None
+    exp = claims.get('exp')
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
 class CRMClient:
     """Клиент для обращения к REST API CRM.
 
     Хранит access- и refresh-токены, использует requests.Session для
-    повторного использования соединений и автоматического обновления
-    access-токена при истечении срока действия.
+    повторного использования соединений. Access-токен обновляется заранее
+    (в фоне за ACCESS_TOKEN_REFRESH_MARGIN секунд до exp) или синхронно,
+    если он уже истёк; одновременные обновления объединяются в одно.
     """
 
-    def __init__(self, access, refresh, base_url=API_BASE_URL):
+    def __init__(
+        self,
+        access,
+        refresh,
+        base_url=API_BASE_URL,
+        timeout=REQUEST_TIMEOUT,
+    ):
         """Инициализация клиента CRM API."""
-        self.access_token = access
         self.refresh_token = refresh
         self.base_url = str(base_url).rstrip('/')
+        self.timeout = timeout
         self.session = requests.Session()
-        self.session.headers.update(
-            {'Authorization': f'Bearer {self.access_token}'}
-        )
+        self._refresh_lock = threading.Lock()
+        self._refresh_future = None
+        self._set_access(access)
+
+    def _set_access(self, access):
+        """Запоминает access-токен и время его истечения."""
+        self.access_token = access
+        self.access_expires_at = token_expires_at(access)
 
     def _refresh(self):
         """Обновить access-токен по refresh-токену."""
@@ -87,27 +122,116 @@ class CRMClient:
             raise RefreshTokenMissingError
         url = f'{self.base_url}/api/auth/jwt/refresh/'
         payload = {'refresh': self.refresh_token}
-        response = self.session.post(url, json=payload)
+        response = self.session.post(url, json=payload, timeout=self.timeout)
         if response.status_code == HTTPStatus.UNAUTHORIZED:
             logger.warning('Refresh-токен недействителен')
             raise RefreshTokenInvalidError
         response.raise_for_status()
         data = response.json()
-        self.access_token = data['access']
-        self.session.headers.update(
-            {'Authorization': f'Bearer {self.access_token}'}
-        )
+        self._set_access(data['access'])
+
+    def _claim_refresh(self) -> tuple[Future, bool]:
+        """Future текущего обновления токена или новое, если его нет.
+
+        Второй элемент — True, если вызвавший поток должен сам выполнить
+        обновление (_run_refresh). Проверка и создание — под блокировкой,
+        поэтому одновременно идёт не больше одного обновления.
+        """
+        with self._refresh_lock:
+            if self._refresh_future is not None:
+                return self._refresh_future, False
+            self._refresh_future = Future()
+            return self._refresh_future, True
+
+    def _run_refresh(self, future: Future):
+        """Выполнить обновление и передать его итог ожидающим future."""
+        try:
+            self._refresh()
+        except Exception as exc:  # noqa: BLE001
+            future.set_exception(exc)
+        else:
+            future.set_result(self.access_token)
+        finally:
+            with self._refresh_lock:
+                self._refresh_future = None
+
+    def _refresh_once(self) -> Future:
+        """Запустить обновление токена или присоединиться к текущему.
+
+        Первый вызвавший поток выполняет _refresh(), остальные получают
+        тот же Future и ждут его результата, не отправляя свои запросы.
+        """
+        future, owner = self._claim_refresh()
+        if owner:
+            self._run_refresh(future)
+        return future
+
+    def _refresh_in_background(self, future: Future):
+        """Фоновое упреждающее обновление; ошибки только логируются."""
+        self._run_refresh(future)
+        exc = future.exception()
+        if exc is None:
+            return
+        if isinstance(exc, (CRMAuthError, requests.RequestException)):
+            logger.warning('Фоновое обновление access-токена не удалось')
+        else:
+            logger.error(
+                'Фоновое обновление access-токена завершилось ошибкой',
+                exc_info=exc,
+            )
+
+    def _start_background_refresh(self):
+        """Запустить фоновое обновление, если никакое ещё не идёт."""
+        future, owner = self._claim_refresh()
+        if owner:
+            threading.Thread(
+                target=self._refresh_in_background,
+                args=(future,),
+                name='crm-token-refresh',
+                daemon=True,
+            ).start()
+
+    def _ensure_fresh_token(self):
+        """Обновить токен заранее, не дожидаясь ответа 401.
+
+        - до exp меньше ACCESS_TOKEN_EXPIRY_SKEW секунд — ждём обновления;
+        - меньше ACCESS_TOKEN_REFRESH_MARGIN — запускаем его в фоне, а
+          текущий запрос идёт со старым, ещё действующим токеном.
+        """
+        if self.access_expires_at is None:
+            return
+        remaining = self.access_expires_at - time.time()
+        if remaining <= ACCESS_TOKEN_EXPIRY_SKEW:
+            self._refresh_once().result()
+        elif remaining <= ACCESS_TOKEN_REFRESH_MARGIN:
+            self._start_background_refresh()
+
+    def _send(self, method, url, token, headers=None, **kwargs):
+        """Отправить запрос с заданным access-токеном и таймаутом."""
+        headers = {**(headers or {}), 'Authorization': f'Bearer {token}'}
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, headers=headers, **kwargs)
 
     def _request(self, method, path, **kwargs):
-        """Сделать запрос к API,при 401 один раз обновить токен и повторить."""
+        """Сделать запрос к API, при 401 один раз обновить токен и повторить.
+
+        Если токен уже обновил другой поток, пока шёл запрос, повторяем
+        запрос с новым токеном без ещё одного обращения к refresh.
+        """
         url = f'{self.base_url}/{path}'
-        response = self.session.request(method, url, **kwargs)
+        try:
+            self._ensure_fresh_token()
+        except CRMAuthError as exc:
+            raise CRMAuthError from exc
+        token = self.access_token
+        response = self._send(method, url, token, **kwargs)
         if response.status_code == HTTPStatus.UNAUTHORIZED:
-            try:
-                self._refresh()
-            except CRMAuthError as exc:
-                raise CRMAuthError from exc
-            response = self.session.request(method, url, **kwargs)
+            if self.access_token == token:
+                try:
+                    self._refresh_once().result()
+                except CRMAuthError as exc:
+                    raise CRMAuthError from exc
+            response = self._send(method, url, self.access_token, **kwargs)
         response.raise_for_status()
         return response
 
@@ -129,6 +253,11 @@ class CRMClient:
         data = response.json()
         return self._extract_results(data)
 
+    def lookup(self, query):
+        """Клиент и его открытые заказы по телефону, заказу или технике."""
+        response = self._request('GET', 'api/bot/lookup/', params={'q': query})
+        return response.json()
+
     def get_client(self, client_id):
         """Получить клиента по id."""
         path = f'api/clients/{client_id}/'
@@ -172,3 +301,17 @@ class CRMClient:
         path = f'api/purchases/{purchase_id}/'
         response = self._request('GET', path)
         return response.json()
+
+    def get_events(self, consumer, limit=None):
+        """Пачка outbox-событий после курсора потребителя."""
+        params = {'consumer': consumer}
+        if limit is not None:
+            params['limit'] = limit
+        response = self._request('GET', 'api/events/', params=params)
+        return response.json()
+
+    def ack_events(self, consumer, last_event_id):
+        """Подтвердить доставку событий до last_event_id включительно."""
+        payload = {'consumer': consumer, 'last_event_id': last_event_id}
+        response = self._request('POST', 'api/events/ack/', json=payload)
+        return response.json()
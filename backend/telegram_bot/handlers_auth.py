@@ -3,12 +3,16 @@
 Содержит обработчики:
 - /start — запуск бота, показ 'Авторизация' или 'Меню';
 - 'Авторизация' — начало ввода логина и пароля;
-- auth_command — поэтапный ввод логина и пароля;
+- auth_username, auth_password — поэтапный ввод логина и пароля;
 - 'Меню' — показ главного меню;
-- /help — вывод справочной информации.
-
-Хендлеры используют общий объект bot и состояния sessions, login_state,
-а также вспомогательные функции из telegram_bot.bot.
+- /help — вывод справочной информации;
+- /subscribe, /unsubscribe — включение и отключение push-уведомлений
+  о смене статусов заказов и покупок.
+
+Команды регистрируются в TeleBot напрямую, кнопки и ввод по этапам
+диалога — в маршрутизаторе router. Хендлеры используют общий объект bot
+и состояния sessions, dialogs, subscriptions, а также вспомогательные
+функции из telegram_bot.bot.
 """
 
 import requests
@@ -16,16 +20,20 @@ import requests
 from .bot import (
     bot,
     clear_dialog_states,
+    dialogs,
     get_crm_or_ask_auth,
     is_allowed_chat,
-    login_state,
+    router,
     sessions,
+    set_stage,
     show_main_menu,
+    subscriptions,
 )
 from .constants import HELP_TEXT
 from .crm_client import CRMClient, get_tokens
 from .keyboards import menu_only_keyboard, start_keyboard
 from .logger import logger
+from .router import Stage
 
 
 @bot.message_handler(commands=['start'])
@@ -54,65 +62,62 @@ def start_command(message):
     )
 
 
-@bot.message_handler(func=lambda m: m.text == 'Авторизация')
+@router.text('Авторизация')
 def login_auth(message):
     """Начинает процесс авторизации - запрашивает логин."""
     chat_id = message.chat.id
-    login_state[chat_id] = {'stage': 'await_username'}
+    clear_dialog_states(chat_id)
+    set_stage(chat_id, Stage.AWAIT_USERNAME)
     bot.send_message(chat_id, 'Введите логин')
 
 
-@bot.message_handler(
-    func=lambda m: login_state.get(m.chat.id, {}).get('stage') is not None,
-    content_types=['text'],
-)
-def auth_command(message):
-    """Обрабатывает поэтапный ввод логина и пароля."""
+@router.stage(Stage.AWAIT_USERNAME)
+def auth_username(message):
+    """Запоминает введённый логин и запрашивает пароль."""
     chat_id = message.chat.id
-    state = login_state.get(chat_id, {}).get('stage')
-    if message.text in {'Авторизация', 'Меню', 'Клиенты', 'Заказы', 'Покупки'}:
-        return
-    if state == 'await_username':
-        username = message.text.strip()
-        login_state[chat_id]['username'] = username
-        login_state[chat_id]['stage'] = 'await_password'
-        bot.send_message(chat_id, 'Введите пароль')
-        return
-    if state == 'await_password':
-        username = login_state[chat_id]['username']
-        password = message.text
-        try:
-            tokens = get_tokens(username, password)
-        except requests.HTTPError:
-            logger.warning(
-                'Неуспешная авторизация: username=%s, chat_id=%s',
-                username,
-                chat_id,
-            )
-            bot.send_message(chat_id, 'Неверный логин или пароль')
-            login_state.pop(chat_id, None)
-            return
-        access = tokens['access']
-        refresh = tokens['refresh']
-        client = CRMClient(access, refresh)
-        sessions[chat_id] = client
-        login_state.pop(chat_id, None)
-        logger.info(
-            'Успешная авторизация: username=%s, chat_id=%s',
+    state = set_stage(chat_id, Stage.AWAIT_PASSWORD)
+    state.username = message.text.strip()
+    bot.send_message(chat_id, 'Введите пароль')
+
+
+@router.stage(Stage.AWAIT_PASSWORD)
+def auth_password(message):
+    """Получает токены по логину и паролю и открывает CRM-сессию."""
+    chat_id = message.chat.id
+    username = dialogs[chat_id].username
+    password = message.text
+    clear_dialog_states(chat_id)
+    try:
+        tokens = get_tokens(username, password)
+    except requests.HTTPError:
+        logger.warning(
+            'Неуспешная авторизация: username=%s, chat_id=%s',
             username,
             chat_id,
         )
-        bot.send_message(
-            chat_id,
-            (
-                'Авторизация успешна! Выберите раздел меню.\n'
-                'Справочная информация в разделе /help.'
-            ),
-            reply_markup=menu_only_keyboard(),
-        )
+        bot.send_message(chat_id, 'Неверный логин или пароль')
+        return
+    access = tokens['access']
+    refresh = tokens['refresh']
+    client = CRMClient(access, refresh)
+    sessions[chat_id] = client
+    subscriptions.add(chat_id)
+    logger.info(
+        'Успешная авторизация: username=%s, chat_id=%s',
+        username,
+        chat_id,
+    )
+    bot.send_message(
+        chat_id,
+        (
+            'Авторизация успешна! Выберите раздел меню.\n'
+            'Справочная информация в разделе /help.'
+        ),
+        reply_markup=menu_only_keyboard(),
+    )
 
 
-@bot.message_handler(func=lambda m: m.text == 'Меню')
+@router.text('Меню')
 def menu_command(message):
     """Обрабатывает кнопку 'Меню': показывает главное меню.
 
@@ -131,3 +136,21 @@ def help_command(message):
     """Обработчик команды /help - отправляет справочную информацию."""
     chat_id = message.chat.id
     bot.send_message(chat_id, HELP_TEXT)
+
+
+@bot.message_handler(commands=['subscribe'])
+def subscribe_command(message):
+    """Включает push-уведомления о смене статусов для чата."""
+    chat_id = message.chat.id
+    if not get_crm_or_ask_auth(chat_id):
+        return
+    subscriptions.add(chat_id)
+    bot.send_message(chat_id, 'Уведомления о смене статусов включены.')
+
+
+@bot.message_handler(commands=['unsubscribe'])
+def unsubscribe_command(message):
+    """Отключает push-уведомления о смене статусов для чата."""
+    chat_id = message.chat.id
+    subscriptions.discard(chat_id)
+    bot.send_message(chat_id, 'Уведомления о смене статусов отключены.')
@@ -2,9 +2,12 @@
 
 Содержит обработчики:
 - 'Клиенты' — вход в раздел, запрос номера телефона клиента;
-- clients_by_phone — поиск и отображение клиента по номеру телефона.
+- clients_by_phone — поиск клиента по телефону, номеру заказа или
+  оборудованию через /api/bot/lookup/ и вывод карточки с открытыми
+  заказами.
 
-Хендлеры опираются на состояния clients_state и sessions и используют
+Хендлеры регистрируются в маршрутизаторе router, опираются на этап
+диалога (Stage.AWAIT_PHONE) и sessions и используют
 CRMClient для доступа к API, а также утилиты из telegram_bot.bot
 (проверка авторизации, обработка ошибок, форматирование).
 """
@@ -13,15 +16,17 @@ from .bot import (
     bot,
     call_api_or_error,
     clear_dialog_states,
-    clients_state,
     get_crm_or_ask_auth,
+    router,
+    set_stage,
     show_main_menu,
 )
-from .constants import ENTITY_LABELS, SERVICE_BUTTONS
+from .constants import ENTITY_LABELS, ORDER_STATUS_LABELS
 from .keyboards import clients_keyboard
+from .router import Stage
 
 
-@bot.message_handler(func=lambda m: m.text == 'Клиенты')
+@router.text('Клиенты')
 def clients_menu_command(message):
     """Обрабатывает кнопку 'Клиенты'.
 
@@ -35,7 +40,7 @@ def clients_menu_command(message):
     if not crm:
         return
     clear_dialog_states(chat_id)
-    clients_state[chat_id] = {'stage': 'await_phone'}
+    set_stage(chat_id, Stage.AWAIT_PHONE)
     bot.send_message(
         chat_id,
         'Поиск по номеру телефона клиента (в формате +7999...) /\n'
@@ -45,48 +50,53 @@ def clients_menu_command(message):
     )
 
 
-@bot.message_handler(
-    func=lambda m: (
-        clients_state.get(m.chat.id, {}).get('stage') == 'await_phone'
-        and (m.text not in SERVICE_BUTTONS)
-    )
-)
+@router.stage(Stage.AWAIT_PHONE)
 def clients_by_phone(message):
-    """Ищет и отображает клиента по номеру телефона, заказа, оборудования."""
+    """Ищет и отображает клиента по номеру телефона, заказа, оборудования.
+
+    Один запрос /api/bot/lookup/ возвращает карточку клиента и его
+    последние открытые заказы.
+    """
     chat_id = message.chat.id
-    phone = message.text.strip()
+    query = message.text.strip()
     try:
         crm = get_crm_or_ask_auth(chat_id)
         if not crm:
             return
-        clients = call_api_or_error(chat_id, crm.get_clients, search=phone)
-        if clients is None:
+        found = call_api_or_error(chat_id, crm.lookup, query)
+        if found is None:
             return
-        if not clients:
+        client = found['client']
+        if client is None:
             bot.send_message(
                 chat_id, 'Клиенты по текущей информации отсутствуют'
             )
             show_main_menu(chat_id)
             return
-        client = clients[0]
-        name = client['client_name']
-        client_phone = client['mobile_phone']
-        entity = client['entity_type']
-        entity_label = ENTITY_LABELS.get(entity, entity)
-        company = client['company']
-        address = client['address']
-        company_display = company or '-'
-        address_display = address or '-'
         bot.send_message(
-            chat_id,
-            (
-                f'Имя: {name},\n'
-                f'Телефон: {client_phone},\n'
-                f'Тип: {entity_label},\n'
-                f'Компания: {company_display},\n'
-                f'Адрес: {address_display}\n'
-            ),
+            chat_id, format_client_message(client, found['orders'])
         )
         show_main_menu(chat_id)
     finally:
-        clients_state.pop(chat_id, None)
+        clear_dialog_states(chat_id)
+
+
+def format_client_message(client: dict, orders: list[dict]) -> str:
+    """Формирует карточку клиента со списком его заказов из lookup."""
+    entity = client['entity_type']
+    entity_label = ENTITY_LABELS.get(entity, entity)
+    text = (
+        f'Имя: {client["client_name"]},\n'
+        f'Телефон: {client["mobile_phone"]},\n'
+        f'Тип: {entity_label},\n'
+        f'Компания: {client["company"] or "-"},\n'
+        f'Адрес: {client["address"] or "-"}\n'
+    )
+    if not orders:
+        return text
+    lines = [
+        f'{order["code"]} — {order["accepted_equipment"]} '
+        f'({ORDER_STATUS_LABELS.get(order["status"], order["status"])})'
+        for order in orders
+    ]
+    return '\n'.join([text, 'Заказы:', *lines])
@@ -8,7 +8,8 @@
 - orders_status_menu — показ клавиатуры со статусами заказов;
 - orders_by_status — фильтрация и вывод заказов по выбранному статусу.
 
-Хендлеры используют состояние orders_state, CRMClient для работы с API
+Хендлеры регистрируются в маршрутизаторе router и используют этапы
+диалога (Stage.ORDERS_MENU, AWAIT_SEARCH, AWAIT_STATUS), CRMClient для работы с API
 и общие утилиты из telegram_bot.bot (format_order_message,
 send_orders_list, обработку ошибок и т.п.).
 """
@@ -18,20 +19,22 @@ from .bot import (
     call_api_or_error,
     clear_dialog_states,
     get_crm_or_ask_auth,
-    orders_state,
+    router,
     send_orders_list,
     sessions,
+    set_stage,
     show_main_menu,
 )
-from .constants import ORDER_STATUS_TEXT_TO_CODE, SERVICE_BUTTONS
+from .constants import ORDER_STATUS_TEXT_TO_CODE
 from .keyboards import (
     orders_menu_keyboard,
     orders_search_keyboard,
     orders_status_keyboard,
 )
+from .router import Stage
 
 
-@bot.message_handler(func=lambda m: m.text == 'Заказы')
+@router.text('Заказы')
 def orders_menu_command(message):
     """Обрабатывает кнопку 'Заказы'.
 
@@ -44,7 +47,7 @@ def orders_menu_command(message):
     if not crm:
         return
     clear_dialog_states(chat_id)
-    orders_state[chat_id] = {'stage': 'orders_menu'}
+    set_stage(chat_id, Stage.ORDERS_MENU)
     bot.send_message(
         chat_id,
         'Выберите действие для заказов:',
@@ -52,19 +55,15 @@ def orders_menu_command(message):
     )
 
 
-@bot.message_handler(
-    func=lambda m: orders_state.get(m.chat.id, {}).get('stage')
-    == 'orders_menu'
-    and m.text == 'Поиск'
-)
+@router.stage_text(Stage.ORDERS_MENU, 'Поиск')
 def orders_search_start(message):
     """Переводит раздел 'Заказы' в режим текстового поиска.
 
-    Устанавливает stage='await_search' и отправляет подсказку о том,
+    Переводит диалог на этап AWAIT_SEARCH и отправляет подсказку о том,
     что можно искать по телефону, номеру заказа или оборудованию.
     """
     chat_id = message.chat.id
-    orders_state[chat_id]['stage'] = 'await_search'
+    set_stage(chat_id, Stage.AWAIT_SEARCH)
     bot.send_message(
         chat_id,
         (
@@ -76,12 +75,7 @@ def orders_search_start(message):
     )
 
 
-@bot.message_handler(
-    func=lambda m: (
-        orders_state.get(m.chat.id, {}).get('stage') == 'await_search'
-        and (m.text not in SERVICE_BUTTONS)
-    )
-)
+@router.stage(Stage.AWAIT_SEARCH)
 def orders_by_search(message):
     """Ищет и отображает заказы по введённой строке.
 
@@ -108,22 +102,18 @@ def orders_by_search(message):
             return
         send_orders_list(chat_id, orders)
     finally:
-        orders_state.pop(chat_id, None)
+        clear_dialog_states(chat_id)
 
 
-@bot.message_handler(
-    func=lambda m: orders_state.get(m.chat.id, {}).get('stage')
-    == 'orders_menu'
-    and m.text == 'Выбор статуса'
-)
+@router.stage_text(Stage.ORDERS_MENU, 'Выбор статуса')
 def orders_status_menu(message):
     """Показывает подменю выбора статуса заказов.
 
-    Переводит stage в 'await_status' и отображает кнопки со статусами
+    Переводит диалог на этап AWAIT_STATUS и отображает кнопки со статусами
     в человекочитаемом виде, а также 'Меню' и 'Авторизация'.
     """
     chat_id = message.chat.id
-    orders_state[chat_id]['stage'] = 'await_status'
+    set_stage(chat_id, Stage.AWAIT_STATUS)
     bot.send_message(
         chat_id,
         'Выберите статус заказов',
@@ -131,12 +121,7 @@ def orders_status_menu(message):
     )
 
 
-@bot.message_handler(
-    func=lambda m: (
-        orders_state.get(m.chat.id, {}).get('stage') == 'await_status'
-        and m.text in ORDER_STATUS_TEXT_TO_CODE
-    )
-)
+@router.stage_text(Stage.AWAIT_STATUS, *ORDER_STATUS_TEXT_TO_CODE)
 def orders_by_status(message):
     """Показывает список заказов с выбранным статусом.
 
@@ -166,4 +151,4 @@ def orders_by_status(message):
             return
         send_orders_list(chat_id, orders)
     finally:
-        orders_state.pop(chat_id, None)
+        clear_dialog_states(chat_id)
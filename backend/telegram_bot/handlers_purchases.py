@@ -7,15 +7,22 @@
 - 'Получено' — покупки со статусом received;
 - 'Установлено' — покупки со статусом installed.
 
-Все варианты используют общий хелпер send_purchases, который проверяет
+Кнопки регистрируются в маршрутизаторе router и действуют на любом
+этапе диалога. Все варианты используют общий хелпер send_purchases, который проверяет
 авторизацию, обращается к API через CRMClient и форматирует вывод.
 """
 
-from .bot import bot, clear_dialog_states, get_crm_or_ask_auth, send_purchases
+from .bot import (
+    bot,
+    clear_dialog_states,
+    get_crm_or_ask_auth,
+    router,
+    send_purchases,
+)
 from .keyboards import purchases_menu_keyboard
 
 
-@bot.message_handler(func=lambda m: m.text == 'Покупки')
+@router.text('Покупки')
 def purchases_menu_command(message):
     """Обрабатывает кнопку 'Покупки'.
 
@@ -35,7 +42,7 @@ def purchases_menu_command(message):
     )
 
 
-@bot.message_handler(func=lambda m: m.text == 'Все покупки')
+@router.text('Все покупки')
 def purchases_all_command(message):
     """Выводит последние покупки без фильтрации по статусу.
 
@@ -45,21 +52,21 @@ def purchases_all_command(message):
     send_purchases(chat_id)
 
 
-@bot.message_handler(func=lambda m: m.text == 'Ожидается поставка')
+@router.text('Ожидается поставка')
 def purchases_awaiting_command(message):
     """Выводит покупки со статусом 'ожидается поставка'."""
     chat_id = message.chat.id
     send_purchases(chat_id, status='delivery_expected')
 
 
-@bot.message_handler(func=lambda m: m.text == 'Получено')
+@router.text('Получено')
 def purchases_received_command(message):
     """Выводит покупки со статусом 'получено'."""
     chat_id = message.chat.id
     send_purchases(chat_id, status='received')
 
 
-@bot.message_handler(func=lambda m: m.text == 'Установлено')
+@router.text('Установлено')
 def purchases_installed_command(message):
     """Выводит покупки со статусом 'установлено'."""
     chat_id = message.chat.id
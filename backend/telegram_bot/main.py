@@ -1,13 +1,21 @@
 """Точка входа для запуска Telegram-бота CRM.
 
-Импортирует объект bot и модули с хендлерами, чтобы зарегистрировать все
-@bot.message_handler, затем запускает бесконечный long polling.
+Импортирует объект bot и модули с хендлерами, чтобы зарегистрировать
+команды (@bot.message_handler) и маршруты router, затем подключает
+router.dispatch последним хендлером и запускает приём апдейтов в режиме из
+TELEGRAM_DELIVERY_MODE: бесконечный long polling (по умолчанию) или
+webhook-сервер с пулом обработчиков (telegram_bot.webhook). Параллельно
+в фоне запускается доставка push-уведомлений о смене статусов
+(telegram_bot.notifications), если задан служебный пользователь.
 """
 
 import importlib
 
-from .bot import bot
+from .bot import bot, router, subscriptions
+from .config import DELIVERY_MODE_WEBHOOK, TELEGRAM_DELIVERY_MODE
 from .logger import logger
+from .notifications import start_notifications
+from .webhook import run_webhook
 
 HANDLER_MODULES = [
     'telegram_bot.handlers_auth',
@@ -18,15 +26,22 @@ HANDLER_MODULES = [
 
 
 def load_handlers() -> None:
-    """Импортирует все модули с хендлерами (@bot.message_handler)."""
+    """Импортирует модули с хендлерами и подключает маршрутизатор."""
     for module in HANDLER_MODULES:
         importlib.import_module(module)
+    router.install(bot)
     logger.info('Handlers loaded: %s', ', '.join(HANDLER_MODULES))
 
 
 def main() -> None:
     """Точка входа для запуска бота."""
     load_handlers()
+    start_notifications(bot, subscriptions)
+    if TELEGRAM_DELIVERY_MODE == DELIVERY_MODE_WEBHOOK:
+        run_webhook(bot)
+        return
+    # getUpdates не работает, пока зарегистрирован webhook.
+    bot.remove_webhook()
     logger.info('Bot started, polling...')
     bot.infinity_polling(skip_pending=True)
 
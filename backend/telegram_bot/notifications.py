@@ -0,0 +1,267 @@
+"""Push-уведомления о смене статусов заказов и покупок.
+
+Вместо того чтобы техники опрашивали меню бота (и каждый раз API), сервер
+пишет события в outbox (crm.OrderEvent) в одной транзакции со сменой
+статуса, а бот вычитывает их пачками через GET /api/events/ и рассылает
+подписанным чатам одно объединённое сообщение на пачку.
+
+Гарантии доставки:
+- курсор потребителя на сервере сдвигается (POST /api/events/ack/) только
+  после того, как пачка доставлена всем подписчикам, — при сбое пачка
+  будет получена повторно («хотя бы один раз»);
+- курсоры чатов (chat_cursors) хранят последнее доставленное событие,
+  поэтому при повторе пачки чаты, уже получившие её, не получают дубль;
+- ошибки Telegram и сети повторяются с экспоненциальной задержкой,
+  заблокировавшие бота чаты (400/403) удаляются из подписки;
+- чат, которому сообщение не доставлено и после повторов, не держит
+  остальных: его сообщения откладываются (не больше EVENTS_PARKED_LIMIT,
+  в памяти бота) и повторяются в начале следующих прогонов, а пачка
+  подтверждается.
+"""
+
+import threading
+import time
+from collections import deque
+
+import requests
+from telebot.apihelper import ApiTelegramException
+
+from .config import (
+    TELEGRAM_EVENTS_PASSWORD,
+    TELEGRAM_EVENTS_POLL_INTERVAL,
+    TELEGRAM_EVENTS_USERNAME,
+)
+from .constants import (
+    EVENTS_BATCH_SIZE,
+    EVENTS_CONSUMER,
+    EVENTS_MAX_BACKOFF,
+    EVENTS_PARKED_LIMIT,
+    EVENTS_SEND_ATTEMPTS,
+    ORDER_STATUS_LABELS,
+    PURCHASE_STATUS_LABELS,
+)
+from .crm_client import CRMClient, CRMClientError, get_tokens
+from .logger import logger
+
+MESSAGE_LIMIT = 4096  # ограничение Telegram на длину сообщения
+UNSUBSCRIBE_ERROR_CODES = frozenset({400, 403})
+
+
+class DeliveryError(CRMClientError):
+    """Сообщение не удалось доставить в чат после всех попыток."""
+
+    default_message = 'Не удалось доставить уведомление'
+
+
+def backoff_delay(attempt: int, max_delay=EVENTS_MAX_BACKOFF) -> float:
+    """Экспоненциальная задержка: 1, 2, 4, ... секунд, не больше max."""
+    return float(min(max_delay, 2 ** max(attempt - 1, 0)))
+
+
+def _event_key(event: dict):
+    """Ключ объекта события для объединения нескольких смен статуса."""
+    if event['kind'] == 'purchase_status':
+        return ('purchase', event['purchase_id'] or f'event-{event["id"]}')
+    return ('order', event['order_id'] or f'event-{event["id"]}')
+
+
+def _format_event(event: dict, old_status: str) -> str:
+    """Строка уведомления об одном (объединённом) изменении статуса."""
+    if event['kind'] == 'purchase_status':
+        labels = PURCHASE_STATUS_LABELS
+        order_part = (
+            f' к заказу {event["order_code"]}'
+            if event['order_code']
+            else ' без заказа'
+        )
+        subject = f'Покупка «{event["title"]}»{order_part}'
+    else:
+        labels = ORDER_STATUS_LABELS
+        subject = f'Заказ {event["order_code"]} ({event["title"]})'
+    old_label = labels.get(old_status, old_status)
+    new_label = labels.get(event['new_status'], event['new_status'])
+    return f'{subject}: {old_label} → {new_label}'
+
+
+def format_events(events: list[dict]) -> str:
+    """Объединяет пачку событий в один текст уведомления.
+
+    Несколько смен статуса одного объекта схлопываются в одну строку
+    «первый прежний статус → последний новый»; если статус вернулся к
+    исходному, строка не выводится.
+    """
+    first_old = {}
+    latest = {}
+    for event in events:
+        key = _event_key(event)
+        first_old.setdefault(key, event['old_status'])
+        latest[key] = event
+    lines = [
+        _format_event(event, first_old[key])
+        for key, event in latest.items()
+        if first_old[key] != event['new_status']
+    ]
+    if not lines:
+        return ''
+    text = '\n'.join(['Изменения статусов:', *lines])
+    return text[:MESSAGE_LIMIT]
+
+
+class EventConsumer:
+    """Потребитель outbox-событий с рассылкой подписанным чатам."""
+
+    consumer = EVENTS_CONSUMER
+    batch_size = EVENTS_BATCH_SIZE
+    poll_interval = TELEGRAM_EVENTS_POLL_INTERVAL
+    send_attempts = EVENTS_SEND_ATTEMPTS
+    parked_limit = EVENTS_PARKED_LIMIT
+
+    def __init__(self, crm, send_message, subscribers, sleep=time.sleep):
+        """Создаёт потребителя; subscribers — изменяемое множество chat_id."""
+        self.crm = crm
+        self.send_message = send_message
+        self.subscribers = subscribers
+        self.sleep = sleep
+        self.chat_cursors = {}
+        self.parked = {}
+
+    def _deliver(self, chat_id: int, text: str, attempts=None):
+        """Отправляет сообщение в чат с повторами и задержкой."""
+        attempts = attempts or self.send_attempts
+        for attempt in range(1, attempts + 1):
+            delay = backoff_delay(attempt)
+            try:
+                self.send_message(chat_id, text)
+            except ApiTelegramException as exc:
+                if exc.error_code in UNSUBSCRIBE_ERROR_CODES:
+                    logger.warning(
+                        'Чат %s недоступен (%s), подписка снята',
+                        chat_id,
+                        exc.error_code,
+                    )
+                    self.subscribers.discard(chat_id)
+                    return
+                parameters = exc.result_json.get('parameters') or {}
+                delay = parameters.get('retry_after', delay)
+            except requests.RequestException:
+                logger.warning('Сетевая ошибка при отправке в чат %s', chat_id)
+            else:
+                return
+            if attempt < attempts:
+                self.sleep(delay)
+        raise DeliveryError
+
+    def _send(self, chat_id: int, text: str):
+        """Доставляет сообщение чату или откладывает его при сбое."""
+        queue = self.parked.get(chat_id)
+        if queue is None:
+            try:
+                self._deliver(chat_id, text)
+            except DeliveryError:
+                logger.warning(
+                    'Чат %s недоступен, сообщения отложены', chat_id
+                )
+                self.parked[chat_id] = deque([text], maxlen=self.parked_limit)
+            return
+        if len(queue) == queue.maxlen:
+            logger.warning(
+                'Чат %s: отложенных сообщений больше %s, старое отброшено',
+                chat_id,
+                self.parked_limit,
+            )
+        queue.append(text)
+
+    def _retry_parked(self):
+        """Повторяет отложенные сообщения, по одной попытке на чат."""
+        for chat_id, queue in list(self.parked.items()):
+            while queue and chat_id in self.subscribers:
+                try:
+                    self._deliver(chat_id, queue[0], attempts=1)
+                except DeliveryError:
+                    break
+                queue.popleft()
+            else:
+                del self.parked[chat_id]
+
+    def run_once(self) -> int:
+        """Доставляет одну пачку событий; возвращает её размер."""
+        self._retry_parked()
+        events = self.crm.get_events(self.consumer, limit=self.batch_size)
+        if not events:
+            return 0
+        last_id = events[-1]['id']
+        text = format_events(events)
+        if text:
+            for chat_id in sorted(set(self.subscribers)):
+                if self.chat_cursors.get(chat_id, 0) >= last_id:
+                    continue
+                self._send(chat_id, text)
+                self.chat_cursors[chat_id] = last_id
+        self.crm.ack_events(self.consumer, last_id)
+        return len(events)
+
+    def run_forever(self, stop_event: threading.Event):
+        """Цикл доставки до установки stop_event.
+
+        Полные пачки вычитываются без паузы, после неполной — ждём
+        poll_interval; при ошибках — экспоненциальная задержка.
+        """
+        failures = 0
+        while not stop_event.is_set():
+            try:
+                delivered = self.run_once()
+            except (CRMClientError, requests.RequestException):
+                failures += 1
+                logger.exception(
+                    'Ошибка доставки событий, попытка %s', failures
+                )
+                stop_event.wait(backoff_delay(failures))
+                continue
+            failures = 0
+            if delivered < self.batch_size:
+                stop_event.wait(self.poll_interval)
+
+
+def _login(stop_event: threading.Event):
+    """Авторизуется служебным пользователем, повторяя при сбоях."""
+    attempt = 0
+    while not stop_event.is_set():
+        try:
+            tokens = get_tokens(
+                TELEGRAM_EVENTS_USERNAME, TELEGRAM_EVENTS_PASSWORD
+            )
+        except requests.RequestException:
+            attempt += 1
+            logger.exception('Не удалось авторизовать потребителя событий')
+            stop_event.wait(backoff_delay(attempt))
+            continue
+        return CRMClient(tokens['access'], tokens['refresh'])
+    return None
+
+
+def _run(bot, subscribers, stop_event):
+    """Тело фонового потока: авторизация и цикл доставки."""
+    crm = _login(stop_event)
+    if crm is None:
+        return
+    EventConsumer(crm, bot.send_message, subscribers).run_forever(stop_event)
+
+
+def start_notifications(bot, subscribers):
+    """Запускает фоновую доставку уведомлений, если она настроена.
+
+    Возвращает threading.Event для остановки или None, если служебный
+    пользователь (TELEGRAM_EVENTS_USERNAME) не задан.
+    """
+    if not TELEGRAM_EVENTS_USERNAME:
+        logger.info('Push-уведомления отключены: нет TELEGRAM_EVENTS_USERNAME')
+        return None
+    stop_event = threading.Event()
+    threading.Thread(
+        target=_run,
+        args=(bot, subscribers, stop_event),
+        name='order-events',
+        daemon=True,
+    ).start()
+    logger.info('Push-уведомления о смене статусов запущены')
+    return stop_event
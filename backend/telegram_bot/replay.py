@@ -0,0 +1,180 @@
+r"""Нагрузочное воспроизведение записанных апдейтов на webhook бота.
+
+Читает апдейты Telegram (JSON-массив или JSON Lines, один Update на строку),
+при необходимости размножает диалоги на N синтетических чатов и отправляет
+их на webhook-сервер (telegram_bot.webhook) с секретным заголовком.
+Апдейты одного чата уходят строго последовательно, разные чаты — параллельно,
+как это делает сам Telegram. В конце печатает пропускную способность,
+распределение HTTP-статусов и перцентили задержки ответа.
+
+Пример (из каталога backend/):
+
+    python -m telegram_bot.replay updates.jsonl --chats 200 \
+        --url http://127.0.0.1:8443/telegram/webhook/
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from .config import (
+    TELEGRAM_WEBHOOK_PORT,
+    TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_URL,
+)
+from .webhook import SECRET_HEADER
+
+CHAT_ID_STEP = 1_000_000  # сдвиг chat_id для синтетических копий диалога
+PERCENTILES = (50, 95, 99)
+
+
+def load_updates(path: Path) -> list[dict]:
+    """Загружает апдейты из JSON-массива или файла JSON Lines."""
+    text = path.read_text(encoding='utf-8').strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _message_of(update: dict) -> dict | None:
+    """Возвращает сообщение апдейта, из которого берётся chat_id."""
+    return update.get('message') or update.get('edited_message')
+
+
+def group_by_chat(updates: list[dict], copies: int) -> list[list[dict]]:
+    """Группирует апдейты по чатам, размножая каждый диалог copies раз.
+
+    Копии получают сдвинутые chat.id/from.id и уникальные update_id,
+    порядок апдейтов внутри каждого чата сохраняется.
+    """
+    update_ids = itertools.count(1)
+    chats = defaultdict(list)
+    for copy_index in range(copies):
+        shift = copy_index * CHAT_ID_STEP
+        for original in updates:
+            update = copy.deepcopy(original)
+            update['update_id'] = next(update_ids)
+            message = _message_of(update)
+            chat_id = 0
+            if message is not None:
+                message['chat']['id'] += shift
+                if 'from' in message:
+                    message['from']['id'] += shift
+                chat_id = message['chat']['id']
+            chats[chat_id].append(update)
+    return list(chats.values())
+
+
+class ReplayStats:
+    """Потокобезопасный сбор статусов и задержек ответов."""
+
+    def __init__(self):
+        """Создаёт пустую статистику."""
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.statuses = Counter()
+
+    def add(self, status, latency: float):
+        """Учитывает один ответ webhook-сервера."""
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] += 1
+
+
+def percentile(values: list[float], rank: int) -> float:
+    """Перцентиль по методу ближайшего ранга (values отсортирован)."""
+    if not values:
+        return 0.0
+    index = max(0, -(-rank * len(values) // 100) - 1)
+    return values[index]
+
+
+def replay_chat(url, secret, updates, stats, timeout):
+    """Последовательно отправляет апдейты одного чата."""
+    session = requests.Session()
+    session.headers[SECRET_HEADER] = secret
+    for update in updates:
+        started = time.perf_counter()
+        try:
+            response = session.post(url, json=update, timeout=timeout)
+            status = response.status_code
+        except requests.RequestException as exc:
+            status = type(exc).__name__
+        stats.add(status, time.perf_counter() - started)
+
+
+def run_replay(url, secret, chats, concurrency, timeout) -> ReplayStats:
+    """Воспроизводит чаты с заданным числом параллельных отправителей."""
+    stats = ReplayStats()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for updates in chats:
+            executor.submit(replay_chat, url, secret, updates, stats, timeout)
+    return stats
+
+
+def format_report(stats: ReplayStats, elapsed: float) -> str:
+    """Формирует текстовый отчёт по результатам прогона."""
+    latencies = sorted(stats.latencies)
+    total = len(latencies)
+    lines = [
+        f'Отправлено апдейтов: {total} за {elapsed:.2f} с '
+        f'({total / elapsed if elapsed else 0:.1f} апдейтов/с)',
+        'Статусы: '
+        + ', '.join(
+            f'{status}={count}' for status, count in stats.statuses.items()
+        ),
+    ]
+    lines.extend(
+        f'p{rank}: {percentile(latencies, rank) * 1000:.1f} мс'
+        for rank in PERCENTILES
+    )
+    if latencies:
+        lines.append(f'max: {latencies[-1] * 1000:.1f} мс')
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('updates', type=Path, help='файл с апдейтами')
+    parser.add_argument(
+        '--url',
+        default=TELEGRAM_WEBHOOK_URL
+        or f'http://127.0.0.1:{TELEGRAM_WEBHOOK_PORT}/',
+        help='адрес webhook-сервера',
+    )
+    parser.add_argument('--secret', default=TELEGRAM_WEBHOOK_SECRET)
+    parser.add_argument(
+        '--chats', type=int, default=1, help='копий каждого диалога'
+    )
+    parser.add_argument(
+        '--concurrency', type=int, default=16, help='параллельных чатов'
+    )
+    parser.add_argument('--timeout', type=float, default=10.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Точка входа: загрузка, воспроизведение и вывод отчёта."""
+    args = parse_args(argv)
+    chats = group_by_chat(load_updates(args.updates), args.chats)
+    started = time.perf_counter()
+    stats = run_replay(
+        args.url, args.secret, chats, args.concurrency, args.timeout
+    )
+    elapsed = time.perf_counter() - started
+    sys.stdout.write(format_report(stats, elapsed) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+"""Маршрутизация текстовых сообщений и состояние диалогов по чатам.
+
+Вместо цепочки @bot.message_handler(func=lambda m: ...), которую TeleBot
+проверяет по очереди для каждого апдейта, все текстовые сообщения
+попадают в единственный хендлер Router.dispatch, а он выбирает обработчик
+по хеш-таблицам:
+1. (этап диалога, текст) — кнопки, действующие только на своём этапе
+   ('Поиск', 'Выбор статуса', кнопки статусов заказов);
+2. этап диалога — свободный ввод (логин, пароль, строка поиска), кроме
+   служебных кнопок SERVICE_BUTTONS;
+3. текст — кнопки, действующие из любого места (разделы меню, фильтры
+   покупок).
+
+Этап диалога чата хранится в компактном объекте DialogState (__slots__),
+допустимые переходы между этапами заданы таблицей TRANSITIONS.
+"""
+
+from .constants import SERVICE_BUTTONS
+from .logger import logger
+
+
+class Stage:
+    """Этапы диалогов бота."""
+
+    IDLE = 'idle'
+    AWAIT_USERNAME = 'await_username'
+    AWAIT_PASSWORD = 'await_password'  # noqa: S105
+    AWAIT_PHONE = 'await_phone'
+    ORDERS_MENU = 'orders_menu'
+    AWAIT_SEARCH = 'await_search'
+    AWAIT_STATUS = 'await_status'
+
+
+# Этапы, в которые можно попасть из любого состояния (кнопками разделов).
+ENTRY_STAGES = frozenset(
+    {
+        Stage.IDLE,
+        Stage.AWAIT_USERNAME,
+        Stage.AWAIT_PHONE,
+        Stage.ORDERS_MENU,
+    }
+)
+
+# Переходы внутри диалога: этап -> допустимые следующие этапы.
+TRANSITIONS = {
+    Stage.AWAIT_USERNAME: frozenset({Stage.AWAIT_PASSWORD}),
+    Stage.ORDERS_MENU: frozenset({Stage.AWAIT_SEARCH, Stage.AWAIT_STATUS}),
+}
+
+
+class DialogState:
+    """Этап диалога одного чата и введённый на нём логин."""
+
+    __slots__ = ('stage', 'username')
+
+    def __init__(self, stage=Stage.IDLE):
+        """Создаёт состояние на указанном этапе."""
+        self.stage = stage
+        self.username = None
+
+    def advance(self, stage):
+        """Переводит диалог на этап stage, проверяя таблицу переходов."""
+        if stage not in ENTRY_STAGES and stage not in TRANSITIONS.get(
+            self.stage, ()
+        ):
+            raise ValueError(  # noqa: TRY003
+                f'Недопустимый переход {self.stage} -> {stage}'
+            )
+        self.stage = stage
+
+
+class Router:
+    """Диспетчер текстовых сообщений по таблицам обработчиков."""
+
+    def __init__(self, dialogs):
+        """Создаёт пустые таблицы; dialogs — словарь chat_id -> DialogState."""
+        self.dialogs = dialogs
+        self.text_routes = {}
+        self.stage_text_routes = {}
+        self.stage_routes = {}
+
+    def text(self, *texts):
+        """Регистрирует обработчик кнопок, действующих на любом этапе."""
+
+        def decorator(handler):
+            for text in texts:
+                self.text_routes[text] = handler
+            return handler
+
+        return decorator
+
+    def stage_text(self, stage, *texts):
+        """Регистрирует обработчик кнопок, действующих только на этапе."""
+
+        def decorator(handler):
+            for text in texts:
+                self.stage_text_routes[stage, text] = handler
+            return handler
+
+        return decorator
+
+    def stage(self, stage):
+        """Регистрирует обработчик свободного ввода на этапе диалога."""
+
+        def decorator(handler):
+            self.stage_routes[stage] = handler
+            return handler
+
+        return decorator
+
+    def resolve(self, chat_id, text):
+        """Возвращает обработчик для текста в текущем этапе чата или None."""
+        state = self.dialogs.get(chat_id)
+        stage = state.stage if state is not None else Stage.IDLE
+        handler = self.stage_text_routes.get((stage, text))
+        if handler is not None:
+            return handler
+        if text not in SERVICE_BUTTONS:
+            handler = self.stage_routes.get(stage)
+            if handler is not None:
+                return handler
+        return self.text_routes.get(text)
+
+    def dispatch(self, message):
+        """Единый хендлер TeleBot для всех текстовых сообщений."""
+        handler = self.resolve(message.chat.id, message.text)
+        if handler is None:
+            logger.debug(
+                'Нет обработчика для сообщения в chat_id=%s', message.chat.id
+            )
+            return
+        handler(message)
+
+    def install(self, bot):
+        """Регистрирует dispatch последним хендлером бота.
+
+        Хендлеры команд (/start, /help, ...) регистрируются раньше и
+        проверяются TeleBot первыми.
+        """
+        bot.register_message_handler(self.dispatch, content_types=['text'])
@@ -0,0 +1,219 @@
+"""Доставка апдейтов Telegram через webhook.
+
+Содержит:
+- ChatOrderedWorkerPool — ограниченный пул потоков-обработчиков, который
+  раскладывает апдейты по очередям по chat_id: апдейты одного чата всегда
+  обрабатываются одним потоком строго по очереди (диалоги зависят от
+  переходов этапов DialogState), а разные чаты
+  обрабатываются параллельно;
+- WebhookRequestHandler — обработчик HTTP POST от Telegram: проверяет путь
+  и секрет X-Telegram-Bot-Api-Secret-Token и передаёт апдейт в пул;
+- build_server/run_webhook — запуск лёгкого HTTP-сервера на стандартной
+  библиотеке и регистрацию webhook в Telegram.
+
+Если очередь нужного обработчика переполнена, сервер отвечает 503 —
+Telegram повторит доставку позже, а память процесса остаётся ограниченной.
+"""
+
+import hmac
+import json
+import queue
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from telebot import types
+
+from .config import (
+    TELEGRAM_WEBHOOK_LISTEN,
+    TELEGRAM_WEBHOOK_PORT,
+    TELEGRAM_WEBHOOK_QUEUE_SIZE,
+    TELEGRAM_WEBHOOK_SECRET,
+    TELEGRAM_WEBHOOK_URL,
+    TELEGRAM_WEBHOOK_WORKERS,
+)
+from .logger import logger
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'  # noqa: S105
+MAX_BODY_SIZE = 1_000_000  # 1 MB — апдейты Telegram намного меньше
+_STOP = object()
+
+
+def update_chat_id(update: types.Update) -> int:
+    """Возвращает chat_id апдейта или update_id, если чата в апдейте нет."""
+    for message in (
+        update.message,
+        update.edited_message,
+        getattr(update.callback_query, 'message', None),
+    ):
+        if message is not None:
+            return message.chat.id
+    return update.update_id
+
+
+class ChatOrderedWorkerPool:
+    """Пул обработчиков с сохранением порядка апдейтов внутри чата.
+
+    Каждому потоку соответствует своя ограниченная очередь; чат
+    закрепляется за потоком по остатку от деления chat_id на число
+    потоков, поэтому апдейты одного чата не обгоняют друг друга.
+    """
+
+    def __init__(self, handler, num_workers, queue_size):
+        """Создаёт очереди; потоки запускаются методом start()."""
+        if num_workers < 1:
+            raise ValueError('num_workers должен быть не меньше 1')  # noqa
+        self._handler = handler
+        self._queues = [
+            queue.Queue(maxsize=queue_size) for _ in range(num_workers)
+        ]
+        self._threads = []
+
+    def start(self):
+        """Запускает потоки-обработчики."""
+        for index, tasks in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._work,
+                args=(tasks,),
+                name=f'webhook-worker-{index}',
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, update: types.Update) -> bool:
+        """Ставит апдейт в очередь его чата; False — очередь переполнена."""
+        tasks = self._queues[update_chat_id(update) % len(self._queues)]
+        try:
+            tasks.put_nowait(update)
+        except queue.Full:
+            logger.warning(
+                'Очередь webhook переполнена, update_id=%s отклонён',
+                update.update_id,
+            )
+            return False
+        return True
+
+    def stop(self, timeout=None):
+        """Дожидается обработки уже принятых апдейтов и останавливает пул."""
+        for tasks in self._queues:
+            tasks.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def _work(self, tasks):
+        """Цикл потока: последовательно обрабатывает апдейты своей очереди."""
+        while True:
+            update = tasks.get()
+            try:
+                if update is _STOP:
+                    return
+                self._handler([update])
+            except Exception:  # noqa: BLE001
+                logger.exception(
+                    'Ошибка обработки update_id=%s', update.update_id
+                )
+            finally:
+                tasks.task_done()
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """Принимает POST от Telegram и передаёт апдейт в пул обработчиков."""
+
+    # Заполняются в build_server() через подкласс.
+    pool: ChatOrderedWorkerPool
+    path_expected = '/'
+    secret = ''
+
+    def do_POST(self):
+        """Проверяет запрос и ставит апдейт в очередь его чата."""
+        if urlsplit(self.path).path != self.path_expected:
+            self._reply(HTTPStatus.NOT_FOUND)
+            return
+        token = self.headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(token, self.secret):
+            logger.warning(
+                'Webhook: неверный секрет от %s', self.client_address
+            )
+            self._reply(HTTPStatus.FORBIDDEN)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if not 0 < length <= MAX_BODY_SIZE:
+            self._reply(HTTPStatus.BAD_REQUEST)
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            update = types.Update.de_json(payload)
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Webhook: некорректное тело запроса')
+            self._reply(HTTPStatus.BAD_REQUEST)
+            return
+        if not self.pool.submit(update):
+            self._reply(HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        self._reply(HTTPStatus.OK)
+
+    def _reply(self, status: HTTPStatus):
+        """Отправляет пустой ответ с указанным статусом."""
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):  # noqa: PLR6301
+        """Пишет access-лог HTTP-сервера в логгер бота."""
+        logger.debug('Webhook: ' + format, *args)
+
+
+def build_server(pool, host, port, path, secret):
+    """Создаёт HTTP-сервер webhook, привязанный к пулу обработчиков."""
+    handler_class = type(
+        'BoundWebhookRequestHandler',
+        (WebhookRequestHandler,),
+        {'pool': pool, 'path_expected': path or '/', 'secret': secret},
+    )
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    return server
+
+
+def run_webhook(bot):
+    """Регистрирует webhook в Telegram и обслуживает его до остановки."""
+    if not TELEGRAM_WEBHOOK_URL or not TELEGRAM_WEBHOOK_SECRET:
+        raise RuntimeError(  # noqa: TRY003
+            'Для режима webhook нужны TELEGRAM_WEBHOOK_URL и '
+            'TELEGRAM_WEBHOOK_SECRET'
+        )
+    pool = ChatOrderedWorkerPool(
+        bot.process_new_updates,
+        num_workers=TELEGRAM_WEBHOOK_WORKERS,
+        queue_size=TELEGRAM_WEBHOOK_QUEUE_SIZE,
+    )
+    server = build_server(
+        pool,
+        TELEGRAM_WEBHOOK_LISTEN,
+        TELEGRAM_WEBHOOK_PORT,
+        urlsplit(TELEGRAM_WEBHOOK_URL).path,
+        TELEGRAM_WEBHOOK_SECRET,
+    )
+    pool.start()
+    bot.set_webhook(
+        url=TELEGRAM_WEBHOOK_URL,
+        secret_token=TELEGRAM_WEBHOOK_SECRET,
+        drop_pending_updates=True,
+        max_connections=TELEGRAM_WEBHOOK_WORKERS,
+    )
+    logger.info(
+        'Webhook started on %s:%s, workers=%s',
+        TELEGRAM_WEBHOOK_LISTEN,
+        TELEGRAM_WEBHOOK_PORT,
+        TELEGRAM_WEBHOOK_WORKERS,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info('Webhook stopping...')
+    finally:
+        server.server_close()
+        pool.stop()